@@ -3,6 +3,7 @@ Script para agregar datos de prueba al bot
 Ejecuta este archivo para llenar la base de datos con proyectos, tareas y notas de ejemplo
 """
 from datetime import date, timedelta
+import config
 from database.models import DatabaseManager, Project, Task, Note
 
 def add_sample_data():
@@ -14,9 +15,10 @@ def add_sample_data():
     
     # Inicializar gestores
     db = DatabaseManager()
-    project_manager = Project(db)
-    task_manager = Task(db)
-    note_manager = Note(db)
+    owner_id = config.AUTHORIZED_USER_ID  # Los datos de prueba son del usuario principal
+    project_manager = Project(db, owner_id)
+    task_manager = Task(db, owner_id)
+    note_manager = Note(db, owner_id)
     
     # Calcular fechas
     today = date.today()
@@ -0,0 +1,12 @@
+"""
+Benchmarks del bot de productividad
+
+Uso:
+    python -m benchmarks                      # dataset por defecto (100.000 objetivos)
+    python -m benchmarks --tasks 10000 --output resultados.json
+    python -m benchmarks --compare anterior.json
+    python -m benchmarks.loadtest --users 10 --rate 50   # prueba de carga del bot completo
+
+Todo se ejecuta en una carpeta temporal con su propia base de datos:
+nunca toca productivity_bot.db ni necesita conexión con Telegram.
+"""
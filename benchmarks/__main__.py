@@ -0,0 +1,110 @@
+"""
+Punto de entrada: python -m benchmarks [opciones]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import config
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks del bot con un dataset sintético (no toca la base de datos real)"
+    )
+    parser.add_argument('--projects', type=int, default=500, help="Proyectos a generar")
+    parser.add_argument('--tasks', type=int, default=100_000, help="Objetivos principales (sin contar subtareas)")
+    parser.add_argument('--notes', type=int, default=20_000, help="Notas a generar")
+    parser.add_argument('--seed', type=int, default=42, help="Semilla del generador")
+    parser.add_argument('--output', default="benchmark_results.json", help="Fichero JSON de resultados")
+    parser.add_argument('--compare', help="Resultados anteriores con los que comparar (JSON)")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Empeoramiento de p50 a partir del cual hay regresión (0.2 = 20%%)")
+    parser.add_argument('--filter', help="Ejecutar solo los benchmarks cuyo nombre contenga este texto")
+    parser.add_argument('--skip-handlers', action='store_true', help="No ejecutar los benchmarks de handlers")
+    parser.add_argument('--keep', action='store_true', help="No borrar la carpeta temporal con la base de datos")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    output = os.path.abspath(args.output)
+    compare = os.path.abspath(args.compare) if args.compare else None
+
+    # Todo (base de datos, logs, archivos por usuario) se crea en una carpeta temporal:
+    # las rutas de config.py son relativas al directorio actual
+    original_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="cortana_bench_")
+    os.chdir(workdir)
+
+    try:
+        from database.models import DatabaseManager
+        from benchmarks.core import BenchmarkSuite, compare_results
+        from benchmarks.datagen import generate_dataset
+        from benchmarks import micro
+        from benchmarks.handlers_bench import run_handler_benchmarks
+
+        owner_id = config.AUTHORIZED_USER_ID
+        db = DatabaseManager()
+
+        print(f"🧪 Generando dataset (semilla {args.seed}) en {workdir}...")
+        slow_query_ms = config.SQL_SLOW_QUERY_MS
+        config.SQL_SLOW_QUERY_MS = float('inf')  # La carga masiva no es una consulta lenta
+        start = time.perf_counter()
+        counts = generate_dataset(db, owner_id, args.projects, args.tasks, args.notes, args.seed)
+        config.SQL_SLOW_QUERY_MS = slow_query_ms
+        print(f"   {counts} en {time.perf_counter() - start:.1f} s\n")
+
+        suite = BenchmarkSuite(name_filter=args.filter)
+
+        # Primero los modelos sin instrumentar: ProductivityBot añade las métricas de /stats
+        micro.run_all(suite, db, owner_id)
+        if not args.skip_handlers:
+            asyncio.run(run_handler_benchmarks(suite, owner_id))
+
+        suite.write_json(output, meta={'seed': args.seed, 'dataset': counts})
+        print(f"\n💾 Resultados en {output}")
+
+        if suite.errors:
+            print(f"⚠️ {len(suite.errors)} benchmark(s) con errores (ver 'errors' en el JSON)")
+
+        if compare:
+            with open(compare, encoding='utf-8') as f:
+                previous = json.load(f)
+            return report_comparison(compare_results(previous, suite.to_dict(), args.threshold))
+
+        return 0
+    finally:
+        os.chdir(original_cwd)
+        if args.keep:
+            print(f"📁 Datos conservados en {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def report_comparison(rows) -> int:
+    """Imprime la comparación y devuelve 1 si hay alguna regresión"""
+    regressions = [row for row in rows if row['regression']]
+
+    print(f"\n📊 Comparación con la ejecución anterior ({len(rows)} benchmarks en común)")
+    for row in sorted(rows, key=lambda r: r['change'], reverse=True)[:15]:
+        mark = "🔴" if row['regression'] else ("🟢" if row['change'] < 0 else "⚪")
+        print(f"  {mark} {row['name']:<55} {row['old_p50_us']:>10.1f} → {row['new_p50_us']:>10.1f} µs "
+              f"({row['change']:+.0%})")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regresión(es)")
+        return 1
+
+    print("\n✅ Sin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Medición y resultados de los benchmarks
+Cada benchmark se repite hasta llenar un tiempo mínimo y se guardan los
+tiempos de cada iteración para calcular media y percentiles.
+"""
+import contextlib
+import io
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Límites de cada benchmark
+MIN_TIME = 0.2  # Segundos midiendo como mínimo
+MIN_ITERATIONS = 5
+MAX_ITERATIONS = 5000
+WARMUP_ITERATIONS = 2
+
+# Una diferencia menor que esta (en p50) no se considera regresión
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+
+class _NullStream(io.TextIOBase):
+    """Descarta lo que se escribe: los prints de depuración no cuentan como resultado"""
+
+    def write(self, text):
+        return len(text)
+
+
+def quiet_stdout():
+    """Context manager que silencia los print() mientras se mide"""
+    return contextlib.redirect_stdout(_NullStream())
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize_timings(timings_ns: List[int]) -> Dict[str, Any]:
+    """Estadísticas de una lista de tiempos (en nanosegundos) expresadas en microsegundos"""
+    values = sorted(t / 1000 for t in timings_ns)
+    mean = statistics.fmean(values)
+    return {
+        'iterations': len(values),
+        'mean_us': round(mean, 2),
+        'p50_us': round(_percentile(values, 0.50), 2),
+        'p95_us': round(_percentile(values, 0.95), 2),
+        'p99_us': round(_percentile(values, 0.99), 2),
+        'max_us': round(values[-1], 2),
+        'ops_per_sec': round(1_000_000 / mean, 1) if mean else None,
+    }
+
+
+class BenchmarkSuite:
+    """
+    Ejecuta benchmarks y acumula sus resultados por nombre.
+
+    Uso:
+        suite = BenchmarkSuite()
+        suite.bench("db.Task.get_all", lambda: task_manager.get_all())
+        suite.bench("db.Task.delete", task_manager.delete, setup=lambda: (task_manager.create("x"),))
+        suite.write_json("resultados.json")
+    """
+
+    def __init__(self, name_filter: Optional[str] = None, verbose: bool = True):
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.errors: Dict[str, str] = {}
+        self.name_filter = name_filter
+        self.verbose = verbose
+
+    def _selected(self, name: str) -> bool:
+        return self.name_filter is None or self.name_filter in name
+
+    def bench(self, name: str, func: Callable, setup: Optional[Callable[[], tuple]] = None):
+        """
+        Mide una función síncrona.
+
+        Args:
+            name: Nombre del benchmark (capa.Clase.metodo)
+            func: Función a medir
+            setup: Se llama antes de cada iteración (sin medir) y devuelve los argumentos de func
+        """
+        if not self._selected(name):
+            return
+
+        timings = []
+        try:
+            with quiet_stdout():
+                for _ in range(WARMUP_ITERATIONS):
+                    func(*(setup() if setup else ()))
+
+                deadline = time.perf_counter() + MIN_TIME
+                while len(timings) < MAX_ITERATIONS and (
+                        len(timings) < MIN_ITERATIONS or time.perf_counter() < deadline):
+                    args = setup() if setup else ()
+                    start = time.perf_counter_ns()
+                    func(*args)
+                    timings.append(time.perf_counter_ns() - start)
+        except Exception as e:
+            self._record_error(name, e)
+            return
+
+        self._record(name, timings)
+
+    async def bench_async(self, name: str, func: Callable, setup: Optional[Callable[[], tuple]] = None):
+        """Igual que bench() para corrutinas (handlers)"""
+        if not self._selected(name):
+            return
+
+        timings = []
+        try:
+            with quiet_stdout():
+                for _ in range(WARMUP_ITERATIONS):
+                    await func(*(setup() if setup else ()))
+
+                deadline = time.perf_counter() + MIN_TIME
+                while len(timings) < MAX_ITERATIONS and (
+                        len(timings) < MIN_ITERATIONS or time.perf_counter() < deadline):
+                    args = setup() if setup else ()
+                    start = time.perf_counter_ns()
+                    await func(*args)
+                    timings.append(time.perf_counter_ns() - start)
+        except Exception as e:
+            self._record_error(name, e)
+            return
+
+        self._record(name, timings)
+
+    def _record(self, name: str, timings: List[int]):
+        self.results[name] = summarize_timings(timings)
+        if self.verbose:
+            result = self.results[name]
+            print(f"  {name:<55} p50 {result['p50_us']:>10.1f} µs   p95 {result['p95_us']:>10.1f} µs")
+
+    def _record_error(self, name: str, error: Exception):
+        self.errors[name] = f"{type(error).__name__}: {error}"
+        if self.verbose:
+            print(f"  ❌ {name}: {self.errors[name]}")
+
+    # ========== RESULTADOS ==========
+
+    def to_dict(self, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return {
+            'meta': dict(environment_info(), **(meta or {})),
+            'results': self.results,
+            'errors': self.errors,
+        }
+
+    def write_json(self, path: str, meta: Optional[Dict[str, Any]] = None):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(meta), f, indent=2, ensure_ascii=False)
+
+
+def environment_info() -> Dict[str, Any]:
+    """Datos de la máquina y del código para saber qué se está comparando"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+    }
+
+
+def compare_results(old: Dict[str, Any], new: Dict[str, Any],
+                    threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compara dos ficheros de resultados por p50.
+
+    Returns:
+        Una fila por benchmark común con old_p50, new_p50, change (fracción)
+        y regression (True si empeora más que threshold)
+    """
+    rows = []
+    for name, new_result in sorted(new['results'].items()):
+        old_result = old['results'].get(name)
+        if not old_result or not old_result['p50_us']:
+            continue
+
+        change = (new_result['p50_us'] - old_result['p50_us']) / old_result['p50_us']
+        rows.append({
+            'name': name,
+            'old_p50_us': old_result['p50_us'],
+            'new_p50_us': new_result['p50_us'],
+            'change': round(change, 3),
+            'regression': change > threshold,
+        })
+    return rows
@@ -0,0 +1,244 @@
+"""
+Generador de datos sintéticos para benchmarks
+Llena una base de datos con proyectos, objetivos (con árboles de subtareas)
+y notas con volúmenes y distribuciones parecidos a los de un uso real.
+
+EXPLICACIÓN: Con la misma semilla se genera exactamente el mismo dataset,
+así dos ejecuciones de los benchmarks son comparables. Las filas se insertan
+con executemany en una sola transacción: 100.000 objetivos tardan segundos.
+"""
+import itertools
+import random
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import config
+from database.models import DatabaseManager, Task
+
+# ========== DISTRIBUCIONES ==========
+# Pesos aproximados sacados de cómo se usa el bot a diario
+
+PRIORITY_WEIGHTS = {'low': 30, 'medium': 50, 'high': 20}
+TASK_STATUS_WEIGHTS = {'pending': 45, 'in_progress': 20, 'completed': 35}
+PROJECT_STATUS_WEIGHTS = {'active': 60, 'paused': 15, 'completed': 25}
+
+TASK_IN_PROJECT_RATIO = 0.7  # Objetivos que pertenecen a un proyecto
+TASK_WITH_DEADLINE_RATIO = 0.75
+TASK_WITH_ALERT_RATIO = 0.05  # Con hora límite y aviso
+PARENT_WITH_SUBTASKS_RATIO = 0.25  # Objetivos que tienen subtareas
+MAX_SUBTASKS = 5
+SUBTASK_DEPTH = 2  # Subtareas de subtareas como máximo
+NOTE_LINKED_RATIO = 0.5  # Notas asociadas a un proyecto u objetivo
+
+VERBS = ["Revisar", "Preparar", "Enviar", "Diseñar", "Corregir", "Llamar a", "Documentar",
+         "Actualizar", "Migrar", "Probar", "Publicar", "Presupuestar", "Planificar"]
+OBJECTS = ["la landing", "el presupuesto", "la factura", "el informe", "la API", "el cliente",
+           "la base de datos", "el contrato", "la reunión", "el diseño", "los tests", "el backlog"]
+CLIENTS = ["Cliente Premium SL", "Restaurante La Tasca", "Personal", "Estudio Norte",
+           "Clínica Dental Sur", "Academia Online", "Tienda Verde"]
+TAGS = ["idea", "reunión", "cliente", "bug", "diseño", "factura", "personal", "urgente"]
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+         "incididunt ut labore et dolore magna aliqua").split()
+
+
+def _weighted(rng: random.Random, weights: Dict[str, int]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _sentence(rng: random.Random, min_words: int, max_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))).capitalize()
+
+
+def _deadline(rng: random.Random, today: date) -> Optional[str]:
+    """Deadlines entre hace 60 días y dentro de 90, más densos cerca de hoy"""
+    if rng.random() > TASK_WITH_DEADLINE_RATIO:
+        return None
+    offset = int(rng.triangular(-60, 90, 3))
+    return (today + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def _timestamp(rng: random.Random, now: datetime, max_days_ago: int) -> str:
+    moment = now - timedelta(minutes=rng.randint(0, max_days_ago * 24 * 60))
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ========== GENERADOR ==========
+
+class DatasetGenerator:
+    """
+    Genera el dataset de un usuario.
+
+    Uso:
+        DatasetGenerator(db_manager, owner_id=1, seed=42).generate(projects=500, tasks=100_000, notes=20_000)
+    """
+
+    def __init__(self, db_manager: DatabaseManager, owner_id: int = config.AUTHORIZED_USER_ID,
+                 seed: int = 42):
+        self.db = db_manager.for_user(owner_id)
+        self.owner_id = owner_id
+        self.rng = random.Random(seed)
+        self.today = date.today()
+        self.now = datetime.now()
+        self._project_pool: List[int] = []
+        self._project_cum_weights: List[float] = []
+
+    def generate(self, projects: int, tasks: int, notes: int) -> Dict[str, int]:
+        """
+        Inserta el dataset completo en una sola transacción.
+
+        Returns:
+            Número de filas insertadas por tabla (incluidas subtareas)
+        """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            project_ids = self._insert_projects(cursor, projects)
+            self._set_project_pool(project_ids)
+            task_ids = self._insert_tasks(cursor, tasks, project_ids)
+            self._insert_notes(cursor, notes, project_ids, task_ids)
+            conn.commit()
+        finally:
+            conn.close()
+
+        return {'projects': len(project_ids), 'tasks': len(task_ids), 'notes': notes}
+
+    def _insert_projects(self, cursor, count: int) -> List[int]:
+        rows = []
+        for i in range(count):
+            status = _weighted(self.rng, PROJECT_STATUS_WEIGHTS)
+            created = _timestamp(self.rng, self.now, 365)
+            rows.append((
+                f"Proyecto {i + 1}: {self.rng.choice(OBJECTS)}",
+                _sentence(self.rng, 5, 20),
+                self.rng.choice(CLIENTS),
+                status,
+                _weighted(self.rng, PRIORITY_WEIGHTS),
+                _deadline(self.rng, self.today),
+                created,
+                created,
+                created if status == 'completed' else None,
+                self.owner_id,
+            ))
+
+        cursor.executemany("""
+            INSERT INTO projects (name, description, client, status, priority, deadline,
+                                  created_at, updated_at, completed_at, owner_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+        cursor.execute("SELECT id FROM projects ORDER BY id DESC LIMIT ?", (count,))
+        return [row[0] for row in reversed(cursor.fetchall())]
+
+    def _insert_tasks(self, cursor, count: int, project_ids: List[int]) -> List[int]:
+        """
+        Inserta 'count' objetivos principales y después sus subtareas,
+        nivel a nivel (los IDs de los padres ya existen al insertar los hijos).
+        """
+        all_ids = []
+        parents = [(None, None)] * count  # (parent_task_id, project_id) de cada objetivo a crear
+
+        for depth in range(SUBTASK_DEPTH + 1):
+            if not parents:
+                break
+
+            rows = [self._task_row(parent_id, project_id, depth) for parent_id, project_id in parents]
+
+            cursor.executemany("""
+                INSERT INTO tasks (title, description, project_id, status, priority, deadline,
+                                   created_at, updated_at, completed_at, parent_task_id,
+                                   deadline_time, remind_before_minutes, alert_at, owner_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
+            # Los IDs recién creados son los últimos, en el mismo orden que las filas
+            cursor.execute("SELECT id FROM tasks ORDER BY id DESC LIMIT ?", (len(rows),))
+            level_ids = [row[0] for row in reversed(cursor.fetchall())]
+            all_ids.extend(level_ids)
+
+            # Siguiente nivel: algunos objetivos de este nivel tienen subtareas
+            parents = []
+            for task_id, row in zip(level_ids, rows):
+                if self.rng.random() < PARENT_WITH_SUBTASKS_RATIO:
+                    parents.extend([(task_id, row[2])] * self.rng.randint(1, MAX_SUBTASKS))
+
+        return all_ids
+
+    def _task_row(self, parent_id: Optional[int], project_id: Optional[int], depth: int) -> tuple:
+        if depth == 0 and project_id is None and self.rng.random() < TASK_IN_PROJECT_RATIO:
+            project_id = self._pick_project()
+
+        status = _weighted(self.rng, TASK_STATUS_WEIGHTS)
+        priority = _weighted(self.rng, PRIORITY_WEIGHTS)
+        deadline = _deadline(self.rng, self.today)
+        created = _timestamp(self.rng, self.now, 120)
+        completed_at = _timestamp(self.rng, self.now, 60) if status == 'completed' else None
+
+        deadline_time = remind_before = alert_at = None
+        if deadline and self.rng.random() < TASK_WITH_ALERT_RATIO:
+            deadline_time = f"{self.rng.randint(8, 20):02d}:{self.rng.choice(['00', '30'])}"
+            remind_before = self.rng.choice([15, 30, 60])
+            alert_at = Task._compute_alert_at({
+                'status': status, 'deadline': deadline,
+                'deadline_time': deadline_time, 'remind_before_minutes': remind_before,
+            }, config.DEFAULT_TIMEZONE)
+
+        title = f"{self.rng.choice(VERBS)} {self.rng.choice(OBJECTS)}"
+        if depth:
+            title = f"{title} (parte {self.rng.randint(1, 9)})"
+
+        return (
+            title, _sentence(self.rng, 0, 25), project_id, status, priority, deadline,
+            created, completed_at or created, completed_at, parent_id,
+            deadline_time, remind_before, alert_at, self.owner_id,
+        )
+
+    def _set_project_pool(self, project_ids: List[int]):
+        """Pocos proyectos concentran muchos objetivos (distribución tipo Zipf)"""
+        self._project_pool = project_ids
+        self._project_cum_weights = list(itertools.accumulate(
+            1 / (rank + 1) ** 0.8 for rank in range(len(project_ids))
+        ))
+
+    def _pick_project(self) -> Optional[int]:
+        if not self._project_pool:
+            return None
+        return self.rng.choices(self._project_pool, cum_weights=self._project_cum_weights)[0]
+
+    def _insert_notes(self, cursor, count: int, project_ids: List[int], task_ids: List[int]):
+        rows = []
+        for i in range(count):
+            project_id = task_id = None
+            if self.rng.random() < NOTE_LINKED_RATIO:
+                if task_ids and self.rng.random() < 0.5:
+                    task_id = self.rng.choice(task_ids)
+                elif project_ids:
+                    project_id = self.rng.choice(project_ids)
+
+            created = _timestamp(self.rng, self.now, 365)
+            rows.append((
+                f"Nota {i + 1}: {self.rng.choice(OBJECTS)}",
+                _sentence(self.rng, 10, 120),
+                ",".join(self.rng.sample(TAGS, self.rng.randint(0, 3))),
+                project_id, task_id, created, created, self.owner_id,
+            ))
+
+        cursor.executemany("""
+            INSERT INTO notes (title, content, tags, project_id, task_id, created_at, updated_at, owner_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+
+def generate_dataset(db_manager: DatabaseManager, owner_id: int = config.AUTHORIZED_USER_ID,
+                     projects: int = 500, tasks: int = 100_000, notes: int = 20_000,
+                     seed: int = 42) -> Dict[str, int]:
+    """Atajo: genera el dataset de un usuario y devuelve cuántas filas se crearon"""
+    generator = DatasetGenerator(db_manager, owner_id, seed)
+    counts = generator.generate(projects, tasks, notes)
+
+    # Estadísticas frescas para el planificador de consultas de SQLite
+    conn = generator.db.get_connection()
+    conn.execute("ANALYZE")
+    conn.close()
+
+    return counts
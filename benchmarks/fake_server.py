@@ -0,0 +1,160 @@
+"""
+Servidor HTTP local que imita la Bot API de Telegram
+Sirve FakeTelegramAPI en http://127.0.0.1:<puerto>/bot<token>/<método> para
+que el bot funcione completo (cliente HTTP, long polling con getUpdates,
+handlers...) sin salir de la máquina.
+
+EXPLICACIÓN: el bot se crea con base_url apuntando a este servidor. Las
+llamadas que hace (sendMessage, editMessageText...) las responde
+FakeTelegramAPI, y los updates que se inyectan con inject() se entregan en
+la siguiente petición getUpdates, igual que hace Telegram con el long polling.
+"""
+import json
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fake_telegram import FakeTelegramAPI
+
+# Espera máxima de un getUpdates aunque el bot pida más (segundos)
+MAX_POLL_TIMEOUT = 10
+
+
+def _decode_value(value: str) -> Any:
+    """Los parámetros complejos (teclados, entidades...) llegan como JSON"""
+    if value[:1] in ('{', '['):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_parameters(content_type: str, body: bytes) -> Dict[str, Any]:
+    """Parámetros de una petición de la Bot API (formulario, JSON o multipart)"""
+    if not body:
+        return {}
+
+    if content_type.startswith('application/json'):
+        return json.loads(body)
+
+    if content_type.startswith('multipart/form-data'):
+        message = BytesParser().parsebytes(
+            b"Content-Type: " + content_type.encode('latin-1') + b"\r\n\r\n" + body
+        )
+        params = {}
+        for part in message.get_payload():
+            name = part.get_param('name', header='content-disposition')
+            payload = part.get_payload(decode=True) or b""
+            filename = part.get_filename()
+            if filename:
+                # De los archivos solo interesa saber que se enviaron
+                params[name] = {'filename': filename, 'size': len(payload)}
+            else:
+                params[name] = _decode_value(payload.decode('utf-8'))
+        return params
+
+    return {key: _decode_value(values[-1]) for key, values in parse_qs(body.decode('utf-8')).items()}
+
+
+class _BotAPIHandler(BaseHTTPRequestHandler):
+    server: 'FakeTelegramServer'
+
+    def _dispatch(self):
+        # Ruta: /bot<token>/<método>
+        method = urlparse(self.path).path.rsplit('/', 1)[-1]
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b""
+        params = parse_parameters(self.headers.get('Content-Type', ''), body)
+
+        if method == 'getUpdates':
+            result = self.server.get_updates(params)
+        else:
+            result = self.server.api.handle(method, params)
+
+        response = json.dumps({'ok': True, 'result': result}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    do_POST = _dispatch
+    do_GET = _dispatch
+
+    def log_message(self, format, *args):
+        pass  # Sin una línea por petición
+
+
+class FakeTelegramServer(ThreadingHTTPServer):
+    """
+    Bot API falsa en un hilo aparte.
+
+    Uso:
+        server = FakeTelegramServer(FakeTelegramAPI())
+        server.start()
+        bot = ProductivityBot(base_url=server.base_url)
+        server.inject(server.api.message_update(user_id, "/start"))
+        ...
+        server.stop()
+    """
+
+    daemon_threads = True
+
+    def __init__(self, api: Optional[FakeTelegramAPI] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _BotAPIHandler)
+        self.api = api or FakeTelegramAPI()
+        self._updates: List[Dict[str, Any]] = []
+        self._updates_ready = threading.Condition()
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Valor para ApplicationBuilder.base_url (el token se añade detrás)"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-telegram", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.stop_polling()
+        self.shutdown()
+        self.server_close()
+
+    # ========== UPDATES ==========
+
+    def inject(self, update: Dict[str, Any]):
+        """Encola un update para el bot (lo recibirá en su próximo getUpdates)"""
+        with self._updates_ready:
+            self._updates.append(update)
+            self._updates_ready.notify_all()
+
+    def stop_polling(self):
+        """Responde al momento los getUpdates pendientes (para parar el bot sin esperar)"""
+        with self._updates_ready:
+            self._closing = True
+            self._updates_ready.notify_all()
+
+    def get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        getUpdates con long polling: espera hasta que haya updates o pase el timeout.
+        Los updates con id menor que offset ya están confirmados y se descartan.
+        """
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        deadline = time.monotonic() + min(float(params.get('timeout') or 0), MAX_POLL_TIMEOUT)
+
+        with self._updates_ready:
+            self._updates = [u for u in self._updates if u['update_id'] >= offset]
+            while not self._updates and not self._closing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._updates_ready.wait(remaining)
+            return self._updates[:limit]
@@ -0,0 +1,202 @@
+"""
+API de Telegram falsa para benchmarks y pruebas sin conexión
+Responde a las llamadas del bot (sendMessage, editMessageText...) como lo
+haría Telegram, y guarda cada llamada para poder revisarla después.
+
+EXPLICACIÓN: python-telegram-bot hace todas sus peticiones a través de un
+objeto "request". FakeRequest lo sustituye: en lugar de ir a la red, le pasa
+la llamada a FakeTelegramAPI y devuelve su respuesta en el mismo formato JSON
+que la API real. El resto del bot (handlers, teclados, parse_mode...) funciona
+exactamente igual que en producción.
+"""
+import itertools
+import json
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram.request import BaseRequest, RequestData
+
+# Bot y usuario de mentira: nunca se usan para hablar con Telegram
+FAKE_BOT_TOKEN = "123456:FAKE-TOKEN-benchmarks"
+FAKE_BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Cortana", "username": "cortana_fake_bot"}
+
+# Métodos de la API que devuelven el mensaje enviado o editado
+MESSAGE_METHODS = {
+    'sendMessage', 'editMessageText', 'editMessageReplyMarkup',
+    'sendDocument', 'sendPhoto', 'editMessageCaption',
+}
+
+
+class FakeTelegramAPI:
+    """
+    Estado de la API falsa: los mensajes enviados y las llamadas recibidas.
+    Es seguro usarla desde varios hilos (el servidor HTTP de carga lo hace).
+    """
+
+    def __init__(self, bot_user: Dict[str, Any] = FAKE_BOT_USER):
+        self.bot_user = bot_user
+        self.calls: List[Tuple[str, Dict[str, Any]]] = []
+        self.responses: Counter = Counter()  # Llamadas dirigidas a cada chat
+        self.keyboards: Dict[int, Tuple[int, List[str]]] = {}  # chat -> (mensaje, callback_data)
+        self._callback_chats: Dict[str, int] = {}
+        self._message_ids = itertools.count(1)
+        self._update_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    # ========== RESPUESTAS ==========
+
+    def handle(self, method: str, params: Dict[str, Any]) -> Any:
+        """Devuelve el 'result' que daría la API real para esta llamada"""
+        chat_id = self._chat_of(method, params)
+        with self._lock:
+            self.calls.append((method, params))
+            if chat_id is not None:
+                self.responses[chat_id] += 1
+
+        if method == 'getMe':
+            return self.bot_user
+        if method in MESSAGE_METHODS:
+            message = self._message_result(params)
+            if 'reply_markup' in message:
+                buttons = [button.get('callback_data')
+                           for row in message['reply_markup']['inline_keyboard'] for button in row]
+                with self._lock:
+                    self.keyboards[chat_id] = (message['message_id'], [b for b in buttons if b])
+            return message
+        if method == 'getUpdates':
+            return []
+        return True  # answerCallbackQuery, deleteMessage, setMyCommands...
+
+    def _chat_of(self, method: str, params: Dict[str, Any]) -> Optional[int]:
+        """Chat al que va dirigida una llamada (las respuestas a botones no lo indican)"""
+        if method == 'answerCallbackQuery':
+            with self._lock:
+                return self._callback_chats.get(str(params.get('callback_query_id')))
+        try:
+            return int(params['chat_id'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _message_result(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params.get('chat_id') or 0)
+        message_id = params.get('message_id') or next(self._message_ids)
+
+        message = {
+            'message_id': int(message_id),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': self.bot_user,
+        }
+        if 'text' in params:
+            message['text'] = params['text']
+        if 'reply_markup' in params:
+            markup = params['reply_markup']
+            markup = json.loads(markup) if isinstance(markup, str) else markup
+            # En el mensaje devuelto solo aparece el teclado inline (el de respuesta no)
+            if 'inline_keyboard' in markup:
+                message['reply_markup'] = markup
+        return message
+
+    def count(self, method: Optional[str] = None) -> int:
+        with self._lock:
+            if method is None:
+                return len(self.calls)
+            return sum(1 for name, _ in self.calls if name == method)
+
+    def last(self, method: str) -> Optional[Dict[str, Any]]:
+        """Parámetros de la última llamada a un método (o None)"""
+        with self._lock:
+            for name, params in reversed(self.calls):
+                if name == method:
+                    return params
+        return None
+
+    def last_keyboard(self, chat_id: int) -> Tuple[Optional[int], List[str]]:
+        """Último teclado inline que ha recibido un chat: (message_id, callback_data de sus botones)"""
+        with self._lock:
+            return self.keyboards.get(chat_id, (None, []))
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.responses.clear()
+            self.keyboards.clear()
+            self._callback_chats.clear()
+
+    # ========== UPDATES DE MENTIRA ==========
+
+    def _user(self, user_id: int) -> Dict[str, Any]:
+        return {'id': user_id, 'is_bot': False, 'first_name': f"Usuario {user_id}"}
+
+    def message_update(self, user_id: int, text: str) -> Dict[str, Any]:
+        """Update de un mensaje de texto (o un comando si empieza por /)"""
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': self._user(user_id),
+            'text': text,
+        }
+        if text.startswith('/'):
+            command_length = len(text.split()[0])
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': command_length}]
+
+        return {'update_id': next(self._update_ids), 'message': message}
+
+    def inline_query_update(self, user_id: int, query: str) -> Dict[str, Any]:
+        """Update de una búsqueda inline (@bot texto)"""
+        update_id = next(self._update_ids)
+        return {
+            'update_id': update_id,
+            'inline_query': {
+                'id': str(update_id),
+                'from': self._user(user_id),
+                'query': query,
+                'offset': "",
+            },
+        }
+
+    def callback_update(self, user_id: int, data: str, message_id: Optional[int] = None) -> Dict[str, Any]:
+        """Update de un botón inline pulsado sobre un mensaje del bot"""
+        update_id = next(self._update_ids)
+        with self._lock:
+            self._callback_chats[str(update_id)] = user_id
+        return {
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id),
+                'from': self._user(user_id),
+                'chat_instance': str(user_id),
+                'data': data,
+                'message': {
+                    'message_id': message_id or next(self._message_ids),
+                    'date': int(time.time()),
+                    'chat': {'id': user_id, 'type': 'private'},
+                    'from': self.bot_user,
+                    'text': "…",
+                },
+            },
+        }
+
+
+class FakeRequest(BaseRequest):
+    """Sustituye al cliente HTTP del bot: las llamadas van a FakeTelegramAPI"""
+
+    def __init__(self, api: FakeTelegramAPI):
+        self.api = api
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         *args, **kwargs) -> Tuple[int, bytes]:
+        api_method = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data else {}
+
+        result = self.api.handle(api_method, params)
+        return 200, json.dumps({'ok': True, 'result': result}).encode('utf-8')
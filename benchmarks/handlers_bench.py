@@ -0,0 +1,107 @@
+"""
+Benchmarks de extremo a extremo de los handlers
+Cada escenario es un update (un botón o un mensaje) que pasa por la
+aplicación completa: control de acceso, ConversationHandlers, handler,
+base de datos, formateo y la llamada (falsa) a la API de Telegram.
+"""
+from telegram import Update
+
+import config
+from benchmarks.core import BenchmarkSuite
+from benchmarks.fake_telegram import FakeTelegramAPI, FakeRequest
+from benchmarks.micro import SampleData
+
+
+def build_scenarios(api: FakeTelegramAPI, sample: SampleData, user_id: int):
+    """Nombre del escenario -> función que crea su update (en formato JSON)"""
+    emoji = config.EMOJI
+
+    def text(value):
+        return lambda: api.message_update(user_id, value)
+
+    def button(data):
+        return lambda: api.callback_update(user_id, data)
+
+    def inline(value):
+        return lambda: api.inline_query_update(user_id, value)
+
+    return {
+        'handler.start': text("/start"),
+        'handler.menu.projects': text(f"{emoji['project']} Proyectos"),
+        'handler.menu.tasks': text(f"{emoji['task']} Tareas"),
+        'handler.menu.today': text(f"{emoji['today']} Hoy"),
+        'handler.menu.dashboard': text(f"{emoji['dashboard']} Dashboard"),
+        'handler.menu.notes': text(f"{emoji['note']} Notas"),
+        'handler.menu.settings': text(f"{emoji['settings']} Configuración"),
+        'handler.task_list.all': button("task_list_all"),
+        'handler.task_list.today': button("task_list_today"),
+        'handler.task_list.week': button("task_list_week"),
+        'handler.task_list.overdue': button("task_list_overdue"),
+        'handler.task_list.high_priority': button("task_list_high_priority"),
+        'handler.task_list.completed': button("task_list_completed_archived"),
+        'handler.view_task': button(f"task_view_{sample.task_id}"),
+        'handler.view_subtasks': button(f"task_view_subtasks_{sample.parent_task_id}"),
+        'handler.complete_task': button(f"task_complete_{sample.task_id}"),
+        'handler.postpone_task': button(f"task_postpone_{sample.task_id}_1"),
+        'handler.task_repeat': button(f"task_repeat_{sample.task_id}"),
+        'handler.task_deps': button(f"task_deps_{sample.task_id}_0"),
+        'handler.project_list.active': button("project_list_active"),
+        'handler.project_list.page': button("project_list_active_page_1"),
+        'handler.view_project': button(f"project_view_{sample.project_id}"),
+        'handler.project_critical': button(f"project_critical_{sample.project_id}"),
+        'handler.note_list': button("note_list_all"),
+        'handler.view_note': button(f"note_view_{sample.note_id}"),
+        'handler.dashboard_main': button("dashboard_main"),
+        'handler.dashboard_weekly': button("dashboard_weekly"),
+        'handler.dashboard_monthly': button("dashboard_monthly"),
+        'handler.settings_menu': button("settings_menu"),
+        'handler.inline_query.empty': inline(""),
+        'handler.inline_query.prefix': inline(sample.search_prefix),
+    }
+
+
+async def run_handler_benchmarks(suite: BenchmarkSuite, user_id: int = config.AUTHORIZED_USER_ID):
+    """
+    Mide cada escenario con la aplicación real y la API falsa.
+    Los errores que capture python-telegram-bot se guardan en suite.errors.
+    """
+    from main import ProductivityBot  # Importa todos los handlers
+
+    # Sin debounce la búsqueda inline se responde dentro de process_update y se puede medir
+    debounce = config.INLINE_DEBOUNCE_SECONDS
+    config.INLINE_DEBOUNCE_SECONDS = 0
+
+    api = FakeTelegramAPI()
+    productivity_bot = ProductivityBot(request=FakeRequest(api))
+    productivity_bot.setup_handlers()
+    app = productivity_bot.app
+
+    handler_errors = []
+
+    async def collect_error(update, context):
+        handler_errors.append(f"{type(context.error).__name__}: {context.error}")
+
+    app.add_error_handler(collect_error)
+    await app.initialize()
+
+    sample = SampleData(productivity_bot.db_manager, user_id)
+
+    print("🤖 Handlers (API de Telegram falsa)")
+    try:
+        for name, make_update in build_scenarios(api, sample, user_id).items():
+            handler_errors.clear()
+            await suite.bench_async(
+                name,
+                app.process_update,
+                setup=lambda make_update=make_update: (Update.de_json(make_update(), app.bot),)
+            )
+
+            if handler_errors and name in suite.results:
+                suite.results[name]['errors'] = len(handler_errors)
+                suite.errors[name] = handler_errors[-1]
+                print(f"  ⚠️ {name}: {len(handler_errors)} error(es), el último: {handler_errors[-1]}")
+    finally:
+        await app.shutdown()
+        config.INLINE_DEBOUNCE_SECONDS = debounce
+
+    return api
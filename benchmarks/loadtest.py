@@ -0,0 +1,419 @@
+"""
+Prueba de carga de extremo a extremo sin conexión
+
+Uso:
+    python -m benchmarks.loadtest                          # 5 usuarios, 20 pasos/s, 30 s
+    python -m benchmarks.loadtest --users 20 --rate 100 --duration 60
+    python -m benchmarks.loadtest --rate 0 --output carga.json   # sin límite de ritmo
+
+EXPLICACIÓN: el bot arranca completo (long polling, ConversationHandlers,
+control de acceso, base de datos...) contra FakeTelegramServer, un servidor
+local que imita la Bot API. Cada usuario virtual repite escenarios realistas
+(abrir menús, ver y completar objetivos, crear un objetivo o una misión paso
+a paso) pulsando los botones que el bot le ha enviado de verdad. Un paso
+termina cuando el bot acaba de procesar su update, así que la latencia incluye
+la cola de updates, el polling y las llamadas HTTP a la API.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import config
+from benchmarks.core import environment_info, quiet_stdout, summarize_timings
+
+# Los usuarios virtuales extra (con --users > 1) usan IDs a partir de este
+LOADTEST_USER_BASE = 900_000_000
+
+# Tiempo máximo que se espera a que el bot procese un update (segundos)
+STEP_TIMEOUT = 15
+
+# Espera de cada getUpdates del bot (el servidor contesta antes si llega un update)
+MAX_POLL_SECONDS = 5
+
+# Tipos de paso
+TEXT = 'text'    # Escribir un mensaje (menú persistente, respuestas de una conversación)
+CLICK = 'click'  # Pulsar un botón con un callback_data concreto
+PICK = 'pick'    # Pulsar al azar uno de los botones recibidos cuyo callback_data empiece así
+
+
+def build_scenarios() -> Dict[str, tuple]:
+    """Nombre del escenario -> (peso, [(paso, tipo, valor), ...])"""
+    emoji = config.EMOJI
+    tasks_menu = ('menu.tasks', TEXT, f"{emoji['task']} Tareas")
+
+    return {
+        'browse_tasks': (30, [
+            tasks_menu,
+            ('task_list', PICK, "task_list_"),
+            ('view_task', PICK, "task_view_"),
+            ('back_to_tasks', CLICK, "menu_tasks"),
+        ]),
+        'complete_task': (15, [
+            tasks_menu,
+            ('task_list.overdue', CLICK, "task_list_overdue"),
+            ('view_task', PICK, "task_view_"),
+            ('complete_task', PICK, "task_complete_"),
+        ]),
+        'postpone_task': (10, [
+            tasks_menu,
+            ('task_list.week', CLICK, "task_list_week"),
+            ('view_task', PICK, "task_view_"),
+            ('postpone_task', PICK, "task_postpone_"),
+        ]),
+        'today': (15, [
+            ('menu.today', TEXT, f"{emoji['today']} Hoy"),
+        ]),
+        'dashboard': (5, [
+            ('menu.dashboard', TEXT, f"{emoji['dashboard']} Dashboard"),
+        ]),
+        'browse_projects': (5, [
+            ('menu.projects', TEXT, f"{emoji['project']} Proyectos"),
+            ('project_list', CLICK, "project_list_active"),
+            ('view_project', PICK, "project_view_"),
+        ]),
+        'browse_notes': (5, [
+            ('menu.notes', TEXT, f"{emoji['note']} Notas"),
+            ('note_list', CLICK, "note_list_all"),
+            ('view_note', PICK, "note_view_"),
+        ]),
+        'settings': (5, [
+            ('menu.settings', TEXT, f"{emoji['settings']} Configuración"),
+            ('settings.timezone', CLICK, "settings_timezone"),
+            ('settings.back', CLICK, "settings_menu"),
+        ]),
+        'create_task': (7, [
+            tasks_menu,
+            ('task_new', CLICK, "task_new"),
+            ('task_new.title', TEXT, "Revisar propuesta de la prueba de carga"),
+            ('task_new.description', CLICK, "task_skip_description"),
+            ('task_new.priority', PICK, "task_priority_"),
+            ('task_new.deadline', PICK, "task_deadline_"),
+            ('task_new.project', PICK, "task_project_"),
+            ('task_new.confirm', CLICK, "task_confirm_yes"),
+        ]),
+        'create_project': (3, [
+            ('menu.projects', TEXT, f"{emoji['project']} Proyectos"),
+            ('project_new', CLICK, "project_new"),
+            ('project_new.name', TEXT, "Misión de la prueba de carga"),
+            ('project_new.description', CLICK, "project_skip_desc"),
+            ('project_new.priority', PICK, "priority_"),
+            ('project_new.deadline', CLICK, "project_skip_deadline"),
+            ('project_new.confirm', CLICK, "project_confirm_yes"),
+        ]),
+    }
+
+
+def _latency_stats(timings_ns: List[int]) -> Dict[str, Any]:
+    """Percentiles de latencia (las ops/s de un paso no son el rendimiento del bot)"""
+    stats = summarize_timings(timings_ns)
+    stats.pop('ops_per_sec')
+    return stats
+
+
+class RateLimiter:
+    """Reparte los pasos de todos los usuarios a un ritmo fijo (0 = sin límite)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = time.perf_counter()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class LoadTest:
+    """
+    Arranca el bot contra la API falsa y lanza los usuarios virtuales.
+
+    Cada paso se anota con su latencia y, si falla, con el motivo: excepción
+    en un handler, el bot no respondió nada, o no terminó en STEP_TIMEOUT.
+    """
+
+    def __init__(self, server, user_ids: List[int], rate: float, duration: float, seed: int = 42):
+        self.server = server
+        self.api = server.api
+        self.user_ids = user_ids
+        self.limiter = RateLimiter(rate)
+        self.rate = rate
+        self.duration = duration
+        self.seed = seed
+        self.scenarios = build_scenarios()
+
+        self.timings: Dict[str, List[int]] = defaultdict(list)  # Paso -> latencias (ns)
+        self.step_errors: Dict[str, Counter] = defaultdict(Counter)  # Paso -> motivo -> veces
+        self.scenario_counts: Counter = Counter()
+        self.aborted: Counter = Counter()  # Escenarios que no se pudieron terminar
+        self.elapsed = 0.0
+
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._handler_errors: Dict[int, List[str]] = defaultdict(list)
+
+    # ========== SEGUIMIENTO DE UPDATES ==========
+
+    def attach(self, app):
+        """
+        Registra un handler en el último grupo (se ejecuta cuando el update ya
+        ha pasado por todos los demás) y otro de errores.
+        """
+        from telegram import Update
+        from telegram.ext import TypeHandler
+
+        async def update_done(update, context):
+            future = self._pending.pop(update.update_id, None)
+            if future and not future.done():
+                future.set_result(self._handler_errors.pop(update.update_id, []))
+
+        async def collect_error(update, context):
+            update_id = getattr(update, 'update_id', None)
+            self._handler_errors[update_id].append(f"{type(context.error).__name__}: {context.error}")
+
+        app.add_handler(TypeHandler(Update, update_done), group=1000)
+        app.add_error_handler(collect_error)
+
+    def _build_update(self, user_id: int, kind: str, value: str, rng: random.Random) -> Optional[Dict[str, Any]]:
+        if kind == TEXT:
+            return self.api.message_update(user_id, value)
+
+        message_id, buttons = self.api.last_keyboard(user_id)
+        if kind == PICK:
+            candidates = [data for data in buttons if data.startswith(value)]
+            if not candidates:
+                return None
+            value = rng.choice(candidates)
+        return self.api.callback_update(user_id, value, message_id)
+
+    async def _send(self, update: Dict[str, Any]) -> List[str]:
+        """Inyecta el update y espera a que el bot termine con él. Devuelve los errores"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending[update['update_id']] = future
+        self.server.inject(update)
+        try:
+            return await asyncio.wait_for(future, STEP_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._pending.pop(update['update_id'], None)
+            return [f"timeout ({STEP_TIMEOUT} s)"]
+
+    # ========== USUARIOS VIRTUALES ==========
+
+    async def _virtual_user(self, user_id: int, deadline: float):
+        rng = random.Random(f"{self.seed}-{user_id}")
+        names = list(self.scenarios)
+        weights = [self.scenarios[name][0] for name in names]
+
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            self.scenario_counts[name] += 1
+
+            for step, kind, value in self.scenarios[name][1]:
+                if time.perf_counter() >= deadline:
+                    return
+
+                await self.limiter.wait()
+                update = self._build_update(user_id, kind, value, rng)
+                if update is None:
+                    # No hay botón que pulsar (p. ej. ninguna tarea atrasada): no es un error del bot
+                    self.aborted[name] += 1
+                    break
+
+                responses_before = self.api.responses[user_id]
+                start = time.perf_counter_ns()
+                errors = await self._send(update)
+                self.timings[step].append(time.perf_counter_ns() - start)
+
+                if not errors and self.api.responses[user_id] == responses_before:
+                    errors = ["sin respuesta del bot"]
+                for error in errors:
+                    self.step_errors[step][error] += 1
+                if errors:
+                    self.aborted[name] += 1
+                    break
+
+    async def run(self, app):
+        from telegram import Update
+
+        self.attach(app)
+        await app.initialize()
+        await app.updater.start_polling(poll_interval=0, timeout=MAX_POLL_SECONDS,
+                                        allowed_updates=Update.ALL_TYPES)
+        await app.start()
+
+        try:
+            start = time.perf_counter()
+            deadline = start + self.duration
+            with quiet_stdout():  # Los handlers imprimen trazas de depuración
+                await asyncio.gather(*(self._virtual_user(user_id, deadline) for user_id in self.user_ids))
+            self.elapsed = time.perf_counter() - start
+        finally:
+            self.server.stop_polling()
+            await app.updater.stop()
+            await app.stop()
+            await app.shutdown()
+
+    # ========== RESULTADOS ==========
+
+    def report(self) -> Dict[str, Any]:
+        from utils import metrics
+
+        all_timings = [t for timings in self.timings.values() for t in timings]
+        total_steps = len(all_timings)
+        failed = sum(sum(errors.values()) for errors in self.step_errors.values())
+
+        steps = {}
+        for step, timings in sorted(self.timings.items()):
+            errors = sum(self.step_errors[step].values())
+            steps[step] = dict(_latency_stats(timings), errors=errors,
+                               error_rate=round(errors / len(timings), 4))
+
+        error_reasons = Counter()
+        for step, errors in self.step_errors.items():
+            for reason, count in errors.items():
+                error_reasons[f"{step}: {reason}"] += count
+
+        return {
+            'meta': dict(environment_info(), users=len(self.user_ids), target_rate=self.rate,
+                         duration_s=round(self.elapsed, 2), seed=self.seed),
+            'summary': dict(
+                _latency_stats(all_timings) if all_timings else {},
+                steps=total_steps,
+                errors=failed,
+                error_rate=round(failed / total_steps, 4) if total_steps else 0.0,
+                throughput=round(total_steps / self.elapsed, 2) if self.elapsed else 0.0,
+            ),
+            'steps': steps,
+            'scenarios': dict(self.scenario_counts),
+            'aborted_scenarios': dict(self.aborted),
+            'errors': dict(error_reasons.most_common()),
+            'api_calls': dict(Counter(method for method, _ in self.api.calls).most_common()),
+            # Desglose por capa de las métricas de /stats (handlers, base de datos, API)
+            'layers': {layer: metrics.summarize(layer) for layer in metrics.LAYERS},
+        }
+
+
+def print_report(result: Dict[str, Any]):
+    meta, summary = result['meta'], result['summary']
+    rate = f"{meta['target_rate']:g} pasos/s" if meta['target_rate'] else "sin límite"
+
+    print(f"\n📈 Prueba de carga: {meta['users']} usuario(s), {meta['duration_s']:.1f} s, ritmo {rate}")
+    if not summary['steps']:
+        print("  ⚠️ No se ejecutó ningún paso")
+        return
+
+    print(f"  Pasos: {summary['steps']}  ·  rendimiento {summary['throughput']:.1f} pasos/s  ·  "
+          f"errores {summary['errors']} ({summary['error_rate']:.1%})")
+    print(f"  Latencia: p50 {summary['p50_us'] / 1000:.1f} ms  ·  p95 {summary['p95_us'] / 1000:.1f} ms  ·  "
+          f"p99 {summary['p99_us'] / 1000:.1f} ms  ·  máx {summary['max_us'] / 1000:.1f} ms")
+
+    print(f"\n  {'Paso':<28} {'n':>6} {'p50 ms':>9} {'p99 ms':>9} {'error':>7}")
+    for step, stats in sorted(result['steps'].items(), key=lambda item: item[1]['p99_us'], reverse=True):
+        print(f"  {step:<28} {stats['iterations']:>6} {stats['p50_us'] / 1000:>9.1f} "
+              f"{stats['p99_us'] / 1000:>9.1f} {stats['error_rate']:>7.1%}")
+
+    if result['errors']:
+        print("\n  ❌ Errores más frecuentes:")
+        for reason, count in list(result['errors'].items())[:10]:
+            print(f"    {count:>5} × {reason}")
+
+    if result['aborted_scenarios']:
+        aborted = ", ".join(f"{name} ({count})" for name, count in result['aborted_scenarios'].items())
+        print(f"\n  ⏭️ Escenarios sin terminar: {aborted}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.loadtest",
+        description="Prueba de carga del bot completo contra una API de Telegram local"
+    )
+    parser.add_argument('--users', type=int, default=5, help="Usuarios virtuales simultáneos")
+    parser.add_argument('--rate', type=float, default=20, help="Pasos por segundo entre todos (0 = sin límite)")
+    parser.add_argument('--duration', type=float, default=30, help="Duración en segundos")
+    parser.add_argument('--projects', type=int, default=30, help="Proyectos por usuario")
+    parser.add_argument('--tasks', type=int, default=1000, help="Objetivos principales por usuario")
+    parser.add_argument('--notes', type=int, default=200, help="Notas por usuario")
+    parser.add_argument('--seed', type=int, default=42, help="Semilla del dataset y de los escenarios")
+    parser.add_argument('--output', help="Guardar los resultados en este fichero JSON")
+    parser.add_argument('--keep', action='store_true', help="No borrar la carpeta temporal con la base de datos")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else None
+
+    # Igual que los benchmarks: todo se crea en una carpeta temporal
+    original_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="cortana_load_")
+    os.chdir(workdir)
+
+    user_ids = [config.AUTHORIZED_USER_ID] + [LOADTEST_USER_BASE + i for i in range(1, args.users)]
+    if len(user_ids) > 1:
+        config.MULTI_USER_MODE = True
+
+    # Cada petición a la API falsa (y cada timeout de conversación) aparecería en consola
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    logging.getLogger('apscheduler').setLevel(logging.WARNING)
+
+    try:
+        from database.models import DatabaseManager
+        from benchmarks.datagen import generate_dataset
+        from benchmarks.fake_server import FakeTelegramServer
+        from handlers import access
+        from main import ProductivityBot
+
+        db = DatabaseManager()
+        print(f"🧪 Generando datos de {len(user_ids)} usuario(s) en {workdir}...")
+        slow_query_ms = config.SQL_SLOW_QUERY_MS
+        config.SQL_SLOW_QUERY_MS = float('inf')  # La carga masiva no es una consulta lenta
+        for index, user_id in enumerate(user_ids):
+            generate_dataset(db, user_id, args.projects, args.tasks, args.notes, args.seed + index)
+            if config.MULTI_USER_MODE:
+                access.access_control.add_user(user_id, 'admin' if index == 0 else 'member')
+        config.SQL_SLOW_QUERY_MS = slow_query_ms
+
+        server = FakeTelegramServer()
+        server.start()
+        print(f"🛰️ API de Telegram falsa en {server.base_url}")
+
+        try:
+            productivity_bot = ProductivityBot(base_url=server.base_url)
+            productivity_bot.setup_handlers()
+
+            load_test = LoadTest(server, user_ids, args.rate, args.duration, args.seed)
+            print(f"🚀 {len(user_ids)} usuario(s) virtual(es) durante {args.duration:g} s...")
+            asyncio.run(load_test.run(productivity_bot.app))
+        finally:
+            server.stop()
+
+        result = load_test.report()
+        print_report(result)
+
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+            print(f"\n💾 Resultados en {output}")
+
+        return 1 if result['summary']['errors'] else 0
+    finally:
+        os.chdir(original_cwd)
+        if args.keep:
+            print(f"📁 Datos conservados en {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
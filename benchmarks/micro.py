@@ -0,0 +1,370 @@
+"""
+Microbenchmarks: modelos, formateadores, búsqueda, dependencias, teclados y plantillas
+Cada método público de Project, Task y Note, cada función de
+utils/formatters.py, cada teclado de utils/keyboards.py y cada plantilla con
+datos de cortana_personality.py tiene su benchmark.
+Si se añade uno nuevo sin benchmark, check_coverage() lo avisa.
+"""
+import inspect
+import string
+from datetime import date, timedelta
+from typing import Iterable, List
+
+import config
+from database import events, fulltext
+from database.models import DatabaseManager, Project, Task, Note
+import cortana_personality
+from utils import formatters, keyboards, search_index, task_graph
+from utils.dates import DateClassifier
+from utils.long_messages import split_html
+from utils.templates import render_template
+
+from benchmarks.core import BenchmarkSuite
+
+
+def check_coverage(covered: Iterable[str], names: Iterable[str], prefix: str) -> List[str]:
+    """Devuelve (y avisa de) los nombres que no tienen benchmark"""
+    covered = set(covered)
+    missing = [name for name in names if name not in covered]
+    for name in missing:
+        print(f"  ⚠️ Sin benchmark: {prefix}{name}")
+    return missing
+
+
+def public_methods(cls) -> List[str]:
+    return [name for name, attr in vars(cls).items()
+            if not name.startswith('_') and inspect.isfunction(attr)]
+
+
+def module_functions(module) -> List[str]:
+    return [name for name, attr in vars(module).items()
+            if inspect.isfunction(attr) and attr.__module__ == module.__name__ and not name.startswith('_')]
+
+
+class SampleData:
+    """IDs y filas reales del dataset para usarlos como argumentos"""
+
+    def __init__(self, db: DatabaseManager, owner_id: int):
+        conn = db.for_user(owner_id).get_connection()
+        cursor = conn.cursor()
+
+        # El proyecto con más objetivos y un objetivo con subtareas: los casos caros
+        cursor.execute("""
+            SELECT project_id FROM tasks
+            WHERE owner_id = ? AND project_id IS NOT NULL
+            GROUP BY project_id ORDER BY COUNT(*) DESC LIMIT 1
+        """, (owner_id,))
+        row = cursor.fetchone()
+        self.project_id = row[0] if row else None
+
+        cursor.execute("""
+            SELECT parent_task_id FROM tasks
+            WHERE owner_id = ? AND parent_task_id IS NOT NULL
+            GROUP BY parent_task_id ORDER BY COUNT(*) DESC LIMIT 1
+        """, (owner_id,))
+        row = cursor.fetchone()
+        self.parent_task_id = row[0] if row else None
+
+        cursor.execute("SELECT id, title FROM tasks WHERE owner_id = ? AND parent_task_id IS NULL LIMIT 1", (owner_id,))
+        row = cursor.fetchone()
+        self.task_id = row[0] if row else None
+
+        # Búsquedas con la palabra más larga del título: el principio y con una errata
+        word = max(fulltext.words(row[1]), key=len) if row else ""
+        self.search_word = word
+        self.search_prefix = word[:4]
+        self.search_typo = word[:1] + word[2:3] + word[1:2] + word[3:] if len(word) > 3 else word
+
+        cursor.execute("SELECT id FROM notes WHERE owner_id = ? LIMIT 1", (owner_id,))
+        row = cursor.fetchone()
+        self.note_id = row[0] if row else None
+
+        conn.close()
+
+
+# ========== MODELOS ==========
+
+def run_model_benchmarks(suite: BenchmarkSuite, db: DatabaseManager, owner_id: int):
+    sample = SampleData(db, owner_id)
+    project_manager = Project(db, owner_id)
+    task_manager = Task(db, owner_id)
+    note_manager = Note(db, owner_id)
+    next_week = (date.today() + timedelta(days=7)).strftime("%Y-%m-%d")
+
+    def linked_pair():
+        task_id, depends_on_id = task_manager.create("Después"), task_manager.create("Antes")
+        task_manager.add_dependency(task_id, depends_on_id)
+        return task_id, depends_on_id
+
+    project_benches = {
+        'create': lambda: project_manager.create("Benchmark", "Descripción", "Cliente", "medium", next_week),
+        'get_all': lambda: project_manager.get_all(),
+        'get_all_archived': lambda: project_manager.get_all('completed', include_archived=True),
+        'get_by_id': lambda: project_manager.get_by_id(sample.project_id),
+        'update_status': lambda: project_manager.update_status(sample.project_id, 'active'),
+        'get_progress': lambda: project_manager.get_progress(sample.project_id),
+        'get_overview': lambda: project_manager.get_overview(),
+        'delete': (project_manager.delete, lambda: (project_manager.create("Para borrar"),)),
+    }
+
+    task_benches = {
+        'create': lambda: task_manager.create("Benchmark", "Descripción", sample.project_id, "high", next_week),
+        'get_all': lambda: task_manager.get_all(),
+        'get_all_archived': lambda: task_manager.get_all({'status': 'completed', 'include_archived': True}),
+        'get_by_id': lambda: task_manager.get_by_id(sample.task_id),
+        'update_status': lambda: task_manager.update_status(sample.task_id, 'in_progress'),
+        'update_deadline': lambda: task_manager.update_deadline(sample.task_id, next_week),
+        'update_title': lambda: task_manager.update_title(sample.task_id, "Título de benchmark"),
+        'update_description': lambda: task_manager.update_description(sample.task_id, "Descripción"),
+        'update_priority': lambda: task_manager.update_priority(sample.task_id, 'high'),
+        'update': lambda: task_manager.update(sample.task_id, {'title': "Título", 'priority': 'medium'}),
+        'postpone': lambda: task_manager.postpone(sample.task_id, 1),
+        'delete': (task_manager.delete, lambda: (task_manager.create("Para borrar"),)),
+        'get_subtasks': lambda: task_manager.get_subtasks(sample.parent_task_id),
+        'set_deadline_alert': lambda: task_manager.set_deadline_alert(sample.task_id, "18:00", 30),
+        'get_pending_alerts': lambda: task_manager.get_pending_alerts(),
+        'claim_alert': lambda: task_manager.claim_alert(sample.task_id, 0.0),
+        'refresh_alerts': lambda: task_manager.refresh_alerts(),
+        'set_recurrence': (task_manager.set_recurrence,
+                           lambda: (task_manager.create("Periódica", deadline=next_week), "FREQ=WEEKLY")),
+        'get_due_recurrences': lambda: task_manager.get_due_recurrences(next_week),
+        'materialize_next': (task_manager.materialize_next,
+                             lambda: (task_manager.create("Periódica", deadline=next_week, recurrence="FREQ=DAILY"),)),
+        'add_dependency': (task_manager.add_dependency,
+                           lambda: (task_manager.create("Después"), task_manager.create("Antes"))),
+        'remove_dependency': (task_manager.remove_dependency, lambda: linked_pair()),
+        'get_dependencies': lambda: task_manager.get_dependencies(sample.task_id),
+        'get_dependents': lambda: task_manager.get_dependents(sample.task_id),
+        'get_dependency_graph': lambda: task_manager.get_dependency_graph(),
+    }
+
+    note_benches = {
+        'create': lambda: note_manager.create("Benchmark", "Contenido de la nota", "idea,cliente"),
+        'get_all': lambda: note_manager.get_all(),
+        'get_by_id': lambda: note_manager.get_by_id(sample.note_id),
+        'update': lambda: note_manager.update(sample.note_id, content="Contenido actualizado"),
+        'delete': (note_manager.delete, lambda: (note_manager.create("Para borrar", "x"),)),
+    }
+
+    # Variantes de las consultas más usadas por los handlers
+    extra = {
+        'db.Project.get_all[active]': lambda: project_manager.get_all(status='active'),
+        'db.Project.get_overview[active]': lambda: project_manager.get_overview(status='active'),
+        'db.Task.get_all[parent_only]': lambda: task_manager.get_all({'parent_only': True}),
+        'db.Task.get_all[project]': lambda: task_manager.get_all({'project_id': sample.project_id}),
+        'db.Task.get_all[today]': lambda: task_manager.get_all({'today': True}),
+        'db.Task.get_all[overdue]': lambda: task_manager.get_all({'overdue': True}),
+        'db.Note.get_all[tag]': lambda: note_manager.get_all({'tag': 'idea'}),
+        'db.Task.get_all[search]': lambda: task_manager.get_all({'search': sample.search_word, 'limit': 20}),
+        'db.Task.get_all[search_typo]': lambda: task_manager.get_all({'search': sample.search_typo, 'limit': 20}),
+        'db.Task.get_all[search_filtered]': lambda: task_manager.get_all(
+            {'search': sample.search_word, 'status': 'pending', 'priority': 'high'}),
+        'db.Note.get_all[search]': lambda: note_manager.get_all({'search': 'lorem'}),
+    }
+
+    for cls, benches in ((Project, project_benches), (Task, task_benches), (Note, note_benches)):
+        check_coverage(benches, public_methods(cls), f"{cls.__name__}.")
+        for method, bench in benches.items():
+            func, setup = bench if isinstance(bench, tuple) else (bench, None)
+            suite.bench(f"db.{cls.__name__}.{method}", func, setup)
+
+    for name, func in extra.items():
+        suite.bench(name, func)
+
+
+# ========== FORMATEADORES ==========
+
+def run_formatter_benchmarks(suite: BenchmarkSuite, db: DatabaseManager, owner_id: int):
+    sample = SampleData(db, owner_id)
+    project_manager = Project(db, owner_id)
+    task_manager = Task(db, owner_id)
+    note_manager = Note(db, owner_id)
+
+    project = project_manager.get_by_id(sample.project_id) or {}
+    progress = project_manager.get_progress(sample.project_id) if sample.project_id else {}
+    task = task_manager.get_by_id(sample.task_id) or {}
+    note = note_manager.get_by_id(sample.note_id) or {}
+    tasks = task_manager.get_all({'parent_only': True})[:50]
+    overdue = task_manager.get_all({'overdue': True})[:10]
+    projects = [p for p in project_manager.get_all(status='active') if p.get('deadline')][:10]
+    overview = project_manager.get_overview(status='active')[:config.PROJECTS_PER_PAGE]
+    graph = task_graph.TaskGraph(db)
+    analysis = graph.critical_path(owner_id, sample.project_id)
+    events.unsubscribe(graph.on_event)
+    today = date.today()
+
+    summary = {
+        'tasks_pending': 120, 'tasks_in_progress': 30, 'tasks_completed_today': 4,
+        'tasks_overdue': 12, 'projects_active': 15, 'projects_paused': 3,
+        'upcoming_deadlines': projects[:5],
+    }
+    weekly = {
+        'week_start': (today - timedelta(days=7)).strftime("%Y-%m-%d"),
+        'week_end': today.strftime("%Y-%m-%d"),
+        'completed': 12, 'created': 20, 'overdue': 3,
+    }
+    monthly = {'month': today.strftime("%B %Y"), 'completed': 40,
+               'projects_completed': 2, 'productivity_score': 7}
+
+    benches = {
+        'format_date': lambda: formatters.format_date(task.get('deadline') or today.strftime("%Y-%m-%d")),
+        'format_project': lambda: formatters.format_project(project),
+        'format_project_with_progress': lambda: formatters.format_project_with_progress(project, progress),
+        'format_project_overview': lambda: formatters.format_project_overview(overview, "Misiones", total=50),
+        'format_critical_path': lambda: formatters.format_critical_path(project.get('name', "Misión"), analysis),
+        'format_task': lambda: formatters.format_task(task, include_project=True, project_name="Proyecto"),
+        'format_task_list': lambda: formatters.format_task_list(tasks, "Objetivos"),
+        'format_note': lambda: formatters.format_note(note),
+        'format_dashboard': lambda: formatters.format_dashboard(summary),
+        'format_progress_bar': lambda: formatters.format_progress_bar(62.5),
+        'format_daily_summary': lambda: formatters.format_daily_summary(tasks[:10], overdue[:5], projects[:5], projects),
+        'format_weekly_stats': lambda: formatters.format_weekly_stats(weekly),
+        'format_monthly_stats': lambda: formatters.format_monthly_stats(monthly),
+    }
+
+    check_coverage(benches, module_functions(formatters), "formatters.")
+    for name, func in benches.items():
+        suite.bench(f"formatters.{name}", func)
+
+    # Clasificar todos los objetivos por su deadline (dashboard, resúmenes)
+    all_tasks = task_manager.get_all()
+    suite.bench("dates.classify_batch", lambda: DateClassifier().classify_batch(all_tasks))
+
+    # Dividir un mensaje que no cabe en uno (unas 20.000 letras de lista de objetivos)
+    long_message = formatters.format_task_list(all_tasks[:400], "Objetivos")
+    suite.bench("long_messages.split_html", lambda: split_html(long_message))
+
+
+# ========== BÚSQUEDA ==========
+
+def run_search_benchmarks(suite: BenchmarkSuite, db: DatabaseManager, owner_id: int):
+    sample = SampleData(db, owner_id)
+    index = search_index.SearchIndex(db)
+
+    def search(query):
+        # Cada vez sin caché: se mide la búsqueda, no el diccionario
+        index._users[owner_id].cache.clear()
+        return index.search(owner_id, query)
+
+    suite.bench("search_index.load", lambda: index._load(owner_id))
+    index.search(owner_id, "")
+    suite.bench("search_index.search[empty]", lambda: search(""))
+    suite.bench("search_index.search[prefix]", lambda: search(sample.search_prefix))
+    suite.bench("search_index.search[typo]", lambda: search(sample.search_typo))
+    suite.bench("search_index.search[cached]", lambda: index.search(owner_id, sample.search_prefix))
+
+    events.unsubscribe(index.on_event)
+
+
+# ========== DEPENDENCIAS ==========
+
+def run_dependency_benchmarks(suite: BenchmarkSuite, db: DatabaseManager, owner_id: int):
+    sample = SampleData(db, owner_id)
+    task_manager = Task(db, owner_id)
+    graph = task_graph.TaskGraph(db)
+
+    # Cadena por capas en la misión más grande: cada objetivo espera a los
+    # dos de la capa anterior (el caso caro de la ruta crítica)
+    pending = [task for task in task_manager.get_all({'project_id': sample.project_id})
+               if task['status'] != 'completed'][:60]
+    for i, task in enumerate(pending[2:], 2):
+        for depends_on in pending[(i // 2 - 1) * 2:(i // 2) * 2]:
+            task_manager.add_dependency(task['id'], depends_on['id'])
+    today = task_manager.get_all({'today': True}) + task_manager.get_all({'overdue': True})
+
+    def load():
+        graph.forget(owner_id)
+        return graph._graph(owner_id)
+
+    def critical_path():
+        # Cada vez sin caché: se mide el análisis, no el diccionario
+        graph._graph(owner_id).drop_analyses()
+        return graph.critical_path(owner_id, sample.project_id)
+
+    suite.bench("task_graph.load", load)
+    suite.bench("task_graph.split[today]", lambda: graph.split(owner_id, today))
+    suite.bench("task_graph.critical_path", critical_path)
+    suite.bench("task_graph.critical_path[cached]", lambda: graph.critical_path(owner_id, sample.project_id))
+
+    events.unsubscribe(graph.on_event)
+
+
+# ========== TECLADOS ==========
+
+def run_keyboard_benchmarks(suite: BenchmarkSuite, db: DatabaseManager, owner_id: int):
+    project_manager = Project(db, owner_id)
+    task_manager = Task(db, owner_id)
+    note_manager = Note(db, owner_id)
+
+    projects = project_manager.get_all()
+    tasks = task_manager.get_all({'parent_only': True})
+    notes = note_manager.get_all()
+
+    benches = {
+        'get_main_keyboard': lambda: keyboards.get_main_keyboard(),
+        'get_projects_menu': lambda: keyboards.get_projects_menu(),
+        'get_project_list_keyboard': lambda: keyboards.get_project_list_keyboard(projects, page=1, status='active'),
+        'get_project_detail_keyboard': lambda: keyboards.get_project_detail_keyboard(1, 'active'),
+        'get_tasks_menu': lambda: keyboards.get_tasks_menu(),
+        'get_task_list_keyboard': lambda: keyboards.get_task_list_keyboard(tasks, 'all', page=1),
+        'get_task_detail_keyboard': lambda: keyboards.get_task_detail_keyboard(1, 'pending', True),
+        'get_task_recurrence_keyboard': lambda: keyboards.get_task_recurrence_keyboard(1, True),
+        'get_task_dependency_keyboard': lambda: keyboards.get_task_dependency_keyboard(
+            1, tasks[:config.DEPENDENCY_CANDIDATES_MAX], {task['id'] for task in tasks[:3]}),
+        'get_critical_path_keyboard': lambda: keyboards.get_critical_path_keyboard(1),
+        'get_notes_menu': lambda: keyboards.get_notes_menu(),
+        'get_note_list_keyboard': lambda: keyboards.get_note_list_keyboard(notes, page=1),
+        'get_note_detail_keyboard': lambda: keyboards.get_note_detail_keyboard(1),
+        'get_dashboard_menu': lambda: keyboards.get_dashboard_menu(),
+        'get_settings_menu': lambda: keyboards.get_settings_menu(),
+        'get_reminder_time_keyboard': lambda: keyboards.get_reminder_time_keyboard(
+            'daily', config.DAILY_SUMMARY_TIME_OPTIONS, "07:00", True),
+        'get_timezone_keyboard': lambda: keyboards.get_timezone_keyboard(config.DEFAULT_TIMEZONE),
+        'get_confirmation_keyboard': lambda: keyboards.get_confirmation_keyboard('task_delete', 1),
+        'get_export_keyboard': lambda: keyboards.get_export_keyboard(),
+        'get_import_keyboard': lambda: keyboards.get_import_keyboard(),
+        'get_archived_task_keyboard': lambda: keyboards.get_archived_task_keyboard(),
+        'get_priority_keyboard': lambda: keyboards.get_priority_keyboard(),
+        'get_cancel_keyboard': lambda: keyboards.get_cancel_keyboard(),
+    }
+
+    check_coverage(benches, module_functions(keyboards), "keyboards.")
+    for name, func in benches.items():
+        suite.bench(f"keyboards.{name}", func)
+
+
+# ========== PLANTILLAS ==========
+
+def run_template_benchmarks(suite: BenchmarkSuite):
+    templates = {
+        name: text for name, text in vars(cortana_personality).items()
+        if name.startswith('CORTANA_') and isinstance(text, str)
+    }
+
+    for name, text in templates.items():
+        fields = {field for _, field, _, _ in string.Formatter().parse(text) if field}
+        if not fields:
+            continue
+        values = {field: f"valor de {field}" for field in fields}
+        suite.bench(f"templates.{name}", lambda text=text, values=values: render_template(text, **values))
+
+    # Referencia: la misma plantilla con str.format, como se hacía antes
+    values = {'title': "Informe", 'description': "Detalles", 'priority': "Alta",
+              'deadline': "Mañana", 'project': "Cortana"}
+    suite.bench("templates.str_format[CORTANA_NEW_TASK_CONFIRM]",
+                lambda: cortana_personality.CORTANA_NEW_TASK_CONFIRM.format(**values))
+
+
+def run_all(suite: BenchmarkSuite, db: DatabaseManager, owner_id: int):
+    print("🗄️ Modelos")
+    run_model_benchmarks(suite, db, owner_id)
+    print("🔗 Dependencias")
+    run_dependency_benchmarks(suite, db, owner_id)
+    print("🖋️ Formateadores")
+    run_formatter_benchmarks(suite, db, owner_id)
+    print("🔎 Búsqueda")
+    run_search_benchmarks(suite, db, owner_id)
+    print("⌨️ Teclados")
+    run_keyboard_benchmarks(suite, db, owner_id)
+    print("🧩 Plantillas")
+    run_template_benchmarks(suite)
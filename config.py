@@ -10,13 +10,83 @@ BOT_TOKEN = "8222314009:AAG-nc-6_IJvVMk-LH4Q5bFVO3GLOymTA4o"
 # ID del usuario autorizado (solo tú puedes usar el bot)
 AUTHORIZED_USER_ID = 6009496370
 
+# Modo multiusuario: con True, los usuarios de la tabla authorized_users también
+# pueden usar el bot (cada uno con sus propios datos). AUTHORIZED_USER_ID es el
+# administrador que los autoriza con /allow y /revoke.
+MULTI_USER_MODE = False
+
 # Configuración de la base de datos
 DATABASE_PATH = "productivity_bot.db"
 
+# Almacenamiento de los datos de cada usuario (proyectos, tareas y notas):
+#   'shared'   -> todo en DATABASE_PATH
+#   'per_user' -> un archivo por usuario en SHARD_DIRECTORY (database/sharding.py)
+STORAGE_MODE = "shared"
+SHARD_DIRECTORY = "data/users"
+SHARD_MAX_OPEN_CONNECTIONS = 32  # Conexiones abiertas como máximo (LRU)
+SHARD_IDLE_TIMEOUT = 300  # Segundos sin uso antes de cerrar una conexión
+
 # Configuración de recordatorios
 DEFAULT_DAILY_SUMMARY_TIME = time(7, 0)  # 07:00 AM
 DEFAULT_EVENING_REMINDER_TIME = time(18, 0)  # 06:00 PM
 
+# Persistencia del planificador: los trabajos se guardan en la base de datos
+# para que un reinicio no borre los recordatorios programados
+SCHEDULER_JOBS_TABLE = "apscheduler_jobs"
+# Segundos de margen para ejecutar un recordatorio que se retrasó mientras el bot corría
+REMINDER_MISFIRE_GRACE_TIME = 300
+
+# Planificador de recordatorios por usuario (utils/reminder_scheduler.py)
+REMINDER_MAX_CONCURRENT_SENDS = 20  # Envíos simultáneos como máximo
+REMINDER_SCHEDULER_MAX_SLEEP = 300  # Segundos máximos que duerme el bucle sin revisar
+REMINDER_FANOUT_BATCH_SIZE = 25  # Usuarios por tanda en los resúmenes semanal y mensual
+
+# Alertas de deadline con hora exacta (utils/deadline_alerts.py)
+DEADLINE_ALERT_DEFAULT_MINUTES = 30  # Aviso por defecto: 30 minutos antes
+DEADLINE_ALERT_BATCH_SIZE = 200  # Alertas que se cargan en memoria de cada vez
+
+# Métricas de latencia (utils/metrics.py): handlers, base de datos y API de Telegram
+METRICS_ENABLED = True
+METRICS_HOST = "127.0.0.1"  # Solo accesible desde la propia máquina
+METRICS_PORT = 9464  # Endpoint /metrics en formato Prometheus (None = sin endpoint)
+
+# Trazas de las consultas SQL (database/tracing.py)
+SQL_TRACE_ENABLED = True
+SQL_SLOW_QUERY_MS = 50  # Las consultas más lentas se anotan en logs/sql.log
+SQL_REPORT_INTERVAL_MINUTES = 60  # Cada cuánto se escribe el top de consultas en el log
+SQL_REPORT_TOP = 10
+
+# Logs (logger_config.py): se escriben desde un hilo aparte, nunca en el event loop
+LOG_DIRECTORY = "logs"
+LOG_FORMAT = "text"  # 'text' o 'json' (una línea JSON por mensaje)
+LOG_MAX_BYTES = 10 * 1024 * 1024  # Rotar al llegar a 10 MB (y además cada día)
+LOG_BACKUP_COUNT = 7  # Archivos rotados (.gz) que se conservan por log
+# Fracción de mensajes DEBUG que se guardan: 1.0 = todos, 0.1 = uno de cada diez
+LOG_DEBUG_SAMPLE_RATE = 1.0
+LOG_DEBUG_SAMPLE_RATES = {}  # Por logger, por ejemplo {'tasks': 0.1}
+
+# Arranque rápido (handlers/__init__.py): cada módulo de handlers se importa
+# la primera vez que llega un update para él
+LAZY_HANDLERS = True
+HANDLER_PRELOAD = True  # Una vez respondiendo, importar el resto en segundo plano
+
+# Fechas distintas que se recuerdan ya convertidas (utils/dates.py)
+DATE_PARSE_CACHE_SIZE = 4096
+
+# Opciones que se ofrecen en Configuración
+DAILY_SUMMARY_TIME_OPTIONS = ["06:00", "06:30", "07:00", "07:30", "08:00", "09:00"]
+EVENING_REMINDER_TIME_OPTIONS = ["17:00", "18:00", "19:00", "20:00", "21:00", "22:00"]
+TIMEZONE_OPTIONS = [
+    "Europe/Madrid",
+    "Europe/London",
+    "Atlantic/Canary",
+    "America/Mexico_City",
+    "America/Bogota",
+    "America/Argentina/Buenos_Aires",
+    "America/New_York",
+    "UTC"
+]
+
 # Zona horaria por defecto
 DEFAULT_TIMEZONE = "Europe/Madrid"
 
@@ -26,6 +96,76 @@ MAX_TASK_NAME_LENGTH = 200
 MAX_NOTE_TITLE_LENGTH = 100
 MAX_NOTE_CONTENT_LENGTH = 4000
 
+# Listas paginadas
+PROJECTS_PER_PAGE = 5  # Misiones por página en la lista de misiones (con su progreso)
+
+# Mensajes largos (utils/long_messages.py)
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096  # Límite de Telegram por mensaje (caracteres visibles)
+MESSAGE_PAGE_LENGTH = 3000  # Texto por página en las vistas paginadas (subobjetivos)
+
+# Exportación de datos (utils/export.py)
+EXPORT_BATCH_SIZE = 500  # Filas que se leen de la base de datos de cada vez
+EXPORT_MAX_DOCUMENT_BYTES = 50 * 1024 * 1024  # Límite de Telegram para documentos de bots
+
+# Copias de seguridad en caliente (database/backup.py)
+BACKUP_ENABLED = True
+BACKUP_DIRECTORY = "backups"
+BACKUP_INTERVAL_HOURS = 24  # Cada cuánto se hace una copia programada
+BACKUP_STARTUP_DELAY = 300  # Segundos tras arrancar para la primera copia si ya tocaba
+BACKUP_PAGES_PER_STEP = 256  # Páginas copiadas por paso (entre pasos el bot puede escribir)
+BACKUP_STEP_PAUSE = 0.01  # Segundos de pausa entre pasos
+BACKUP_MAX_RESTARTS = 5  # Reinicios por escrituras antes de copiar de una sola vez
+BACKUP_BUSY_TIMEOUT = 30  # Segundos esperando a que se libere la base de datos
+BACKUP_QUICK_CHECK = False  # True = PRAGMA quick_check (más rápido) en lugar de integrity_check
+BACKUP_COMPRESS = True  # Guardar las copias comprimidas con gzip
+BACKUP_COMPRESS_LEVEL = 6
+BACKUP_KEEP_LAST = 3  # Copias más recientes que se conservan siempre
+BACKUP_KEEP_DAILY = 7  # Además, la última de cada uno de estos días
+BACKUP_KEEP_WEEKLY = 4  # Y la última de cada una de estas semanas
+
+# Registro de cambios (database/events.py)
+EVENTS_RETENTION_DAYS = 365  # Eventos más antiguos se borran al archivar (0 = nunca)
+
+# Archivo de completados (database/archive.py)
+ARCHIVE_ENABLED = True
+ARCHIVE_AFTER_DAYS = 90  # Se archiva lo completado hace más de estos días
+ARCHIVE_BATCH_SIZE = 1000  # Objetivos principales movidos por transacción
+ARCHIVE_INTERVAL_HOURS = 24  # Cada cuánto se pasa a archivar
+ARCHIVE_STARTUP_DELAY = 600  # Segundos tras arrancar para la primera pasada
+
+# Importación de objetivos (utils/importer.py)
+IMPORT_BATCH_SIZE = 5000  # Filas por transacción (y cada cuánto se avisa del progreso)
+IMPORT_MAX_FILE_BYTES = 20 * 1024 * 1024  # Límite de Telegram para descargar archivos
+IMPORT_CREATE_MISSING_PROJECTS = True  # Crear las misiones que no existan (si no, la fila es un error)
+IMPORT_MAX_REPORTED_ERRORS = 10  # Filas con error que se muestran como ejemplo
+IMPORT_PROGRESS_INTERVAL = 2  # Segundos mínimos entre actualizaciones del mensaje de progreso
+
+# Búsqueda inline: @bot texto (utils/search_index.py, handlers/inline.py)
+INLINE_RESULTS_LIMIT = 20  # Resultados por respuesta (Telegram admite 50)
+INLINE_DEBOUNCE_SECONDS = 0.05  # Espera antes de buscar: si llega otra letra, solo se responde a la última
+INLINE_CACHE_TIME = 10  # Segundos que Telegram puede reutilizar una respuesta (cache_time)
+INLINE_QUERY_CACHE_SIZE = 64  # Búsquedas recientes guardadas por usuario
+INLINE_INDEX_MAX_USERS = 200  # Usuarios con índice en memoria (se descarta el menos usado)
+
+# Objetivos que se repiten (database/recurrence.py)
+RECURRENCE_HORIZON_DAYS = 1  # La siguiente repetición se crea cuando faltan estos días o menos (0 = el mismo día)
+RECURRENCE_INTERVAL_HOURS = 1  # Cada cuánto se buscan repeticiones que ya toca crear
+RECURRENCE_BATCH_SIZE = 500  # Series que se leen por consulta en cada pasada
+RECURRENCE_PRESETS = {  # Botones de "🔁 Repetir": clave -> (texto, regla RRULE)
+    'daily': ("📅 Cada día", "FREQ=DAILY"),
+    'weekdays': ("💼 De lunes a viernes", "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"),
+    'weekly': ("🗓️ Cada semana", "FREQ=WEEKLY"),
+    'biweekly': ("🗓️ Cada dos semanas", "FREQ=WEEKLY;INTERVAL=2"),
+    'monthly': ("📆 Cada mes", "FREQ=MONTHLY"),
+    'yearly': ("🎂 Cada año", "FREQ=YEARLY"),
+}
+
+# Dependencias entre objetivos (utils/task_graph.py)
+DEPENDENCY_TASK_DAYS = 1  # Días que se estima que dura cada objetivo pendiente (ruta crítica)
+DEPENDENCY_GRAPH_MAX_USERS = 200  # Usuarios con grafo en memoria (se descarta el menos usado)
+DEPENDENCY_CANDIDATES_PER_PAGE = 8  # Objetivos por página al elegir de cuáles depende uno
+DEPENDENCY_CANDIDATES_MAX = 100  # Objetivos en progreso y pendientes que se ofrecen como máximo (de cada estado)
+
 # Estados de tareas
 TASK_STATUS = {
     'pending': '⏳ Pendiente',
@@ -63,5 +203,6 @@ EMOJI = {
     'stats': '📈',
     'calendar': '📆',
     'reminder': '⏰',
-    'export': '📤'
+    'export': '📤',
+    'import': '📥'
 }
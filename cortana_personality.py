@@ -52,6 +52,10 @@ Permíteme mostrarte las capacidades del sistema:
 • Etiquetar por categorías
 • Búsqueda rápida
 
+<b>🔎 Búsqueda instantánea</b>
+• Escribe @ y mi nombre en cualquier chat, seguido de lo que buscas
+• Objetivos, misiones y notas mientras escribes
+
 <b>⚙️ Configuración</b>
 • Ajustar sistema de alertas
 • Exportar datos
@@ -92,6 +96,12 @@ Datos del mes completo compilados.
 
 Me gusta ver progreso consistente:"""
 
+CORTANA_CATCH_UP_DIGEST = """🛰️ <b>Reconexión Completada</b>
+
+Estuve fuera de línea y me perdí {count} aviso(s) programado(s).
+
+Te lo resumo todo en un solo informe con los datos actualizados:"""
+
 
 # ============================================================================
 # MENSAJES DEL MENÚ PRINCIPAL
@@ -201,6 +211,13 @@ CORTANA_OVERDUE_WARNING = """⚠️ <b>Alerta: Objetivos vencidos detectados</b>
 
 Los datos indican retrasos. Sugiero revisar las prioridades."""
 
+CORTANA_DEADLINE_ALERT = """⏰ <b>Deadline inminente</b>
+
+<b>{title}</b>
+Vence: {deadline} a las {time} (quedan {minutes} min)
+
+Es el momento de cerrar este objetivo."""
+
 
 # ============================================================================
 # MENSAJES DEL DASHBOARD
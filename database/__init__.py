@@ -1,6 +1,6 @@
 """
 Paquete de base de datos
 """
-from .models import DatabaseManager, Project, Task, Note
+from .models import DatabaseManager, Project, Task, Note, UserSettings, AccessControl
 
-__all__ = ['DatabaseManager', 'Project', 'Task', 'Note']
+__all__ = ['DatabaseManager', 'Project', 'Task', 'Note', 'UserSettings', 'AccessControl']
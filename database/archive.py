@@ -0,0 +1,314 @@
+"""
+Archivo de misiones y objetivos completados
+Lo que se terminó hace tiempo sale de las tablas activas (projects, tasks)
+y pasa a projects_archive y tasks_archive, en el mismo archivo de SQLite.
+
+EXPLICACIÓN:
+- Los objetivos completados se quedaban para siempre en tasks: cada listado,
+  cada get_progress y cada consulta del dashboard seguía recorriéndolos.
+  Cada ARCHIVE_INTERVAL_HOURS se mueven al archivo:
+  - Un objetivo principal completado hace más de ARCHIVE_AFTER_DAYS días,
+    junto con todos sus subobjetivos. Si alguno de los subobjetivos se ha
+    tocado después de esa fecha, el objetivo entero se queda donde está.
+  - Una misión completada hace más de ARCHIVE_AFTER_DAYS días, cuando ya no
+    le queda ningún objetivo en la tabla activa.
+- Se mueve por tandas de ARCHIVE_BATCH_SIZE objetivos principales. Cada tanda
+  es una transacción (INSERT ... SELECT en el archivo y DELETE en la tabla
+  activa): si algo falla a mitad, no se pierde ni se duplica nada, y entre
+  tanda y tanda el bot puede seguir escribiendo.
+- Las estadísticas no cambian al archivar. Antes de mover cada tanda se suma
+  en archive_rollups cuánto se creó y cuánto se completó cada día (por
+  usuario, tipo y misión). Los resúmenes semanal y mensual y el progreso de
+  las misiones suman esos totales a lo que hay en las tablas activas.
+- Las tablas del archivo tienen las mismas columnas que las activas más
+  archived_at, y conservan los ids: las vistas de historial pueden pedir
+  include_archived y ver todo junto (Task.get_all, Project.get_all).
+- Cada tanda deja un evento 'archived' por usuario en la tabla events (con
+  los ids movidos), y en cada pasada programada se borran los eventos más
+  antiguos que EVENTS_RETENTION_DAYS (database/events.py).
+- Con STORAGE_MODE = 'per_user' se archiva dentro del archivo de cada usuario.
+
+Uso desde la terminal:
+    python -m database.archive              # Archivar ahora
+    python -m database.archive --days 30    # Con otro límite de días
+"""
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import config
+from database import events
+from database.models import DatabaseManager, ARCHIVE_TABLES
+
+
+# Suma lo de una tanda en archive_rollups. {source} es la tabla activa y
+# {batch} la tabla temporal con los ids de la tanda.
+ROLLUP_SQL = """
+    INSERT INTO archive_rollups (owner_id, kind, project_id, day, created, completed, total)
+    SELECT owner_id, kind, project_id, day, SUM(created), SUM(completed), SUM(total)
+    FROM (
+        SELECT owner_id, {kind} AS kind, {project} AS project_id,
+               COALESCE(date(created_at), date(updated_at), date('now')) AS day,
+               1 AS created, 0 AS completed, 0 AS total
+        FROM {source} WHERE id IN (SELECT id FROM {batch})
+        UNION ALL
+        SELECT owner_id, {kind}, {project},
+               COALESCE(date(completed_at), date(updated_at), date('now')),
+               0, status = 'completed', 1
+        FROM {source} WHERE id IN (SELECT id FROM {batch})
+    )
+    GROUP BY owner_id, kind, project_id, day
+    ON CONFLICT (owner_id, kind, project_id, day) DO UPDATE SET
+        created = created + excluded.created,
+        completed = completed + excluded.completed,
+        total = total + excluded.total
+"""
+
+
+class ArchiveManager:
+    """Mueve al archivo las misiones y objetivos completados hace tiempo"""
+
+    # Una sola pasada a la vez en todo el proceso (programada o manual)
+    _lock = threading.Lock()
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+        self.db = db_manager or DatabaseManager()
+
+    def databases(self) -> List[DatabaseManager]:
+        """Archivos con datos de usuarios: el principal y, en 'per_user', el de cada uno"""
+        databases = [self.db]
+
+        if config.STORAGE_MODE == 'per_user':
+            from database.sharding import get_registry
+            registry = get_registry()
+            databases.extend(registry.get(user_id) for user_id in registry.list_user_ids())
+
+        return databases
+
+    def run(self, after_days: Optional[int] = None, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Archiva todo lo completado hace más de after_days días.
+
+        Returns:
+            {'tasks', 'projects', 'cutoff', 'seconds'}: objetivos (con
+            subobjetivos) y misiones movidos al archivo
+        """
+        after_days = config.ARCHIVE_AFTER_DAYS if after_days is None else after_days
+        if after_days < 1:
+            raise ValueError("after_days tiene que ser al menos 1")
+
+        cutoff = (date.today() - timedelta(days=after_days)).strftime("%Y-%m-%d")
+        batch_size = batch_size or config.ARCHIVE_BATCH_SIZE
+        started = time.monotonic()
+        result = {'tasks': 0, 'projects': 0, 'cutoff': cutoff}
+
+        with ArchiveManager._lock:
+            for database in self.databases():
+                moved = self.archive_database(database, cutoff, batch_size)
+                result['tasks'] += moved['tasks']
+                result['projects'] += moved['projects']
+
+        result['seconds'] = time.monotonic() - started
+        return result
+
+    def archive_database(self, database: DatabaseManager, cutoff: str, batch_size: int) -> Dict[str, int]:
+        """Archiva un archivo de SQLite, tanda a tanda. cutoff: fecha YYYY-MM-DD excluida"""
+        conn = database.get_connection()
+        moved = {'tasks': 0, 'projects': 0}
+
+        try:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY, root_id INTEGER)")
+
+            # Objetivos primero: así las misiones ya vacías se archivan en la misma pasada
+            after_id = 0
+            while True:
+                count, after_id = self._archive_task_batch(conn, cutoff, after_id, batch_size)
+                moved['tasks'] += count
+                if after_id is None:
+                    break
+
+            after_id = 0
+            while True:
+                count, after_id = self._archive_project_batch(conn, cutoff, after_id, batch_size)
+                moved['projects'] += count
+                if after_id is None:
+                    break
+        finally:
+            conn.close()
+
+        return moved
+
+    def _archive_task_batch(self, conn, cutoff: str, after_id: int, batch_size: int):
+        """
+        Una tanda de objetivos principales (con sus subobjetivos, a cualquier profundidad).
+
+        Returns:
+            (objetivos principales archivados, último id revisado o None si no queda nada)
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM temp.archive_batch")
+            conn.execute("""
+                INSERT INTO temp.archive_batch (id, root_id)
+                WITH RECURSIVE tree(id, root_id, owner_id) AS (
+                    SELECT id, id, owner_id FROM (
+                        SELECT id, owner_id FROM tasks
+                        WHERE status = 'completed'
+                        AND parent_task_id IS NULL
+                        AND date(completed_at) < ?
+                        AND id > ?
+                        ORDER BY id
+                        LIMIT ?
+                    )
+                    UNION ALL
+                    SELECT t.id, tree.root_id, t.owner_id
+                    FROM tasks t JOIN tree ON t.owner_id = tree.owner_id AND t.parent_task_id = tree.id
+                )
+                SELECT id, root_id FROM tree
+            """, (cutoff, after_id, batch_size))
+
+            last_root = conn.execute("SELECT MAX(root_id) AS id FROM temp.archive_batch").fetchone()['id']
+            if last_root is None:
+                conn.rollback()
+                return 0, None
+
+            # Si algún subobjetivo se ha tocado hace poco, el objetivo entero sigue activo
+            conn.execute("""
+                DELETE FROM temp.archive_batch WHERE root_id IN (
+                    SELECT b.root_id FROM temp.archive_batch b JOIN tasks t ON t.id = b.id
+                    WHERE b.id != b.root_id AND date(t.updated_at) >= ?
+                )
+            """, (cutoff,))
+
+            conn.execute(ROLLUP_SQL.format(
+                source='tasks', batch='temp.archive_batch',
+                kind="CASE WHEN parent_task_id IS NULL THEN 'task' ELSE 'subtask' END",
+                project="COALESCE(project_id, 0)"
+            ))
+            count = self._count(conn)
+            archived = self._record_archived(conn, 'tasks', 'task')
+            self._move(conn, 'tasks')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        events.publish(*archived)
+        return count, last_root
+
+    def _archive_project_batch(self, conn, cutoff: str, after_id: int, batch_size: int):
+        """Una tanda de misiones completadas que ya no tienen objetivos activos"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM temp.archive_batch")
+            conn.execute("""
+                INSERT INTO temp.archive_batch (id, root_id)
+                SELECT id, id FROM projects p
+                WHERE status = 'completed'
+                AND date(completed_at) < ?
+                AND id > ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM tasks t WHERE t.owner_id = p.owner_id AND t.project_id = p.id
+                )
+                ORDER BY id
+                LIMIT ?
+            """, (cutoff, after_id, batch_size))
+
+            last_id = conn.execute("SELECT MAX(id) AS id FROM temp.archive_batch").fetchone()['id']
+            if last_id is None:
+                conn.rollback()
+                return 0, None
+
+            conn.execute(ROLLUP_SQL.format(
+                source='projects', batch='temp.archive_batch', kind="'project'", project="id"
+            ))
+            count = self._count(conn)
+            archived = self._record_archived(conn, 'projects', 'project')
+            self._move(conn, 'projects')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        events.publish(*archived)
+        return count, last_id
+
+    def _count(self, conn) -> int:
+        """Objetivos principales (o misiones) que hay en la tanda"""
+        return conn.execute(
+            "SELECT COUNT(*) AS count FROM temp.archive_batch WHERE id = root_id"
+        ).fetchone()['count']
+
+    def _record_archived(self, conn, table: str, entity: str) -> List[Dict[str, Any]]:
+        """Un evento 'archived' por usuario con los ids de la tanda"""
+        ids_by_owner: Dict[int, List[int]] = {}
+        for row in conn.execute(f"""
+            SELECT owner_id, id FROM {table} WHERE id IN (SELECT id FROM temp.archive_batch) ORDER BY id
+        """):
+            ids_by_owner.setdefault(row['owner_id'], []).append(row['id'])
+
+        cursor = conn.cursor()
+        return [
+            events.record(cursor, owner_id, entity, None, 'archived', {'ids': ids})
+            for owner_id, ids in ids_by_owner.items()
+        ]
+
+    def _move(self, conn, table: str):
+        """Copia las filas de la tanda al archivo y las borra de la tabla activa"""
+        archive = ARCHIVE_TABLES[table]
+        columns = ", ".join(row['name'] for row in conn.execute(f"PRAGMA table_info({table})"))
+
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {archive} ({columns})
+            SELECT {columns} FROM {table} WHERE id IN (SELECT id FROM temp.archive_batch)
+        """)
+        conn.execute(f"DELETE FROM {table} WHERE id IN (SELECT id FROM temp.archive_batch)")
+
+
+def run_scheduled_archive():
+    """
+    Pasada programada (main.py la registra cada ARCHIVE_INTERVAL_HOURS).
+    Es síncrona: APScheduler la ejecuta en su pool de hilos, fuera del event loop.
+    """
+    from logger_config import setup_logger
+    logger = setup_logger('archive')
+
+    manager = ArchiveManager()
+    try:
+        result = manager.run()
+    except Exception as e:
+        logger.error(f"❌ Archivo de completados fallido: {e}")
+        return
+
+    # Limpieza del registro de cambios, aprovechando la misma pasada
+    try:
+        pruned = sum(events.prune(database) for database in manager.databases())
+    except Exception as e:
+        logger.error(f"❌ No se pudieron borrar los eventos antiguos: {e}")
+    else:
+        if pruned:
+            logger.info(f"🧹 Borrados {pruned} evento(s) de más de {config.EVENTS_RETENTION_DAYS} días")
+
+    if result['tasks'] or result['projects']:
+        logger.info(
+            f"🗄️ Archivados {result['tasks']} objetivo(s) y {result['projects']} misión(es) "
+            f"completados antes del {result['cutoff']} en {result['seconds']:.1f} s"
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Archiva las misiones y objetivos completados hace tiempo")
+    parser.add_argument('--days', type=int, default=config.ARCHIVE_AFTER_DAYS,
+                        help="Archivar lo completado hace más de estos días")
+    args = parser.parse_args(argv)
+
+    result = ArchiveManager().run(after_days=args.days)
+    print(f"🗄️ Archivados {result['tasks']} objetivo(s) y {result['projects']} misión(es) "
+          f"completados antes del {result['cutoff']} ({result['seconds']:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
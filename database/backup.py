@@ -0,0 +1,506 @@
+"""
+Copias de seguridad en caliente con la API de backup de SQLite
+Se hacen con el bot en marcha: nunca hace falta pararlo para copiar
+productivity_bot.db (ni los archivos de cada usuario).
+
+EXPLICACIÓN:
+- La copia se hace con sqlite3.Connection.backup por pasos de
+  BACKUP_PAGES_PER_STEP páginas. Entre paso y paso SQLite suelta el bloqueo
+  de lectura y se hace una pausa (BACKUP_STEP_PAUSE), así el bot puede seguir
+  escribiendo mientras tanto.
+- Si alguien escribe durante la copia, SQLite la vuelve a empezar para que
+  sea consistente. Si eso pasa más de BACKUP_MAX_RESTARTS veces, la última
+  vuelta se hace de una sola vez (las escrituras esperan solo lo que tarda
+  en copiarse el archivo).
+- Cada copia se comprueba con PRAGMA integrity_check y después se comprime
+  con gzip. El manifest.json guarda el SHA-256 de cada base de datos.
+- Cada copia es una carpeta backups/AAAAMMDD_HHMMSS con la base principal y,
+  con STORAGE_MODE = 'per_user', el archivo de cada usuario en users/.
+  Se escribe primero en una carpeta temporal: una copia a medias nunca
+  aparece en la lista.
+- Retención: se conservan las BACKUP_KEEP_LAST más recientes, la última de
+  cada uno de los BACKUP_KEEP_DAILY últimos días y la última de cada una de
+  las BACKUP_KEEP_WEEKLY últimas semanas.
+- Restaurar también usa la API de backup (en sentido contrario), así que el
+  bot puede seguir en marcha. Antes se hace una copia del estado actual.
+
+Uso desde la terminal:
+    python -m database.backup                          # Hacer una copia ahora
+    python -m database.backup list
+    python -m database.backup verify AAAAMMDD_HHMMSS
+    python -m database.backup restore AAAAMMDD_HHMMSS [--user ID]
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+
+MANIFEST_NAME = "manifest.json"
+_SET_NAME = re.compile(r'^\d{8}_\d{6}(_\d+)?$')
+_TEMP_PREFIX = ".tmp_"
+_CHUNK_SIZE = 1024 * 1024
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+# ========== COPIA DE UN ARCHIVO ==========
+
+def copy_database(source_path: str, destination_path: str, pages: Optional[int] = None,
+                  pause: Optional[float] = None, max_restarts: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Copia consistente de una base de datos SQLite que puede estar en uso.
+
+    Args:
+        source_path: Base de datos de origen
+        destination_path: Archivo de destino (se sobrescribe)
+        pages: Páginas por paso (-1 = todo de una vez)
+        pause: Segundos de pausa entre pasos para dejar paso a las escrituras
+        max_restarts: Veces que se deja reiniciar la copia antes de hacerla de una vez
+
+    Returns:
+        {'pages', 'restarts', 'seconds'}
+    """
+    pages = pages or config.BACKUP_PAGES_PER_STEP
+    pause = config.BACKUP_STEP_PAUSE if pause is None else pause
+    max_restarts = config.BACKUP_MAX_RESTARTS if max_restarts is None else max_restarts
+
+    started = time.perf_counter()
+    restarts = 0
+    last_remaining = None
+    total_pages = 0
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining, total_pages
+        total_pages = total
+        # Si quedan más páginas que en el paso anterior, la copia ha vuelto a empezar
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    source = sqlite3.connect(source_path, timeout=config.BACKUP_BUSY_TIMEOUT)
+    target = sqlite3.connect(destination_path, timeout=config.BACKUP_BUSY_TIMEOUT)
+    try:
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        except _TooManyRestarts:
+            source.backup(target, pages=-1)
+            total_pages = source.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+
+    return {'pages': total_pages, 'restarts': restarts, 'seconds': time.perf_counter() - started}
+
+
+def check_integrity(path: str, quick: Optional[bool] = None) -> Optional[str]:
+    """Comprueba una copia (None si está bien, o el primer problema encontrado)"""
+    quick = config.BACKUP_QUICK_CHECK if quick is None else quick
+    conn = sqlite3.connect(path)
+    try:
+        result = conn.execute("PRAGMA quick_check" if quick else "PRAGMA integrity_check").fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        return str(e)
+    finally:
+        conn.close()
+    return None if result == 'ok' else result
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compress_file(path: str, destination: str) -> str:
+    """Comprime un archivo con gzip y devuelve el SHA-256 del original"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source, gzip.open(destination, 'wb', compresslevel=config.BACKUP_COMPRESS_LEVEL) as output:
+        for chunk in iter(lambda: source.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            output.write(chunk)
+    return digest.hexdigest()
+
+
+def extract_file(path: str, destination: str) -> str:
+    """Descomprime (o copia) un archivo de una copia y devuelve su SHA-256"""
+    if not path.endswith('.gz'):
+        shutil.copyfile(path, destination)
+        return _file_sha256(destination)
+
+    digest = hashlib.sha256()
+    with gzip.open(path, 'rb') as source, open(destination, 'wb') as output:
+        for chunk in iter(lambda: source.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            output.write(chunk)
+    return digest.hexdigest()
+
+
+# ========== COPIAS COMPLETAS ==========
+
+class BackupManager:
+    """
+    Crea, lista, comprueba y restaura las copias de la carpeta de backups.
+
+    Uso:
+        backups = BackupManager()
+        manifest = backups.create()          # {'name': '20241029_031500', 'files': [...], ...}
+        backups.restore(manifest['name'])
+    """
+
+    # Una sola copia o restauración a la vez en todo el proceso
+    _lock = threading.Lock()
+
+    def __init__(self, directory: str = config.BACKUP_DIRECTORY,
+                 main_db_path: str = config.DATABASE_PATH):
+        self.directory = directory
+        self.main_db_path = main_db_path
+
+    def sources(self) -> List[Tuple[str, str]]:
+        """Archivos que entran en una copia: (nombre dentro de la copia, ruta)"""
+        sources = [(os.path.basename(self.main_db_path), self.main_db_path)]
+
+        if config.STORAGE_MODE == 'per_user':
+            from database.sharding import get_registry
+            registry = get_registry()
+            for user_id in registry.list_user_ids():
+                sources.append((f"users/user_{user_id}.db", registry.shard_path(user_id)))
+
+        return sources
+
+    def _target_path(self, name: str) -> str:
+        """Ruta real de un archivo de la copia (la inversa de sources)"""
+        if name.startswith("users/"):
+            from database.sharding import get_registry
+            return os.path.join(get_registry().directory, os.path.basename(name))
+        return self.main_db_path
+
+    # ---------- Crear ----------
+
+    def create(self, reason: str = "manual") -> Dict[str, Any]:
+        """
+        Hace una copia completa y aplica la política de retención.
+
+        Raises:
+            RuntimeError: si ya hay otra copia en curso o la copia no pasa la comprobación
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("ya hay una copia de seguridad o una restauración en curso")
+        try:
+            self._remove_temporary()
+            manifest = self._create(reason)
+            manifest['deleted'] = self.apply_retention()
+            return manifest
+        finally:
+            self._lock.release()
+
+    def _create(self, reason: str) -> Dict[str, Any]:
+        os.makedirs(self.directory, exist_ok=True)
+
+        started = time.perf_counter()
+        now = datetime.now()
+        name = now.strftime('%Y%m%d_%H%M%S')
+        suffix = 1
+        while os.path.exists(os.path.join(self.directory, name)):
+            name = f"{now.strftime('%Y%m%d_%H%M%S')}_{suffix}"
+            suffix += 1
+
+        work = os.path.join(self.directory, _TEMP_PREFIX + name)
+        files = []
+        try:
+            for file_name, source_path in self.sources():
+                if not os.path.exists(source_path):
+                    continue
+
+                copy_path = os.path.join(work, file_name)
+                os.makedirs(os.path.dirname(copy_path), exist_ok=True)
+                stats = copy_database(source_path, copy_path)
+
+                problem = check_integrity(copy_path)
+                if problem:
+                    raise RuntimeError(f"la copia de {file_name} no pasa la comprobación: {problem}")
+
+                size = os.path.getsize(copy_path)
+                if config.BACKUP_COMPRESS:
+                    stored = file_name + ".gz"
+                    sha256 = compress_file(copy_path, os.path.join(work, stored))
+                    os.remove(copy_path)
+                else:
+                    stored = file_name
+                    sha256 = _file_sha256(copy_path)
+
+                files.append({
+                    'name': file_name,
+                    'stored': stored,
+                    'size': size,
+                    'stored_size': os.path.getsize(os.path.join(work, stored)),
+                    'sha256': sha256,
+                    **stats,
+                })
+
+            manifest = {
+                'name': name,
+                'created_at': now.isoformat(timespec='seconds'),
+                'reason': reason,
+                'storage_mode': config.STORAGE_MODE,
+                'files': files,
+                'seconds': round(time.perf_counter() - started, 3),
+            }
+            with open(os.path.join(work, MANIFEST_NAME), 'w', encoding='utf-8') as output:
+                json.dump(manifest, output, ensure_ascii=False, indent=2)
+
+            # La copia solo aparece en la lista cuando está completa
+            os.rename(work, os.path.join(self.directory, name))
+        except BaseException:
+            shutil.rmtree(work, ignore_errors=True)
+            raise
+
+        return manifest
+
+    def _remove_temporary(self):
+        """Borra las carpetas de copias que se quedaron a medias (el bot se paró durante la copia)"""
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.listdir(self.directory):
+            if entry.startswith(_TEMP_PREFIX):
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+
+    # ---------- Consultar ----------
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Manifiestos de las copias completas, de la más reciente a la más antigua"""
+        if not os.path.isdir(self.directory):
+            return []
+
+        manifests = []
+        for entry in os.listdir(self.directory):
+            if not _SET_NAME.match(entry):
+                continue
+            try:
+                with open(os.path.join(self.directory, entry, MANIFEST_NAME), encoding='utf-8') as source:
+                    manifests.append(json.load(source))
+            except (OSError, ValueError):
+                continue
+
+        manifests.sort(key=lambda manifest: (manifest['created_at'], manifest['name']), reverse=True)
+        return manifests
+
+    def get(self, name: str) -> Dict[str, Any]:
+        """Manifiesto de una copia (ValueError si no existe)"""
+        for manifest in self.list():
+            if manifest['name'] == name:
+                return manifest
+        raise ValueError(f"no existe la copia {name}")
+
+    def next_run_time(self, now: Optional[datetime] = None) -> datetime:
+        """Cuándo toca la próxima copia programada (hora local con zona horaria)"""
+        now = now or datetime.now().astimezone()
+        backups = self.list()
+        if backups:
+            last = datetime.fromisoformat(backups[0]['created_at']).astimezone()
+            due = last + timedelta(hours=config.BACKUP_INTERVAL_HOURS)
+            if due > now:
+                return due
+        return now + timedelta(seconds=config.BACKUP_STARTUP_DELAY)
+
+    def verify(self, name: str) -> List[str]:
+        """
+        Comprueba que una copia se puede restaurar: descomprime cada archivo,
+        compara su SHA-256 con el del manifiesto y pasa integrity_check.
+
+        Returns:
+            Problemas encontrados (lista vacía si todo está bien)
+        """
+        manifest = self.get(name)
+        work = os.path.join(self.directory, f"{_TEMP_PREFIX}verify_{name}")
+        os.makedirs(work, exist_ok=True)
+
+        problems = []
+        try:
+            for i, entry in enumerate(manifest['files']):
+                problem = self._check_file(name, entry, os.path.join(work, f"{i}.db"))
+                if problem:
+                    problems.append(f"{entry['name']}: {problem}")
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        return problems
+
+    def _check_file(self, name: str, entry: Dict[str, Any], extracted: str, keep: bool = False) -> Optional[str]:
+        """Descomprime un archivo de la copia en extracted y lo comprueba"""
+        try:
+            sha256 = extract_file(os.path.join(self.directory, name, entry['stored']), extracted)
+            if sha256 != entry['sha256']:
+                return "el SHA-256 no coincide"
+            return check_integrity(extracted, quick=False)
+        except (OSError, EOFError) as e:
+            return str(e)
+        finally:
+            if not keep and os.path.exists(extracted):
+                os.remove(extracted)
+
+    # ---------- Retención ----------
+
+    def apply_retention(self, now: Optional[datetime] = None) -> List[str]:
+        """Borra las copias que no cubre ninguna regla de retención y devuelve sus nombres"""
+        backups = self.list()
+        keep = {manifest['name'] for manifest in backups[:config.BACKUP_KEEP_LAST]}
+
+        days, weeks = set(), set()
+        for manifest in backups:
+            created = datetime.fromisoformat(manifest['created_at'])
+            day, week = created.date(), created.isocalendar()[:2]
+            if day not in days and len(days) < config.BACKUP_KEEP_DAILY:
+                days.add(day)
+                keep.add(manifest['name'])
+            if week not in weeks and len(weeks) < config.BACKUP_KEEP_WEEKLY:
+                weeks.add(week)
+                keep.add(manifest['name'])
+
+        deleted = []
+        for manifest in backups:
+            if manifest['name'] not in keep:
+                shutil.rmtree(os.path.join(self.directory, manifest['name']), ignore_errors=True)
+                deleted.append(manifest['name'])
+        return deleted
+
+    # ---------- Restaurar ----------
+
+    def restore(self, name: str, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Restaura una copia sobre las bases de datos en uso.
+
+        Primero se comprueban todos los archivos de la copia; si alguno falla
+        no se toca nada. Después se hace una copia del estado actual y se
+        restaura cada archivo de una vez (las escrituras esperan mientras tanto).
+
+        Args:
+            name: Copia a restaurar
+            user_id: Restaurar solo el archivo de este usuario (STORAGE_MODE = 'per_user')
+
+        Returns:
+            {'restored': [nombres], 'safety_backup': nombre de la copia previa}
+        """
+        manifest = self.get(name)
+        entries = manifest['files']
+        if user_id is not None:
+            entries = [entry for entry in entries if entry['name'] == f"users/user_{user_id}.db"]
+            if not entries:
+                raise ValueError(f"la copia {name} no tiene datos propios del usuario {user_id}")
+
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("ya hay una copia de seguridad o una restauración en curso")
+        try:
+            work = os.path.join(self.directory, f"{_TEMP_PREFIX}restore_{name}")
+            os.makedirs(work, exist_ok=True)
+            try:
+                extracted = []
+                for i, entry in enumerate(entries):
+                    path = os.path.join(work, f"{i}.db")
+                    problem = self._check_file(name, entry, path, keep=True)
+                    if problem:
+                        raise RuntimeError(f"{entry['name']}: {problem}")
+                    extracted.append((entry['name'], path))
+
+                safety = self._create(f"antes de restaurar {name}")
+
+                for file_name, path in extracted:
+                    target = self._target_path(file_name)
+                    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+                    copy_database(path, target, pages=-1)
+            finally:
+                shutil.rmtree(work, ignore_errors=True)
+        finally:
+            self._lock.release()
+
+        return {'restored': [file_name for file_name, _ in extracted], 'safety_backup': safety['name']}
+
+
+# ========== TRABAJO PROGRAMADO ==========
+
+def run_scheduled_backup():
+    """
+    Copia programada (main.py la registra cada BACKUP_INTERVAL_HOURS).
+    Es síncrona: APScheduler la ejecuta en su pool de hilos, fuera del event loop.
+    """
+    from logger_config import setup_logger
+    logger = setup_logger('backup')
+
+    try:
+        manifest = BackupManager().create(reason="programada")
+    except Exception as e:
+        logger.error(f"❌ Copia de seguridad fallida: {e}")
+        return
+
+    size = sum(entry['stored_size'] for entry in manifest['files'])
+    logger.info(
+        f"💾 Copia de seguridad {manifest['name']}: {len(manifest['files'])} archivo(s), "
+        f"{size / (1024 * 1024):.1f} MB en {manifest['seconds']:.1f} s"
+        + (f" (borradas: {', '.join(manifest['deleted'])})" if manifest['deleted'] else "")
+    )
+
+
+def format_size(size: int) -> str:
+    """Tamaño legible (KB / MB)"""
+    if size < 1024 * 1024:
+        return f"{size / 1024:.0f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Copias de seguridad de la base de datos del bot")
+    parser.add_argument('command', nargs='?', default='create', choices=['create', 'list', 'verify', 'restore'])
+    parser.add_argument('name', nargs='?', help="Copia (AAAAMMDD_HHMMSS) para verify y restore")
+    parser.add_argument('--user', type=int, help="Restaurar solo el archivo de este usuario")
+    args = parser.parse_args(argv)
+
+    backups = BackupManager()
+
+    if args.command == 'create':
+        manifest = backups.create()
+        print(f"💾 Copia {manifest['name']} creada en {manifest['seconds']:.1f} s")
+        for entry in manifest['files']:
+            print(f"  {entry['name']}: {format_size(entry['size'])} -> {format_size(entry['stored_size'])}"
+                  f" ({entry['restarts']} reinicios)")
+        for name in manifest['deleted']:
+            print(f"  🗑️ Borrada por retención: {name}")
+        return
+
+    if args.command == 'list':
+        for manifest in backups.list():
+            size = sum(entry['stored_size'] for entry in manifest['files'])
+            print(f"{manifest['name']}  {format_size(size):>9}  {len(manifest['files'])} archivo(s)  {manifest['reason']}")
+        return
+
+    if not args.name:
+        parser.error(f"{args.command} necesita el nombre de la copia")
+
+    if args.command == 'verify':
+        problems = backups.verify(args.name)
+        print("✅ Copia correcta" if not problems else "\n".join(f"❌ {problem}" for problem in problems))
+        return
+
+    result = backups.restore(args.name, args.user)
+    print(f"✅ Restaurado: {', '.join(result['restored'])}")
+    print(f"💾 Estado anterior guardado en la copia {result['safety_backup']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Registro de cambios (change data capture) y avisos dentro del proceso
+Cada cambio en misiones, objetivos y notas deja un evento en la tabla events
+y se avisa a quien se haya suscrito.
+
+EXPLICACIÓN:
+- La tabla events solo crece (nunca se modifica una fila): es el historial
+  de lo que ha pasado. Cada evento se escribe en la MISMA transacción que el
+  cambio que describe, así que no hay eventos de cambios que no llegaron a
+  guardarse ni cambios sin su evento.
+- Un evento es un diccionario:
+    {'id', 'owner_id', 'entity', 'entity_id', 'action', 'changes', 'created_at'}
+  entity es 'project', 'task' o 'note' y action 'created', 'updated' o
+  'deleted'. Las dependencias entre objetivos son entity 'dependency', con
+  entity_id el objetivo que depende y changes
+  {'depends_on_id': [antes, después]}.
+  changes tiene solo los campos que han cambiado, siempre como
+  {campo: [antes, después]} (al crear, "antes" es None; al borrar, "después").
+  Los cambios en bloque ('imported', 'archived') no tienen entity_id: sus
+  ids van en changes['ids'].
+- Los modelos llaman a publish() después del commit: los suscriptores solo
+  ven cambios ya guardados. Se les llama en el hilo que hizo el cambio; si un
+  suscriptor falla, se registra el error y el resto sigue recibiendo el evento.
+- Con el historial se puede calcular lo que antes no se podía (cuántas veces
+  se pospuso un objetivo, cuánto tiempo estuvo en progreso) y los servicios
+  pueden reaccionar a cada cambio en vez de volver a leerlo todo (las alertas
+  de deadline, utils/deadline_alerts.py).
+"""
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+
+# Campos que no generan evento por sí solos (cambian en cada escritura)
+IGNORED_FIELDS = {'id', 'updated_at', 'version'}
+
+EventHandler = Callable[[Dict[str, Any]], None]
+
+
+# ========== ESCRITURA (dentro de la transacción del cambio) ==========
+
+def record(cursor, owner_id: Optional[int], entity: str, entity_id: Optional[int],
+           action: str, changes: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Añade un evento a la tabla events con el cursor de la transacción en curso.
+
+    Returns:
+        El evento, para publicarlo cuando se haya hecho el commit
+    """
+    created_at = time.time()
+    cursor.execute("""
+        INSERT INTO events (owner_id, entity, entity_id, action, changes, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (owner_id, entity, entity_id, action,
+          json.dumps(changes, ensure_ascii=False, default=str), created_at))
+
+    return {
+        'id': cursor.lastrowid,
+        'owner_id': owner_id,
+        'entity': entity,
+        'entity_id': entity_id,
+        'action': action,
+        'changes': changes,
+        'created_at': created_at,
+    }
+
+
+def record_change(cursor, entity: str, entity_id: int, before: Optional[Dict[str, Any]],
+                  after: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Compara la fila antes y después del cambio y guarda el evento.
+    before=None es una creación y after=None un borrado.
+
+    Returns:
+        El evento, o None si en realidad no cambió nada
+    """
+    if before is None and after is None:
+        return None
+
+    before_values = before or {}
+    after_values = after or {}
+    changes = {
+        field: [before_values.get(field), after_values.get(field)]
+        for field in (after_values.keys() | before_values.keys()) - IGNORED_FIELDS
+        if before_values.get(field) != after_values.get(field)
+    }
+    if not changes:
+        return None
+
+    action = 'created' if before is None else 'deleted' if after is None else 'updated'
+    owner_id = (after or before).get('owner_id')
+    return record(cursor, owner_id, entity, entity_id, action, changes)
+
+
+# ========== SUSCRIPCIONES ==========
+
+class EventBus:
+    """Reparte los eventos ya guardados entre los suscriptores de este proceso"""
+
+    def __init__(self):
+        self._subscribers: List[tuple] = []  # (handler, entity o None para todas)
+        self._lock = threading.Lock()
+
+    def subscribe(self, handler: EventHandler, entity: Optional[str] = None):
+        """Llama a handler(evento) con cada evento (o solo los de una entidad)"""
+        with self._lock:
+            self._subscribers.append((handler, entity))
+
+    def unsubscribe(self, handler: EventHandler):
+        with self._lock:
+            self._subscribers = [(h, e) for h, e in self._subscribers if h != handler]
+
+    def publish(self, *events: Optional[Dict[str, Any]]):
+        """Entrega los eventos en orden. Los None se ignoran (cambios que no cambiaron nada)"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for event in events:
+            if event is None:
+                continue
+            for handler, entity in subscribers:
+                if entity is not None and entity != event['entity']:
+                    continue
+                try:
+                    handler(event)
+                except Exception as e:
+                    print(f"❌ Error en suscriptor de eventos ({event['entity']} {event['action']}): {e}")
+
+
+_bus = EventBus()
+
+
+def subscribe(handler: EventHandler, entity: Optional[str] = None):
+    _bus.subscribe(handler, entity)
+
+
+def unsubscribe(handler: EventHandler):
+    _bus.unsubscribe(handler)
+
+
+def publish(*events: Optional[Dict[str, Any]]):
+    _bus.publish(*events)
+
+
+# ========== LECTURA ==========
+
+def get_events(db_manager, owner_id: int, entity: Optional[str] = None,
+               entity_id: Optional[int] = None, after_id: int = 0,
+               limit: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Eventos de un usuario en orden, desde after_id (para ponerse al día o
+    para ver el historial de una misión, objetivo o nota concretos).
+    """
+    query = "SELECT * FROM events WHERE owner_id = ? AND id > ?"
+    params: list = [owner_id, after_id]
+    if entity is not None:
+        query += " AND entity = ?"
+        params.append(entity)
+    if entity_id is not None:
+        query += " AND entity_id = ?"
+        params.append(entity_id)
+    query += " ORDER BY id LIMIT ?"
+    params.append(limit)
+
+    conn = db_manager.for_user(owner_id).get_connection()
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+    return [{**dict(row), 'changes': json.loads(row['changes'] or '{}')} for row in rows]
+
+
+def postpone_count(db_manager, owner_id: int, task_id: int) -> int:
+    """Veces que se ha movido el deadline de un objetivo a una fecha posterior"""
+    return sum(
+        1 for event in get_events(db_manager, owner_id, 'task', task_id, limit=-1)
+        if _postponed(event['changes'])
+    )
+
+
+def seconds_in_status(db_manager, owner_id: int, task_id: int, status: str = 'in_progress',
+                      now: Optional[float] = None) -> float:
+    """Tiempo total (segundos) que un objetivo ha pasado en un estado"""
+    total = 0.0
+    entered = None
+    for event in get_events(db_manager, owner_id, 'task', task_id, limit=-1):
+        change = event['changes'].get('status')
+        if not change:
+            continue
+        if change[1] == status and entered is None:
+            entered = event['created_at']
+        elif change[1] != status and entered is not None:
+            total += event['created_at'] - entered
+            entered = None
+
+    if entered is not None:
+        total += (now or time.time()) - entered
+    return total
+
+
+def _postponed(changes: Dict[str, Any]) -> bool:
+    deadline = changes.get('deadline')
+    return bool(deadline and deadline[0] and deadline[1] and deadline[1] > deadline[0])
+
+
+# ========== LIMPIEZA ==========
+
+def prune(db_manager, older_than_days: int = config.EVENTS_RETENTION_DAYS) -> int:
+    """
+    Borra los eventos más antiguos que older_than_days (0 = guardarlos siempre).
+    Es lo único que quita filas de events.
+
+    Returns:
+        Eventos borrados
+    """
+    if not older_than_days:
+        return 0
+
+    cutoff = time.time() - older_than_days * 86400
+    conn = db_manager.get_connection()
+    try:
+        deleted = conn.execute("DELETE FROM events WHERE created_at < ?", (cutoff,)).rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    return deleted
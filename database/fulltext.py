@@ -0,0 +1,344 @@
+"""
+Búsqueda de texto aproximada en objetivos y notas
+Task.get_all({'search': ...}) y Note.get_all({'search': ...}) encuentran las
+filas aunque el texto tenga erratas y las devuelven de la más a la menos
+parecida.
+
+EXPLICACIÓN:
+- Índice FTS5 de SQLite con el tokenizador trigram (trozos de tres letras)
+  sobre el título y la descripción de los objetivos (tasks_fts) y el título y
+  el contenido de las notas (notes_fts). Son tablas "contentless": no guardan
+  el texto, solo el índice. Unos triggers lo mantienen al día con cada
+  INSERT, UPDATE y DELETE, vengan de los modelos, del importador, del archivo
+  o del reparto por usuario.
+- Se indexa el texto ya normalizado, sin tildes (search_fold(), la misma
+  normalize() de las búsquedas): si no, "dia" no daría ningún trozo de "día".
+  Por eso search_fold() tiene que estar registrada en toda conexión que
+  escriba en tasks o notes (register(), lo hacen DatabaseManager y el reparto
+  por usuario); desde otra, el trigger falla con "no such function".
+- Buscar va en dos pasos dentro de la misma consulta:
+  1. Candidatos: el índice da las filas que contienen algún trozo de cada
+     palabra buscada. Una errata solo estropea los trozos donde cae, así que
+     "reunoin" sigue encontrando "reunión" por "reu".
+  2. Puntuación: search_score(), una función registrada en la conexión,
+     compara palabra a palabra igual que la búsqueda inline
+     (utils/search_index.py): exacta, prefijo, en medio de la palabra o con
+     erratas, y vale más si está en el título. Las filas que no encajan con
+     todas las palabras puntúan 0 y se descartan.
+- El paso 1 es una condición más del WHERE: se combina con el resto de
+  filtros (estado, misión, prioridad...) y SQLite empieza por el más selectivo.
+- Las palabras se comparan sin mayúsculas ni tildes. Si SQLite no tiene FTS5
+  con trigram (anterior a 3.34), no hay índice y la puntuación recorre todas
+  las filas del usuario: más lento, mismos resultados.
+"""
+import functools
+import re
+import sqlite3
+import unicodedata
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Tabla -> (columna del título, columna con el resto del texto)
+FTS_TABLES = {
+    'tasks': ('title', 'description'),
+    'notes': ('title', 'content'),
+}
+
+WORD_RE = re.compile(r"\w+")
+ACCENTS_RE = re.compile(r"[\u0300-\u036f]")  # Tildes y diéresis sueltas tras NFKD
+
+# Puntuación de cada tipo de coincidencia de una palabra buscada
+SCORE_EXACT = 1.0
+SCORE_PREFIX = 0.8
+SCORE_INFIX = 0.6
+SCORE_FUZZY = 0.5
+TITLE_BONUS = 1.5  # La coincidencia está en el título
+
+
+# ========== COMPARACIÓN DE PALABRAS ==========
+
+def normalize(text: Optional[str]) -> str:
+    """Minúsculas y sin tildes ("Reunión" -> "reunion")"""
+    text = (text or '').casefold()
+    if text.isascii():
+        return text
+    return ACCENTS_RE.sub('', unicodedata.normalize('NFKD', text))
+
+
+def words(text: Optional[str]) -> List[str]:
+    """Palabras normalizadas de un texto"""
+    text = (text or '').casefold()
+    found = WORD_RE.findall(text)
+    if text.isascii():
+        return found
+    return [word if word.isascii() else _fold_word(word) for word in found]
+
+
+@functools.lru_cache(maxsize=65536)
+def _fold_word(word: str) -> str:
+    # Las palabras se repiten mucho: cada una se normaliza una sola vez
+    return ACCENTS_RE.sub('', unicodedata.normalize('NFKD', word))
+
+
+def trigrams(word: str) -> Set[str]:
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def max_typos(word: str) -> int:
+    """Erratas permitidas según la longitud de la palabra buscada"""
+    if len(word) < 4:
+        return 0
+    return 1 if len(word) < 8 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Distancia de Damerau-Levenshtein (cambiar, añadir, quitar o intercambiar
+    dos letras seguidas). Deja de calcular en cuanto pasa de limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def fuzzy_prefix(query_word: str, word: str, typos: int) -> bool:
+    """La palabra empieza por algo a typos erratas o menos de lo escrito"""
+    lengths = range(max(1, len(query_word) - typos), len(query_word) + typos + 1)
+    return any(edit_distance(query_word, word[:length], typos) <= typos for length in lengths)
+
+
+@functools.lru_cache(maxsize=65536)
+def word_score(query_word: str, word: str) -> float:
+    """Cuánto encaja una palabra del texto con una palabra buscada (0 = nada)"""
+    if word == query_word:
+        return SCORE_EXACT
+    if word.startswith(query_word):
+        return SCORE_PREFIX
+    if len(query_word) >= 3 and query_word in word:
+        return SCORE_INFIX
+    typos = max_typos(query_word)
+    if typos and len(word) >= len(query_word) - typos and fuzzy_prefix(query_word, word, typos):
+        return SCORE_FUZZY
+    return 0.0
+
+
+@functools.lru_cache(maxsize=256)
+def query_words(query: str) -> Tuple[str, ...]:
+    """Palabras buscadas, sin repetir"""
+    return tuple(dict.fromkeys(words(query)))
+
+
+def score(query: str, title: Optional[str], body: Optional[str]) -> float:
+    """
+    Puntuación de un texto para una búsqueda: la suma de la mejor coincidencia
+    de cada palabra buscada, o 0 si alguna no aparece.
+    Primero se busca la palabra tal cual dentro del texto; solo si no está se
+    parte el texto en palabras para buscarla con erratas.
+    """
+    title_text = normalize(title)
+    body_text = None  # El resto del texto solo se mira si el título no basta
+    title_words = body_words = None
+
+    total = 0.0
+    for query_word in query_words(query):
+        best = _substring_score(query_word, title_text) * TITLE_BONUS
+        if best < SCORE_EXACT:
+            if body_text is None:
+                body_text = normalize(body)
+            best = max(best, _substring_score(query_word, body_text))
+
+        if not best and max_typos(query_word):
+            if title_words is None:
+                title_words = set(words(title_text))
+                body_words = set(words(body_text)) - title_words
+            best = max(_best_word(query_word, title_words) * TITLE_BONUS,
+                       _best_word(query_word, body_words))
+
+        if not best:
+            return 0.0
+        total += best
+    return total
+
+
+def _best_word(query_word: str, text_words: Set[str]) -> float:
+    return max((word_score(query_word, word) for word in text_words), default=0.0)
+
+
+def _substring_score(query_word: str, text: str) -> float:
+    """Mejor coincidencia exacta, de prefijo o en medio de una palabra dentro de un texto ya normalizado"""
+    best = 0.0
+    start = text.find(query_word)
+    while start != -1:
+        if start == 0 or not _is_word_char(text[start - 1]):
+            end = start + len(query_word)
+            if end == len(text) or not _is_word_char(text[end]):
+                return SCORE_EXACT
+            best = SCORE_PREFIX
+        elif not best and len(query_word) >= 3:
+            best = SCORE_INFIX
+        start = text.find(query_word, start + 1)
+    return best
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+# ========== ÍNDICE (DDL) ==========
+
+def create_indexes(cursor):
+    """
+    Crea los índices de texto y sus triggers si no existen. La primera vez
+    indexa las filas que ya hubiera en la tabla. Los índices de versiones
+    anteriores (external content, con el texto sin normalizar) se rehacen.
+    La conexión del cursor tiene que tener register().
+    """
+    for table, (title, body) in FTS_TABLES.items():
+        fts = f"{table}_fts"
+        existing = _index_sql(cursor, table)
+        if existing is not None and "content=''" not in existing:
+            cursor.execute(f"DROP TABLE {fts}")
+            for trigger in ('insert', 'delete', 'update'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_{trigger}")
+            existing = None
+
+        try:
+            cursor.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts}
+                USING fts5({title}, {body}, content='', tokenize='trigram')
+            """)
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ Búsqueda sin índice en {table} (SQLite sin FTS5 trigram): {e}")
+            continue
+
+        new_values = f"new.id, search_fold(new.{title}), search_fold(new.{body})"
+        old_values = f"old.id, search_fold(old.{title}), search_fold(old.{body})"
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts} (rowid, {title}, {body}) VALUES ({new_values});
+            END
+        """)
+        # Sin copia del texto, para borrar hay que darle los mismos valores que se indexaron
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {title}, {body}) VALUES ('delete', {old_values});
+            END
+        """)
+        # Solo si cambia el texto: los cambios de estado o fecha no tocan el índice
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {title}, {body} ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {title}, {body}) VALUES ('delete', {old_values});
+                INSERT INTO {fts} (rowid, {title}, {body}) VALUES ({new_values});
+            END
+        """)
+
+        if existing is None:
+            cursor.execute(f"""
+                INSERT INTO {fts} (rowid, {title}, {body})
+                SELECT id, search_fold({title}), search_fold({body}) FROM {table}
+            """)
+
+
+def _index_sql(cursor, table: str) -> Optional[str]:
+    """CREATE del índice de una tabla (None si no tiene)"""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (f"{table}_fts",))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _has_index(cursor, table: str) -> bool:
+    return _index_sql(cursor, table) is not None
+
+
+# ========== CONSULTAS ==========
+
+def register(conn):
+    """
+    Registra search_fold() (la usan los triggers del índice) y search_score()
+    en una conexión. Se hace al abrir cada conexión, antes de escribir o buscar.
+    """
+    conn.create_function('search_fold', 1, normalize, deterministic=True)
+    conn.create_function('search_score', 3, score, deterministic=True)
+
+
+def score_column(table: str) -> str:
+    """Columna search_score para el SELECT (su parámetro es el texto buscado)"""
+    title, body = FTS_TABLES[table]
+    return f"search_score(?, {title}, {body}) AS search_score"
+
+
+def candidates(cursor, table: str, query: str, include_archived: bool = False) -> Tuple[str, list]:
+    """
+    Condición para el WHERE que deja solo las filas que el índice da como
+    posibles. Vacía si no hay índice o ninguna palabra tiene tres letras.
+    Las filas archivadas no están en el índice: con include_archived se
+    puntúan todas.
+    """
+    expression = match_expression(query)
+    if not expression or not _has_index(cursor, table):
+        return "", []
+
+    clause = f"id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)"
+    if include_archived:
+        clause = f"(archived_at IS NOT NULL OR {clause})"
+    return f" AND {clause}", [expression]
+
+
+def match_expression(query: str) -> Optional[str]:
+    """
+    Expresión MATCH del índice: por cada palabra buscada, cualquiera de sus
+    trozos ("reu" OR "nion"). Las palabras de menos de tres letras no se
+    pueden buscar en un índice de trigramas y se quedan para search_score().
+    """
+    groups = []
+    for word in query_words(query):
+        if len(word) < 3:
+            continue
+        pieces = ' OR '.join(f'"{piece}"' for piece in sorted(_pieces(word)))
+        groups.append(f"({pieces})")
+    return ' AND '.join(groups) or None
+
+
+def _pieces(word: str) -> Set[str]:
+    """
+    Trozos de una palabra de los que al menos uno sobrevive a sus erratas.
+    Entre trozo y trozo se deja una letra sin usar: así una errata, aunque sea
+    intercambiar dos letras, solo puede romper uno. Las palabras que no dan
+    para dos trozos usan su primer y su último trigrama (los de en medio no
+    salvan ninguna errata más y traen muchos más candidatos).
+    """
+    if not max_typos(word):
+        return {word}
+    count = (len(word) + 1) // 4
+    if count < 2:
+        return {word[:3], word[-3:]}
+
+    size, extra = divmod(len(word) - (count - 1), count)
+    pieces, start = set(), 0
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0)
+        pieces.add(word[start:end])
+        start = end + 1
+    return pieces
+
+
+def ranked(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Quita las filas que no encajan y la columna search_score (ya vienen ordenadas)"""
+    result = []
+    for row in rows:
+        if row.pop('search_score'):
+            result.append(row)
+    return result
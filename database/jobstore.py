@@ -0,0 +1,207 @@
+"""
+Almacén persistente de trabajos de APScheduler sobre SQLite
+Guarda los recordatorios programados en la misma base de datos del bot,
+así sobreviven a reinicios y podemos detectar los que se perdieron mientras
+el bot estaba apagado.
+"""
+import pickle
+import sqlite3
+from datetime import datetime
+from typing import List
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+import config
+
+
+class SQLiteJobStore(BaseJobStore):
+    """
+    Job store de APScheduler que usa sqlite3 directamente.
+    Es el equivalente a SQLAlchemyJobStore pero sin dependencias extra.
+    """
+
+    def __init__(self, db_path: str = config.DATABASE_PATH,
+                 tablename: str = config.SCHEDULER_JOBS_TABLE,
+                 pickle_protocol: int = pickle.HIGHEST_PROTOCOL):
+        """
+        Args:
+            db_path: Ruta al archivo de base de datos SQLite
+            tablename: Tabla donde se guardan los trabajos
+            pickle_protocol: Protocolo de pickle para serializar el estado
+        """
+        super().__init__()
+        self.db_path = db_path
+        self.tablename = tablename
+        self.pickle_protocol = pickle_protocol
+        self._create_table()
+
+    def get_connection(self):
+        """Crea y retorna una nueva conexión a la base de datos"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _create_table(self):
+        """Crea la tabla de trabajos si no existe"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.tablename} (
+                id TEXT PRIMARY KEY,
+                next_run_time REAL,
+                job_state BLOB NOT NULL
+            )
+        """)
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{self.tablename}_next_run_time
+            ON {self.tablename} (next_run_time)
+        """)
+
+        conn.commit()
+        conn.close()
+
+    # ========== API DE BaseJobStore ==========
+
+    def lookup_job(self, job_id):
+        conn = self.get_connection()
+        row = conn.execute(
+            f"SELECT job_state FROM {self.tablename} WHERE id = ?", (job_id,)
+        ).fetchone()
+        conn.close()
+
+        return self._reconstitute_job(row['job_state']) if row else None
+
+    def get_due_jobs(self, now):
+        timestamp = datetime_to_utc_timestamp(now)
+        return self._get_jobs("WHERE next_run_time <= ?", (timestamp,))
+
+    def get_next_run_time(self):
+        conn = self.get_connection()
+        row = conn.execute(f"""
+            SELECT next_run_time FROM {self.tablename}
+            WHERE next_run_time IS NOT NULL
+            ORDER BY next_run_time
+            LIMIT 1
+        """).fetchone()
+        conn.close()
+
+        return utc_timestamp_to_datetime(row['next_run_time']) if row else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        conn = self.get_connection()
+        try:
+            conn.execute(
+                f"INSERT INTO {self.tablename} (id, next_run_time, job_state) VALUES (?, ?, ?)",
+                (job.id, datetime_to_utc_timestamp(job.next_run_time), self._serialize(job))
+            )
+            conn.commit()
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+        finally:
+            conn.close()
+
+    def update_job(self, job):
+        conn = self.get_connection()
+        cursor = conn.execute(
+            f"UPDATE {self.tablename} SET next_run_time = ?, job_state = ? WHERE id = ?",
+            (datetime_to_utc_timestamp(job.next_run_time), self._serialize(job), job.id)
+        )
+        updated = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+
+        if not updated:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        conn = self.get_connection()
+        cursor = conn.execute(f"DELETE FROM {self.tablename} WHERE id = ?", (job_id,))
+        removed = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+
+        if not removed:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        conn = self.get_connection()
+        conn.execute(f"DELETE FROM {self.tablename}")
+        conn.commit()
+        conn.close()
+
+    # ========== RECUPERACIÓN TRAS UN APAGADO ==========
+
+    def get_missed_job_ids(self, now: datetime) -> List[str]:
+        """
+        Devuelve los IDs de los trabajos cuya próxima ejecución quedó en el pasado.
+        Se llama ANTES de arrancar el scheduler: si el bot estuvo apagado, esos
+        trabajos no llegaron a ejecutarse.
+
+        Args:
+            now: Momento actual (con zona horaria)
+
+        Returns:
+            Lista de IDs ordenada por la hora en que debían ejecutarse
+        """
+        conn = self.get_connection()
+        rows = conn.execute(f"""
+            SELECT id FROM {self.tablename}
+            WHERE next_run_time IS NOT NULL AND next_run_time <= ?
+            ORDER BY next_run_time
+        """, (datetime_to_utc_timestamp(now),)).fetchall()
+        conn.close()
+
+        return [row['id'] for row in rows]
+
+    # ========== AUXILIARES ==========
+
+    def _serialize(self, job) -> bytes:
+        return pickle.dumps(job.__getstate__(), self.pickle_protocol)
+
+    def _reconstitute_job(self, job_state):
+        job_state = pickle.loads(job_state)
+        job_state['jobstore'] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where: str = "", params: tuple = ()):
+        jobs = []
+        failed_job_ids = []
+
+        conn = self.get_connection()
+        rows = conn.execute(
+            f"SELECT id, job_state FROM {self.tablename} {where} ORDER BY next_run_time",
+            params
+        ).fetchall()
+
+        for row in rows:
+            try:
+                jobs.append(self._reconstitute_job(row['job_state']))
+            except BaseException:
+                self._logger.exception('No se pudo restaurar el trabajo "%s" -- eliminándolo', row['id'])
+                failed_job_ids.append(row['id'])
+
+        # Eliminar los trabajos que no se pudieron restaurar
+        if failed_job_ids:
+            conn.executemany(
+                f"DELETE FROM {self.tablename} WHERE id = ?",
+                [(job_id,) for job_id in failed_job_ids]
+            )
+            conn.commit()
+
+        conn.close()
+        return jobs
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (db_path={self.db_path})>"
@@ -2,10 +2,59 @@
 Modelos de datos para el bot de productividad
 Este archivo define las estructuras de datos que se guardarán en la base de datos SQLite
 """
+import os
 import sqlite3
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+import threading
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from typing import Optional, List, Dict, Any, Tuple, Callable
 import config
+from database import events, fulltext, recurrence as recurrence_rules
+from database.tracing import TracedConnection
+
+# Tabla activa -> tabla con lo archivado (database/archive.py)
+ARCHIVE_TABLES = {
+    'projects': 'projects_archive',
+    'tasks': 'tasks_archive',
+}
+
+
+def _with_archive(cursor, table: str) -> str:
+    """
+    Subconsulta con las filas activas y las archivadas de una tabla, para usar
+    en el FROM cuando se pide include_archived. Las activas tienen archived_at NULL.
+    """
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = ", ".join(row['name'] for row in cursor.fetchall())
+    return (f"(SELECT {columns}, NULL AS archived_at FROM {table} "
+            f"UNION ALL SELECT {columns}, archived_at FROM {ARCHIVE_TABLES[table]})")
+
+
+class VersionConflict(Exception):
+    """
+    Escritura condicional rechazada: la fila ya no está en la versión que se
+    esperaba (otro cambio llegó antes). current es la fila tal como está ahora.
+    """
+    
+    def __init__(self, entity: str, row_id: int, current: Dict[str, Any]):
+        super().__init__(f"{entity} {row_id} ha cambiado (versión {current.get('version')})")
+        self.entity = entity
+        self.row_id = row_id
+        self.current = current
+
+
+class DependencyCycle(Exception):
+    """
+    Dependencia rechazada: el objetivo del que se quería depender ya depende,
+    directa o indirectamente, del primero (se cerraría un ciclo).
+    """
+    
+    def __init__(self, task_id: int, depends_on_id: int):
+        super().__init__(f"El objetivo {depends_on_id} ya depende del {task_id}")
+        self.task_id = task_id
+        self.depends_on_id = depends_on_id
+
 
 class DatabaseManager:
     """
@@ -13,6 +62,12 @@ class DatabaseManager:
     Maneja la conexión y creación de tablas.
     """
     
+    # Archivos cuyas tablas ya se crearon en este proceso (ruta absoluta).
+    # Cada módulo de handlers crea su propio DatabaseManager: sin esto, cada
+    # uno volvería a ejecutar todo el DDL y las migraciones al arrancar.
+    _initialized_paths = set()
+    _init_lock = threading.Lock()
+    
     def __init__(self, db_path: str = config.DATABASE_PATH):
         """
         Inicializa el gestor de base de datos.
@@ -21,14 +76,45 @@ class DatabaseManager:
             db_path: Ruta al archivo de base de datos SQLite
         """
         self.db_path = db_path
-        self.init_database()
+        self.ensure_initialized()
+    
+    def ensure_initialized(self):
+        """
+        Crea las tablas la primera vez que se usa el archivo en este proceso.
+        Para forzarlo otra vez, llamar directamente a init_database().
+        """
+        if self.db_path == ':memory:':
+            self.init_database()  # Cada conexión es una base de datos distinta
+            return
+        
+        key = os.path.abspath(self.db_path)
+        with DatabaseManager._init_lock:
+            if key in DatabaseManager._initialized_paths:
+                return
+            self.init_database()
+            DatabaseManager._initialized_paths.add(key)
     
     def get_connection(self):
         """Crea y retorna una nueva conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
+        # TracedConnection mide cada consulta (database/tracing.py)
+        conn = sqlite3.connect(self.db_path, factory=TracedConnection)
         conn.row_factory = sqlite3.Row  # Permite acceder a columnas por nombre
+        fulltext.register(conn)  # Los triggers del índice de búsqueda usan search_fold()
         return conn
     
+    def for_user(self, user_id: int) -> 'DatabaseManager':
+        """
+        Devuelve el gestor donde se guardan los datos de un usuario.
+        
+        Con STORAGE_MODE = 'shared' es este mismo (una sola base de datos).
+        Con 'per_user' es el archivo propio del usuario (ver database/sharding.py).
+        """
+        if config.STORAGE_MODE != 'per_user':
+            return self
+        
+        from database.sharding import get_user_shard
+        return get_user_shard(user_id)
+    
     def init_database(self):
         """
         Crea todas las tablas necesarias si no existen.
@@ -37,6 +123,73 @@ class DatabaseManager:
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        # Datos de los usuarios: proyectos, tareas y notas
+        self._create_data_tables(cursor)
+        
+        # Usuarios autorizados (allowlist) y su rol
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS authorized_users (
+                user_id INTEGER PRIMARY KEY,
+                role TEXT DEFAULT 'member',
+                added_by INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            INSERT OR IGNORE INTO authorized_users (user_id, role) VALUES (?, 'admin')
+        """, (config.AUTHORIZED_USER_ID,))
+        
+        # Tabla de configuración del usuario (una fila por usuario)
+        # La versión antigua tenía una sola fila (id = 1): se renombra y se copia
+        legacy_settings = self._rename_legacy_user_settings(cursor)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_settings (
+                user_id INTEGER PRIMARY KEY,
+                daily_summary_time TEXT DEFAULT '07:00',
+                evening_reminder_time TEXT DEFAULT '18:00',
+                timezone TEXT DEFAULT 'Europe/Madrid',
+                daily_summary_enabled INTEGER DEFAULT 1,
+                evening_reminder_enabled INTEGER DEFAULT 1,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        if legacy_settings:
+            # La fila existente pasa a pertenecer al usuario autorizado
+            cursor.execute("""
+                INSERT INTO user_settings (user_id, daily_summary_time, evening_reminder_time,
+                                           timezone, daily_summary_enabled, evening_reminder_enabled)
+                SELECT ?, daily_summary_time, evening_reminder_time,
+                       timezone, daily_summary_enabled, evening_reminder_enabled
+                FROM user_settings_legacy WHERE id = 1
+            """, (config.AUTHORIZED_USER_ID,))
+            cursor.execute("DROP TABLE user_settings_legacy")
+        
+        # Insertar configuración por defecto del usuario autorizado si no existe
+        cursor.execute("""
+            INSERT OR IGNORE INTO user_settings (user_id) VALUES (?)
+        """, (config.AUTHORIZED_USER_ID,))
+        
+        # Registro del último envío de cada recordatorio (para detectar los perdidos)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reminder_log (
+                user_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                last_sent_at REAL NOT NULL,
+                PRIMARY KEY (user_id, kind)
+            )
+        """)
+        
+        conn.commit()
+        conn.close()
+    
+    def _create_data_tables(self, cursor):
+        """
+        Crea las tablas con los datos de los usuarios (proyectos, tareas y notas).
+        Está separado del resto porque en el modo de almacenamiento por usuario
+        cada archivo de usuario solo contiene estas tablas.
+        """
         # Tabla de proyectos
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS projects (
@@ -72,6 +225,33 @@ class DatabaseManager:
             )
         """)
         
+        # Alertas de deadline con hora exacta (columnas añadidas en versiones posteriores)
+        self._add_missing_columns(cursor, 'tasks', {
+            'deadline_time': 'TEXT',              # HH:MM local, opcional
+            'remind_before_minutes': 'INTEGER',   # Aviso N minutos antes
+            'alert_at': 'REAL'                    # Próxima alerta (timestamp UTC) o NULL
+        })
+        
+        # Índice parcial: solo las tareas con alerta pendiente
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tasks_alert_at
+            ON tasks (alert_at) WHERE alert_at IS NOT NULL
+        """)
+        
+        # Objetivos que se repiten (database/recurrence.py): la regla solo la
+        # lleva la última repetición creada de cada serie
+        self._add_missing_columns(cursor, 'tasks', {
+            'recurrence': 'TEXT',        # Regla RRULE o NULL
+            'recurrence_next': 'DATE',   # Fecha de la siguiente repetición, aún sin crear
+            'series_id': 'INTEGER'       # ID del primer objetivo de la serie
+        })
+        
+        # Índice parcial: solo las series con una repetición pendiente de crear
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tasks_recurrence_next
+            ON tasks (recurrence_next) WHERE recurrence_next IS NOT NULL
+        """)
+        
         # Tabla de notas
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS notes (
@@ -88,35 +268,279 @@ class DatabaseManager:
             )
         """)
         
-        # Tabla de configuración del usuario
+        # Modo multiusuario: cada proyecto, tarea y nota pertenece a un usuario.
+        # Los datos anteriores pasan a ser del usuario autorizado original.
+        for table in ('projects', 'tasks', 'notes'):
+            self._add_missing_columns(cursor, table, {'owner_id': 'INTEGER'})
+            cursor.execute(f"UPDATE {table} SET owner_id = ? WHERE owner_id IS NULL",
+                           (config.AUTHORIZED_USER_ID,))
+        
+        # Versión de cada objetivo y nota: sube en cada escritura y permite
+        # escrituras condicionales (expected_version) sin bloqueos
+        for table in ('tasks', 'notes'):
+            self._add_missing_columns(cursor, table, {'version': 'INTEGER NOT NULL DEFAULT 1'})
+        
+        # Índices compuestos que empiezan por owner_id: cada consulta solo
+        # recorre los datos de su usuario, da igual cuántos usuarios haya
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_owner_status ON projects (owner_id, status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_owner_status ON tasks (owner_id, status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_owner_deadline ON tasks (owner_id, deadline)")
+        # Cubre los recuentos por misión (Project.get_overview) sin leer la tabla
+        cursor.execute("DROP INDEX IF EXISTS idx_tasks_owner_project")
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_settings (
-                id INTEGER PRIMARY KEY CHECK (id = 1),
-                daily_summary_time TEXT DEFAULT '07:00',
-                evening_reminder_time TEXT DEFAULT '18:00',
-                timezone TEXT DEFAULT 'Europe/Madrid',
-                daily_summary_enabled INTEGER DEFAULT 1,
-                evening_reminder_enabled INTEGER DEFAULT 1
+            CREATE INDEX IF NOT EXISTS idx_tasks_owner_project_status
+            ON tasks (owner_id, project_id, status, deadline)
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_owner_parent ON tasks (owner_id, parent_task_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_notes_owner_updated ON notes (owner_id, updated_at)")
+
+        # Dependencias entre objetivos: task_id no puede empezar hasta que
+        # depends_on_id esté completado. Al borrar (o archivar) un objetivo se
+        # van sus dependencias con él.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS task_dependencies (
+                task_id INTEGER NOT NULL,
+                depends_on_id INTEGER NOT NULL,
+                owner_id INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (task_id, depends_on_id)
             )
         """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_task_dependencies_depends_on ON task_dependencies (depends_on_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_task_dependencies_owner ON task_dependencies (owner_id)")
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS task_dependencies_cleanup AFTER DELETE ON tasks BEGIN
+                DELETE FROM task_dependencies WHERE task_id = old.id OR depends_on_id = old.id;
+            END
+        """)
         
-        # Insertar configuración por defecto si no existe
+        # Búsqueda de texto con erratas en objetivos y notas (database/fulltext.py)
+        fulltext.create_indexes(cursor)
+
+        # Archivo de completados (database/archive.py): las misiones y objetivos
+        # terminados hace más de ARCHIVE_AFTER_DAYS días salen de las tablas activas
+        for table, archive in ARCHIVE_TABLES.items():
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {archive} (
+                    id INTEGER PRIMARY KEY,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # Mismas columnas que la tabla activa, también las que se añadan después
+            cursor.execute(f"PRAGMA table_info({table})")
+            self._add_missing_columns(cursor, archive, {
+                row['name']: row['type'] for row in cursor.fetchall() if row['name'] != 'id'
+            })
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_archive_owner_completed ON tasks_archive (owner_id, completed_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_archive_owner_project ON tasks_archive (owner_id, project_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_archive_owner_completed ON projects_archive (owner_id, completed_at)")
+
+        # Lo que se archiva sigue contando en las estadísticas: por cada día, lo
+        # creado, lo completado y el total de lo archivado (kind: 'task' para los
+        # objetivos principales, 'subtask' o 'project'; project_id 0 = sin misión)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS archive_rollups (
+                owner_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                project_id INTEGER NOT NULL DEFAULT 0,
+                day DATE NOT NULL,
+                created INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (owner_id, kind, project_id, day)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_archive_rollups_project ON archive_rollups (owner_id, project_id)")
+
+        # Registro de cambios (database/events.py): una fila por cada cambio, nunca se modifica
         cursor.execute("""
-            INSERT OR IGNORE INTO user_settings (id) VALUES (1)
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                owner_id INTEGER,
+                entity TEXT NOT NULL,
+                entity_id INTEGER,
+                action TEXT NOT NULL,
+                changes TEXT,
+                created_at REAL NOT NULL
+            )
         """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_owner_entity ON events (owner_id, entity, entity_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_owner_created ON events (owner_id, created_at)")
+
+    def _rename_legacy_user_settings(self, cursor) -> bool:
+        """
+        Renombra la tabla user_settings antigua (sin columna user_id).
         
-        conn.commit()
-        conn.close()
+        Returns:
+            True si había una tabla antigua que migrar
+        """
+        cursor.execute("PRAGMA table_info(user_settings)")
+        columns = [row['name'] for row in cursor.fetchall()]
+        
+        if not columns or 'user_id' in columns:
+            return False
+        
+        cursor.execute("ALTER TABLE user_settings RENAME TO user_settings_legacy")
+        return True
+    
+    def _add_missing_columns(self, cursor, table: str, columns: Dict[str, str]):
+        """Añade a una tabla existente las columnas que todavía no tenga"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row['name'] for row in cursor.fetchall()}
+        
+        for name, definition in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+class OwnedModel:
+    """
+    Base de los modelos cuyos datos pertenecen a un usuario (owner_id).
+    
+    Todas las consultas se limitan al usuario indicado al crear el gestor.
+    Con owner_id=None no se filtra: solo deben usarlo los servicios internos
+    que trabajan con todos los usuarios (por ejemplo, las alertas de deadline).
+    
+    Cada cambio deja un evento en la tabla events (database/events.py): los
+    métodos leen la fila antes y después del cambio dentro de la misma
+    transacción y publican el evento después del commit.
+    
+    Los modelos con VERSIONED tienen columna version (control de concurrencia
+    optimista): cada escritura la sube en 1 y, si se pasa expected_version,
+    solo se escribe cuando la fila sigue en esa versión. Si no, se lanza
+    VersionConflict con la fila actual y no se toca nada.
+    """
+    
+    # Tabla de datos y nombre de la entidad en los eventos
+    TABLE = ''
+    ENTITY = ''
+    VERSIONED = False
+    
+    def __init__(self, db_manager: DatabaseManager, owner_id: Optional[int] = None):
+        # En el almacenamiento por usuario, cada usuario tiene su propio archivo
+        self.db = db_manager.for_user(owner_id) if owner_id is not None else db_manager
+        self.owner_id = owner_id
+    
+    def _scope(self) -> Tuple[str, tuple]:
+        """Devuelve el filtro SQL del usuario y sus parámetros"""
+        if self.owner_id is None:
+            return "", ()
+        return " AND owner_id = ?", (self.owner_id,)
+    
+    def _require_owner(self) -> int:
+        """Los datos nuevos siempre necesitan dueño"""
+        if self.owner_id is None:
+            raise ValueError(f"{type(self).__name__} necesita owner_id para crear registros")
+        return self.owner_id
+    
+    def _snapshot(self, cursor, row_id: int) -> Optional[Dict[str, Any]]:
+        """La fila tal como está ahora dentro de la transacción (None si no existe)"""
+        scope, scope_params = self._scope()
+        cursor.execute(f"SELECT * FROM {self.TABLE} WHERE id = ?{scope}", (row_id,) + scope_params)
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    def _record_change(self, cursor, row_id: int,
+                       before: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Guarda el evento del cambio (antes -> ahora) en la transacción en curso"""
+        return events.record_change(cursor, self.ENTITY, row_id, before, self._snapshot(cursor, row_id))
+    
+    def _version_check(self, expected_version: Optional[int]) -> Tuple[str, tuple]:
+        """Condición SQL de la escritura condicional (vacía si no se espera versión)"""
+        if expected_version is None or not self.VERSIONED:
+            return "", ()
+        return " AND version = ?", (expected_version,)
+    
+    def _update(self, row_id: int, set_clause: str, params: tuple,
+                expected_version: Optional[int] = None,
+                on_success: Optional[Callable[[Any], Any]] = None) -> bool:
+        """
+        Actualiza una fila del usuario (SET set_clause) y guarda su evento.
+        
+        Args:
+            row_id: ID de la fila
+            set_clause: Asignaciones SQL, p. ej. "title = ?"
+            params: Parámetros de set_clause
+            expected_version: Versión que se vio al mostrarla (None = sin comprobar)
+            on_success: Se llama con el cursor tras actualizar, dentro de la transacción
+            
+        Returns:
+            True si se actualizó, False si no existe
+            
+        Raises:
+            VersionConflict: La fila existe pero ya va por otra versión
+        """
+        if self.VERSIONED:
+            set_clause += ", version = version + 1"
+        
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            scope, scope_params = self._scope()
+            check, check_params = self._version_check(expected_version)
+            before = self._snapshot(cursor, row_id)
+            cursor.execute(f"""
+                UPDATE {self.TABLE}
+                SET {set_clause}, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?{scope}{check}
+            """, tuple(params) + (row_id,) + scope_params + check_params)
+            
+            success = cursor.rowcount > 0
+            event = current = None
+            if success:
+                if on_success:
+                    on_success(cursor)
+                event = self._record_change(cursor, row_id, before)
+            elif check:
+                current = self._snapshot(cursor, row_id)
+            conn.commit()
+        finally:
+            conn.close()
+        
+        if current is not None:
+            raise VersionConflict(self.ENTITY, row_id, current)
+        
+        events.publish(event)
+        return success
+    
+    def _delete(self, row_id: int, expected_version: Optional[int] = None) -> bool:
+        """Borra una fila del usuario y guarda su evento (misma comprobación de versión que _update)"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            scope, scope_params = self._scope()
+            check, check_params = self._version_check(expected_version)
+            before = self._snapshot(cursor, row_id)
+            cursor.execute(f"DELETE FROM {self.TABLE} WHERE id = ?{scope}{check}",
+                           (row_id,) + scope_params + check_params)
+            
+            success = cursor.rowcount > 0
+            event = current = None
+            if success:
+                event = self._record_change(cursor, row_id, before)
+            elif check:
+                current = self._snapshot(cursor, row_id)
+            conn.commit()
+        finally:
+            conn.close()
+        
+        if current is not None:
+            raise VersionConflict(self.ENTITY, row_id, current)
+        
+        events.publish(event)
+        return success
 
 
-class Project:
+class Project(OwnedModel):
     """
     Clase para gestionar proyectos.
     Un proyecto puede tener múltiples tareas asociadas.
     """
     
-    def __init__(self, db_manager: DatabaseManager):
-        self.db = db_manager
+    TABLE = 'projects'
+    ENTITY = 'project'
     
     def create(self, name: str, description: str = "", client: str = "", 
                priority: str = "medium", deadline: Optional[str] = None) -> int:
@@ -137,22 +561,26 @@ class Project:
         cursor = conn.cursor()
         
         cursor.execute("""
-            INSERT INTO projects (name, description, client, priority, deadline)
-            VALUES (?, ?, ?, ?, ?)
-        """, (name, description, client, priority, deadline))
+            INSERT INTO projects (name, description, client, priority, deadline, owner_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (name, description, client, priority, deadline, self._require_owner()))
         
         project_id = cursor.lastrowid
+        event = self._record_change(cursor, project_id, None)
         conn.commit()
         conn.close()
         
+        events.publish(event)
         return project_id
     
-    def get_all(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    def get_all(self, status: Optional[str] = None,
+                include_archived: bool = False) -> List[Dict[str, Any]]:
         """
         Obtiene todos los proyectos, opcionalmente filtrados por estado.
         
         Args:
             status: Filtrar por estado (active, paused, completed) o None para todos
+            include_archived: Incluir también los archivados (con archived_at)
             
         Returns:
             Lista de proyectos como diccionarios
@@ -160,10 +588,13 @@ class Project:
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
+        scope, scope_params = self._scope()
+        source = _with_archive(cursor, 'projects') if include_archived else "projects"
+        
         if status:
-            cursor.execute("""
-                SELECT * FROM projects 
-                WHERE status = ?
+            cursor.execute(f"""
+                SELECT * FROM {source} 
+                WHERE status = ?{scope}
                 ORDER BY 
                     CASE priority
                         WHEN 'high' THEN 1
@@ -171,10 +602,11 @@ class Project:
                         WHEN 'low' THEN 3
                     END,
                     deadline ASC
-            """, (status,))
+            """, (status,) + scope_params)
         else:
-            cursor.execute("""
-                SELECT * FROM projects 
+            cursor.execute(f"""
+                SELECT * FROM {source} 
+                WHERE 1=1{scope}
                 ORDER BY 
                     CASE priority
                         WHEN 'high' THEN 1
@@ -182,19 +614,20 @@ class Project:
                         WHEN 'low' THEN 3
                     END,
                     deadline ASC
-            """)
+            """, scope_params)
         
         projects = [dict(row) for row in cursor.fetchall()]
         conn.close()
         
         return projects
     
-    def get_by_id(self, project_id: int) -> Optional[Dict[str, Any]]:
+    def get_by_id(self, project_id: int, include_archived: bool = False) -> Optional[Dict[str, Any]]:
         """
         Obtiene un proyecto específico por su ID.
         
         Args:
             project_id: ID del proyecto
+            include_archived: Buscarlo también entre los archivados
             
         Returns:
             Diccionario con datos del proyecto o None si no existe
@@ -202,19 +635,21 @@ class Project:
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT * FROM projects WHERE id = ?", (project_id,))
+        scope, scope_params = self._scope()
+        source = _with_archive(cursor, 'projects') if include_archived else "projects"
+        cursor.execute(f"SELECT * FROM {source} WHERE id = ?{scope}", (project_id,) + scope_params)
         row = cursor.fetchone()
         conn.close()
         
         return dict(row) if row else None
     
-    def update_status(self, task_id: int, status: str) -> bool:
+    def update_status(self, project_id: int, status: str) -> bool:
         """
-        Actualiza el estado de una tarea.
+        Actualiza el estado de un proyecto.
         
         Args:
-            task_id: ID de la tarea
-            status: Nuevo estado (pending, in_progress, completed)
+            project_id: ID del proyecto
+            status: Nuevo estado (active, paused, completed)
             
         Returns:
             True si se actualizó correctamente
@@ -223,27 +658,33 @@ class Project:
         cursor = conn.cursor()
         
         # Validar que el estado sea uno de los permitidos
-        valid_statuses = ['pending', 'in_progress', 'completed']
+        valid_statuses = ['active', 'paused', 'completed']
         if status not in valid_statuses:
             print(f"ERROR: Estado inválido '{status}'. Estados válidos: {valid_statuses}")
             conn.close()
             return False
         
+        # completed_at decide cuándo se archiva la misión (database/archive.py)
         completed_at = datetime.now().isoformat() if status == 'completed' else None
         
-        cursor.execute("""
-            UPDATE tasks 
+        scope, scope_params = self._scope()
+        before = self._snapshot(cursor, project_id)
+        cursor.execute(f"""
+            UPDATE projects 
             SET status = ?, 
                 updated_at = CURRENT_TIMESTAMP,
                 completed_at = ?
-            WHERE id = ?
-        """, (status, completed_at, task_id))
+            WHERE id = ?{scope}
+        """, (status, completed_at, project_id) + scope_params)
         
         success = cursor.rowcount > 0
+        event = self._record_change(cursor, project_id, before) if success else None
         conn.commit()
         conn.close()
         
+        events.publish(event)
         return success
+
     def get_progress(self, project_id: int) -> Dict[str, Any]:
         """
         Calcula el progreso de un proyecto basándose en sus tareas.
@@ -258,29 +699,117 @@ class Project:
         cursor = conn.cursor()
         
         # Contar tareas totales y completadas
-        cursor.execute("""
+        scope, scope_params = self._scope()
+        cursor.execute(f"""
             SELECT 
                 COUNT(*) as total_tasks,
                 SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed_tasks
             FROM tasks
-            WHERE project_id = ?
-        """, (project_id,))
+            WHERE project_id = ?{scope}
+        """, (project_id,) + scope_params)
         
         result = cursor.fetchone()
-        conn.close()
         
-        total = result['total_tasks'] or 0
-        completed = result['completed_tasks'] or 0
+        # Más los objetivos de la misión que ya se archivaron
+        cursor.execute(f"""
+            SELECT SUM(total) as total_tasks, SUM(completed) as completed_tasks
+            FROM archive_rollups
+            WHERE project_id = ? AND kind IN ('task', 'subtask'){scope}
+        """, (project_id,) + scope_params)
+        archived = cursor.fetchone()
+        conn.close()
         
+        total = (result['total_tasks'] or 0) + (archived['total_tasks'] or 0)
+        completed = (result['completed_tasks'] or 0) + (archived['completed_tasks'] or 0)
+
+        return self._progress(total, completed)
+
+    def get_overview(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Todos los proyectos con su progreso, en una sola consulta agrupada
+        (para las listas: sin una llamada a get_progress por proyecto).
+
+        Args:
+            status: Filtrar por estado (active, paused, completed) o None para todos
+
+        Returns:
+            Los proyectos, en el orden de get_all, cada uno con las claves de
+            get_progress más:
+                - overdue_tasks: Objetivos sin completar con el deadline pasado
+                - next_deadline: Deadline más cercano (hoy o después) de los
+                  objetivos sin completar, o None
+        """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+
+        scope, scope_params = self._scope()
+        status_filter = " AND status = ?" if status else ""
+        status_params = (status,) if status else ()
+        # Solo se agregan los objetivos de las misiones que se van a mostrar
+        listed = f"SELECT id FROM projects WHERE 1=1{status_filter}{scope}"
+        listed_params = status_params + scope_params
+
+        # Los objetivos y lo archivado, agrupados por misión y unidos a
+        # projects: una sola consulta, tenga las misiones que tenga
+        cursor.execute(f"""
+            SELECT projects.*,
+                   COALESCE(live.total, 0) AS live_total,
+                   COALESCE(live.completed, 0) AS live_completed,
+                   COALESCE(live.overdue, 0) AS overdue_tasks,
+                   live.next_deadline AS next_deadline,
+                   COALESCE(archived.total, 0) AS archived_total,
+                   COALESCE(archived.completed, 0) AS archived_completed
+            FROM projects
+            LEFT JOIN (
+                SELECT project_id,
+                       COUNT(*) AS total,
+                       SUM(status = 'completed') AS completed,
+                       SUM(status != 'completed' AND deadline < date('now')) AS overdue,
+                       MIN(CASE WHEN status != 'completed' AND deadline >= date('now')
+                                THEN deadline END) AS next_deadline
+                FROM tasks
+                WHERE project_id IN ({listed}){scope}
+                GROUP BY project_id
+            ) AS live ON live.project_id = projects.id
+            LEFT JOIN (
+                SELECT project_id, SUM(total) AS total, SUM(completed) AS completed
+                FROM archive_rollups
+                WHERE kind IN ('task', 'subtask') AND project_id IN ({listed}){scope}
+                GROUP BY project_id
+            ) AS archived ON archived.project_id = projects.id
+            WHERE 1=1{status_filter}{scope}
+            ORDER BY
+                CASE priority
+                    WHEN 'high' THEN 1
+                    WHEN 'medium' THEN 2
+                    WHEN 'low' THEN 3
+                END,
+                deadline ASC
+        """, (listed_params + scope_params) * 2 + status_params + scope_params)
+
+        projects = []
+        for row in cursor.fetchall():
+            project = dict(row)
+            total = project.pop('live_total') + project.pop('archived_total')
+            completed = project.pop('live_completed') + project.pop('archived_completed')
+            project.update(self._progress(total, completed))
+            projects.append(project)
+        conn.close()
+
+        return projects
+
+    @staticmethod
+    def _progress(total: int, completed: int) -> Dict[str, Any]:
+        """Estadísticas de progreso a partir de los totales"""
         percentage = (completed / total * 100) if total > 0 else 0
-        
+
         return {
             'total_tasks': total,
             'completed_tasks': completed,
             'pending_tasks': total - completed,
             'percentage': round(percentage, 1)
         }
-    
+
     def delete(self, project_id: int) -> bool:
         """
         Elimina un proyecto y todas sus tareas asociadas.
@@ -294,27 +823,48 @@ class Project:
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+        scope, scope_params = self._scope()
+        before = self._snapshot(cursor, project_id)
+        cursor.execute(f"DELETE FROM projects WHERE id = ?{scope}", (project_id,) + scope_params)
         success = cursor.rowcount > 0
+        event = None
+        
+        # Sus objetivos archivados y lo que sumaban a las estadísticas se van con ella
+        if success:
+            cursor.execute(f"DELETE FROM tasks_archive WHERE project_id = ?{scope}", (project_id,) + scope_params)
+            cursor.execute(f"""
+                DELETE FROM archive_rollups WHERE project_id = ? AND kind IN ('task', 'subtask'){scope}
+            """, (project_id,) + scope_params)
+            event = self._record_change(cursor, project_id, before)
         
         conn.commit()
         conn.close()
         
+        events.publish(event)
         return success
 
 
-class Task:
+class Task(OwnedModel):
     """
     Clase para gestionar tareas.
     Las tareas pueden estar asociadas a proyectos y tener subtareas.
+    
+    Cuando cambia la alerta de una tarea, su evento (database/events.py) lleva
+    el nuevo alert_at: así se entera el servicio de alertas de deadline.
     """
     
-    def __init__(self, db_manager: DatabaseManager):
-        self.db = db_manager
+    TABLE = 'tasks'
+    ENTITY = 'task'
+    VERSIONED = True
+    
+    # Campos que, al cambiar, obligan a recalcular la alerta
+    ALERT_FIELDS = {'deadline', 'deadline_time', 'remind_before_minutes', 'status'}
     
     def create(self, title: str, description: str = "", project_id: Optional[int] = None,
                priority: str = "medium", deadline: Optional[str] = None,
-               parent_task_id: Optional[int] = None) -> int:
+               parent_task_id: Optional[int] = None, deadline_time: Optional[str] = None,
+               remind_before_minutes: Optional[int] = None,
+               recurrence: Optional[str] = None) -> int:
         """
         Crea una nueva tarea.
         
@@ -325,22 +875,41 @@ class Task:
             priority: Prioridad (low, medium, high)
             deadline: Fecha límite en formato YYYY-MM-DD
             parent_task_id: ID de tarea padre (para subtareas)
+            deadline_time: Hora límite HH:MM (opcional, activa la alerta)
+            remind_before_minutes: Minutos de antelación de la alerta
+            recurrence: Regla RRULE para que se repita (sin deadline, empieza hoy)
             
         Returns:
             ID de la tarea creada
+            
+        Raises:
+            ValueError: La regla de recurrencia no es válida
         """
+        recurrence_next = None
+        if recurrence:
+            deadline = deadline or date.today().strftime("%Y-%m-%d")
+            recurrence, recurrence_next = self._schedule(recurrence, deadline)
+        
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
-            INSERT INTO tasks (title, description, project_id, priority, deadline, parent_task_id)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (title, description, project_id, priority, deadline, parent_task_id))
+            INSERT INTO tasks (title, description, project_id, priority, deadline, parent_task_id,
+                               deadline_time, remind_before_minutes, owner_id,
+                               recurrence, recurrence_next)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (title, description, project_id, priority, deadline, parent_task_id,
+              deadline_time, remind_before_minutes, self._require_owner(),
+              recurrence, recurrence_next))
         
         task_id = cursor.lastrowid
+        if deadline_time:
+            self._refresh_alert(cursor, task_id)
+        event = self._record_change(cursor, task_id, None)
         conn.commit()
         conn.close()
         
+        events.publish(event)
         return task_id
     
     def get_all(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
@@ -355,6 +924,10 @@ class Task:
                 - overdue: True para tareas atrasadas
                 - today: True para tareas de hoy
                 - parent_only: True para excluir subtareas
+                - include_archived: True para incluir también las archivadas
+                - search: Buscar en título y descripción, aunque haya erratas
+                  (las más parecidas primero, ver database/fulltext.py)
+                - limit: Máximo de tareas a devolver
                 
         Returns:
             Lista de tareas como diccionarios
@@ -362,8 +935,19 @@ class Task:
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
-        query = "SELECT * FROM tasks WHERE 1=1"
+        filters = filters or {}
+        include_archived = bool(filters.get('include_archived'))
+        search = filters.get('search') if fulltext.query_words(filters.get('search') or '') else None
+        
+        scope, scope_params = self._scope()
+        source = _with_archive(cursor, 'tasks') if include_archived else "tasks"
+        columns = "*"
         params = []
+        if search:
+            columns += ", " + fulltext.score_column('tasks')
+            params.append(search)
+        query = f"SELECT {columns} FROM {source} WHERE 1=1{scope}"
+        params.extend(scope_params)
         
         if filters:
             if 'status' in filters:
@@ -395,180 +979,144 @@ class Task:
             if 'deadline_to' in filters:
                 query += " AND deadline <= ?"
                 params.append(filters['deadline_to'])
+            
+            if search:
+                clause, clause_params = fulltext.candidates(cursor, 'tasks', search, include_archived)
+                query += clause
+                params.extend(clause_params)
         
         query += """ ORDER BY 
-            CASE priority
+            {}CASE priority
                 WHEN 'high' THEN 1
                 WHEN 'medium' THEN 2
                 WHEN 'low' THEN 3
             END,
             deadline ASC
-        """
+        """.format("search_score DESC, " if search else "")
+        
+        if filters.get('limit'):
+            query += " LIMIT ?"
+            params.append(filters['limit'])
         
         cursor.execute(query, params)
         tasks = [dict(row) for row in cursor.fetchall()]
         conn.close()
         
-        return tasks
+        return fulltext.ranked(tasks) if search else tasks
     
-    def get_by_id(self, task_id: int) -> Optional[Dict[str, Any]]:
-        """Obtiene una tarea específica por su ID"""
+    def get_by_id(self, task_id: int, include_archived: bool = False) -> Optional[Dict[str, Any]]:
+        """Obtiene una tarea específica por su ID (con include_archived, también si está archivada)"""
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
+        scope, scope_params = self._scope()
+        source = _with_archive(cursor, 'tasks') if include_archived else "tasks"
+        cursor.execute(f"SELECT * FROM {source} WHERE id = ?{scope}", (task_id,) + scope_params)
         row = cursor.fetchone()
         conn.close()
         
         return dict(row) if row else None
     
-    def update_status(self, task_id: int, status: str) -> bool:
+    def update_status(self, task_id: int, status: str,
+                      expected_version: Optional[int] = None) -> bool:
         """
         Actualiza el estado de una tarea.
         
         Args:
             task_id: ID de la tarea
             status: Nuevo estado (pending, in_progress, completed)
+            expected_version: Versión vista por el usuario (ver OwnedModel)
             
         Returns:
             True si se actualizó correctamente
         """
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
         completed_at = datetime.now().isoformat() if status == 'completed' else None
-        
-        cursor.execute("""
-            UPDATE tasks 
-            SET status = ?, 
-                updated_at = CURRENT_TIMESTAMP,
-                completed_at = ?
-            WHERE id = ?
-        """, (status, completed_at, task_id))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        
+        created = []
+        
+        def on_success(cursor):
+            self._refresh_alert(cursor, task_id)
+            # Si se repite, la siguiente repetición se crea en la misma transacción
+            if status == 'completed':
+                created.extend(self._materialize_next(cursor, task_id))
+        
+        success = self._update(task_id, "status = ?, completed_at = ?", (status, completed_at),
+                               expected_version, on_success)
+        for event in created:
+            events.publish(event)
         return success
     
     # NUEVOS MÉTODOS AÑADIDOS
     
-    def update_deadline(self, task_id: int, deadline: Optional[str]) -> bool:
+    def update_deadline(self, task_id: int, deadline: Optional[str],
+                        expected_version: Optional[int] = None) -> bool:
         """
         Actualiza la fecha límite de una tarea.
         
         Args:
             task_id: ID de la tarea
             deadline: Nueva fecha límite en formato YYYY-MM-DD o None para sin fecha
+            expected_version: Versión vista por el usuario (ver OwnedModel)
             
         Returns:
             True si se actualizó correctamente
         """
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE tasks 
-            SET deadline = ?, 
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (deadline, task_id))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        
-        return success
+        return self._update(task_id, "deadline = ?", (deadline,),
+                            expected_version, self._alert_refresher(task_id))
     
-    def update_title(self, task_id: int, title: str) -> bool:
+    def update_title(self, task_id: int, title: str,
+                     expected_version: Optional[int] = None) -> bool:
         """
         Actualiza el título de una tarea.
         
         Args:
             task_id: ID de la tarea
             title: Nuevo título
+            expected_version: Versión vista por el usuario (ver OwnedModel)
             
         Returns:
             True si se actualizó correctamente
         """
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE tasks 
-            SET title = ?, 
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (title, task_id))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        
-        return success
+        return self._update(task_id, "title = ?", (title,), expected_version)
     
-    def update_description(self, task_id: int, description: str) -> bool:
+    def update_description(self, task_id: int, description: str,
+                           expected_version: Optional[int] = None) -> bool:
         """
         Actualiza la descripción de una tarea.
         
         Args:
             task_id: ID de la tarea
             description: Nueva descripción
+            expected_version: Versión vista por el usuario (ver OwnedModel)
             
         Returns:
             True si se actualizó correctamente
         """
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE tasks 
-            SET description = ?, 
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (description, task_id))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        
-        return success
+        return self._update(task_id, "description = ?", (description,), expected_version)
     
-    def update_priority(self, task_id: int, priority: str) -> bool:
+    def update_priority(self, task_id: int, priority: str,
+                        expected_version: Optional[int] = None) -> bool:
         """
         Actualiza la prioridad de una tarea.
         
         Args:
             task_id: ID de la tarea
             priority: Nueva prioridad (low, medium, high)
+            expected_version: Versión vista por el usuario (ver OwnedModel)
             
         Returns:
             True si se actualizó correctamente
         """
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE tasks 
-            SET priority = ?, 
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (priority, task_id))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        
-        return success
+        return self._update(task_id, "priority = ?", (priority,), expected_version)
     
-    def update(self, task_id: int, data: Dict[str, Any]) -> bool:
+    def update(self, task_id: int, data: Dict[str, Any],
+               expected_version: Optional[int] = None) -> bool:
         """
         Actualiza múltiples campos de una tarea.
         
         Args:
             task_id: ID de la tarea
             data: Diccionario con los campos a actualizar
+            expected_version: Versión vista por el usuario (ver OwnedModel)
             
         Returns:
             True si se actualizó correctamente
@@ -576,91 +1124,487 @@ class Task:
         if not data:
             return False
         
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
         # Construir la consulta dinámicamente
         set_clause = ", ".join([f"{key} = ?" for key in data.keys()])
-        values = list(data.values())
-        values.append(task_id)
-        
-        cursor.execute(f"""
-            UPDATE tasks 
-            SET {set_clause}, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, values)
-        
-        success = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
+        refresh = self._alert_refresher(task_id) if self.ALERT_FIELDS & data.keys() else None
         
-        return success
+        return self._update(task_id, set_clause, tuple(data.values()), expected_version, refresh)
     
-    def postpone(self, task_id: int, days: int) -> bool:
+    def postpone(self, task_id: int, days: int,
+                 expected_version: Optional[int] = None) -> bool:
         """
         Pospone una tarea X días.
         
         Args:
             task_id: ID de la tarea
             days: Número de días a posponer
+            expected_version: Versión vista por el usuario (ver OwnedModel)
             
         Returns:
             True si se actualizó correctamente
         """
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+        return self._update(task_id, "deadline = date(deadline, '+' || ? || ' days')", (days,),
+                            expected_version, self._alert_refresher(task_id))
+    
+    def delete(self, task_id: int, expected_version: Optional[int] = None) -> bool:
+        """Elimina una tarea"""
+        return self._delete(task_id, expected_version)
+    
+    def get_subtasks(self, parent_task_id: int) -> List[Dict[str, Any]]:
+        """Obtiene las subtareas de una tarea padre"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
         
-        cursor.execute("""
-            UPDATE tasks 
-            SET deadline = date(deadline, '+' || ? || ' days'),
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (days, task_id))
+        scope, scope_params = self._scope()
+        cursor.execute(f"""
+            SELECT * FROM tasks 
+            WHERE parent_task_id = ?{scope}
+            ORDER BY created_at ASC
+        """, (parent_task_id,) + scope_params)
         
-        success = cursor.rowcount > 0
-        conn.commit()
+        subtasks = [dict(row) for row in cursor.fetchall()]
         conn.close()
         
+        return subtasks
+    
+    # ========== OBJETIVOS QUE SE REPITEN ==========
+    
+    def set_recurrence(self, task_id: int, rule: Optional[str],
+                       expected_version: Optional[int] = None) -> bool:
+        """
+        Hace que una tarea se repita o deja de repetirse (database/recurrence.py).
+        Sin deadline, la serie empieza hoy. Si ya está completada, la siguiente
+        repetición se crea en ese momento.
+        
+        Args:
+            task_id: ID de la tarea
+            rule: Regla RRULE (p. ej. "FREQ=WEEKLY;BYDAY=MO") o None para que no se repita
+            expected_version: Versión vista por el usuario (ver OwnedModel)
+            
+        Returns:
+            True si se actualizó correctamente
+            
+        Raises:
+            ValueError: La regla no es válida
+        """
+        if not rule:
+            return self._update(task_id, "recurrence = NULL, recurrence_next = NULL", (), expected_version)
+        
+        task = self.get_by_id(task_id)
+        if not task:
+            return False
+        
+        deadline = task['deadline'] or date.today().strftime("%Y-%m-%d")
+        rule, recurrence_next = self._schedule(rule, deadline)
+        created = []
+        
+        def on_success(cursor):
+            self._refresh_alert(cursor, task_id)
+            if task['status'] == 'completed':
+                created.extend(self._materialize_next(cursor, task_id))
+        
+        success = self._update(task_id, "recurrence = ?, recurrence_next = ?, deadline = ?",
+                               (rule, recurrence_next, deadline), expected_version, on_success)
+        for event in created:
+            events.publish(event)
         return success
     
-    def delete(self, task_id: int) -> bool:
-        """Elimina una tarea"""
+    def get_due_recurrences(self, until: str,
+                            limit: int = config.RECURRENCE_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """
+        Series cuya siguiente repetición toca crear (recurrence_next <= until),
+        usando el índice parcial.
+        
+        Returns:
+            Lista de diccionarios con id, owner_id y recurrence_next
+        """
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-        success = cursor.rowcount > 0
+        scope, scope_params = self._scope()
+        cursor.execute(f"""
+            SELECT id, owner_id, recurrence_next FROM tasks
+            WHERE recurrence_next IS NOT NULL AND recurrence_next <= ?{scope}
+            ORDER BY recurrence_next
+            LIMIT ?
+        """, (until,) + scope_params + (limit,))
         
-        conn.commit()
+        due = [dict(row) for row in cursor.fetchall()]
         conn.close()
         
-        return success
+        return due
     
-    def get_subtasks(self, parent_task_id: int) -> List[Dict[str, Any]]:
-        """Obtiene las subtareas de una tarea padre"""
+    def materialize_next(self, task_id: int) -> Optional[int]:
+        """
+        Crea ya la siguiente repetición de la serie que lleva task_id.
+        
+        Returns:
+            ID de la repetición creada, o None si no se repite, la serie
+            terminó u otra llamada la creó antes
+        """
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
+        try:
+            before = self._snapshot(cursor, task_id)
+            created = self._materialize_next(cursor, task_id)
+            changed = self._record_change(cursor, task_id, before) if before else None
+            conn.commit()
+        finally:
+            conn.close()
+        
+        events.publish(changed)
+        for event in created:
+            events.publish(event)
+        return created[0]['entity_id'] if created else None
+    
+    @staticmethod
+    def _schedule(rule: str, deadline: str) -> Tuple[str, Optional[str]]:
+        """Regla lista para guardar y fecha de la repetición siguiente a deadline"""
+        start = datetime.strptime(deadline, "%Y-%m-%d").date()
+        rule = recurrence_rules.prepare(rule, start)
+        following = recurrence_rules.next_date(rule, start)
+        return rule, following.isoformat() if following else None
+    
+    def _materialize_next(self, cursor, task_id: int) -> List[Dict[str, Any]]:
+        """
+        Crea la siguiente repetición dentro de la transacción en curso y le
+        pasa la regla. Nunca con fecha pasada: las que no se crearon a tiempo
+        se saltan.
+        
+        Returns:
+            Eventos por publicar tras el commit (vacío si no se creó nada)
+        """
+        scope, scope_params = self._scope()
+        cursor.execute(f"""
+            SELECT * FROM tasks WHERE id = ? AND recurrence_next IS NOT NULL{scope}
+        """, (task_id,) + scope_params)
+        row = cursor.fetchone()
+        if not row:
+            return []
+        
+        task = dict(row)
+        series_id = task['series_id'] or task['id']
+        caught_up = recurrence_rules.catch_up(task['recurrence'], date.fromisoformat(task['recurrence_next']),
+                                              date.today())
+        # La regla pasa a la nueva repetición (si la serie sigue): esta ya no
+        # crea más. La condición sobre recurrence_next hace que solo una llamada gane.
         cursor.execute("""
-            SELECT * FROM tasks 
-            WHERE parent_task_id = ?
-            ORDER BY created_at ASC
-        """, (parent_task_id,))
+            UPDATE tasks SET recurrence = NULL, recurrence_next = NULL, series_id = ?
+            WHERE id = ? AND recurrence_next = ?
+        """, (series_id, task_id, task['recurrence_next']))
+        if caught_up is None or cursor.rowcount == 0:
+            return []
+        
+        due, rule = caught_up
+        following = recurrence_rules.next_date(rule, due)
+        cursor.execute("""
+            INSERT INTO tasks (title, description, project_id, priority, deadline,
+                               deadline_time, remind_before_minutes, owner_id,
+                               recurrence, recurrence_next, series_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (task['title'], task['description'], task['project_id'], task['priority'], due.isoformat(),
+              task['deadline_time'], task['remind_before_minutes'], task['owner_id'],
+              rule, following.isoformat() if following else None, series_id))
+        
+        new_id = cursor.lastrowid
+        if task['deadline_time']:
+            self._refresh_alert(cursor, new_id)
+        return [self._record_change(cursor, new_id, None)]
+    
+    # ========== DEPENDENCIAS ==========
+    
+    def add_dependency(self, task_id: int, depends_on_id: int) -> bool:
+        """
+        Hace que una tarea dependa de otra: no se puede empezar hasta que
+        depends_on_id esté completada.
         
-        subtasks = [dict(row) for row in cursor.fetchall()]
+        Returns:
+            True si se añadió; False si alguna no existe, son la misma o ya dependía
+            
+        Raises:
+            DependencyCycle: depends_on_id ya depende (directa o indirectamente) de task_id
+        """
+        if task_id == depends_on_id:
+            return False
+        
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        event = None
+        
+        try:
+            scope, scope_params = self._scope()
+            cursor.execute(f"SELECT COUNT(*) AS found FROM tasks WHERE id IN (?, ?){scope}",
+                           (task_id, depends_on_id) + scope_params)
+            if cursor.fetchone()['found'] < 2:
+                return False
+            
+            # Todo lo que depends_on_id necesita antes, a cualquier distancia
+            cursor.execute("""
+                WITH RECURSIVE upstream(id) AS (
+                    SELECT ?
+                    UNION
+                    SELECT d.depends_on_id FROM task_dependencies d JOIN upstream u ON d.task_id = u.id
+                )
+                SELECT 1 FROM upstream WHERE id = ? LIMIT 1
+            """, (depends_on_id, task_id))
+            if cursor.fetchone():
+                raise DependencyCycle(task_id, depends_on_id)
+            
+            cursor.execute("""
+                INSERT OR IGNORE INTO task_dependencies (task_id, depends_on_id, owner_id)
+                VALUES (?, ?, ?)
+            """, (task_id, depends_on_id, self._require_owner()))
+            if cursor.rowcount > 0:
+                event = events.record(cursor, self.owner_id, 'dependency', task_id, 'created',
+                                      {'depends_on_id': [None, depends_on_id]})
+            conn.commit()
+        finally:
+            conn.close()
+        
+        events.publish(event)
+        return event is not None
+    
+    def remove_dependency(self, task_id: int, depends_on_id: int) -> bool:
+        """Quita una dependencia (True si existía)"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        event = None
+        
+        try:
+            scope, scope_params = self._scope()
+            cursor.execute(f"DELETE FROM task_dependencies WHERE task_id = ? AND depends_on_id = ?{scope}",
+                           (task_id, depends_on_id) + scope_params)
+            if cursor.rowcount > 0:
+                event = events.record(cursor, self.owner_id, 'dependency', task_id, 'deleted',
+                                      {'depends_on_id': [depends_on_id, None]})
+            conn.commit()
+        finally:
+            conn.close()
+        
+        events.publish(event)
+        return event is not None
+    
+    def get_dependencies(self, task_id: int) -> List[Dict[str, Any]]:
+        """Tareas de las que depende una tarea (las que hay que terminar antes)"""
+        return self._related_tasks("depends_on_id", "task_id", task_id)
+    
+    def get_dependents(self, task_id: int) -> List[Dict[str, Any]]:
+        """Tareas que dependen de una tarea (las que esperan a que se termine)"""
+        return self._related_tasks("task_id", "depends_on_id", task_id)
+    
+    def _related_tasks(self, column: str, key: str, task_id: int) -> List[Dict[str, Any]]:
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        scope, scope_params = self._scope()
+        cursor.execute(f"""
+            SELECT * FROM tasks
+            WHERE id IN (SELECT {column} FROM task_dependencies WHERE {key} = ?{scope}){scope}
+            ORDER BY deadline IS NULL, deadline, id
+        """, (task_id,) + scope_params + scope_params)
+        
+        tasks = [dict(row) for row in cursor.fetchall()]
         conn.close()
         
-        return subtasks
+        return tasks
+    
+    def get_dependency_graph(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Todas las dependencias del usuario y las tareas que aparecen en ellas
+        (para cargar el grafo de utils/task_graph.py).
+        
+        Returns:
+            {'edges': [{task_id, depends_on_id}], 'tasks': [{id, title, status,
+            priority, deadline, project_id}]}
+        """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        scope, scope_params = self._scope()
+        cursor.execute(f"SELECT task_id, depends_on_id FROM task_dependencies WHERE 1=1{scope}", scope_params)
+        edges = [dict(row) for row in cursor.fetchall()]
+        
+        cursor.execute(f"""
+            SELECT id, title, status, priority, deadline, project_id FROM tasks
+            WHERE id IN (SELECT task_id FROM task_dependencies WHERE 1=1{scope}
+                         UNION SELECT depends_on_id FROM task_dependencies WHERE 1=1{scope}){scope}
+        """, scope_params * 3)
+        tasks = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        
+        return {'edges': edges, 'tasks': tasks}
+    
+    # ========== ALERTAS DE DEADLINE ==========
+    
+    def set_deadline_alert(self, task_id: int, deadline_time: Optional[str],
+                           remind_before_minutes: Optional[int] = None,
+                           expected_version: Optional[int] = None) -> bool:
+        """
+        Configura la hora límite de una tarea y con cuánta antelación avisar.
+        
+        Args:
+            task_id: ID de la tarea
+            deadline_time: Hora límite HH:MM o None para quitar la alerta
+            remind_before_minutes: Minutos antes de la hora límite (None = valor por defecto)
+            expected_version: Versión vista por el usuario (ver OwnedModel)
+            
+        Returns:
+            True si se actualizó correctamente
+        """
+        return self.update(task_id, {
+            'deadline_time': deadline_time,
+            'remind_before_minutes': remind_before_minutes
+        }, expected_version)
+    
+    def get_pending_alerts(self, after: Optional[Tuple[float, int, int]] = None,
+                           limit: int = config.DEADLINE_ALERT_BATCH_SIZE) -> List[Dict[str, Any]]:
+        """
+        Obtiene las próximas alertas pendientes en orden, usando el índice parcial.
+        
+        Args:
+            after: (alert_at, owner_id, id) de la última alerta ya cargada, para seguir desde ahí
+            limit: Número máximo de alertas a devolver
+            
+        Returns:
+            Lista de diccionarios con id, owner_id y alert_at
+        """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        if after is None:
+            cursor.execute("""
+                SELECT id, owner_id, alert_at FROM tasks
+                WHERE alert_at IS NOT NULL
+                ORDER BY alert_at, owner_id, id
+                LIMIT ?
+            """, (limit,))
+        else:
+            cursor.execute("""
+                SELECT id, owner_id, alert_at FROM tasks
+                WHERE alert_at IS NOT NULL AND (alert_at, owner_id, id) > (?, ?, ?)
+                ORDER BY alert_at, owner_id, id
+                LIMIT ?
+            """, (after[0], after[1], after[2], limit))
+        
+        alerts = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        
+        return alerts
+    
+    def claim_alert(self, task_id: int, alert_at: float) -> bool:
+        """
+        Marca una alerta como enviada, solo si sigue siendo la misma.
+        Así una alerta nunca se envía dos veces ni después de haber cambiado.
+        """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE tasks SET alert_at = NULL
+            WHERE id = ? AND alert_at = ?
+        """, (task_id, alert_at))
+        
+        claimed = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        
+        return claimed
+    
+    def refresh_alerts(self) -> int:
+        """
+        Recalcula las alertas pendientes del usuario (tras cambiar de zona
+        horaria: la hora límite es hora local). Las ya enviadas no vuelven.
+        
+        Returns:
+            Número de alertas que han cambiado
+        """
+        self._require_owner()
+        scope, scope_params = self._scope()
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        changed = []
+        
+        try:
+            cursor.execute(f"SELECT id FROM tasks WHERE alert_at IS NOT NULL{scope}", scope_params)
+            for task_id in [row['id'] for row in cursor.fetchall()]:
+                before = self._snapshot(cursor, task_id)
+                self._refresh_alert(cursor, task_id)
+                event = self._record_change(cursor, task_id, before)
+                if event:
+                    changed.append(event)
+            conn.commit()
+        finally:
+            conn.close()
+        
+        # Tras el commit: el servicio de alertas vuelve a colocarlas en su heap
+        for event in changed:
+            events.publish(event)
+        return len(changed)
+    
+    def _alert_refresher(self, task_id: int) -> Callable[[Any], Optional[float]]:
+        """Para _update: recalcula la alerta en la misma transacción del cambio"""
+        return lambda cursor: self._refresh_alert(cursor, task_id)
+    
+    def _refresh_alert(self, cursor, task_id: int) -> Optional[float]:
+        """Recalcula y guarda alert_at de una tarea dentro de la transacción en curso"""
+        cursor.execute("""
+            SELECT deadline, deadline_time, remind_before_minutes, status, owner_id
+            FROM tasks WHERE id = ?
+        """, (task_id,))
+        row = cursor.fetchone()
+        
+        if not row:
+            return None
+        
+        # La hora límite es hora local del dueño de la tarea
+        cursor.execute("SELECT timezone FROM user_settings WHERE user_id = ?",
+                       (row['owner_id'],))
+        settings = cursor.fetchone()
+        timezone = settings['timezone'] if settings else config.DEFAULT_TIMEZONE
+        
+        alert_at = self._compute_alert_at(dict(row), timezone)
+        cursor.execute("UPDATE tasks SET alert_at = ? WHERE id = ?", (alert_at, task_id))
+        
+        return alert_at
+    
+    @staticmethod
+    def _compute_alert_at(task: Dict[str, Any], timezone: str) -> Optional[float]:
+        """
+        Calcula el momento de la alerta (timestamp UTC).
+        No hay alerta si la tarea está completada, no tiene hora límite
+        o el momento del aviso ya pasó.
+        """
+        if task['status'] == 'completed' or not task['deadline'] or not task['deadline_time']:
+            return None
+        
+        try:
+            tz = ZoneInfo(timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            tz = ZoneInfo(config.DEFAULT_TIMEZONE)
+        
+        try:
+            due = datetime.strptime(f"{task['deadline']} {task['deadline_time']}", "%Y-%m-%d %H:%M")
+        except ValueError:
+            return None
+        
+        minutes = task['remind_before_minutes']
+        if minutes is None:
+            minutes = config.DEADLINE_ALERT_DEFAULT_MINUTES
+        
+        alert_at = (due.replace(tzinfo=tz) - timedelta(minutes=minutes)).timestamp()
+        return alert_at if alert_at > time.time() else None
 
 
-class Note:
+class Note(OwnedModel):
     """
     Clase para gestionar notas.
     Las notas pueden asociarse a proyectos o tareas y organizarse por etiquetas.
     """
     
-    def __init__(self, db_manager: DatabaseManager):
-        self.db = db_manager
+    TABLE = 'notes'
+    ENTITY = 'note'
+    VERSIONED = True
     
     def create(self, title: str, content: str, tags: str = "",
                project_id: Optional[int] = None, task_id: Optional[int] = None) -> int:
@@ -681,14 +1625,16 @@ class Note:
         cursor = conn.cursor()
         
         cursor.execute("""
-            INSERT INTO notes (title, content, tags, project_id, task_id)
-            VALUES (?, ?, ?, ?, ?)
-        """, (title, content, tags, project_id, task_id))
+            INSERT INTO notes (title, content, tags, project_id, task_id, owner_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (title, content, tags, project_id, task_id, self._require_owner()))
         
         note_id = cursor.lastrowid
+        event = self._record_change(cursor, note_id, None)
         conn.commit()
         conn.close()
         
+        events.publish(event)
         return note_id
     
     def get_all(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
@@ -700,7 +1646,9 @@ class Note:
                 - project_id: ID del proyecto
                 - task_id: ID de la tarea
                 - tag: Buscar por etiqueta
-                - search: Buscar en título y contenido
+                - search: Buscar en título y contenido, aunque haya erratas
+                  (las más parecidas primero, ver database/fulltext.py)
+                - limit: Máximo de notas a devolver
                 
         Returns:
             Lista de notas como diccionarios
@@ -708,8 +1656,17 @@ class Note:
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
-        query = "SELECT * FROM notes WHERE 1=1"
+        filters = filters or {}
+        search = filters.get('search') if fulltext.query_words(filters.get('search') or '') else None
+        
+        scope, scope_params = self._scope()
+        columns = "*"
         params = []
+        if search:
+            columns += ", " + fulltext.score_column('notes')
+            params.append(search)
+        query = f"SELECT {columns} FROM notes WHERE 1=1{scope}"
+        params.extend(scope_params)
         
         if filters:
             if 'project_id' in filters:
@@ -724,36 +1681,38 @@ class Note:
                 query += " AND tags LIKE ?"
                 params.append(f"%{filters['tag']}%")
             
-            if 'search' in filters:
-                query += " AND (title LIKE ? OR content LIKE ?)"
-                search_term = f"%{filters['search']}%"
-                params.extend([search_term, search_term])
+            if search:
+                clause, clause_params = fulltext.candidates(cursor, 'notes', search)
+                query += clause
+                params.extend(clause_params)
         
-        query += " ORDER BY updated_at DESC"
+        query += " ORDER BY {}updated_at DESC".format("search_score DESC, " if search else "")
+        if filters.get('limit'):
+            query += " LIMIT ?"
+            params.append(filters['limit'])
         
         cursor.execute(query, params)
         notes = [dict(row) for row in cursor.fetchall()]
         conn.close()
         
-        return notes
+        return fulltext.ranked(notes) if search else notes
     
     def get_by_id(self, note_id: int) -> Optional[Dict[str, Any]]:
         """Obtiene una nota específica por su ID"""
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT * FROM notes WHERE id = ?", (note_id,))
+        scope, scope_params = self._scope()
+        cursor.execute(f"SELECT * FROM notes WHERE id = ?{scope}", (note_id,) + scope_params)
         row = cursor.fetchone()
         conn.close()
         
         return dict(row) if row else None
     
     def update(self, note_id: int, title: Optional[str] = None, 
-               content: Optional[str] = None, tags: Optional[str] = None) -> bool:
-        """Actualiza los campos de una nota"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-        
+               content: Optional[str] = None, tags: Optional[str] = None,
+               expected_version: Optional[int] = None) -> bool:
+        """Actualiza los campos de una nota (expected_version: ver OwnedModel)"""
         updates = []
         params = []
         
@@ -772,11 +1731,113 @@ class Note:
         if not updates:
             return False
         
-        updates.append("updated_at = CURRENT_TIMESTAMP")
-        params.append(note_id)
+        return self._update(note_id, ", ".join(updates), tuple(params), expected_version)
+    
+    def delete(self, note_id: int, expected_version: Optional[int] = None) -> bool:
+        """Elimina una nota"""
+        return self._delete(note_id, expected_version)
+
+
+class UserSettings:
+    """
+    Clase para gestionar la configuración de cada usuario.
+    Controla a qué hora y en qué zona horaria llegan sus recordatorios.
+    """
+    
+    # Campos que se pueden modificar desde el bot
+    EDITABLE_FIELDS = (
+        'daily_summary_time',
+        'evening_reminder_time',
+        'timezone',
+        'daily_summary_enabled',
+        'evening_reminder_enabled'
+    )
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+    
+    def get(self, user_id: int) -> Dict[str, Any]:
+        """
+        Obtiene la configuración de un usuario, creándola con valores
+        por defecto si todavía no existe.
         
-        query = f"UPDATE notes SET {', '.join(updates)} WHERE id = ?"
-        cursor.execute(query, params)
+        Args:
+            user_id: ID de Telegram del usuario
+            
+        Returns:
+            Diccionario con la configuración
+        """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("INSERT OR IGNORE INTO user_settings (user_id) VALUES (?)", (user_id,))
+        cursor.execute("SELECT * FROM user_settings WHERE user_id = ?", (user_id,))
+        row = cursor.fetchone()
+        
+        conn.commit()
+        conn.close()
+        
+        return dict(row)
+    
+    def get_all(self) -> List[Dict[str, Any]]:
+        """Obtiene la configuración de todos los usuarios autorizados"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT * FROM user_settings
+            WHERE user_id IN (SELECT user_id FROM authorized_users)
+            ORDER BY user_id
+        """)
+        settings = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        
+        return settings
+    
+    def update(self, user_id: int, data: Dict[str, Any]) -> bool:
+        """
+        Actualiza la configuración de un usuario.
+        
+        Args:
+            user_id: ID de Telegram del usuario
+            data: Campos a modificar (ver EDITABLE_FIELDS)
+            
+        Returns:
+            True si se actualizó correctamente
+        """
+        data = {key: value for key, value in data.items() if key in self.EDITABLE_FIELDS}
+        if not data:
+            return False
+        
+        for key in ('daily_summary_time', 'evening_reminder_time'):
+            if key in data:
+                try:
+                    datetime.strptime(data[key], "%H:%M")
+                except (TypeError, ValueError):
+                    print(f"ERROR: Hora inválida '{data[key]}'. Formato esperado: HH:MM")
+                    return False
+        
+        if 'timezone' in data:
+            try:
+                ZoneInfo(data['timezone'])
+            except (ZoneInfoNotFoundError, ValueError):
+                print(f"ERROR: Zona horaria desconocida '{data['timezone']}'")
+                return False
+        
+        self.get(user_id)  # Asegura que la fila existe
+        
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        set_clause = ", ".join([f"{key} = ?" for key in data.keys()])
+        values = list(data.values())
+        values.append(user_id)
+        
+        cursor.execute(f"""
+            UPDATE user_settings 
+            SET {set_clause}, updated_at = CURRENT_TIMESTAMP
+            WHERE user_id = ?
+        """, values)
         
         success = cursor.rowcount > 0
         conn.commit()
@@ -784,15 +1845,145 @@ class Note:
         
         return success
     
-    def delete(self, note_id: int) -> bool:
-        """Elimina una nota"""
+    def get_last_sent(self, user_id: int, kind: str) -> Optional[float]:
+        """
+        Obtiene cuándo se envió por última vez un recordatorio.
+        
+        Returns:
+            Timestamp UTC del último envío o None si nunca se envió
+        """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT last_sent_at FROM reminder_log 
+            WHERE user_id = ? AND kind = ?
+        """, (user_id, kind))
+        row = cursor.fetchone()
+        conn.close()
+        
+        return row['last_sent_at'] if row else None
+    
+    def mark_sent(self, user_id: int, kind: str, sent_at: float):
+        """Registra el envío de un recordatorio (timestamp UTC)"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO reminder_log (user_id, kind, last_sent_at) VALUES (?, ?, ?)
+            ON CONFLICT (user_id, kind) DO UPDATE SET last_sent_at = excluded.last_sent_at
+        """, (user_id, kind, sent_at))
+        
+        conn.commit()
+        conn.close()
+
+
+class AccessControl:
+    """
+    Lista de usuarios autorizados (allowlist) y su rol (admin o member).
+    Se consulta en cada mensaje, así que se guarda una copia en memoria.
+    """
+    
+    ROLES = ('admin', 'member')
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+        self._roles: Optional[Dict[int, str]] = None
+    
+    def _load(self) -> Dict[int, str]:
+        if self._roles is None:
+            conn = self.db.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT user_id, role FROM authorized_users")
+            self._roles = {row['user_id']: row['role'] for row in cursor.fetchall()}
+            conn.close()
+        
+        return self._roles
+    
+    def reload(self):
+        """Olvida los roles en memoria (se vuelven a leer tras restaurar una copia)"""
+        self._roles = None
+    
+    def get_role(self, user_id: int) -> Optional[str]:
+        """
+        Devuelve el rol del usuario o None si no está autorizado.
+        Sin modo multiusuario solo existe el usuario autorizado original.
+        """
+        if not config.MULTI_USER_MODE:
+            return 'admin' if user_id == config.AUTHORIZED_USER_ID else None
+        
+        return self._load().get(user_id)
+    
+    def is_allowed(self, user_id: int) -> bool:
+        return self.get_role(user_id) is not None
+    
+    def is_admin(self, user_id: int) -> bool:
+        return self.get_role(user_id) == 'admin'
+    
+    def add_user(self, user_id: int, role: str = 'member', added_by: Optional[int] = None) -> bool:
+        """
+        Autoriza a un usuario (o cambia su rol si ya lo estaba).
+        
+        Args:
+            user_id: ID de Telegram del usuario
+            role: 'admin' o 'member'
+            added_by: ID del administrador que lo autoriza
+            
+        Returns:
+            True si se guardó correctamente
+        """
+        if role not in self.ROLES:
+            print(f"ERROR: Rol inválido '{role}'. Roles válidos: {self.ROLES}")
+            return False
+        
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+        cursor.execute("""
+            INSERT INTO authorized_users (user_id, role, added_by)
+            VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET role = excluded.role
+        """, (user_id, role, added_by))
+        
+        conn.commit()
+        conn.close()
+        
+        self._roles = None
+        return True
+    
+    def remove_user(self, user_id: int) -> bool:
+        """Retira la autorización a un usuario (sus datos se conservan)"""
+        if user_id == config.AUTHORIZED_USER_ID:
+            print("ERROR: No se puede retirar el acceso al usuario autorizado original")
+            return False
+        
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM authorized_users WHERE user_id = ?", (user_id,))
         success = cursor.rowcount > 0
         
         conn.commit()
         conn.close()
         
-        return success
\ No newline at end of file
+        self._roles = None
+        return success
+    
+    def get_all(self) -> List[Dict[str, Any]]:
+        """Obtiene todos los usuarios autorizados"""
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM authorized_users ORDER BY created_at, user_id")
+        users = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        
+        return users
+    
+    def get_user_ids(self) -> List[int]:
+        """IDs de los usuarios que reciben los recordatorios"""
+        if not config.MULTI_USER_MODE:
+            return [config.AUTHORIZED_USER_ID]
+        
+        return sorted(self._load())
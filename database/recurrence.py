@@ -0,0 +1,298 @@
+"""
+Objetivos que se repiten
+Una regla de recurrencia en un objetivo ("cada día", "de lunes a viernes",
+"el día 1 de cada mes"...) crea sola la siguiente repetición: las tareas
+periódicas ya no hay que volver a crearlas a mano.
+
+EXPLICACIÓN:
+- La regla se guarda en tasks.recurrence con un subconjunto de RRULE
+  (RFC 5545): FREQ=DAILY|WEEKLY|MONTHLY|YEARLY, INTERVAL, BYDAY (semanal),
+  BYMONTHDAY (-1 = último día del mes), BYMONTH (anual), UNTIL=AAAAMMDD y
+  COUNT.
+- Nunca se crean repeticiones futuras por adelantado: de cada serie solo
+  existe la última creada, que es la que lleva la regla, y en
+  tasks.recurrence_next la fecha de la siguiente. Las anteriores se quedan
+  sin regla y con series_id (el id del primer objetivo de la serie).
+- La siguiente repetición se crea (Task.materialize_next) cuando:
+  1. se completa la actual, en la misma transacción, o
+  2. su fecha entra en el horizonte (hoy + RECURRENCE_HORIZON_DAYS): la
+     pasada programada (run_scheduled_recurrence) las encuentra con el índice
+     parcial sobre recurrence_next, sin leer ninguna regla más.
+- No se crean filas para fechas pasadas: tras días sin completarla o con el
+  bot apagado se salta directamente a la primera fecha desde hoy.
+- COUNT son las repeticiones que quedan contando la actual: cada una nueva
+  lleva la regla con COUNT uno menos. Las fechas que se saltan también
+  cuentan (como en RRULE, la serie acaba el mismo día se cree o no cada una).
+"""
+import calendar
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+import config
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+WEEKDAY_NAMES = ('lun', 'mar', 'mié', 'jue', 'vie', 'sáb', 'dom')
+
+# Unidad de cada frecuencia para describirla (singular, plural)
+FREQUENCY_UNITS = {
+    'DAILY': ('día', 'días'),
+    'WEEKLY': ('semana', 'semanas'),
+    'MONTHLY': ('mes', 'meses'),
+    'YEARLY': ('año', 'años'),
+}
+
+
+# ========== REGLAS ==========
+
+def parse(text: str) -> Dict[str, Any]:
+    """
+    Lee una regla ("FREQ=WEEKLY;BYDAY=MO,WE"). Acepta el prefijo "RRULE:"
+    y da igual mayúsculas o minúsculas.
+
+    Raises:
+        ValueError: Regla vacía, con partes desconocidas o valores no válidos
+    """
+    text = (text or '').strip().upper()
+    if text.startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+
+    parts = {}
+    for part in filter(None, text.split(';')):
+        key, sep, value = part.partition('=')
+        if not sep or not value:
+            raise ValueError(f"Parte de la regla no válida: {part}")
+        parts[key.strip()] = value.strip()
+
+    rule = {
+        'freq': parts.pop('FREQ', None),
+        'interval': _number(parts.pop('INTERVAL', '1'), 'INTERVAL', 1, 999),
+        'byday': None,
+        'bymonthday': None,
+        'bymonth': None,
+        'until': None,
+        'count': None,
+    }
+    if rule['freq'] not in FREQUENCIES:
+        raise ValueError(f"FREQ tiene que ser uno de: {', '.join(FREQUENCIES)}")
+
+    if 'BYDAY' in parts:
+        days = parts.pop('BYDAY').split(',')
+        if any(day not in WEEKDAYS for day in days):
+            raise ValueError(f"BYDAY solo admite: {','.join(WEEKDAYS)}")
+        rule['byday'] = tuple(sorted({WEEKDAYS.index(day) for day in days}))
+    if 'BYMONTHDAY' in parts:
+        rule['bymonthday'] = _number(parts.pop('BYMONTHDAY'), 'BYMONTHDAY', -1, 31)
+        if rule['bymonthday'] == 0:
+            raise ValueError("BYMONTHDAY no puede ser 0")
+    if 'BYMONTH' in parts:
+        rule['bymonth'] = _number(parts.pop('BYMONTH'), 'BYMONTH', 1, 12)
+    if 'UNTIL' in parts:
+        until = parts.pop('UNTIL')[:8]
+        try:
+            rule['until'] = date(int(until[:4]), int(until[4:6]), int(until[6:8]))
+        except ValueError:
+            raise ValueError("UNTIL tiene que ser una fecha AAAAMMDD")
+    if 'COUNT' in parts:
+        rule['count'] = _number(parts.pop('COUNT'), 'COUNT', 1, 9999)
+
+    if parts:
+        raise ValueError(f"Partes de la regla no admitidas: {', '.join(parts)}")
+    if rule['byday'] and rule['freq'] != 'WEEKLY':
+        raise ValueError("BYDAY solo se admite con FREQ=WEEKLY")
+    if rule['bymonthday'] and rule['freq'] not in ('MONTHLY', 'YEARLY'):
+        raise ValueError("BYMONTHDAY solo se admite con FREQ=MONTHLY o YEARLY")
+    if rule['bymonth'] and rule['freq'] != 'YEARLY':
+        raise ValueError("BYMONTH solo se admite con FREQ=YEARLY")
+    return rule
+
+
+def _number(value: str, name: str, low: int, high: int) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} tiene que ser un número")
+    if not low <= number <= high:
+        raise ValueError(f"{name} tiene que estar entre {low} y {high}")
+    return number
+
+
+def format_rule(rule: Dict[str, Any]) -> str:
+    """La regla como texto RRULE (siempre en el mismo orden)"""
+    parts = [f"FREQ={rule['freq']}"]
+    if rule['interval'] != 1:
+        parts.append(f"INTERVAL={rule['interval']}")
+    if rule['byday']:
+        parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in rule['byday']))
+    if rule['bymonth']:
+        parts.append(f"BYMONTH={rule['bymonth']}")
+    if rule['bymonthday']:
+        parts.append(f"BYMONTHDAY={rule['bymonthday']}")
+    if rule['until']:
+        parts.append(f"UNTIL={rule['until'].strftime('%Y%m%d')}")
+    if rule['count']:
+        parts.append(f"COUNT={rule['count']}")
+    return ";".join(parts)
+
+
+def prepare(text: str, start: date) -> str:
+    """
+    Valida una regla y fija lo que depende de la primera fecha: "cada semana"
+    pasa a ser ese día de la semana y "cada mes", ese día del mes. Así la
+    serie no se desplaza (del 31 de enero se pasa al 28 de febrero, pero
+    después vuelve al 31 de marzo).
+
+    Raises:
+        ValueError: La regla no es válida
+    """
+    rule = parse(text)
+    if rule['freq'] == 'WEEKLY' and not rule['byday']:
+        rule['byday'] = (start.weekday(),)
+    elif rule['freq'] in ('MONTHLY', 'YEARLY') and not rule['bymonthday']:
+        rule['bymonthday'] = start.day
+    if rule['freq'] == 'YEARLY' and not rule['bymonth']:
+        rule['bymonth'] = start.month
+    return format_rule(rule)
+
+
+# ========== FECHAS ==========
+
+def next_date(text: str, after: date) -> Optional[date]:
+    """
+    Fecha de la repetición que sigue a la de after. None si la serie se
+    acaba ahí (UNTIL o la última de COUNT).
+    """
+    rule = parse(text)
+    if rule['count'] == 1:
+        return None
+    return _within(rule, _step(rule, after))
+
+
+def catch_up(text: str, due: date, today: date) -> Optional[Tuple[date, str]]:
+    """
+    Siguiente repetición de la serie de text, empezando en due (la que
+    tocaba): las fechas anteriores a today se saltan.
+
+    Returns:
+        (fecha, regla que lleva la nueva repetición), con COUNT descontando
+        la nueva y cada fecha saltada. None si la serie terminó mientras tanto
+    """
+    rule = parse(text)
+    skipped = 0
+    while due < today:
+        due = _step(rule, due)
+        skipped += 1
+
+    if rule['count']:
+        rule['count'] -= 1 + skipped
+        if rule['count'] < 1:
+            return None
+    if _within(rule, due) is None:
+        return None
+    return due, format_rule(rule)
+
+
+def _within(rule: Dict[str, Any], day: date) -> Optional[date]:
+    return None if rule['until'] and day > rule['until'] else day
+
+
+def _step(rule: Dict[str, Any], after: date) -> date:
+    """Siguiente fecha de la regla estrictamente posterior a after"""
+    interval = rule['interval']
+
+    if rule['freq'] == 'DAILY':
+        return after + timedelta(days=interval)
+
+    if rule['freq'] == 'WEEKLY':
+        byday = rule['byday'] or (after.weekday(),)
+        week_start = after - timedelta(days=after.weekday())
+        for weekday in byday:
+            day = week_start + timedelta(days=weekday)
+            if day > after:
+                return day
+        return week_start + timedelta(weeks=interval, days=byday[0])
+
+    if rule['freq'] == 'MONTHLY':
+        month_index = after.year * 12 + after.month - 1
+        while True:
+            year, month = divmod(month_index, 12)
+            day = _month_day(year, month + 1, rule['bymonthday'] or after.day)
+            if day > after:
+                return day
+            month_index += interval
+
+    year = after.year
+    while True:
+        day = _month_day(year, rule['bymonth'] or after.month, rule['bymonthday'] or after.day)
+        if day > after:
+            return day
+        year += interval
+
+
+def _month_day(year: int, month: int, month_day: int) -> date:
+    """Día del mes; -1 es el último y los que no existen (31 de abril) pasan al último"""
+    last = calendar.monthrange(year, month)[1]
+    return date(year, month, last if month_day < 0 else min(month_day, last))
+
+
+# ========== TEXTO ==========
+
+def describe(text: Optional[str]) -> str:
+    """Regla en palabras: "cada 2 semanas (lun, jue), hasta el 31/12/2026" """
+    try:
+        rule = parse(text)
+    except ValueError:
+        return "regla no válida"
+
+    singular, plural = FREQUENCY_UNITS[rule['freq']]
+    result = f"cada {singular}" if rule['interval'] == 1 else f"cada {rule['interval']} {plural}"
+
+    if rule['byday'] == (0, 1, 2, 3, 4) and rule['interval'] == 1:
+        result = "de lunes a viernes"
+    elif rule['byday']:
+        result += " (" + ", ".join(WEEKDAY_NAMES[day] for day in rule['byday']) + ")"
+    elif rule['freq'] == 'MONTHLY' and rule['bymonthday']:
+        result += " (último día)" if rule['bymonthday'] < 0 else f" (día {rule['bymonthday']})"
+    elif rule['freq'] == 'YEARLY' and rule['bymonthday'] and rule['bymonth']:
+        result += f" ({rule['bymonthday']:02d}/{rule['bymonth']:02d})"
+
+    if rule['until']:
+        result += f", hasta el {rule['until'].strftime('%d/%m/%Y')}"
+    if rule['count']:
+        result += ", última vez" if rule['count'] == 1 else f", quedan {rule['count']}"
+    return result
+
+
+# ========== PASADA PROGRAMADA ==========
+
+def run_scheduled_recurrence():
+    """
+    Crea las repeticiones que ya entran en el horizonte (main.py la registra
+    cada RECURRENCE_INTERVAL_HOURS). Es síncrona: APScheduler la ejecuta en su
+    pool de hilos, fuera del event loop.
+    """
+    from logger_config import setup_logger
+    from database.archive import ArchiveManager
+    from database.models import Task
+    logger = setup_logger('recurrence')
+
+    until = (date.today() + timedelta(days=config.RECURRENCE_HORIZON_DAYS)).strftime("%Y-%m-%d")
+    created = 0
+    try:
+        for database in ArchiveManager().databases():
+            # Cada repetición creada puede volver a caer en el horizonte
+            # (las diarias con un horizonte de varios días): se repite la
+            # consulta hasta que no quede ninguna
+            while True:
+                due = Task(database).get_due_recurrences(until)
+                for series in due:
+                    if Task(database, series['owner_id']).materialize_next(series['id']):
+                        created += 1
+                if len(due) < config.RECURRENCE_BATCH_SIZE:
+                    break
+    except Exception as e:
+        logger.error(f"❌ Pasada de objetivos periódicos fallida: {e}")
+        return
+
+    if created:
+        logger.info(f"🔁 Creadas {created} repetición(es) de objetivos periódicos (hasta {until})")
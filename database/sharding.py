@@ -0,0 +1,299 @@
+"""
+Almacenamiento por usuario (STORAGE_MODE = 'per_user')
+Cada usuario guarda sus proyectos, tareas y notas en su propio archivo SQLite.
+
+EXPLICACIÓN: Con una sola base de datos, la escritura de un usuario bloquea
+el archivo entero y los demás esperan. Con un archivo por usuario los bloqueos
+no se cruzan, y exportar, hacer backup o borrar los datos de alguien es una
+operación sobre un solo archivo.
+
+Las conexiones abiertas se reutilizan desde un LRU de tamaño limitado:
+las que llevan un rato sin usarse se cierran solas, y si hay demasiadas
+abiertas se cierra la que hace más tiempo que no se usa.
+
+La configuración, la allowlist y los trabajos programados siguen en la base
+de datos principal (config.DATABASE_PATH). Cada archivo de usuario la tiene
+adjunta (ATTACH), así que las consultas a esas tablas funcionan igual.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import config
+from database import fulltext
+from database.models import DatabaseManager
+from database.tracing import TracedConnection
+
+
+class PooledConnection(TracedConnection):
+    """
+    Conexión que, al cerrarla, vuelve al pool en lugar de cerrarse.
+    Los modelos siguen haciendo conn.close() como siempre.
+    """
+
+    def close(self):
+        pool = getattr(self, 'pool', None)
+        if pool is None:
+            super().close()
+            return
+
+        if self.in_transaction:
+            self.rollback()  # Igual que al cerrar: lo no confirmado se descarta
+        pool.release(self)
+
+    def close_for_real(self):
+        super().close()
+
+
+class ConnectionPool:
+    """
+    LRU de conexiones abiertas, una por archivo.
+
+    Una conexión en uso no se comparte: si se pide otra vez el mismo archivo
+    antes de devolverla, se abre una conexión extra que se cierra al terminar.
+    """
+
+    def __init__(self, max_open: int = config.SHARD_MAX_OPEN_CONNECTIONS,
+                 idle_timeout: float = config.SHARD_IDLE_TIMEOUT,
+                 attach_path: Optional[str] = None):
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self.attach_path = attach_path
+
+        # Conexiones libres: ruta -> (conexión, último uso). La primera es la menos reciente.
+        self._idle: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_use = set()  # Rutas con su conexión prestada
+        self._lock = threading.Lock()
+
+    def acquire(self, path: str) -> sqlite3.Connection:
+        """Presta la conexión de un archivo (la abre si no está en el pool)"""
+        with self._lock:
+            self._evict_idle()
+
+            if path in self._idle:
+                conn, _ = self._idle.pop(path)
+                self._in_use.add(path)
+                return conn
+
+            pooled = path not in self._in_use
+            if pooled:
+                self._in_use.add(path)
+
+        return self._open(path, pooled)
+
+    def release(self, conn: PooledConnection):
+        """Devuelve una conexión al pool"""
+        with self._lock:
+            self._in_use.discard(conn.path)
+            self._idle[conn.path] = (conn, time.monotonic())
+
+            while len(self._idle) > self.max_open:
+                _, (oldest, _) = self._idle.popitem(last=False)
+                oldest.close_for_real()
+
+    def close(self, path: str):
+        """Cierra la conexión libre de un archivo (antes de borrarlo, por ejemplo)"""
+        with self._lock:
+            entry = self._idle.pop(path, None)
+        if entry:
+            entry[0].close_for_real()
+
+    def close_all(self):
+        with self._lock:
+            entries = list(self._idle.values())
+            self._idle.clear()
+        for conn, _ in entries:
+            conn.close_for_real()
+
+    def __len__(self):
+        return len(self._idle) + len(self._in_use)
+
+    def _evict_idle(self):
+        """Cierra las conexiones que llevan más de idle_timeout sin usarse"""
+        limit = time.monotonic() - self.idle_timeout
+
+        while self._idle:
+            path, (conn, last_used) = next(iter(self._idle.items()))
+            if last_used > limit:
+                break
+            del self._idle[path]
+            conn.close_for_real()
+
+    def _open(self, path: str, pooled: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, factory=PooledConnection, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        fulltext.register(conn)
+        conn.path = path
+        conn.pool = self if pooled else None
+
+        if self.attach_path:
+            conn.execute("ATTACH DATABASE ? AS global", (self.attach_path,))
+
+        return conn
+
+
+class UserShard(DatabaseManager):
+    """
+    Gestor de base de datos de un solo usuario.
+    Se usa igual que DatabaseManager, así que los modelos no cambian.
+    """
+
+    def __init__(self, db_path: str, user_id: int, pool: ConnectionPool):
+        self.user_id = user_id
+        self.pool = pool
+        super().__init__(db_path)
+
+    def get_connection(self):
+        return self.pool.acquire(self.db_path)
+
+    def for_user(self, user_id: int) -> DatabaseManager:
+        return get_user_shard(user_id)
+
+    def init_database(self):
+        """Solo las tablas de datos: el resto está en la base de datos principal"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        self._create_data_tables(cursor)
+
+        conn.commit()
+        conn.close()
+
+
+class ShardRegistry:
+    """
+    Sabe dónde está el archivo de cada usuario y gestiona el pool de conexiones.
+    """
+
+    FILE_PATTERN = re.compile(r'^user_(\d+)\.db$')
+
+    def __init__(self, directory: str = config.SHARD_DIRECTORY,
+                 main_db_path: str = config.DATABASE_PATH):
+        self.directory = directory
+        self.main_db_path = main_db_path
+        self.pool = ConnectionPool(attach_path=main_db_path)
+
+        self._shards: Dict[int, UserShard] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def shard_path(self, user_id: int) -> str:
+        return os.path.join(self.directory, f"user_{user_id}.db")
+
+    def get(self, user_id: int) -> UserShard:
+        """Devuelve el gestor de un usuario, creando su archivo si no existe"""
+        shard = self._shards.get(user_id)
+        if shard:
+            return shard
+
+        with self._lock:
+            if user_id not in self._shards:
+                self._shards[user_id] = UserShard(self.shard_path(user_id), user_id, self.pool)
+            return self._shards[user_id]
+
+    def list_user_ids(self) -> List[int]:
+        """IDs de los usuarios que tienen archivo propio"""
+        user_ids = []
+        for name in os.listdir(self.directory):
+            match = self.FILE_PATTERN.match(name)
+            if match:
+                user_ids.append(int(match.group(1)))
+        return sorted(user_ids)
+
+    def backup_user(self, user_id: int, destination: str):
+        """Copia consistente del archivo de un usuario (API de backup de SQLite, por pasos)"""
+        from database.backup import copy_database
+        self.get(user_id)  # Crea el archivo con sus tablas si todavía no existe
+        copy_database(self.shard_path(user_id), destination)
+
+    def delete_user(self, user_id: int) -> bool:
+        """Borra todos los datos de un usuario eliminando su archivo"""
+        path = self.shard_path(user_id)
+
+        with self._lock:
+            self._shards.pop(user_id, None)
+        self.pool.close(path)
+
+        if not os.path.exists(path):
+            return False
+
+        os.remove(path)
+        return True
+
+    def migrate_shared_data(self) -> int:
+        """
+        Mueve los proyectos, tareas y notas (y lo archivado) de la base de datos
+        compartida a los archivos de cada usuario (al pasar de 'shared' a 'per_user').
+        Cada usuario se mueve en una sola transacción: o se copia todo o nada.
+
+        Returns:
+            Número de usuarios migrados
+        """
+        conn = sqlite3.connect(self.main_db_path)
+        conn.row_factory = sqlite3.Row
+        fulltext.register(conn)  # Los triggers del índice de búsqueda la necesitan
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT owner_id FROM projects
+            UNION SELECT owner_id FROM tasks
+            UNION SELECT owner_id FROM notes
+            UNION SELECT owner_id FROM tasks_archive
+            UNION SELECT owner_id FROM projects_archive
+        """)
+        owner_ids = [row['owner_id'] for row in cursor.fetchall() if row['owner_id'] is not None]
+
+        for owner_id in owner_ids:
+            self.get(owner_id)  # Crea el archivo con sus tablas
+            cursor.execute("ATTACH DATABASE ? AS shard", (self.shard_path(owner_id),))
+
+            try:
+                # Las dependencias antes que los objetivos: al borrarlos de la
+                # compartida, su trigger se lleva también las dependencias
+                for table in ('task_dependencies', 'projects', 'tasks', 'notes',
+                              'projects_archive', 'tasks_archive', 'archive_rollups'):
+                    cursor.execute(f"PRAGMA main.table_info({table})")
+                    columns = ", ".join(row['name'] for row in cursor.fetchall())
+
+                    cursor.execute(f"""
+                        INSERT OR IGNORE INTO shard.{table} ({columns})
+                        SELECT {columns} FROM main.{table} WHERE owner_id = ?
+                    """, (owner_id,))
+                    cursor.execute(f"DELETE FROM main.{table} WHERE owner_id = ?", (owner_id,))
+
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"❌ Error al migrar los datos del usuario {owner_id}: {e}")
+            finally:
+                cursor.execute("DETACH DATABASE shard")
+
+        conn.close()
+
+        if owner_ids:
+            print(f"✅ Datos de {len(owner_ids)} usuario(s) movidos a archivos propios")
+
+        return len(owner_ids)
+
+
+_registry: Optional[ShardRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ShardRegistry:
+    """Registro único de archivos de usuario (se crea la primera vez)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ShardRegistry()
+    return _registry
+
+
+def get_user_shard(user_id: int) -> UserShard:
+    return get_registry().get(user_id)
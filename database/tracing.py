@@ -0,0 +1,245 @@
+"""
+Trazas de las consultas SQL
+Registra qué consultas se ejecutan, cuántas veces, cuánto tardan y cuántas
+filas devuelven, y deja en logs/sql.log las que superan SQL_SLOW_QUERY_MS.
+
+EXPLICACIÓN: Todas las conexiones de DatabaseManager son TracedConnection.
+- Los cursores miden execute() y también los fetch*(): SQLite va leyendo
+  las filas a medida que se piden, así que parte del trabajo ocurre ahí.
+- set_trace_callback recoge las sentencias que no pasan por un cursor
+  (BEGIN implícitos, sentencias de triggers...).
+
+Las consultas se agrupan por su forma "normalizada": sin literales ni
+espacios de más, y con las listas IN (?, ?, ?) reducidas a IN (?+).
+Para las lentas se guarda la forma de los parámetros (tipos, no valores):
+así el log no contiene datos de los usuarios.
+"""
+import functools
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import config
+
+# ========== NORMALIZACIÓN ==========
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Forma canónica de una consulta para agruparla con las demás iguales"""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(?+)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def parameter_shape(parameters: Any) -> str:
+    """Tipos de los parámetros: (int, str, None) o {owner_id: int}"""
+    if isinstance(parameters, _Shape):
+        return parameters
+    if parameters is None:
+        return "()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {_type_name(value)}" for key, value in parameters.items()) + "}"
+    try:
+        return "(" + ", ".join(_type_name(value) for value in parameters) + ")"
+    except TypeError:
+        return _type_name(parameters)
+
+
+def _type_name(value: Any) -> str:
+    return "None" if value is None else type(value).__name__
+
+
+# ========== ESTADÍSTICAS ==========
+
+class QueryStats:
+    """Contadores por consulta normalizada"""
+
+    def __init__(self):
+        self._queries: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._slow_logger = None
+
+    def record(self, sql: str, elapsed: float = 0.0, rows: int = 0, executions: int = 1):
+        key = normalize_sql(sql)
+        with self._lock:
+            entry = self._queries.get(key)
+            if entry is None:
+                entry = self._queries[key] = {'count': 0, 'total': 0.0, 'max': 0.0, 'rows': 0}
+            entry['count'] += executions
+            entry['total'] += elapsed
+            entry['max'] = max(entry['max'], elapsed)
+            entry['rows'] += rows
+
+    def record_progress(self, sql: str, extra: float, rows: int, statement_total: float):
+        """Suma el tiempo y las filas de un fetch a la ejecución en curso"""
+        key = normalize_sql(sql)
+        with self._lock:
+            entry = self._queries.get(key)
+            if entry is None:
+                return
+            entry['total'] += extra
+            entry['rows'] += rows
+            entry['max'] = max(entry['max'], statement_total)
+
+    def top(self, limit: int = 10, order_by: str = 'total') -> List[Dict[str, Any]]:
+        """Consultas ordenadas por tiempo acumulado (o por 'count', 'max', 'rows')"""
+        with self._lock:
+            rows = [dict(entry, sql=sql) for sql, entry in self._queries.items()]
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return rows[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._queries.clear()
+
+    def log_slow(self, sql: str, parameters: Any, elapsed: float):
+        if self._slow_logger is None:
+            from logger_config import setup_logger
+            self._slow_logger = setup_logger('sql')
+        self._slow_logger.warning(
+            f"🐢 Consulta lenta ({elapsed * 1000:.1f} ms) {normalize_sql(sql)} "
+            f"parámetros={parameter_shape(parameters)}"
+        )
+
+    def format_report(self, limit: int = config.SQL_REPORT_TOP) -> str:
+        """Informe de texto de las consultas con más tiempo acumulado"""
+        lines = [f"Top {limit} consultas por tiempo acumulado:"]
+        for i, row in enumerate(self.top(limit), 1):
+            avg = row['total'] / row['count'] if row['count'] else 0.0
+            lines.append(
+                f"{i:2}. {row['total'] * 1000:9.1f} ms total | {row['count']:6} veces | "
+                f"media {avg * 1000:.2f} ms | máx {row['max'] * 1000:.1f} ms | "
+                f"{row['rows']} filas | {row['sql'][:160]}"
+            )
+        return "\n".join(lines)
+
+
+query_stats = QueryStats()
+
+
+def log_report():
+    """Escribe el informe de las consultas más costosas en logs/sql.log"""
+    from logger_config import setup_logger
+    setup_logger('sql').info(query_stats.format_report())
+
+
+# ========== CONEXIONES Y CURSORES ==========
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor que mide cada sentencia, incluidas sus lecturas"""
+
+    _current_sql: Optional[str] = None
+    _current_params: Any = None
+    _current_elapsed = 0.0
+    _slow_logged = False
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        self.connection._in_cursor = True
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection._in_cursor = False
+            self._begin(sql, parameters, time.perf_counter() - start, executions=1)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        self.connection._in_cursor = True
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection._in_cursor = False
+            shape = f"{len(seq_of_parameters)} × {parameter_shape(seq_of_parameters[0])}" \
+                if seq_of_parameters else "0 ×"
+            self._begin(sql, _Shape(shape), time.perf_counter() - start,
+                        executions=max(1, len(seq_of_parameters)))
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._progress(time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._progress(time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._progress(time.perf_counter() - start, len(rows))
+        return rows
+
+    def _begin(self, sql, parameters, elapsed, executions):
+        self._current_sql = sql
+        self._current_params = parameters
+        self._current_elapsed = elapsed
+        self._slow_logged = False
+
+        query_stats.record(sql, elapsed, executions=executions)
+        self._progress(0.0, 0)
+
+    def _progress(self, extra, rows):
+        if self._current_sql is None:
+            return
+
+        self._current_elapsed += extra
+        query_stats.record_progress(self._current_sql, extra, rows, self._current_elapsed)
+
+        # Se registra una sola vez por ejecución, cuando cruza el umbral
+        if not self._slow_logged and self._current_elapsed * 1000 >= config.SQL_SLOW_QUERY_MS:
+            self._slow_logged = True
+            query_stats.log_slow(self._current_sql, self._current_params, self._current_elapsed)
+
+
+class _Shape(str):
+    """Forma ya calculada de los parámetros de un executemany"""
+
+
+class TracedConnection(sqlite3.Connection):
+    """
+    Conexión cuyos cursores miden cada consulta (si SQL_TRACE_ENABLED).
+    Connection.execute() también crea el cursor con cursor(), así que
+    conn.execute(...) queda medido igual que cursor.execute(...).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._in_cursor = False
+        self._traced = config.SQL_TRACE_ENABLED
+
+        if self._traced:
+            self.set_trace_callback(self._on_statement)
+
+    def cursor(self, factory=None):
+        if factory is None and self._traced:
+            factory = TracedCursor
+        return super().cursor(factory) if factory else super().cursor()
+
+    def commit(self):
+        if not self._traced:
+            return super().commit()
+        start = time.perf_counter()
+        self._in_cursor = True
+        try:
+            return super().commit()
+        finally:
+            self._in_cursor = False
+            query_stats.record("COMMIT", time.perf_counter() - start)
+
+    def _on_statement(self, statement: str):
+        # Lo que pasa por un cursor o por commit() ya se mide allí (BEGIN implícito incluido)
+        if not self._in_cursor:
+            query_stats.record(statement)
@@ -1,6 +1,65 @@
 """
 Paquete de handlers
+
+Los módulos no se importan al importar el paquete: main.py declara cada
+handler con lazy_handler('modulo.funcion') y el módulo se carga la primera
+vez que llega un update para él. Así el arranque no paga la importación
+(ni la inicialización) de los handlers que todavía nadie ha usado.
 """
-from . import menu, projects, tasks, notes, dashboard, settings, task_conversations, project_conversations
+import importlib
+
+import config
+
+HANDLER_MODULES = (
+    'menu', 'projects', 'tasks', 'notes', 'dashboard', 'settings',
+    'task_conversations', 'project_conversations', 'access', 'stats', 'backups',
+    'inline',
+)
+
+__all__ = list(HANDLER_MODULES) + ['lazy_handler', 'preload_handlers']
+
+
+def _resolve(target: str):
+    module_name, function_name = target.rsplit('.', 1)
+    module = importlib.import_module(f"{__name__}.{module_name}")
+    return getattr(module, function_name)
+
+
+def lazy_handler(target: str):
+    """
+    Devuelve un callback que importa el handler al usarse por primera vez.
+    
+    Args:
+        target: 'modulo.funcion' dentro del paquete handlers (ej: 'tasks.view_task')
+    
+    Con LAZY_HANDLERS = False el handler se importa en el momento.
+    """
+    if not config.LAZY_HANDLERS:
+        return _resolve(target)
+    
+    handler = None
+    
+    async def callback(update, context):
+        nonlocal handler
+        if handler is None:
+            handler = _resolve(target)
+        return await handler(update, context)
+    
+    # Mismo nombre que el handler real (las métricas de /stats lo usan como etiqueta)
+    callback.__name__ = target.rsplit('.', 1)[1]
+    callback.__qualname__ = target
+    callback.lazy_target = target
+    return callback
+
+
+def preload_handlers():
+    """Importa todos los módulos de handlers (para medir o precalentar el arranque)"""
+    for module_name in HANDLER_MODULES:
+        importlib.import_module(f"{__name__}.{module_name}")
+
 
-__all__ = ['menu', 'projects', 'tasks', 'notes', 'dashboard', 'settings', 'task_conversations', 'project_conversations']
\ No newline at end of file
+def __getattr__(name):
+    # handlers.tasks sigue funcionando aunque no se haya importado antes
+    if name in HANDLER_MODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,125 @@
+"""
+Handler de control de acceso
+Decide quién puede usar el bot y permite al administrador gestionar la allowlist
+"""
+from telegram import Update
+from telegram.ext import ContextTypes, ApplicationHandlerStop
+from telegram.constants import ParseMode
+
+import config
+from database.models import DatabaseManager, AccessControl, UserSettings
+
+# Inicializar gestores
+db_manager = DatabaseManager()
+access_control = AccessControl(db_manager)
+settings_manager = UserSettings(db_manager)
+
+
+async def check_access(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Se ejecuta antes que cualquier otro handler (grupo -1).
+    Si el usuario no está en la allowlist se corta el procesamiento del update.
+    """
+    user = update.effective_user
+
+    if user and access_control.is_allowed(user.id):
+        return
+
+    print(f"⛔ Acceso denegado a {user.id if user else 'desconocido'}")
+
+    if update.callback_query:
+        await update.callback_query.answer("❌ No estás autorizado para usar este bot.", show_alert=True)
+    elif update.effective_message:
+        await update.effective_message.reply_text(
+            "❌ Lo siento, no estás autorizado para usar este bot."
+        )
+
+    raise ApplicationHandlerStop
+
+
+async def allow_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Autoriza a un usuario. Uso: /allow <user_id> [admin]
+    Solo para administradores.
+    """
+    if not await _require_admin(update):
+        return
+
+    try:
+        user_id = int(context.args[0])
+        role = context.args[1] if len(context.args) > 1 else 'member'
+    except (IndexError, ValueError):
+        await update.message.reply_text("Uso: /allow <user_id> [admin]")
+        return
+
+    if not access_control.add_user(user_id, role, added_by=update.effective_user.id):
+        await update.message.reply_text(f"❌ Rol no válido. Usa: {', '.join(AccessControl.ROLES)}")
+        return
+
+    # Crear su configuración por defecto y programar sus recordatorios
+    settings_manager.get(user_id)
+    scheduler = context.application.bot_data.get('reminder_scheduler')
+    if scheduler:
+        scheduler.reschedule_user(user_id)
+
+    await update.message.reply_text(
+        f"✅ Usuario <code>{user_id}</code> autorizado ({role})",
+        parse_mode=ParseMode.HTML
+    )
+
+
+async def revoke_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Retira el acceso a un usuario. Uso: /revoke <user_id>
+    Sus datos se conservan por si se le vuelve a autorizar.
+    """
+    if not await _require_admin(update):
+        return
+
+    try:
+        user_id = int(context.args[0])
+    except (IndexError, ValueError):
+        await update.message.reply_text("Uso: /revoke <user_id>")
+        return
+
+    if not access_control.remove_user(user_id):
+        await update.message.reply_text("❌ Ese usuario no está autorizado o no se puede retirar")
+        return
+
+    scheduler = context.application.bot_data.get('reminder_scheduler')
+    if scheduler:
+        scheduler.remove_user(user_id)
+
+    await update.message.reply_text(
+        f"🚫 Acceso retirado a <code>{user_id}</code>",
+        parse_mode=ParseMode.HTML
+    )
+
+
+async def list_users(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Muestra los usuarios autorizados. Solo para administradores."""
+    if not await _require_admin(update):
+        return
+
+    users = access_control.get_all()
+    lines = ["👥 <b>Usuarios autorizados</b>", ""]
+
+    for user in users:
+        emoji = "👑" if user['role'] == 'admin' else "👤"
+        lines.append(f"{emoji} <code>{user['user_id']}</code> ({user['role']})")
+
+    await update.message.reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
+
+
+async def _require_admin(update: Update) -> bool:
+    if not config.MULTI_USER_MODE:
+        await update.message.reply_text(
+            "ℹ️ El modo multiusuario está desactivado (MULTI_USER_MODE en config.py)"
+        )
+        return False
+
+    if not access_control.is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Solo un administrador puede hacer esto.")
+        return False
+
+    return True
@@ -0,0 +1,208 @@
+"""
+Handler de copias de seguridad
+Comandos de administrador para hacer, listar, comprobar y restaurar copias (/backup, /restore)
+"""
+import asyncio
+import html
+import re
+import sys
+from datetime import datetime
+
+from telegram import Update
+from telegram.ext import ContextTypes
+from telegram.constants import ParseMode
+
+import config
+from database.backup import BackupManager, format_size
+from handlers.access import access_control
+from utils.keyboards import get_confirmation_keyboard
+from utils.task_graph import get_task_graph
+
+# Inicializar gestores
+backup_manager = BackupManager()
+
+# Copias que se muestran en /backup
+BACKUP_LIST_ROWS = 10
+
+# Formato del callback: backup_restore_{copia}[-{usuario}]_{confirmed|cancelled}
+RESTORE_CALLBACK = re.compile(r'^backup_restore_(\d{8}_\d{6}(?:_\d+)?)(?:-(\d+))?_(confirmed|cancelled)$')
+
+
+async def backup_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Uso: /backup (lista), /backup now (copia ahora), /backup verify <copia>.
+    Solo para administradores.
+    """
+    if not access_control.is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Solo un administrador puede hacer esto.")
+        return
+
+    args = context.args or []
+    loop = asyncio.get_running_loop()
+
+    if args and args[0] == 'now':
+        status = await update.message.reply_text("⏳ Haciendo la copia de seguridad...")
+        try:
+            # La copia es síncrona (y pausa entre pasos): se hace en un hilo aparte
+            manifest = await loop.run_in_executor(None, backup_manager.create, "manual")
+        except Exception as e:
+            await status.edit_text(f"❌ No se pudo hacer la copia: {e}")
+            return
+
+        print(f"💾 Copia de seguridad {manifest['name']} creada en {manifest['seconds']:.1f} s")
+        await status.edit_text(_describe_backup(manifest), parse_mode=ParseMode.HTML)
+        return
+
+    if args and args[0] == 'verify':
+        if len(args) < 2:
+            await update.message.reply_text("Uso: /backup verify <copia>")
+            return
+        try:
+            problems = await loop.run_in_executor(None, backup_manager.verify, args[1])
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}")
+            return
+
+        if problems:
+            await update.message.reply_text(
+                "❌ <b>La copia tiene problemas</b>\n\n" + "\n".join(f"• {html.escape(p)}" for p in problems),
+                parse_mode=ParseMode.HTML
+            )
+        else:
+            await update.message.reply_text(f"✅ La copia {args[1]} está completa y se puede restaurar.")
+        return
+
+    await update.message.reply_text(_format_backup_list(), parse_mode=ParseMode.HTML)
+
+
+async def restore_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Uso: /restore <copia> [id de usuario]. Pide confirmación antes de restaurar."""
+    if not access_control.is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Solo un administrador puede hacer esto.")
+        return
+
+    args = context.args or []
+    if not args:
+        await update.message.reply_text(
+            "Uso: /restore &lt;copia&gt; [id de usuario]\n\nCopias disponibles en /backup",
+            parse_mode=ParseMode.HTML
+        )
+        return
+
+    name = args[0]
+    try:
+        manifest = backup_manager.get(name)
+        user_id = int(args[1]) if len(args) > 1 else None
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+
+    files = [entry['name'] for entry in manifest['files']]
+    if user_id is not None:
+        files = [file_name for file_name in files if file_name == f"users/user_{user_id}.db"]
+        if not files:
+            await update.message.reply_text(f"❌ La copia {name} no tiene datos propios del usuario {user_id}.")
+            return
+
+    item = name if user_id is None else f"{name}-{user_id}"
+    await update.message.reply_text(
+        f"⚠️ <b>Restaurar la copia {name}</b>\n\n"
+        f"Se sustituirán los datos actuales de: {', '.join(files)}\n"
+        "Antes se guardará una copia del estado actual.\n\n"
+        "¿Continuar?",
+        parse_mode=ParseMode.HTML,
+        reply_markup=get_confirmation_keyboard("backup_restore", item)
+    )
+
+
+async def restore_confirmed(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Restaura la copia tras la confirmación del administrador"""
+    query = update.callback_query
+
+    if not access_control.is_admin(update.effective_user.id):
+        await query.answer("❌ Solo un administrador puede hacer esto.", show_alert=True)
+        return
+
+    match = RESTORE_CALLBACK.match(query.data)
+    if not match:
+        await query.answer("❌ Error en los datos", show_alert=True)
+        return
+
+    await query.answer()
+    name, user_id, decision = match.group(1), match.group(2), match.group(3)
+
+    if decision == 'cancelled':
+        await query.edit_message_text("❌ Restauración cancelada.")
+        return
+
+    await query.edit_message_text(f"⏳ Restaurando la copia {name}...")
+
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(
+            None, backup_manager.restore, name, int(user_id) if user_id else None
+        )
+    except Exception as e:
+        print(f"❌ Error al restaurar la copia {name}: {e}")
+        await query.edit_message_text(f"❌ No se pudo restaurar: {e}")
+        return
+
+    # Los datos han cambiado por debajo: roles, recordatorios y alertas se vuelven a leer
+    access_control.reload()
+    for service in ('reminder_scheduler', 'deadline_alerts'):
+        if context.application.bot_data.get(service):
+            context.application.bot_data[service].reload()
+    
+    # El índice de la búsqueda inline se vuelve a cargar al buscar. Solo existe
+    # si ya se importó handlers/inline.py (se carga con la primera consulta)
+    inline = sys.modules.get('handlers.inline')
+    if inline is not None:
+        inline.search_index.forget(int(user_id) if user_id else None)
+    
+    # Los grafos de dependencias también (se vuelven a cargar al usarlos)
+    get_task_graph().forget(int(user_id) if user_id else None)
+
+    print(f"♻️ Copia {name} restaurada ({', '.join(result['restored'])})")
+    await query.edit_message_text(
+        f"✅ <b>Copia {name} restaurada</b>\n\n"
+        f"Archivos: {', '.join(result['restored'])}\n"
+        f"💾 El estado anterior quedó guardado en la copia {result['safety_backup']}",
+        parse_mode=ParseMode.HTML
+    )
+
+
+def _describe_backup(manifest: dict) -> str:
+    lines = [f"💾 <b>Copia {manifest['name']}</b> ({manifest['seconds']:.1f} s)", ""]
+    for entry in manifest['files']:
+        restarts = f", {entry['restarts']} reinicios" if entry['restarts'] else ""
+        lines.append(
+            f"• <code>{entry['name']}</code>: {format_size(entry['size'])} → "
+            f"{format_size(entry['stored_size'])}{restarts}"
+        )
+    if manifest.get('deleted'):
+        lines.append("")
+        lines.append(f"🗑️ Borradas por retención: {', '.join(manifest['deleted'])}")
+    return "\n".join(lines)
+
+
+def _format_backup_list() -> str:
+    backups = backup_manager.list()
+    if not backups:
+        return "💾 <b>Copias de seguridad</b>\n\n<i>Todavía no hay ninguna.</i>\n\n/backup now para hacer una"
+
+    lines = ["💾 <b>Copias de seguridad</b>", ""]
+    for manifest in backups[:BACKUP_LIST_ROWS]:
+        size = sum(entry['stored_size'] for entry in manifest['files'])
+        created = datetime.fromisoformat(manifest['created_at']).strftime('%d/%m/%Y %H:%M')
+        lines.append(
+            f"• <code>{manifest['name']}</code> — {created}, {format_size(size)} "
+            f"({html.escape(manifest['reason'])})"
+        )
+    if len(backups) > BACKUP_LIST_ROWS:
+        lines.append(f"... y {len(backups) - BACKUP_LIST_ROWS} más")
+
+    lines.append("")
+    if config.BACKUP_ENABLED:
+        lines.append(f"Copia automática cada {config.BACKUP_INTERVAL_HOURS} h")
+    lines.append("/backup now · /backup verify &lt;copia&gt; · /restore &lt;copia&gt;")
+    return "\n".join(lines)
@@ -11,12 +11,12 @@ import config
 from database.models import DatabaseManager, Task, Project
 from utils.keyboards import get_dashboard_menu
 from utils.formatters import format_dashboard, format_weekly_stats, format_monthly_stats
+from utils.dates import DateClassifier
 from utils.reminders import ReminderSystem
 
-# Inicializar gestores
+# Inicializar gestor de base de datos
+# (los gestores de datos se crean en cada handler, limitados al usuario)
 db_manager = DatabaseManager()
-task_manager = Task(db_manager)
-project_manager = Project(db_manager)
 
 
 async def show_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -24,6 +24,9 @@ async def show_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     Muestra el dashboard con el resumen general.
     Puede ser llamado desde mensaje o desde callback.
     """
+    task_manager = Task(db_manager, update.effective_user.id)
+    project_manager = Project(db_manager, update.effective_user.id)
+    
     # Determinar si viene de mensaje o callback
     if update.callback_query:
         query = update.callback_query
@@ -32,8 +35,8 @@ async def show_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         is_callback = False
     
-    today = date.today()
-    next_week = today + timedelta(days=7)
+    # "Hoy" se fija una vez para todas las filas
+    dates = DateClassifier()
     
     # Obtener estadísticas de tareas
     all_tasks = task_manager.get_all({'parent_only': True})
@@ -44,29 +47,15 @@ async def show_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tasks_completed_today = len([
         t for t in all_tasks 
         if t['status'] == 'completed' 
-        and t.get('completed_at') 
-        and datetime.fromisoformat(t['completed_at']).date() == today
+        and dates.is_today_timestamp(t.get('completed_at'))
     ])
     
-    tasks_overdue = len([
-        t for t in all_tasks 
-        if t.get('deadline') 
-        and datetime.strptime(t['deadline'], "%Y-%m-%d").date() < today
-        and t['status'] != 'completed'
-    ])
+    tasks_overdue = len([t for t in all_tasks if dates.is_overdue(t)])
     
     active_projects = project_manager.get_all(status='active')
     paused_projects = project_manager.get_all(status='paused')
     
-    upcoming_deadlines = []
-    for project in active_projects:
-        if project.get('deadline'):
-            try:
-                deadline = datetime.strptime(project['deadline'], "%Y-%m-%d").date()
-                if today <= deadline <= next_week:
-                    upcoming_deadlines.append(project)
-            except:
-                continue
+    upcoming_deadlines = [p for p in active_projects if dates.is_upcoming(p.get('deadline'))]
     
     upcoming_deadlines.sort(key=lambda x: x['deadline'])
     
@@ -108,7 +97,7 @@ async def show_weekly_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     week_end = week_start + timedelta(days=6)
     
     # Crear sistema de recordatorios temporal para usar su método
-    reminder = ReminderSystem(db_manager, None, config.AUTHORIZED_USER_ID)
+    reminder = ReminderSystem(db_manager, None, update.effective_user.id)
     stats = reminder._calculate_weekly_stats(week_start, week_end)
     
     message = format_weekly_stats(stats)
@@ -137,7 +126,7 @@ async def show_monthly_stats(update: Update, context: ContextTypes.DEFAULT_TYPE)
         last_day = next_month - timedelta(days=1)
     
     # Calcular estadísticas
-    reminder = ReminderSystem(db_manager, None, config.AUTHORIZED_USER_ID)
+    reminder = ReminderSystem(db_manager, None, update.effective_user.id)
     stats = reminder._calculate_monthly_stats(first_day, last_day)
     
     message = format_monthly_stats(stats)
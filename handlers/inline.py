@@ -0,0 +1,80 @@
+"""
+Handler de búsqueda inline
+Escribiendo "@bot texto" en cualquier chat aparecen los objetivos, misiones y
+notas que coinciden, mientras se escribe (utils/search_index.py).
+
+EXPLICACIÓN: Telegram manda una consulta nueva con cada letra. El handler se
+registra con block=False (no frena al resto de updates) y espera
+INLINE_DEBOUNCE_SECONDS antes de buscar: si mientras tanto ha llegado otra
+consulta del mismo usuario, esta ya no se responde. La respuesta sale del
+índice en memoria y lleva cache_time para que Telegram la reutilice.
+La búsqueda se hace en un hilo aparte: la primera de cada usuario tiene que
+cargar su índice desde la base de datos y no debe frenar al resto del bot.
+"""
+import asyncio
+from typing import Any, Dict
+
+from telegram import InlineQueryResultArticle, InputTextMessageContent, Update
+from telegram.constants import ParseMode
+from telegram.ext import ContextTypes
+
+import config
+from database.models import DatabaseManager
+from utils.formatters import format_note, format_project, format_task
+from utils.long_messages import split_html
+from utils.search_index import SearchIndex
+from utils.templates import task_badge
+
+# Inicializar gestores
+db_manager = DatabaseManager()
+search_index = SearchIndex(db_manager)
+
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Responde a "@bot texto" con los resultados del índice"""
+    query = update.inline_query
+
+    # Solo se responde a la última consulta de cada usuario
+    context.user_data['inline_query_id'] = query.id
+    if config.INLINE_DEBOUNCE_SECONDS:
+        await asyncio.sleep(config.INLINE_DEBOUNCE_SECONDS)
+        if context.user_data.get('inline_query_id') != query.id:
+            return
+
+    # Síncrona (y lenta si hay que cargar el índice): se hace en un hilo aparte
+    results = await asyncio.get_running_loop().run_in_executor(
+        None, search_index.search, update.effective_user.id, query.query
+    )
+
+    await query.answer(
+        [_build_result(entity, row) for entity, row in results],
+        cache_time=config.INLINE_CACHE_TIME,
+        is_personal=True
+    )
+
+
+def _build_result(entity: str, row: Dict[str, Any]) -> InlineQueryResultArticle:
+    """Un resultado: título y resumen en la lista, la ficha completa al elegirlo"""
+    if entity == 'task':
+        title = f"{task_badge(row.get('status'), row.get('priority'))} {row['title']}"
+        description = row.get('description') or ''
+        text = format_task(row)
+    elif entity == 'project':
+        title = f"{config.EMOJI['project']} {row['name']}"
+        description = row.get('client') or row.get('description') or ''
+        text = format_project(row, include_progress=False)
+    else:
+        title = f"{config.EMOJI['note']} {row['title']}"
+        description = row.get('content') or ''
+        text = format_note(row)
+
+    return InlineQueryResultArticle(
+        id=f"{entity}_{row['id']}",
+        title=title,
+        description=description[:100],
+        # Si la ficha no cabe en un mensaje, se envía el primer trozo
+        input_message_content=InputTextMessageContent(
+            split_html(text)[0],
+            parse_mode=ParseMode.HTML
+        )
+    )
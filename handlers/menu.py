@@ -18,6 +18,8 @@ from utils.keyboards import (
     get_settings_menu
 )
 from utils.formatters import format_task_list, format_dashboard
+from utils.dates import DateClassifier
+from utils.task_graph import get_task_graph
 from cortana_personality import (
     CORTANA_PROJECT_MENU,
     CORTANA_TASK_MENU,
@@ -28,10 +30,9 @@ from cortana_personality import (
     CORTANA_TASK_NO_RESULTS
 )
 
-# Inicializar gestores de base de datos
+# Inicializar gestor de base de datos
+# (los gestores de datos se crean en cada handler, limitados al usuario)
 db_manager = DatabaseManager()
-task_manager = Task(db_manager)
-project_manager = Project(db_manager)
 
 
 async def show_projects_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -84,6 +85,8 @@ async def show_tasks_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def show_today(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Muestra las tareas de hoy y tareas atrasadas"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     # Determinar si viene de mensaje o callback
     if update.callback_query:
         query = update.callback_query
@@ -100,6 +103,12 @@ async def show_today(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Obtener tareas atrasadas
     overdue_tasks = task_manager.get_all({'overdue': True})
     
+    # Las que esperan a otros objetivos no se pueden empezar: van aparte
+    task_graph = get_task_graph()
+    today_tasks, blocked_today = task_graph.split(update.effective_user.id, today_tasks)
+    overdue_tasks, blocked_overdue = task_graph.split(update.effective_user.id, overdue_tasks)
+    blocked_tasks = blocked_overdue + blocked_today
+    
     lines = [CORTANA_TODAY_VIEW, ""]
     
     # Tareas atrasadas (si hay)
@@ -133,7 +142,23 @@ async def show_today(update: Update, context: ContextTypes.DEFAULT_TYPE):
         lines.append("📅 <b>Objetivos de Hoy</b>")
         lines.append(f"\n{CORTANA_TASK_NO_RESULTS}")
     
-    if not today_tasks and not overdue_tasks:
+    # Tareas bloqueadas por otras (atrasadas o de hoy)
+    if blocked_tasks:
+        lines.append("")
+        lines.append("🔒 <b>Esperando a otros objetivos</b>")
+        lines.append(f"{len(blocked_tasks)} objetivo(s) no se pueden empezar todavía:\n")
+        
+        for task in blocked_tasks[:5]:
+            blockers = task_graph.pending_blockers(update.effective_user.id, task['id'])
+            waiting_for = ", ".join(blocker['title'] for blocker in blockers[:2])
+            if len(blockers) > 2:
+                waiting_for += f" y {len(blockers) - 2} más"
+            lines.append(f"⏸️ {task['title']} (espera a: {waiting_for})")
+        
+        if len(blocked_tasks) > 5:
+            lines.append(f"\n...y {len(blocked_tasks) - 5} más")
+    
+    if not today_tasks and not overdue_tasks and not blocked_tasks:
         lines.append("\n✨ Todo despejado por ahora. Buen momento para planificar.")
     
     message = "\n".join(lines)
@@ -154,6 +179,9 @@ async def show_today(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def show_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Muestra el dashboard con el resumen general"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    project_manager = Project(db_manager, update.effective_user.id)
+    
     # Determinar si viene de mensaje o callback
     if update.callback_query:
         query = update.callback_query
@@ -162,8 +190,8 @@ async def show_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         is_callback = False
 
-    today = date.today()
-    next_week = today + timedelta(days=7)
+    # "Hoy" se fija una vez para todas las filas
+    dates = DateClassifier()
     
     # Obtener estadísticas de tareas
     all_tasks = task_manager.get_all({'parent_only': True})
@@ -174,29 +202,15 @@ async def show_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tasks_completed_today = len([
         t for t in all_tasks 
         if t['status'] == 'completed' 
-        and t.get('completed_at') 
-        and datetime.fromisoformat(t['completed_at']).date() == today
+        and dates.is_today_timestamp(t.get('completed_at'))
     ])
     
-    tasks_overdue = len([
-        t for t in all_tasks 
-        if t.get('deadline') 
-        and datetime.strptime(t['deadline'], "%Y-%m-%d").date() < today
-        and t['status'] != 'completed'
-    ])
+    tasks_overdue = len([t for t in all_tasks if dates.is_overdue(t)])
     
     active_projects = project_manager.get_all(status='active')
     paused_projects = project_manager.get_all(status='paused')
     
-    upcoming_deadlines = []
-    for project in active_projects:
-        if project.get('deadline'):
-            try:
-                deadline = datetime.strptime(project['deadline'], "%Y-%m-%d").date()
-                if today <= deadline <= next_week:
-                    upcoming_deadlines.append(project)
-            except:
-                continue
+    upcoming_deadlines = [p for p in active_projects if dates.is_upcoming(p.get('deadline'))]
     
     upcoming_deadlines.sort(key=lambda x: x['deadline'])
     
@@ -14,10 +14,11 @@ from utils.keyboards import (
     get_note_detail_keyboard
 )
 from utils.formatters import format_note
+from utils.long_messages import edit_long_message
 
-# Inicializar gestores
+# Inicializar gestor de base de datos
+# (los gestores de datos se crean en cada handler, limitados al usuario)
 db_manager = DatabaseManager()
-note_manager = Note(db_manager)
 
 
 async def show_notes_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -59,6 +60,8 @@ Puedes organizar tus notas con etiquetas y asociarlas a proyectos o tareas.
 
 async def list_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Lista todas las notas con paginación"""
+    note_manager = Note(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -97,6 +100,8 @@ async def list_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def view_note(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Muestra una nota específica"""
+    note_manager = Note(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -123,11 +128,9 @@ async def view_note(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Crear teclado
     keyboard = get_note_detail_keyboard(note_id)
     
-    await query.edit_message_text(
-        message,
-        parse_mode=ParseMode.HTML,
-        reply_markup=keyboard
-    )
+    # Una nota cerca de MAX_NOTE_CONTENT_LENGTH más el título y las etiquetas
+    # puede pasar del límite de Telegram: se divide antes de enviar
+    await edit_long_message(query, message, reply_markup=keyboard)
 
 
 # NOTA: Para crear, editar y eliminar notas se necesitaría implementar
@@ -11,6 +11,7 @@ import random
 import config
 from database.models import DatabaseManager, Project
 from utils.keyboards import get_projects_menu, get_priority_keyboard
+from utils.templates import render_template
 
 # Mensajes de Cortana para proyectos
 CORTANA_NEW_PROJECT_START = """📁 <b>Nueva Misión</b>
@@ -61,18 +62,18 @@ CORTANA_MOTIVATION = [
     "🚀 Un paso a la vez. Así se conquistan misiones imposibles.",
 ]
 
-# Inicializar gestores
+# Inicializar gestor de base de datos
+# (los gestores de datos se crean en cada handler, limitados al usuario)
 db_manager = DatabaseManager()
-project_manager = Project(db_manager)
 
-# Estados del ConversationHandler
-(
+# Estados del ConversationHandler (definidos en handlers/states.py)
+from handlers.states import (
     PROJECT_NAME,
     PROJECT_DESCRIPTION,
     PROJECT_PRIORITY,
     PROJECT_DEADLINE,
     PROJECT_CONFIRM
-) = range(5)
+)
 
 
 async def create_project_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -233,7 +234,7 @@ async def project_deadline_received(update: Update, context: ContextTypes.DEFAUL
         except:
             pass
     
-    message = CORTANA_NEW_PROJECT_CONFIRM.format(
+    message = render_template(CORTANA_NEW_PROJECT_CONFIRM,
         name=project_data['name'],
         description=project_data.get('description', 'Sin descripción') or 'Sin descripción',
         priority=priority_names.get(project_data['priority'], project_data['priority']),
@@ -267,6 +268,8 @@ async def project_deadline_received(update: Update, context: ContextTypes.DEFAUL
 
 async def project_confirmed(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Confirma y crea el proyecto en la base de datos"""
+    project_manager = Project(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -11,9 +11,11 @@ from database.models import DatabaseManager, Project
 from utils.keyboards import (
     get_projects_menu,
     get_project_list_keyboard,
-    get_project_detail_keyboard
+    get_project_detail_keyboard,
+    get_critical_path_keyboard
 )
-from utils.formatters import format_project, format_project_with_progress
+from utils.formatters import format_critical_path, format_project_overview, format_project_with_progress
+from utils.task_graph import get_task_graph
 from cortana_personality import (
     CORTANA_PROJECT_MENU,
     CORTANA_PROJECT_COMPLETED,
@@ -22,8 +24,8 @@ from cortana_personality import (
 )
 
 # Inicializar gestor de base de datos
+# (los gestores de datos se crean en cada handler, limitados al usuario)
 db_manager = DatabaseManager()
-project_manager = Project(db_manager)
 
 
 async def show_projects_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -40,6 +42,8 @@ async def show_projects_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def list_projects(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Lista los proyectos según el filtro solicitado"""
+    project_manager = Project(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -65,7 +69,8 @@ async def list_projects(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except:
             page = 0
     
-    projects = project_manager.get_all(status=status)
+    # Todas las misiones con su progreso en una sola consulta
+    projects = project_manager.get_overview(status=status)
     
     if not projects:
         message = f"{title}\n\n{CORTANA_PROJECT_NO_RESULTS}"
@@ -76,13 +81,15 @@ async def list_projects(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    message = f"""{title}
-
-Total: {len(projects)} misiones
-
-Selecciona una misión para ver detalles:"""
+    # La página puede haberse quedado vacía (misiones que cambiaron de estado)
+    per_page = config.PROJECTS_PER_PAGE
+    page = max(0, min(page, (len(projects) - 1) // per_page))
+    page_projects = projects[page * per_page:(page + 1) * per_page]
     
-    keyboard = get_project_list_keyboard(projects, status=status, page=page)
+    message = format_project_overview(page_projects, title, total=len(projects))
+    message += "\n\nSelecciona una misión para ver detalles:"
+    
+    keyboard = get_project_list_keyboard(projects, page=page, items_per_page=per_page, status=status)
     
     await query.edit_message_text(
         message,
@@ -93,6 +100,8 @@ Selecciona una misión para ver detalles:"""
 
 async def view_project(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Muestra los detalles completos de un proyecto"""
+    project_manager = Project(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -115,11 +124,7 @@ async def view_project(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     message = format_project_with_progress(project, progress)
     
-    keyboard = get_project_detail_keyboard(
-        project_id, 
-        project['status'],
-        progress['total_tasks']
-    )
+    keyboard = get_project_detail_keyboard(project_id, project['status'])
     
     await query.edit_message_text(
         message,
@@ -128,8 +133,41 @@ async def view_project(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+async def show_critical_path(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Muestra la ruta crítica de una misión según las dependencias de sus objetivos"""
+    project_manager = Project(db_manager, update.effective_user.id)
+    
+    query = update.callback_query
+    await query.answer()
+    
+    try:
+        project_id = int(query.data.split('_')[-1])
+    except ValueError:
+        await query.edit_message_text("❌ Error: ID de misión inválido")
+        return
+    
+    project = project_manager.get_by_id(project_id)
+    
+    if not project:
+        await query.edit_message_text(
+            CORTANA_ERROR_NOT_FOUND,
+            reply_markup=get_projects_menu()
+        )
+        return
+    
+    analysis = get_task_graph().critical_path(update.effective_user.id, project_id)
+    
+    await query.edit_message_text(
+        format_critical_path(project['name'], analysis),
+        parse_mode=ParseMode.HTML,
+        reply_markup=get_critical_path_keyboard(project_id)
+    )
+
+
 async def change_project_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Cambia el estado de un proyecto"""
+    project_manager = Project(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -163,6 +201,8 @@ async def change_project_status(update: Update, context: ContextTypes.DEFAULT_TY
 
 async def complete_project(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Marca un proyecto como completado"""
+    project_manager = Project(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     
     try:
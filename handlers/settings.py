@@ -2,16 +2,44 @@
 Handler de configuración
 Gestiona la configuración del bot
 """
+import asyncio
+import html
+import os
+import tempfile
+import time
+from typing import Optional
+
 from telegram import Update
+from telegram.error import TelegramError
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 
-from utils.keyboards import get_settings_menu
+import config
+from database import events
+from database.models import DatabaseManager, Task, UserSettings
+from utils.keyboards import (
+    get_settings_menu, get_reminder_time_keyboard, get_timezone_keyboard, get_export_keyboard,
+    get_import_keyboard, get_tasks_menu
+)
+from utils.export import export_user_data
+from utils.importer import ImportInterrupted, detect_format, import_file
+
+# Inicializar gestores
+db_manager = DatabaseManager()
+settings_manager = UserSettings(db_manager)
+
+# Tipo de recordatorio en el callback -> (campo de hora, campo de activación, opciones, nombre)
+REMINDER_FIELDS = {
+    'daily': ('daily_summary_time', 'daily_summary_enabled',
+              config.DAILY_SUMMARY_TIME_OPTIONS, "⏰ Resumen diario"),
+    'evening': ('evening_reminder_time', 'evening_reminder_enabled',
+                config.EVENING_REMINDER_TIME_OPTIONS, "🔔 Recordatorio de tarde")
+}
 
 
 async def show_settings_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Muestra el menú de configuración.
+    Muestra el menú de configuración con los valores actuales del usuario.
     Puede ser llamado desde mensaje o desde callback.
     """
     # Determinar si viene de mensaje o callback
@@ -21,20 +49,21 @@ async def show_settings_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
         is_callback = True
     else:
         is_callback = False
-    
-    message = """
+
+    settings = settings_manager.get(update.effective_user.id)
+
+    message = f"""
 ⚙️ <b>Configuración</b>
 
 Personaliza el funcionamiento del bot:
 
-• Cambiar horarios de recordatorios
-• Activar/desactivar notificaciones
-• Exportar tus datos
-• Ajustar zona horaria
+⏰ Resumen diario: {_describe_reminder(settings, 'daily')}
+🔔 Recordatorio de tarde: {_describe_reminder(settings, 'evening')}
+🌍 Zona horaria: {settings['timezone']}
 
 ¿Qué quieres configurar?
 """
-    
+
     if is_callback:
         await query.edit_message_text(
             message,
@@ -49,6 +78,361 @@ Personaliza el funcionamiento del bot:
         )
 
 
-# NOTA: La configuración completa requeriría ConversationHandler
-# para manejar diálogos de cambio de hora, zona horaria, etc.
-# Esta es la estructura base que puedes expandir.
+async def show_reminder_time_options(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Muestra las horas disponibles para el resumen diario o el recordatorio de tarde"""
+    query = update.callback_query
+    await query.answer()
+
+    kind = 'daily' if query.data == 'settings_daily_time' else 'evening'
+    await _render_reminder_options(query, update.effective_user.id, kind)
+
+
+async def set_reminder_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Guarda la hora elegida. Formato del callback: settings_set_{kind}_{HHMM}"""
+    query = update.callback_query
+
+    parts = query.data.split('_')
+
+    try:
+        kind = parts[2]
+        hhmm = f"{parts[3][:2]}:{parts[3][2:]}"
+        time_field, enabled_field, _, _ = REMINDER_FIELDS[kind]
+    except (IndexError, KeyError):
+        await query.answer("❌ Error en los datos", show_alert=True)
+        return
+
+    user_id = update.effective_user.id
+    success = settings_manager.update(user_id, {time_field: hhmm, enabled_field: 1})
+
+    if not success:
+        await query.answer("❌ Error al guardar la hora", show_alert=True)
+        return
+
+    _reschedule(context, user_id)
+    await query.answer(f"✅ Programado a las {hhmm}")
+    await _render_reminder_options(query, user_id, kind)
+
+
+async def toggle_reminder(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Activa o desactiva un recordatorio. Formato del callback: settings_toggle_{kind}"""
+    query = update.callback_query
+
+    kind = query.data.split('_')[-1]
+    if kind not in REMINDER_FIELDS:
+        await query.answer("❌ Error en los datos", show_alert=True)
+        return
+
+    user_id = update.effective_user.id
+    enabled_field = REMINDER_FIELDS[kind][1]
+    settings = settings_manager.get(user_id)
+    enabled = 0 if settings[enabled_field] else 1
+
+    settings_manager.update(user_id, {enabled_field: enabled})
+    _reschedule(context, user_id)
+
+    await query.answer("🔔 Recordatorio activado" if enabled else "🔕 Recordatorio desactivado")
+    await _render_reminder_options(query, user_id, kind)
+
+
+async def show_timezone_options(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Muestra las zonas horarias disponibles"""
+    query = update.callback_query
+    await query.answer()
+
+    settings = settings_manager.get(update.effective_user.id)
+
+    await query.edit_message_text(
+        f"🌍 <b>Zona horaria</b>\n\nActual: {settings['timezone']}\n\n"
+        "Los recordatorios llegarán a la hora local de la zona elegida:",
+        parse_mode=ParseMode.HTML,
+        reply_markup=get_timezone_keyboard(settings['timezone'])
+    )
+
+
+async def set_timezone(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Guarda la zona horaria elegida. Formato del callback: settings_set_tz_{índice}"""
+    query = update.callback_query
+
+    try:
+        timezone = config.TIMEZONE_OPTIONS[int(query.data.split('_')[-1])]
+    except (IndexError, ValueError):
+        await query.answer("❌ Error en los datos", show_alert=True)
+        return
+
+    user_id = update.effective_user.id
+
+    if not settings_manager.update(user_id, {'timezone': timezone}):
+        await query.answer("❌ Zona horaria no válida", show_alert=True)
+        return
+
+    _reschedule(context, user_id)
+    # Las alertas de deadline se calcularon con la zona anterior
+    Task(db_manager, user_id).refresh_alerts()
+    await query.answer(f"🌍 Zona horaria: {timezone}")
+    await show_settings_menu(update, context)
+
+
+async def show_export_options(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Muestra los formatos de exportación disponibles"""
+    query = update.callback_query
+    await query.answer()
+
+    await query.edit_message_text(
+        f"{config.EMOJI['export']} <b>Exportar datos</b>\n\n"
+        "📄 <b>JSON Lines</b>: misiones, objetivos y notas completos (.jsonl.gz)\n"
+        "📊 <b>CSV</b>: una hoja por tabla para Excel o Google Sheets (.zip)\n"
+        "📅 <b>ICS</b>: deadlines pendientes para tu calendario\n\n"
+        "Elige el formato:",
+        parse_mode=ParseMode.HTML,
+        reply_markup=get_export_keyboard()
+    )
+
+
+async def export_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Exporta los datos del usuario y los envía como documento.
+    Formato del callback: settings_export_{jsonl|csv|ics}
+    """
+    query = update.callback_query
+    await query.answer()
+
+    fmt = query.data.split('_')[-1]
+    user_id = update.effective_user.id
+    timezone = settings_manager.get(user_id)['timezone']
+
+    await query.edit_message_text("⏳ Preparando la exportación...")
+
+    # La lectura y la compresión son síncronas: se hacen en un hilo aparte
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(None, export_user_data, db_manager, user_id, fmt, timezone)
+    except Exception as e:
+        print(f"❌ Error al exportar datos: {e}")
+        await query.edit_message_text("❌ No se pudo generar la exportación.", reply_markup=get_settings_menu())
+        return
+
+    try:
+        if result['size'] > config.EXPORT_MAX_DOCUMENT_BYTES:
+            await query.edit_message_text(
+                f"❌ La exportación ocupa {result['size'] // (1024 * 1024)} MB y Telegram "
+                f"solo permite enviar {config.EXPORT_MAX_DOCUMENT_BYTES // (1024 * 1024)} MB.",
+                reply_markup=get_settings_menu()
+            )
+            return
+
+        counts = result['counts']
+        summary = ", ".join(
+            f"{counts[table]} {label}"
+            for table, label in (('projects', "misiones"), ('tasks', "objetivos"), ('notes', "notas"),
+                                 ('projects_archive', "misiones archivadas"),
+                                 ('tasks_archive', "objetivos archivados"))
+            if counts.get(table)
+        )
+
+        with open(result['path'], 'rb') as document:
+            await context.bot.send_document(
+                chat_id=update.effective_chat.id,
+                document=document,
+                filename=result['filename'],
+                caption=f"{config.EMOJI['export']} Exportación completa: {summary}"
+            )
+    finally:
+        os.remove(result['path'])
+
+    print(f"✅ Datos exportados ({fmt}, {result['size']} bytes) para el usuario {user_id}")
+    await query.edit_message_text("✅ Exportación enviada.", reply_markup=get_settings_menu())
+
+
+async def show_import_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Explica cómo importar objetivos enviando un documento"""
+    query = update.callback_query
+    await query.answer()
+
+    await query.edit_message_text(
+        f"{config.EMOJI['import']} <b>Importar objetivos</b>\n\n"
+        "Envíame un documento en cualquiera de estos formatos:\n\n"
+        "📊 <b>CSV</b> (.csv, o el .zip de la exportación): una fila por objetivo con columnas <code>título</code>, "
+        "<code>descripción</code>, <code>misión</code>, <code>prioridad</code>, "
+        "<code>fecha</code>, <code>hora</code>, <code>estado</code> (también en inglés)\n"
+        "📄 <b>JSON</b> (.json, .jsonl): una lista de objetos con esos mismos campos, "
+        "o la exportación del bot\n"
+        "📝 <b>Markdown</b> (.md, .txt): una lista de casillas\n"
+        "<code># Misión\n- [ ] Objetivo @2024-12-31 18:00 !alta\n  - [x] Subobjetivo</code>\n\n"
+        f"Las misiones que no existan se crean. Tamaño máximo: "
+        f"{config.IMPORT_MAX_FILE_BYTES // (1024 * 1024)} MB.",
+        parse_mode=ParseMode.HTML,
+        reply_markup=get_import_keyboard()
+    )
+
+
+async def import_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Importa los objetivos de un documento enviado al bot.
+    La importación se hace en un hilo aparte y el mensaje de estado se
+    actualiza con el progreso cada IMPORT_PROGRESS_INTERVAL segundos.
+    """
+    document = update.message.document
+    fmt = detect_format(document.file_name)
+
+    if fmt is None:
+        await update.message.reply_text(
+            f"❌ No sé importar este archivo. Formatos admitidos: CSV, JSON, JSON Lines y Markdown.\n\n"
+            f"Más información en {config.EMOJI['settings']} Configuración → {config.EMOJI['import']} Importar objetivos."
+        )
+        return
+
+    if document.file_size and document.file_size > config.IMPORT_MAX_FILE_BYTES:
+        await update.message.reply_text(
+            f"❌ El archivo ocupa más de {config.IMPORT_MAX_FILE_BYTES // (1024 * 1024)} MB, "
+            "el máximo que Telegram deja descargar a un bot."
+        )
+        return
+
+    # El handler no bloquea (block=False): un usuario no puede lanzar dos importaciones a la vez
+    if context.user_data.get('import_running'):
+        await update.message.reply_text("⏳ Ya hay una importación en curso. Espera a que termine.")
+        return
+
+    context.user_data['import_running'] = True
+    try:
+        await _import_document(update, context, document, fmt)
+    finally:
+        context.user_data.pop('import_running', None)
+
+
+async def _import_document(update: Update, context: ContextTypes.DEFAULT_TYPE, document, fmt: str):
+    user_id = update.effective_user.id
+    timezone = settings_manager.get(user_id)['timezone']
+    status = await update.message.reply_text("⏳ Descargando el archivo...")
+
+    handle, path = tempfile.mkstemp(prefix="cortana_import_", suffix=os.path.splitext(document.file_name)[1])
+    os.close(handle)
+
+    loop = asyncio.get_running_loop()
+    updates = []          # Ediciones del mensaje de progreso pendientes
+    last_update = 0.0
+
+    def progress(processed: int, imported: int):
+        # Se llama desde el hilo de la importación: la edición se programa en el bucle del bot
+        nonlocal last_update
+        now = time.monotonic()
+        if now - last_update < config.IMPORT_PROGRESS_INTERVAL:
+            return
+        last_update = now
+        updates.append(asyncio.run_coroutine_threadsafe(
+            _edit_progress(status, f"⏳ Importando... {processed} filas leídas, {imported} objetivos creados"),
+            loop
+        ))
+
+    failure = None  # Error que cortó la importación después de guardar alguna tanda
+    try:
+        telegram_file = await context.bot.get_file(document.file_id)
+        await telegram_file.download_to_drive(path)
+        await _edit_progress(status, "⏳ Importando...")
+
+        # Lectura, validación e inserción son síncronas: se hacen en un hilo aparte
+        try:
+            result = await loop.run_in_executor(
+                None, import_file, db_manager, user_id, path, fmt, timezone, progress
+            )
+        except ImportInterrupted as e:
+            # Las tandas anteriores al error ya están guardadas: hay que
+            # publicar sus eventos y decir cuántas filas entraron
+            result, failure = e.result, e.__cause__
+            if not result['imported']:
+                raise failure
+    except (ValueError, UnicodeDecodeError) as e:
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in updates))
+        await status.edit_text(f"❌ No se pudo leer el archivo: {html.escape(str(e))}",
+                               parse_mode=ParseMode.HTML)
+        return
+    except Exception as e:
+        print(f"❌ Error al importar objetivos: {e}")
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in updates))
+        await status.edit_text("❌ No se pudo completar la importación.")
+        return
+    finally:
+        os.remove(path)
+
+    # Publicar los eventos de la importación desde el hilo del bot
+    # (así el servicio de alertas de deadline conoce las alertas nuevas)
+    events.publish(*result['events'])
+
+    # Esperar a las ediciones de progreso para que no pisen el resumen
+    await asyncio.gather(*(asyncio.wrap_future(future) for future in updates))
+
+    if failure:
+        print(f"❌ Importación interrumpida tras {result['imported']} objetivos ({fmt}) "
+              f"para el usuario {user_id}: {failure}")
+    else:
+        print(f"✅ Importados {result['imported']} objetivos ({fmt}) para el usuario {user_id} "
+              f"en {result['seconds']:.1f} s")
+    await status.edit_text(
+        _describe_import(result, failure),
+        parse_mode=ParseMode.HTML,
+        reply_markup=get_tasks_menu()
+    )
+
+
+async def _edit_progress(message, text: str):
+    try:
+        await message.edit_text(text)
+    except TelegramError:
+        pass  # Un mensaje de progreso que no se actualiza no es un error
+
+
+def _describe_import(result: dict, failure: Optional[Exception] = None) -> str:
+    if failure is None:
+        lines = [f"✅ <b>Importación completada</b> ({result['seconds']:.1f} s)\n"]
+    else:
+        # Los errores de lectura dicen qué falla en el archivo; los demás son internos
+        reason = str(failure) if isinstance(failure, (ValueError, UnicodeDecodeError)) else "error al guardar"
+        lines = [
+            f"⚠️ <b>Importación interrumpida</b> ({result['seconds']:.1f} s)\n",
+            f"Se importaron {result['imported']} objetivos hasta la línea {result['imported_until']}; "
+            f"el resto del archivo no: {html.escape(reason)}\n",
+        ]
+    lines.append(f"{config.EMOJI['task']} Objetivos creados: {result['imported']}")
+    if result['projects_created']:
+        lines.append(f"{config.EMOJI['project']} Misiones nuevas: {result['projects_created']}")
+    if result['alerts']:
+        lines.append(f"{config.EMOJI['reminder']} Alertas programadas: {len(result['alerts'])}")
+
+    if result['errors']:
+        lines.append(f"\n⚠️ Filas con errores: {result['errors']}")
+        lines.extend(
+            f"• Línea {line}: {html.escape(reason)}"
+            for line, reason in result['error_examples']
+        )
+        if result['errors'] > len(result['error_examples']):
+            lines.append("• ...")
+
+    return "\n".join(lines)
+
+
+def _describe_reminder(settings: dict, kind: str) -> str:
+    time_field, enabled_field, _, _ = REMINDER_FIELDS[kind]
+    if not settings[enabled_field]:
+        return "desactivado"
+    return settings[time_field]
+
+
+async def _render_reminder_options(query, user_id: int, kind: str):
+    time_field, enabled_field, options, title = REMINDER_FIELDS[kind]
+    settings = settings_manager.get(user_id)
+
+    await query.edit_message_text(
+        f"<b>{title}</b>\n\nEstado: {_describe_reminder(settings, kind)}\n"
+        f"Zona horaria: {settings['timezone']}\n\nElige la hora:",
+        parse_mode=ParseMode.HTML,
+        reply_markup=get_reminder_time_keyboard(
+            kind, options, settings[time_field], bool(settings[enabled_field])
+        )
+    )
+
+
+def _reschedule(context: ContextTypes.DEFAULT_TYPE, user_id: int):
+    """Aplica al momento los cambios en el planificador de recordatorios"""
+    scheduler = context.application.bot_data.get('reminder_scheduler')
+    if scheduler:
+        scheduler.reschedule_user(user_id)
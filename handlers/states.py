@@ -0,0 +1,30 @@
+"""
+Estados de los ConversationHandlers
+Están en un módulo aparte para que main.py pueda declarar las conversaciones
+sin importar los módulos de handlers (se cargan la primera vez que se usan).
+"""
+
+# Crear misión (handlers/project_conversations.py)
+(
+    PROJECT_NAME,
+    PROJECT_DESCRIPTION,
+    PROJECT_PRIORITY,
+    PROJECT_DEADLINE,
+    PROJECT_CONFIRM
+) = range(5)
+
+# Crear objetivo (handlers/task_conversations.py)
+(
+    TASK_TITLE,
+    TASK_DESCRIPTION,
+    TASK_PRIORITY,
+    TASK_DEADLINE,
+    TASK_PROJECT,
+    TASK_CONFIRM
+) = range(6)
+
+# Añadir subtarea y editar objetivo (handlers/tasks.py)
+ADD_SUBTASK_TITLE = 0
+ADD_SUBTASK_DESC = 1
+EDIT_FIELD = 2
+EDIT_VALUE = 3
@@ -0,0 +1,102 @@
+"""
+Handler de estadísticas internas
+Muestra la latencia de handlers, base de datos y API de Telegram (/stats)
+"""
+import html
+
+from telegram import Update
+from telegram.ext import ContextTypes
+from telegram.constants import ParseMode
+
+import config
+from database.tracing import query_stats
+from handlers.access import access_control
+from utils import metrics
+
+# Filas que se muestran por sección
+STATS_TOP_ROWS = 10
+
+SECTIONS = [
+    ('handler', "🤖 <b>Handlers</b>", 'handler'),
+    ('db', "🗄️ <b>Base de datos</b>", 'method'),
+    ('telegram_api', "📡 <b>API de Telegram</b>", 'method'),
+]
+
+
+async def show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Muestra p50/p99 por handler, método de la BD y llamada a Telegram.
+    Uso: /stats [sql|reset]. Solo para administradores.
+    """
+    if not access_control.is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Solo un administrador puede hacer esto.")
+        return
+
+    if context.args and context.args[0] == 'sql':
+        await update.message.reply_text(format_sql_stats(), parse_mode=ParseMode.HTML)
+        return
+
+    if not config.METRICS_ENABLED:
+        await update.message.reply_text("ℹ️ Las métricas están desactivadas (METRICS_ENABLED en config.py)")
+        return
+
+    if context.args and context.args[0] == 'reset':
+        metrics.registry.clear()
+        query_stats.clear()
+        await update.message.reply_text("🔄 Métricas reiniciadas")
+        return
+
+    await update.message.reply_text(format_stats(), parse_mode=ParseMode.HTML)
+
+
+def format_stats() -> str:
+    """Construye el informe de /stats"""
+    lines = ["📈 <b>Latencias</b> (p50 / p99, nº llamadas)", ""]
+
+    for layer, title, label in SECTIONS:
+        rows = metrics.summarize(layer)
+        lines.append(title)
+
+        if not rows:
+            lines.append("<i>Sin datos todavía</i>")
+            lines.append("")
+            continue
+
+        for row in rows[:STATS_TOP_ROWS]:
+            errors = f" ⚠️{row['errors']}" if row['errors'] else ""
+            name = row['labels'][label]
+            if layer == 'handler':
+                name = f"{name} [{row['labels']['type']}]"
+            lines.append(
+                f"• <code>{name}</code>: "
+                f"{_ms(row['p50'])} / {_ms(row['p99'])} ({row['count']}){errors}"
+            )
+        lines.append("")
+
+    return "\n".join(lines).strip()
+
+
+def format_sql_stats() -> str:
+    """Consultas SQL con más tiempo acumulado (/stats sql)"""
+    if not config.SQL_TRACE_ENABLED:
+        return "ℹ️ Las trazas SQL están desactivadas (SQL_TRACE_ENABLED en config.py)"
+
+    rows = query_stats.top(STATS_TOP_ROWS)
+    if not rows:
+        return "🗄️ <b>Consultas SQL</b>\n\n<i>Sin datos todavía</i>"
+
+    lines = ["🗄️ <b>Consultas SQL</b> (tiempo total, veces, máx, filas)", ""]
+    for row in rows:
+        sql = html.escape(row['sql'][:120])
+        lines.append(
+            f"• {_ms(row['total'])}, {row['count']}×, máx {_ms(row['max'])}, {row['rows']} filas\n"
+            f"  <code>{sql}</code>"
+        )
+
+    return "\n".join(lines)
+
+
+def _ms(seconds) -> str:
+    if seconds is None:
+        return "-"
+    return f"{seconds * 1000:.1f}ms"
@@ -11,6 +11,7 @@ import random
 import config
 from database.models import DatabaseManager, Task, Project
 from utils.keyboards import get_tasks_menu, get_priority_keyboard, get_cancel_keyboard
+from utils.templates import render_template
 from cortana_personality import (
     CORTANA_NEW_TASK_START,
     CORTANA_NEW_TASK_DESCRIPTION,
@@ -23,24 +24,19 @@ from cortana_personality import (
     CORTANA_MOTIVATION
 )
 
-# Inicializar gestores
+# Inicializar gestor de base de datos
+# (los gestores de datos se crean en cada handler, limitados al usuario)
 db_manager = DatabaseManager()
-task_manager = Task(db_manager)
-project_manager = Project(db_manager)
 
-# Estados del conversationhandler
-(
+# Estados del conversationhandler (definidos en handlers/states.py)
+from handlers.states import (
     TASK_TITLE,
     TASK_DESCRIPTION,
     TASK_PRIORITY,
     TASK_DEADLINE,
     TASK_PROJECT,
-    TASK_CONFIRM,
-    ADD_SUBTASK_TITLE,
-    ADD_SUBTASK_DESC,
-    EDIT_FIELD,
-    EDIT_VALUE
-) = range(10)
+    TASK_CONFIRM
+)
 
 
 async def create_task_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -75,7 +71,7 @@ async def task_title_received(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     context.user_data['new_task']['title'] = title
     
-    message = CORTANA_NEW_TASK_DESCRIPTION.format(title=title)
+    message = render_template(CORTANA_NEW_TASK_DESCRIPTION, title=title)
     
     keyboard = [[InlineKeyboardButton("⏭️ Omitir", callback_data="task_skip_description")]]
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -106,7 +102,7 @@ async def task_description_received(update: Update, context: ContextTypes.DEFAUL
     title = context.user_data['new_task']['title']
     desc_text = description if description else "Sin detalles tácticos"
     
-    message = CORTANA_NEW_TASK_PRIORITY.format(
+    message = render_template(CORTANA_NEW_TASK_PRIORITY,
         title=title,
         description=desc_text
     )
@@ -145,7 +141,7 @@ async def task_priority_received(update: Update, context: ContextTypes.DEFAULT_T
     title = context.user_data['new_task']['title']
     priority_text = config.PRIORITY_LEVELS.get(priority, priority)
     
-    message = CORTANA_NEW_TASK_DEADLINE.format(
+    message = render_template(CORTANA_NEW_TASK_DEADLINE,
         title=title,
         priority=priority_text
     )
@@ -170,6 +166,7 @@ async def task_priority_received(update: Update, context: ContextTypes.DEFAULT_T
 
 async def task_deadline_received(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Recibe la fecha límite de la tarea"""
+    project_manager = Project(db_manager, update.effective_user.id)
     
     if update.callback_query:
         query = update.callback_query
@@ -210,7 +207,7 @@ async def task_deadline_received(update: Update, context: ContextTypes.DEFAULT_T
     
     projects = project_manager.get_all(status='active')
     
-    message = CORTANA_NEW_TASK_PROJECT.format(
+    message = render_template(CORTANA_NEW_TASK_PROJECT,
         title=title,
         priority=priority_text,
         deadline=deadline_text
@@ -247,6 +244,8 @@ async def task_deadline_received(update: Update, context: ContextTypes.DEFAULT_T
 
 async def task_project_received(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Recibe el proyecto de la tarea"""
+    project_manager = Project(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -268,7 +267,7 @@ async def task_project_received(update: Update, context: ContextTypes.DEFAULT_TY
         if project:
             project_name = project['name']
     
-    message = CORTANA_NEW_TASK_CONFIRM.format(
+    message = render_template(CORTANA_NEW_TASK_CONFIRM,
         title=task_data['title'],
         description=task_data.get('description', 'Sin detalles'),
         priority=config.PRIORITY_LEVELS.get(task_data['priority'], 'Media'),
@@ -295,6 +294,8 @@ async def task_project_received(update: Update, context: ContextTypes.DEFAULT_TY
 
 async def task_confirmed(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Crea la tarea en la base de datos"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -6,15 +6,23 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram.constants import ParseMode
 from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
 
 import config
-from database.models import DatabaseManager, Task
+from database.models import DatabaseManager, DependencyCycle, Task, VersionConflict
 from utils.keyboards import (
     get_tasks_menu,
     get_task_list_keyboard,
-    get_task_detail_keyboard
+    get_task_detail_keyboard,
+    get_task_recurrence_keyboard,
+    get_task_dependency_keyboard,
+    get_archived_task_keyboard
 )
+from database import recurrence
 from utils.formatters import format_task, format_task_list
+from utils.long_messages import edit_long_message, paginate_lines
+from utils.task_graph import get_task_graph
+from utils.templates import PRIORITY_EMOJI
 from cortana_personality import (
     CORTANA_TASK_MENU,
     CORTANA_TASK_CREATED,
@@ -28,8 +36,16 @@ from cortana_personality import (
 )
 
 # Inicializar gestor de base de datos
+# (los gestores de datos se crean en cada handler, limitados al usuario)
 db_manager = DatabaseManager()
-task_manager = Task(db_manager)
+
+# Versiones de objetivo vistas que se recuerdan por usuario (las más recientes)
+TASK_VERSIONS_KEPT = 50
+
+CONFLICT_NOTICE = (
+    "⚠️ <i>Este objetivo cambió mientras tanto. Esta es la versión actual: "
+    "repite la acción si todavía hace falta.</i>"
+)
 
 
 async def show_tasks_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -58,10 +74,13 @@ async def show_tasks_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def list_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Lista las tareas según el filtro solicitado"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
     callback_parts = query.data.split('_')
+    include_archived = None  # Solo las vistas de historial pueden incluir lo archivado
     
     if 'today' in callback_parts:
         filter_type = 'today'
@@ -84,6 +103,15 @@ async def list_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
         filter_type = 'high_priority'
         title = "🔴 Objetivos de Alta Prioridad"
         tasks = task_manager.get_all({'priority': 'high', 'parent_only': True})
+    elif 'completed' in callback_parts:
+        include_archived = 'archived' in callback_parts
+        filter_type = 'completed_archived' if include_archived else 'completed'
+        title = "✅ Objetivos Completados"
+        tasks = task_manager.get_all({
+            'status': 'completed',
+            'parent_only': True,
+            'include_archived': include_archived
+        })
     else:  # 'all' o cualquier otro caso
         filter_type = 'all'
         title = "📋 Todos los Objetivos"
@@ -96,7 +124,7 @@ async def list_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except:
             page = 0
     
-    if not tasks:
+    if not tasks and include_archived is None:
         message = f"{title}\n\n{CORTANA_TASK_NO_RESULTS}"
         await query.edit_message_text(
             message,
@@ -105,13 +133,18 @@ async def list_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    message = f"""{title}
+    if tasks:
+        message = f"""{title}
 
 Total: {len(tasks)} objetivos
 
 Selecciona un objetivo para ver detalles:"""
+    else:
+        # En el historial vacío se deja el botón para incluir los archivados
+        message = f"{title}\n\n{CORTANA_TASK_NO_RESULTS}"
     
-    keyboard = get_task_list_keyboard(tasks, filter_type=filter_type, page=page)
+    keyboard = get_task_list_keyboard(tasks, filter_type=filter_type, page=page,
+                                      include_archived=include_archived)
     
     await query.edit_message_text(
         message,
@@ -134,17 +167,27 @@ async def view_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await view_task_by_id(update, context, task_id)
 
 
-async def view_task_by_id(update: Update, context: ContextTypes.DEFAULT_TYPE, task_id: int, force_refresh: bool = False):
+async def view_task_by_id(update: Update, context: ContextTypes.DEFAULT_TYPE, task_id: int,
+                          force_refresh: bool = False, notice: Optional[str] = None):
     """
     Función auxiliar para mostrar una tarea por su ID.
     Se usa después de modificar una tarea para actualizar la vista.
     El parámetro force_refresh ayuda a evitar el error "Message is not modified".
+    notice es un aviso que se muestra encima (por ejemplo, CONFLICT_NOTICE).
     """
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     
     task = task_manager.get_by_id(task_id)
     
     if not task:
+        # Puede estar en el archivo (historial con archivados): se muestra solo para leer
+        archived_task = task_manager.get_by_id(task_id, include_archived=True)
+        if archived_task:
+            await view_archived_task(query, archived_task)
+            return
+        
         await query.edit_message_text(
             CORTANA_ERROR_NOT_FOUND,
             reply_markup=get_tasks_menu()
@@ -157,20 +200,10 @@ async def view_task_by_id(update: Update, context: ContextTypes.DEFAULT_TYPE, ta
     print(f"DEBUG: Estado de la tarea en la BD: '{task.get('status')}'")
     # --- FIN DE DEPURACIÓN ---
     
-    # Obtener subtareas si existen
-    subtasks = task_manager.get_subtasks(task_id)
-    has_subtasks = len(subtasks) > 0
-    
-    # Obtener nombre del proyecto si está asociado a uno
-    project_name = None
-    if task.get('project_id'):
-        from database.models import Project
-        project_manager = Project(db_manager)
-        project = project_manager.get_by_id(task['project_id'])
-        if project:
-            project_name = project['name']
-    
-    message = format_task(task, include_project=True, project_name=project_name)
+    message, keyboard = _build_task_view(task_manager, task)
+    _remember_version(context, task)
+    if notice:
+        message = f"{notice}\n\n{message}"
     
     # --- INICIO DE DEPURACIÓN ---
     print(f"DEBUG: Mensaje generado (longitud {len(message)}):")
@@ -178,23 +211,14 @@ async def view_task_by_id(update: Update, context: ContextTypes.DEFAULT_TYPE, ta
     print("="*50)
     # --- FIN DE DEPURACIÓN ---
     
-    keyboard = get_task_detail_keyboard(
-        task_id, 
-        task['status'],
-        has_subtasks
-    )
-    
     # SI SE FUERZA LA ACTUALIZACIÓN, AÑADIMOS UN CARÁCTER INVISIBLE PARA CAMBIAR EL MENSAJE
     if force_refresh:
         message += "\u200B"  # Espacio de ancho cero (Zero-Width Space)
         print("DEBUG: Forzando refresh con carácter invisible.")
     
     try:
-        await query.edit_message_text(
-            message,
-            parse_mode=ParseMode.HTML,
-            reply_markup=keyboard
-        )
+        # Si la descripción es muy larga se divide en varios mensajes antes de enviar
+        await edit_long_message(query, message, reply_markup=keyboard)
     except Exception as e:
         # Manejo específico de errores comunes de Telegram
         error_message = str(e)
@@ -206,25 +230,10 @@ async def view_task_by_id(update: Update, context: ContextTypes.DEFAULT_TYPE, ta
             print("DEBUG: El mensaje no cambió. Reintentando con fuerza.")
             # Llamamos a la misma función pero con force_refresh=True
             # Esto añadirá un carácter invisible y forzará la actualización.
-            await view_task_by_id(update, context, task_id, force_refresh=True)
+            await view_task_by_id(update, context, task_id, force_refresh=True, notice=notice)
             return
         
-        # Caso 2: El mensaje es demasiado largo
-        if "message is too long" in error_message:
-            max_length = 4096
-            if len(message) > max_length:
-                truncated_message = message[:max_length - 50] + "\n\n<i>(Mensaje truncado por ser muy largo)</i>"
-                try:
-                    await query.edit_message_text(
-                        truncated_message,
-                        parse_mode=ParseMode.HTML,
-                        reply_markup=keyboard
-                    )
-                    return
-                except Exception as e2:
-                    print(f"Error al enviar mensaje truncado: {e2}")
-        
-        # Caso 3: Otro tipo de error
+        # Caso 2: Otro tipo de error
         try:
             await query.message.reply_text(
                 "❌ No se pudo actualizar la vista, pero la acción se completó. Vuelve al menú de tareas para ver los cambios.",
@@ -233,8 +242,90 @@ async def view_task_by_id(update: Update, context: ContextTypes.DEFAULT_TYPE, ta
         except Exception as e3:
             print(f"Error fatal al enviar mensaje de fallback: {e3}")
 
+
+def _build_task_view(task_manager: Task, task: Dict[str, Any]) -> Tuple[str, InlineKeyboardMarkup]:
+    """Mensaje y teclado de la vista de detalle de un objetivo"""
+    # Obtener subtareas si existen
+    subtasks = task_manager.get_subtasks(task['id'])
+    has_subtasks = len(subtasks) > 0
+    
+    # Obtener nombre del proyecto si está asociado a uno
+    project_name = None
+    if task.get('project_id'):
+        from database.models import Project
+        project_manager = Project(db_manager, task_manager.owner_id)
+        project = project_manager.get_by_id(task['project_id'])
+        if project:
+            project_name = project['name']
+    
+    blocked_by = get_task_graph().pending_blockers(task_manager.owner_id, task['id'])
+    message = format_task(task, include_project=True, project_name=project_name, blocked_by=blocked_by)
+    keyboard = get_task_detail_keyboard(
+        task['id'], 
+        task['status'],
+        has_subtasks
+    )
+    return message, keyboard
+
+
+# ========== CONTROL DE CONCURRENCIA ==========
+# Cada vista de un objetivo guarda en user_data la versión que se mostró.
+# Las acciones sobre esa vista la pasan como expected_version: si el objetivo
+# ha cambiado entretanto (dos pulsaciones seguidas, un recordatorio, otra
+# ventana), el modelo no escribe y se vuelve a mostrar la versión actual.
+
+def _remember_version(context: ContextTypes.DEFAULT_TYPE, task: Dict[str, Any]):
+    versions = context.user_data.setdefault('task_versions', {})
+    versions.pop(task['id'], None)
+    versions[task['id']] = task['version']
+    while len(versions) > TASK_VERSIONS_KEPT:
+        versions.pop(next(iter(versions)))
+
+
+def _seen_version(context: ContextTypes.DEFAULT_TYPE, task_id: int) -> Optional[int]:
+    """Versión del objetivo que el usuario tiene en pantalla (None si no se sabe)"""
+    return context.user_data.get('task_versions', {}).get(task_id)
+
+
+async def _show_conflict(update: Update, context: ContextTypes.DEFAULT_TYPE, conflict: VersionConflict):
+    """Otro cambio llegó antes: se muestra el objetivo tal como está ahora"""
+    print(f"⚠️ Conflicto de versión en el objetivo {conflict.row_id} "
+          f"(usuario {update.effective_user.id}): se muestra la versión actual")
+    
+    if update.callback_query:
+        await view_task_by_id(update, context, conflict.row_id, notice=CONFLICT_NOTICE)
+        return
+    
+    # Edición por texto: la vista actual va en un mensaje nuevo
+    task_manager = Task(db_manager, update.effective_user.id)
+    message, keyboard = _build_task_view(task_manager, conflict.current)
+    _remember_version(context, conflict.current)
+    await update.message.reply_text(
+        f"{CONFLICT_NOTICE}\n\n{message}",
+        parse_mode=ParseMode.HTML,
+        reply_markup=keyboard
+    )
+
+
+async def view_archived_task(query, task: Dict[str, Any]):
+    """Muestra un objetivo archivado: solo lectura, con el botón para volver al historial"""
+    project_name = None
+    if task.get('project_id'):
+        from database.models import Project
+        project = Project(db_manager, query.from_user.id).get_by_id(task['project_id'], include_archived=True)
+        if project:
+            project_name = project['name']
+    
+    message = format_task(task, include_project=True, project_name=project_name)
+    message += f"\n\n🗄️ <i>Archivado el {datetime.fromisoformat(task['archived_at']).strftime('%d/%m/%Y')}</i>"
+    
+    await edit_long_message(query, message, reply_markup=get_archived_task_keyboard())
+
+
 async def change_task_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Cambia el estado de una tarea"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -255,7 +346,11 @@ async def change_task_status(update: Update, context: ContextTypes.DEFAULT_TYPE)
         print(f"DEBUG: Mapeando estado 'in' a 'in_progress' para la tarea {task_id}")
     # --- FIN DE LA CORRECCIÓN ---
     
-    success = task_manager.update_status(task_id, new_status)
+    try:
+        success = task_manager.update_status(task_id, new_status, _seen_version(context, task_id))
+    except VersionConflict as conflict:
+        await _show_conflict(update, context, conflict)
+        return
     
     if success:
         status_messages = {
@@ -276,6 +371,8 @@ async def change_task_status(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def complete_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Marca una tarea como completada"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     
     try:
@@ -290,7 +387,12 @@ async def complete_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.answer(f"❌ {CORTANA_ERROR_NOT_FOUND}", show_alert=True)
         return
     
-    success = task_manager.update_status(task_id, 'completed')
+    try:
+        success = task_manager.update_status(task_id, 'completed', _seen_version(context, task_id))
+    except VersionConflict as conflict:
+        await query.answer()
+        await _show_conflict(update, context, conflict)
+        return
     
     if success:
         await query.answer(
@@ -306,6 +408,8 @@ async def complete_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def postpone_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Pospone una tarea"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -324,7 +428,11 @@ async def postpone_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.answer(f"❌ {CORTANA_ERROR_NOT_FOUND}", show_alert=True)
         return
     
-    success = task_manager.postpone(task_id, days)
+    try:
+        success = task_manager.postpone(task_id, days, _seen_version(context, task_id))
+    except VersionConflict as conflict:
+        await _show_conflict(update, context, conflict)
+        return
     
     if success:
         await query.answer(
@@ -338,32 +446,234 @@ async def postpone_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.answer("❌ Error al posponer objetivo", show_alert=True)
 
 
-async def view_subtasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Muestra las subtareas de una tarea"""
+async def show_recurrence_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Muestra las opciones para que un objetivo se repita"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
     try:
         task_id = int(query.data.split('_')[-1])
     except ValueError:
+        await query.edit_message_text("❌ Error: ID de objetivo inválido")
+        return
+    
+    task = task_manager.get_by_id(task_id)
+    
+    if not task:
+        await query.edit_message_text(CORTANA_ERROR_NOT_FOUND, reply_markup=get_tasks_menu())
+        return
+    
+    _remember_version(context, task)
+    if task.get('recurrence'):
+        current = f"Ahora se repite {recurrence.describe(task['recurrence'])}."
+    else:
+        current = "Ahora no se repite."
+    
+    await query.edit_message_text(
+        f"🔁 <b>Repetir: {task['title']}</b>\n\n"
+        f"{current}\n"
+        f"Cuando completes una repetición aparecerá la siguiente.",
+        parse_mode=ParseMode.HTML,
+        reply_markup=get_task_recurrence_keyboard(task_id, bool(task.get('recurrence')))
+    )
+
+
+async def set_task_recurrence(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Aplica la regla elegida (o quita la repetición)"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
+    query = update.callback_query
+    parts = query.data.split('_')
+    
+    try:
+        # El formato es "task_setrepeat_ID_clave"
+        task_id = int(parts[2])
+        key = parts[3]
+    except (IndexError, ValueError):
+        await query.answer("❌ Error en los datos", show_alert=True)
+        return
+    
+    preset = config.RECURRENCE_PRESETS.get(key)
+    if key != 'none' and preset is None:
+        await query.answer("❌ Opción no válida", show_alert=True)
+        return
+    
+    try:
+        success = task_manager.set_recurrence(task_id, preset[1] if preset else None,
+                                              _seen_version(context, task_id))
+    except VersionConflict as conflict:
+        await query.answer()
+        await _show_conflict(update, context, conflict)
+        return
+    
+    if success:
+        await query.answer("🔁 Se repetirá" if preset else "🚫 Ya no se repite", show_alert=False)
+        await view_task_by_id(update, context, task_id)
+    else:
+        await query.answer(f"❌ {CORTANA_ERROR_NOT_FOUND}", show_alert=True)
+
+
+async def show_dependencies(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Muestra de qué objetivos depende una tarea y permite elegirlos"""
+    query = update.callback_query
+    await query.answer()
+    
+    parts = query.data.split('_')
+    
+    try:
+        # El formato es "task_deps_ID_página"
+        task_id = int(parts[2])
+        page = int(parts[3]) if len(parts) > 3 else 0
+    except (IndexError, ValueError):
+        await query.edit_message_text("❌ Error: ID de objetivo inválido")
+        return
+    
+    await _render_dependencies(update, task_id, page)
+
+
+async def toggle_dependency(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Añade o quita una dependencia desde la lista de objetivos"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
+    query = update.callback_query
+    parts = query.data.split('_')
+    
+    try:
+        # El formato es "task_deptoggle_ID_OTRO_página"
+        task_id = int(parts[2])
+        depends_on_id = int(parts[3])
+        page = int(parts[4])
+    except (IndexError, ValueError):
+        await query.answer("❌ Error en los datos", show_alert=True)
+        return
+    
+    current = {task['id'] for task in task_manager.get_dependencies(task_id)}
+    
+    if depends_on_id in current:
+        task_manager.remove_dependency(task_id, depends_on_id)
+        await query.answer("🔓 Ya no depende de ese objetivo")
+    else:
+        try:
+            added = task_manager.add_dependency(task_id, depends_on_id)
+        except DependencyCycle:
+            await query.answer(
+                "🔄 No puede ser: ese objetivo ya depende de este (directa o indirectamente)",
+                show_alert=True
+            )
+            return
+        
+        if not added:
+            await query.answer(f"❌ {CORTANA_ERROR_NOT_FOUND}", show_alert=True)
+            return
+        await query.answer("🔗 Dependencia añadida")
+    
+    await _render_dependencies(update, task_id, page)
+
+
+async def _render_dependencies(update: Update, task_id: int, page: int):
+    """
+    Lista para elegir dependencias: primero las que ya tiene y después los
+    objetivos sin completar de la misma misión (o todos, si no tiene misión).
+    """
+    task_manager = Task(db_manager, update.effective_user.id)
+    query = update.callback_query
+    
+    task = task_manager.get_by_id(task_id)
+    
+    if not task:
+        await query.edit_message_text(CORTANA_ERROR_NOT_FOUND, reply_markup=get_tasks_menu())
+        return
+    
+    dependencies = task_manager.get_dependencies(task_id)
+    selected = {dependency['id'] for dependency in dependencies}
+    
+    filters = {'parent_only': True, 'limit': config.DEPENDENCY_CANDIDATES_MAX}
+    if task.get('project_id'):
+        filters['project_id'] = task['project_id']
+    others = [
+        candidate
+        for status in ('in_progress', 'pending')
+        for candidate in task_manager.get_all(dict(filters, status=status))
+        if candidate['id'] != task_id and candidate['id'] not in selected
+    ]
+    candidates = dependencies + others
+    
+    pages = max(1, -(-len(candidates) // config.DEPENDENCY_CANDIDATES_PER_PAGE))
+    page = min(max(page, 0), pages - 1)
+    
+    lines = [f"🔗 <b>{task['title']}</b>", ""]
+    if dependencies:
+        lines.append("No se puede empezar hasta completar:")
+        for dependency in dependencies:
+            mark = "✅" if dependency['status'] == 'completed' else "⏳"
+            lines.append(f"{mark} {dependency['title']}")
+    else:
+        lines.append("No depende de ningún objetivo.")
+    lines.append("")
+    lines.append("Toca un objetivo para añadirlo o quitarlo.")
+    
+    await query.edit_message_text(
+        "\n".join(lines),
+        parse_mode=ParseMode.HTML,
+        reply_markup=get_task_dependency_keyboard(task_id, candidates, selected, page)
+    )
+
+
+async def view_subtasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Muestra las subtareas de una tarea.
+    Si no caben en un mensaje se muestran por páginas ("task_view_subtasks_ID_page_N").
+    """
+    task_manager = Task(db_manager, update.effective_user.id)
+    
+    query = update.callback_query
+    await query.answer()
+    
+    parts = query.data.split('_')
+    try:
+        task_id = int(parts[3])
+        page = int(parts[5]) if len(parts) > 5 and parts[4] == 'page' else 0
+    except (IndexError, ValueError):
         await query.edit_message_text("❌ Error: ID inválido")
         return
     
     subtasks = task_manager.get_subtasks(task_id)
+    has_more = False
     
     if not subtasks:
         message = "📋 <b>Subobjetivos</b>\n\n❌ No hay subobjetivos registrados."
     else:
-        lines = ["📋 <b>Subobjetivos</b>\n"]
-        
-        for i, subtask in enumerate(subtasks, 1):
-            status = "✅" if subtask['status'] == 'completed' else "⏳"
-            priority = "🔴" if subtask['priority'] == 'high' else "🟡" if subtask['priority'] == 'medium' else "🟢"
-            lines.append(f"{i}. {status}{priority} {subtask['title']}")
+        # Las líneas se generan a medida que se paginan: solo se formatean hasta la página pedida
+        subtask_lines = (
+            f"{i}. {'✅' if subtask['status'] == 'completed' else '⏳'}"
+            f"{PRIORITY_EMOJI.get(subtask['priority'], '🟢')} {subtask['title']}"
+            for i, subtask in enumerate(subtasks, 1)
+        )
+        page_lines, has_more = paginate_lines(subtask_lines, page)
         
-        message = "\n".join(lines)
-    
-    keyboard = [
+        header = "📋 <b>Subobjetivos</b>\n"
+        if page > 0 or has_more:
+            header = f"📋 <b>Subobjetivos</b> (página {page + 1})\n"
+        message = "\n".join([header] + page_lines)
+    
+    keyboard = []
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(
+            "◀️ Anterior",
+            callback_data=f"task_view_subtasks_{task_id}_page_{page - 1}"
+        ))
+    if has_more:
+        navigation.append(InlineKeyboardButton(
+            "Más ▶️",
+            callback_data=f"task_view_subtasks_{task_id}_page_{page + 1}"
+        ))
+    if navigation:
+        keyboard.append(navigation)
+    
+    keyboard += [
         [InlineKeyboardButton(
             f"➕ Añadir subobjetivo",
             callback_data=f"task_add_subtask_{task_id}"
@@ -411,6 +721,8 @@ async def view_subtasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def edit_task_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Muestra el menú de edición de una tarea"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -440,6 +752,9 @@ async def edit_task_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
             InlineKeyboardButton("🎯 Prioridad", callback_data=f"edit_task_field_{task_id}_priority"),
             InlineKeyboardButton("📅 Deadline", callback_data=f"edit_task_field_{task_id}_deadline")
         ],
+        [
+            InlineKeyboardButton("⏰ Hora límite y aviso", callback_data=f"edit_task_field_{task_id}_alert")
+        ],
         [
             InlineKeyboardButton("🔙 Volver", callback_data=f"task_view_{task_id}")
         ]
@@ -454,14 +769,17 @@ async def edit_task_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def edit_task_field(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Inicia la edición de un campo específico de la tarea"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
     parts = query.data.split('_')
     
     try:
-        task_id = int(parts[2])
-        field = parts[3]
+        # El formato es "edit_task_field_ID_campo"
+        task_id = int(parts[3])
+        field = parts[4]
     except (IndexError, ValueError):
         await query.answer("❌ Error en los datos", show_alert=True)
         return
@@ -478,16 +796,31 @@ async def edit_task_field(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Guardar información para el siguiente paso
     context.user_data['edit_task'] = {
         'task_id': task_id,
-        'field': field
+        'field': field,
+        'version': _seen_version(context, task_id)
     }
     
     field_messages = {
         'title': "Envía el nuevo título del objetivo:",
         'description': "Envía la nueva descripción (o '-' para dejar vacía):",
         'priority': "Selecciona la nueva prioridad:",
-        'deadline': "Envía la nueva fecha límite (DD/MM/AAAA) o '-' para sin fecha:"
+        'deadline': "Envía la nueva fecha límite (DD/MM/AAAA) o '-' para sin fecha:",
+        'alert': (
+            "Envía la hora límite (HH:MM) y, opcionalmente, cuántos minutos antes avisar.\n"
+            f"Ejemplo: 17:30 15 (sin minutos se avisa {config.DEADLINE_ALERT_DEFAULT_MINUTES} min antes)\n"
+            "Envía '-' para quitar la alerta:"
+        )
     }
     
+    if field == 'alert' and not task.get('deadline'):
+        await query.edit_message_text(
+            "📅 Primero asigna una fecha límite al objetivo.",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Volver", callback_data=f"task_edit_{task_id}")
+            ]])
+        )
+        return ConversationHandler.END
+    
     if field == 'priority':
         keyboard = [
             [InlineKeyboardButton("🔴 Alta", callback_data="edit_priority_high")],
@@ -508,6 +841,8 @@ async def edit_task_field(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def edit_task_value_received(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Recibe el nuevo valor para el campo de la tarea"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     task_data = context.user_data.get('edit_task', {})
     
     if not task_data:
@@ -516,6 +851,7 @@ async def edit_task_value_received(update: Update, context: ContextTypes.DEFAULT
     
     task_id = task_data['task_id']
     field = task_data['field']
+    version = task_data.get('version')
     
     # Procesar el valor recibido
     if update.callback_query:
@@ -530,39 +866,16 @@ async def edit_task_value_received(update: Update, context: ContextTypes.DEFAULT
         new_value = update.message.text
         query = None
     
-    # Validar y actualizar
-    success = False
-    
-    if field == 'title':
-        if len(new_value) > config.MAX_TASK_NAME_LENGTH:
-            await update.message.reply_text(
-                f"❌ El título es muy largo. Máximo {config.MAX_TASK_NAME_LENGTH} caracteres."
-            )
-            return EDIT_VALUE
-        
-        success = task_manager.update_title(task_id, new_value)
-    
-    elif field == 'description':
-        if new_value == '-':
-            new_value = ''
-        
-        success = task_manager.update_description(task_id, new_value)
-    
-    elif field == 'priority':
-        success = task_manager.update_priority(task_id, new_value)
+    # Validar y actualizar (solo si el objetivo sigue como cuando se empezó a editar)
+    try:
+        success = await _apply_task_edit(update, task_manager, task_id, field, new_value, version)
+    except VersionConflict as conflict:
+        context.user_data.pop('edit_task', None)
+        await _show_conflict(update, context, conflict)
+        return ConversationHandler.END
     
-    elif field == 'deadline':
-        if new_value == '-':
-            success = task_manager.update_deadline(task_id, None)
-        else:
-            try:
-                deadline_date = datetime.strptime(new_value, "%d/%m/%Y").date()
-                success = task_manager.update_deadline(task_id, deadline_date.strftime("%Y-%m-%d"))
-            except ValueError:
-                await update.message.reply_text(
-                    "❌ Formato de fecha incorrecto. Usa DD/MM/AAAA (ejemplo: 25/12/2024)"
-                )
-                return EDIT_VALUE
+    if success is None:
+        return EDIT_VALUE
     
     if success:
         message = f"✅ <b>Campo actualizado</b>\n\n{field.capitalize()}: {new_value}"
@@ -593,8 +906,72 @@ async def edit_task_value_received(update: Update, context: ContextTypes.DEFAULT
         return ConversationHandler.END
 
 
+async def _apply_task_edit(update: Update, task_manager: Task, task_id: int, field: str,
+                           new_value: Optional[str], version: Optional[int]) -> Optional[bool]:
+    """
+    Valida el valor recibido y actualiza el campo.
+    
+    Returns:
+        True/False según se haya actualizado, o None si el valor no es válido
+        (ya se ha pedido de nuevo al usuario)
+    """
+    if field == 'title':
+        if len(new_value) > config.MAX_TASK_NAME_LENGTH:
+            await update.message.reply_text(
+                f"❌ El título es muy largo. Máximo {config.MAX_TASK_NAME_LENGTH} caracteres."
+            )
+            return None
+        
+        return task_manager.update_title(task_id, new_value, version)
+    
+    elif field == 'description':
+        if new_value == '-':
+            new_value = ''
+        
+        return task_manager.update_description(task_id, new_value, version)
+    
+    elif field == 'priority':
+        return task_manager.update_priority(task_id, new_value, version)
+    
+    elif field == 'deadline':
+        if new_value == '-':
+            return task_manager.update_deadline(task_id, None, version)
+        else:
+            try:
+                deadline_date = datetime.strptime(new_value, "%d/%m/%Y").date()
+                deadline = deadline_date.strftime("%Y-%m-%d")
+            except ValueError:
+                await update.message.reply_text(
+                    "❌ Formato de fecha incorrecto. Usa DD/MM/AAAA (ejemplo: 25/12/2024)"
+                )
+                return None
+            return task_manager.update_deadline(task_id, deadline, version)
+    
+    elif field == 'alert':
+        if new_value.strip() == '-':
+            return task_manager.set_deadline_alert(task_id, None, expected_version=version)
+        else:
+            try:
+                parts = new_value.split()
+                deadline_time = datetime.strptime(parts[0], "%H:%M").strftime("%H:%M")
+                minutes = int(parts[1]) if len(parts) > 1 else None
+                if len(parts) > 2 or (minutes is not None and minutes < 0):
+                    raise ValueError
+            except (IndexError, ValueError):
+                await update.message.reply_text(
+                    "❌ Formato incorrecto. Usa HH:MM y, opcionalmente, los minutos (ejemplo: 17:30 15)"
+                )
+                return None
+            
+            return task_manager.set_deadline_alert(task_id, deadline_time, minutes, version)
+    
+    return False
+
+
 async def delete_task_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Solicita confirmación para eliminar una tarea"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -631,6 +1008,8 @@ async def delete_task_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def delete_task_confirmed(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Elimina una tarea confirmada"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     query = update.callback_query
     await query.answer()
     
@@ -640,7 +1019,11 @@ async def delete_task_confirmed(update: Update, context: ContextTypes.DEFAULT_TY
         await query.edit_message_text("❌ Error: ID inválido")
         return
     
-    success = task_manager.delete(task_id)
+    try:
+        success = task_manager.delete(task_id, _seen_version(context, task_id))
+    except VersionConflict as conflict:
+        await _show_conflict(update, context, conflict)
+        return
     
     if success:
         await query.edit_message_text(
@@ -716,6 +1099,8 @@ async def subtask_title_received(update: Update, context: ContextTypes.DEFAULT_T
 
 async def subtask_description_received(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Recibe la descripción de la subtarea y la crea"""
+    task_manager = Task(db_manager, update.effective_user.id)
+    
     subtask_data = context.user_data.get('subtask', {})
     
     if not subtask_data:
@@ -775,8 +1160,5 @@ async def subtask_description_received(update: Update, context: ContextTypes.DEF
     return ConversationHandler.END
 
 
-# Constantes para los estados del ConversationHandler
-ADD_SUBTASK_TITLE = 0
-ADD_SUBTASK_DESC = 1
-EDIT_FIELD = 2
-EDIT_VALUE = 3
\ No newline at end of file
+# Constantes para los estados del ConversationHandler (definidas en handlers/states.py)
+from handlers.states import ADD_SUBTASK_TITLE, ADD_SUBTASK_DESC, EDIT_FIELD, EDIT_VALUE
\ No newline at end of file
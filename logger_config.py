@@ -2,13 +2,22 @@
 Sistema de logging para el bot de productividad
 Este archivo configura los logs para rastrear errores y eventos
 """
+import atexit
+import gzip
+import json
 import logging
-from datetime import datetime
 import os
+import queue
+import shutil
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+import config
 
 # Crear carpeta de logs si no existe
-if not os.path.exists('logs'):
-    os.makedirs('logs')
+if not os.path.exists(config.LOG_DIRECTORY):
+    os.makedirs(config.LOG_DIRECTORY)
 
 # EXPLICACIÓN: Configuramos diferentes niveles de log
 # DEBUG: información detallada para diagnóstico (todo lo que pasa)
@@ -16,65 +25,277 @@ if not os.path.exists('logs'):
 # WARNING: advertencias de algo que podría ser un problema
 # ERROR: errores que impiden que algo funcione
 # CRITICAL: errores graves que pueden detener el bot
+#
+# EXPLICACIÓN: Escribir en disco es lento y el bot atiende a todos los usuarios
+# en un único event loop. Por eso los loggers NO escriben: solo meten el
+# mensaje en una cola (QueueHandler). Un hilo aparte (QueueListener) lo saca
+# y lo escribe en el archivo que toca, rotándolo y comprimiéndolo cuando
+# crece demasiado o cambia el día.
+
+# FORMATO del log: [FECHA HORA] NIVEL - MÓDULO - MENSAJE
+# Ejemplo: [2024-10-30 15:30:45] INFO - tasks - Usuario hizo clic en tarea ID 5
+TEXT_FORMAT = '[%(asctime)s] %(levelname)s - %(name)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por mensaje (LOG_FORMAT = 'json'), fácil de procesar con herramientas"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _make_formatter() -> logging.Formatter:
+    if config.LOG_FORMAT == 'json':
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+
+# ========== ROTACIÓN ==========
+
+class CompressingRotatingFileHandler(logging.FileHandler):
+    """
+    Archivo de log que rota por tamaño (LOG_MAX_BYTES) y al cambiar el día.
+
+    El archivo rotado se comprime: tasks.log -> tasks.log.2024-10-30_153045_123456.gz
+    y solo se conservan los LOG_BACKUP_COUNT más recientes.
+    """
+
+    def __init__(self, filename: str, max_bytes: int = config.LOG_MAX_BYTES,
+                 backup_count: int = config.LOG_BACKUP_COUNT):
+        super().__init__(filename, encoding='utf-8', delay=True)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        # Día al que pertenece el archivo actual
+        if os.path.exists(self.baseFilename):
+            self._day = datetime.fromtimestamp(os.path.getmtime(self.baseFilename)).date()
+        else:
+            self._day = datetime.now().date()
+
+    def emit(self, record):
+        try:
+            if self.should_rollover(record):
+                self.do_rollover()
+        except Exception:
+            self.handleError(record)
+            return
+        super().emit(record)
+
+    def should_rollover(self, record) -> bool:
+        if datetime.fromtimestamp(record.created).date() != self._day:
+            return True
+
+        if self.max_bytes <= 0:
+            return False
+        if self.stream:
+            return self.stream.tell() >= self.max_bytes
+        return os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) >= self.max_bytes
+
+    def do_rollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            stamp = datetime.now().strftime('%Y-%m-%d_%H%M%S_%f')
+            target = f"{self.baseFilename}.{stamp}.gz"
+            with open(self.baseFilename, 'rb') as source, gzip.open(target, 'wb') as compressed:
+                shutil.copyfileobj(source, compressed)
+            os.remove(self.baseFilename)
+            self._delete_old_backups()
+
+        self._day = datetime.now().date()
+
+    def _delete_old_backups(self):
+        directory, base = os.path.split(self.baseFilename)
+        backups = sorted(
+            name for name in os.listdir(directory)
+            if name.startswith(base + '.') and name.endswith('.gz')
+        )
+        for name in backups[:max(0, len(backups) - self.backup_count)]:
+            os.remove(os.path.join(directory, name))
+
+
+# ========== MUESTREO ==========
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar solo una parte de los mensajes DEBUG de un logger
+    (LOG_DEBUG_SAMPLE_RATES). El resto de niveles pasa siempre.
+
+    El muestreo es determinista: con 0.25 pasa exactamente 1 de cada 4.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self._seen = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno != logging.DEBUG or self.rate >= 1:
+            return True
+        if self.rate <= 0:
+            return False
+
+        with self._lock:
+            before = int(self._seen * self.rate)
+            self._seen += 1
+            return int(self._seen * self.rate) > before
+
+
+class _TargetFilter(logging.Filter):
+    """Marca cada mensaje con el archivo donde debe acabar"""
+
+    def __init__(self, target: str):
+        super().__init__()
+        self.target = target
+
+    def filter(self, record):
+        record.log_target = self.target
+        return True
+
+
+# ========== ESCRITURA EN SEGUNDO PLANO ==========
+
+class _LogRouter(logging.Handler):
+    """
+    Corre en el hilo del QueueListener: manda cada mensaje a su archivo
+    (logs/<nombre>.log), a logs/<nombre>_errors.log si es un error,
+    y a la consola si es INFO o superior.
+    """
+
+    def __init__(self):
+        super().__init__()
+        formatter = _make_formatter()
+
+        # Consola (lo que vemos al ejecutar el bot)
+        # Mostramos INFO y superiores para no saturar la consola
+        self.console = logging.StreamHandler()
+        self.console.setLevel(logging.INFO)
+        self.console.setFormatter(formatter)
+
+        self.formatter_for_files = formatter
+        self.files = {}
+
+    def _handlers_for(self, target: str):
+        handlers = self.files.get(target)
+        if handlers is None:
+            # Archivo con TODOS los logs (debug y superiores)
+            all_handler = CompressingRotatingFileHandler(os.path.join(config.LOG_DIRECTORY, f'{target}.log'))
+            all_handler.setLevel(logging.DEBUG)
+
+            # Archivo solo con ERRORES (error y critical)
+            error_handler = CompressingRotatingFileHandler(
+                os.path.join(config.LOG_DIRECTORY, f'{target}_errors.log')
+            )
+            error_handler.setLevel(logging.ERROR)
+
+            handlers = [all_handler, error_handler]
+            for handler in handlers:
+                handler.setFormatter(self.formatter_for_files)
+            self.files[target] = handlers
+        return handlers
+
+    def emit(self, record):
+        target = getattr(record, 'log_target', 'bot')
+        for handler in self._handlers_for(target) + [self.console]:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def close(self):
+        for handlers in self.files.values():
+            for handler in handlers:
+                handler.close()
+        self.console.close()
+        super().close()
+
+
+_log_queue = queue.SimpleQueue()
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _start_listener():
+    """Arranca el hilo que escribe los logs (una sola vez)"""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = QueueListener(_log_queue, _LogRouter())
+            _listener.start()
+            atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Escribe lo que quede en la cola y para el hilo (se llama solo al salir)"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
+
+def _queue_handler(target: str, name: str, level=logging.DEBUG) -> QueueHandler:
+    handler = QueueHandler(_log_queue)
+    handler.setLevel(level)
+    handler.addFilter(_TargetFilter(target))
+
+    rate = config.LOG_DEBUG_SAMPLE_RATES.get(name, config.LOG_DEBUG_SAMPLE_RATE)
+    handler.addFilter(SamplingFilter(rate))
+    return handler
+
 
 def setup_logger(name):
     """
     Crea un logger personalizado para un módulo específico
-    
+
     Args:
         name: Nombre del módulo (ej: 'tasks', 'projects', 'main')
-    
+
     Returns:
         logger configurado
     """
     logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG)  # Capturamos TODO (debug y superiores)
-    
+
     # Evitar duplicar handlers si ya existen
     if logger.handlers:
         return logger
-    
-    # HANDLER 1: Archivo con TODOS los logs (debug y superiores)
-    # Este archivo tendrá información muy detallada
-    file_handler = logging.FileHandler(
-        f'logs/{name}.log',
-        encoding='utf-8'
-    )
-    file_handler.setLevel(logging.DEBUG)
-    
-    # HANDLER 2: Archivo solo con ERRORES (error y critical)
-    # Este archivo solo guardará los problemas importantes
-    error_handler = logging.FileHandler(
-        f'logs/{name}_errors.log',
-        encoding='utf-8'
-    )
-    error_handler.setLevel(logging.ERROR)
-    
-    # HANDLER 3: Consola (lo que vemos al ejecutar el bot)
-    # Mostramos INFO y superiores para no saturar la consola
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    
-    # FORMATO del log: [FECHA HORA] NIVEL - MÓDULO - MENSAJE
-    # Ejemplo: [2024-10-30 15:30:45] INFO - tasks - Usuario hizo clic en tarea ID 5
-    formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)s - %(name)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Aplicar formato a todos los handlers
-    file_handler.setFormatter(formatter)
-    error_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
-    
-    # Agregar handlers al logger
-    logger.addHandler(file_handler)
-    logger.addHandler(error_handler)
-    logger.addHandler(console_handler)
-    
+
+    _start_listener()
+
+    # Un único handler: la cola. Los archivos y la consola los gestiona el hilo de escritura.
+    logger.addHandler(_queue_handler(name, name))
+    logger.propagate = False  # Si no, la consola lo mostraría dos veces
+
     return logger
 
 
+def setup_root_logging(level=logging.INFO):
+    """
+    Manda también por la cola los logs del resto del programa (main,
+    python-telegram-bot, APScheduler, httpx...): a la consola y a logs/bot.log.
+    Sustituye a logging.basicConfig.
+    """
+    _start_listener()
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if not any(isinstance(handler, QueueHandler) for handler in root.handlers):
+        root.addHandler(_queue_handler('bot', 'root', level))
+
+
 # DECORADOR para logging automático de funciones
 # EXPLICACIÓN: Un decorador es una función que "envuelve" otra función
 # para añadirle funcionalidad extra (en este caso, logging automático)
@@ -82,7 +303,10 @@ def log_function_call(logger):
     """
     Decorador que registra automáticamente cuando se llama una función
     y si tiene errores
-    
+
+    Las líneas de inicio y fin son DEBUG (se muestrean con LOG_DEBUG_SAMPLE_RATES),
+    los errores siempre se registran.
+
     Uso:
         @log_function_call(logger)
         async def mi_funcion(update, context):
@@ -92,18 +316,18 @@ def log_function_call(logger):
         async def wrapper(*args, **kwargs):
             # Extraer el nombre de la función
             func_name = func.__name__
-            
+
             # LOG cuando SE INICIA la función
-            logger.info(f"🔵 INICIO: {func_name}()")
-            
+            logger.debug(f"🔵 INICIO: {func_name}()")
+
             try:
                 # EJECUTAR la función original
                 result = await func(*args, **kwargs)
-                
+
                 # LOG cuando TERMINA CORRECTAMENTE
-                logger.info(f"✅ FIN: {func_name}() - Éxito")
+                logger.debug(f"✅ FIN: {func_name}() - Éxito")
                 return result
-                
+
             except Exception as e:
                 # LOG cuando HAY UN ERROR
                 logger.error(
@@ -112,7 +336,7 @@ def log_function_call(logger):
                 )
                 # Volver a lanzar el error para no ocultarlo
                 raise
-        
+
         return wrapper
     return decorator
 
@@ -121,7 +345,7 @@ def log_function_call(logger):
 bot_logger = setup_logger('bot')
 
 # EXPLICACIÓN de cómo usar este sistema:
-# 
+#
 # 1. En cada archivo de handlers, importa:
 #    from logger_config import setup_logger, log_function_call
 #
@@ -140,6 +364,8 @@ bot_logger = setup_logger('bot')
 #    logger.error("No se pudo guardar en la base de datos")
 #
 # Los logs se guardarán en:
-# - logs/tasks.log (TODO)
+# - logs/tasks.log (TODO, rota por tamaño y por día, comprimido en .gz)
 # - logs/tasks_errors.log (solo ERRORES)
-# - Consola (INFO y superiores)
\ No newline at end of file
+# - Consola (INFO y superiores)
+#
+# Ninguna de estas escrituras bloquea: las hace un hilo aparte.
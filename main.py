@@ -5,8 +5,9 @@ Punto de entrada principal de la aplicación
 Este archivo inicializa el bot, configura los handlers (manejadores de mensajes y botones),
 y arranca el sistema de recordatorios automáticos.
 """
+import asyncio
 import logging
-from datetime import time
+from datetime import datetime, time, timedelta
 from telegram import Update
 from telegram.ext import (
     Application,
@@ -14,30 +15,42 @@ from telegram.ext import (
     MessageHandler,
     CallbackQueryHandler,
     ConversationHandler,
+    InlineQueryHandler,
+    TypeHandler,
     filters
 )
 from telegram.constants import ParseMode
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.jobstores.base import JobLookupError
 
 # Importar configuración y componentes
 import config
+from logger_config import setup_root_logging
 from database.models import DatabaseManager, Project, Task, Note
+from database.jobstore import SQLiteJobStore
+from database import archive, backup, recurrence, tracing
+from utils import reminders
 from utils.reminders import ReminderSystem
+from utils.reminder_scheduler import ReminderScheduler
+from utils.deadline_alerts import DeadlineAlertService
 from utils.keyboards import get_main_keyboard
-from utils.formatters import format_dashboard
+from utils.templates import render_template
+from utils import metrics
 
 # Importar personalidad de Cortana
 from cortana_personality import CORTANA_WELCOME, CORTANA_HELP
 
-# Importar handlers
-from handlers import menu, projects, tasks, notes, dashboard, settings, task_conversations, project_conversations
+# Importar handlers: solo el control de acceso se carga ya (actúa sobre todos los updates).
+# El resto se declara con lazy_handler y su módulo se importa al usarse por primera vez.
+from handlers import access, states, lazy_handler, preload_handlers
 
-# Configurar logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+# Configurar logging: todo pasa por una cola y lo escribe un hilo aparte
+# (consola y logs/bot.log, con rotación), así no bloquea el event loop
+setup_root_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -48,25 +61,64 @@ class ProductivityBot:
     Personalidad: Cortana de Halo
     """
     
-    def __init__(self):
+    def __init__(self, request=None, base_url=None):
         """
         Inicializa el bot y todos sus componentes.
+        
+        Args:
+            request: Cliente HTTP alternativo para la API de Telegram
+                     (los benchmarks usan uno falso que no sale a la red)
+            base_url: URL alternativa de la Bot API (la prueba de carga usa
+                      un servidor local que imita a Telegram)
         """
         # Inicializar base de datos
         self.db_manager = DatabaseManager()
         logger.info("✅ Base de datos inicializada")
         
+        # Con un archivo por usuario, mover los datos que sigan en la base compartida
+        if config.STORAGE_MODE == 'per_user':
+            from database.sharding import get_registry
+            get_registry().migrate_shared_data()
+        
+        # Medir la latencia de los métodos de los modelos (ver /stats)
+        if config.METRICS_ENABLED:
+            metrics.instrument_models()
+        
         # Inicializar gestores de datos
         self.project_manager = Project(self.db_manager)
         self.task_manager = Task(self.db_manager)
         self.note_manager = Note(self.db_manager)
         
         # Crear aplicación de Telegram
-        self.app = Application.builder().token(config.BOT_TOKEN).build()
+        # El cliente HTTP instrumentado mide cada llamada a la API de Telegram
+        builder = (
+            Application.builder()
+            .token(config.BOT_TOKEN)
+            .request(request or metrics.InstrumentedRequest(connection_pool_size=256))
+            .post_init(self.post_init)
+        )
+        if base_url:
+            builder = builder.base_url(base_url)
+        self.app = builder.build()
         
         # Sistema de recordatorios
+        # Los trabajos programados se guardan en SQLite ('default') para sobrevivir
+        # a reinicios. Los trabajos de un solo uso van en memoria ('memory').
         self.reminder_system = None
-        self.scheduler = AsyncIOScheduler()
+        self.reminder_scheduler = None
+        self.deadline_alerts = None
+        self.job_store = SQLiteJobStore(config.DATABASE_PATH)
+        self.scheduler = AsyncIOScheduler(
+            jobstores={
+                'default': self.job_store,
+                'memory': MemoryJobStore()
+            },
+            job_defaults={
+                'coalesce': True,  # Si se acumulan varias ejecuciones, solo se hace una
+                'misfire_grace_time': config.REMINDER_MISFIRE_GRACE_TIME,
+                'max_instances': 1
+            }
+        )
         
         logger.info("✅ Bot inicializado - Personalidad: Cortana")
     
@@ -83,11 +135,36 @@ class ProductivityBot:
         Los ConversationHandlers tienen prioridad sobre otros handlers.
         """
         
+        # ========== CONTROL DE ACCESO ==========
+        # Grupo -1: se ejecuta antes que todo lo demás y corta los updates
+        # de usuarios que no están en la allowlist
+        
+        self.app.add_handler(TypeHandler(Update, access.check_access), group=-1)
+        
         # ========== COMANDOS ==========
         
         self.app.add_handler(CommandHandler("start", self.start_command))
         self.app.add_handler(CommandHandler("help", self.help_command))
         
+        # Gestión de usuarios (modo multiusuario, solo administradores)
+        self.app.add_handler(CommandHandler("allow", access.allow_user))
+        self.app.add_handler(CommandHandler("revoke", access.revoke_user))
+        self.app.add_handler(CommandHandler("users", access.list_users))
+        
+        # Latencias de handlers, base de datos y API de Telegram (administradores)
+        self.app.add_handler(CommandHandler("stats", lazy_handler('stats.show_stats')))
+        
+        # Copias de seguridad (solo administradores). block=False: copiar o
+        # restaurar tarda y no debe frenar al resto de updates; BackupManager
+        # ya rechaza una segunda copia o restauración a la vez
+        self.app.add_handler(CommandHandler("backup", lazy_handler('backups.backup_command'), block=False))
+        self.app.add_handler(CommandHandler("restore", lazy_handler('backups.restore_command'), block=False))
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('backups.restore_confirmed'),
+            pattern="^backup_restore_",
+            block=False
+        ))
+        
         # ========== CONVERSATION HANDLERS ==========
         # CRÍTICO: Estos DEBEN ir ANTES del menú persistente
         
@@ -95,61 +172,61 @@ class ProductivityBot:
         project_creation_handler = ConversationHandler(
             entry_points=[
                 CallbackQueryHandler(
-                    project_conversations.create_project_start, 
+                    lazy_handler('project_conversations.create_project_start'), 
                     pattern="^project_new$"
                 )
             ],
             states={
-                project_conversations.PROJECT_NAME: [
+                states.PROJECT_NAME: [
                     MessageHandler(
                         filters.TEXT & ~filters.COMMAND, 
-                        project_conversations.project_name_received
+                        lazy_handler('project_conversations.project_name_received')
                     ),
                     CallbackQueryHandler(
-                        project_conversations.project_creation_cancelled,
+                        lazy_handler('project_conversations.project_creation_cancelled'),
                         pattern="^project_create_cancel$"
                     )
                 ],
-                project_conversations.PROJECT_DESCRIPTION: [
+                states.PROJECT_DESCRIPTION: [
                     MessageHandler(
                         filters.TEXT & ~filters.COMMAND,
-                        project_conversations.project_description_received
+                        lazy_handler('project_conversations.project_description_received')
                     ),
                     CallbackQueryHandler(
-                        project_conversations.project_description_received,
+                        lazy_handler('project_conversations.project_description_received'),
                         pattern="^project_skip_desc$"
                     )
                 ],
-                project_conversations.PROJECT_PRIORITY: [
+                states.PROJECT_PRIORITY: [
                     CallbackQueryHandler(
-                        project_conversations.project_priority_received,
+                        lazy_handler('project_conversations.project_priority_received'),
                         pattern="^priority_"
                     )
                 ],
-                project_conversations.PROJECT_DEADLINE: [
+                states.PROJECT_DEADLINE: [
                     MessageHandler(
                         filters.TEXT & ~filters.COMMAND,
-                        project_conversations.project_deadline_received
+                        lazy_handler('project_conversations.project_deadline_received')
                     ),
                     CallbackQueryHandler(
-                        project_conversations.project_deadline_received,
+                        lazy_handler('project_conversations.project_deadline_received'),
                         pattern="^project_skip_deadline$"
                     )
                 ],
-                project_conversations.PROJECT_CONFIRM: [
+                states.PROJECT_CONFIRM: [
                     CallbackQueryHandler(
-                        project_conversations.project_confirmed,
+                        lazy_handler('project_conversations.project_confirmed'),
                         pattern="^project_confirm_yes$"
                     ),
                     CallbackQueryHandler(
-                        project_conversations.project_creation_cancelled,
+                        lazy_handler('project_conversations.project_creation_cancelled'),
                         pattern="^project_create_cancel$"
                     )
                 ]
             },
             fallbacks=[
                 CallbackQueryHandler(
-                    projects.show_projects_menu,
+                    lazy_handler('projects.show_projects_menu'),
                     pattern="^menu_projects$"
                 )
             ],
@@ -166,67 +243,67 @@ class ProductivityBot:
         task_creation_handler = ConversationHandler(
             entry_points=[
                 CallbackQueryHandler(
-                    task_conversations.create_task_start, 
+                    lazy_handler('task_conversations.create_task_start'), 
                     pattern="^task_new$"
                 )
             ],
             states={
-                task_conversations.TASK_TITLE: [
+                states.TASK_TITLE: [
                     MessageHandler(
                         filters.TEXT & ~filters.COMMAND, 
-                        task_conversations.task_title_received
+                        lazy_handler('task_conversations.task_title_received')
                     ),
                     CallbackQueryHandler(
-                        task_conversations.task_creation_cancelled,
+                        lazy_handler('task_conversations.task_creation_cancelled'),
                         pattern="^task_create_cancel$"
                     )
                 ],
-                task_conversations.TASK_DESCRIPTION: [
+                states.TASK_DESCRIPTION: [
                     MessageHandler(
                         filters.TEXT & ~filters.COMMAND,
-                        task_conversations.task_description_received
+                        lazy_handler('task_conversations.task_description_received')
                     ),
                     CallbackQueryHandler(
-                        task_conversations.task_description_received,
+                        lazy_handler('task_conversations.task_description_received'),
                         pattern="^task_skip_description$"
                     )
                 ],
-                task_conversations.TASK_PRIORITY: [
+                states.TASK_PRIORITY: [
                     CallbackQueryHandler(
-                        task_conversations.task_priority_received,
+                        lazy_handler('task_conversations.task_priority_received'),
                         pattern="^task_priority_"
                     )
                 ],
-                task_conversations.TASK_DEADLINE: [
+                states.TASK_DEADLINE: [
                     MessageHandler(
                         filters.TEXT & ~filters.COMMAND,
-                        task_conversations.task_deadline_received
+                        lazy_handler('task_conversations.task_deadline_received')
                     ),
                     CallbackQueryHandler(
-                        task_conversations.task_deadline_received,
+                        lazy_handler('task_conversations.task_deadline_received'),
                         pattern="^task_deadline_"
                     )
                 ],
-                task_conversations.TASK_PROJECT: [
+                states.TASK_PROJECT: [
                     CallbackQueryHandler(
-                        task_conversations.task_project_received,
+                        lazy_handler('task_conversations.task_project_received'),
                         pattern="^task_project_"
                     )
                 ],
-                task_conversations.TASK_CONFIRM: [
+                states.TASK_CONFIRM: [
                     CallbackQueryHandler(
-                        task_conversations.task_confirmed,
+                        lazy_handler('task_conversations.task_confirmed'),
                         pattern="^task_confirm_yes$"
                     ),
                     CallbackQueryHandler(
-                        task_conversations.task_creation_cancelled,
+                        lazy_handler('task_conversations.task_creation_cancelled'),
                         pattern="^task_create_cancel$"
                     )
                 ]
             },
             fallbacks=[
                 CallbackQueryHandler(
-                    menu.show_tasks_menu,  # Corregido: era tasks.show_tasks_menu
+                    lazy_handler('menu.show_tasks_menu'),  # Corregido: era tasks.show_tasks_menu
                     pattern="^menu_tasks$"
                 )
             ],
@@ -243,31 +320,31 @@ class ProductivityBot:
         subtask_creation_handler = ConversationHandler(
             entry_points=[
                 CallbackQueryHandler(
-                    tasks.add_subtask, 
+                    lazy_handler('tasks.add_subtask'), 
                     pattern="^task_add_subtask_"
                 )
             ],
             states={
-                tasks.ADD_SUBTASK_TITLE: [
+                states.ADD_SUBTASK_TITLE: [
                     MessageHandler(
                         filters.TEXT & ~filters.COMMAND, 
-                        tasks.subtask_title_received
+                        lazy_handler('tasks.subtask_title_received')
                     )
                 ],
-                tasks.ADD_SUBTASK_DESC: [
+                states.ADD_SUBTASK_DESC: [
                     MessageHandler(
                         filters.TEXT & ~filters.COMMAND,
-                        tasks.subtask_description_received
+                        lazy_handler('tasks.subtask_description_received')
                     ),
                     CallbackQueryHandler(
-                        tasks.subtask_description_received,
+                        lazy_handler('tasks.subtask_description_received'),
                         pattern="^subtask_skip_desc_"
                     )
                 ]
             },
             fallbacks=[
                 CallbackQueryHandler(
-                    tasks.view_task,
+                    lazy_handler('tasks.view_task'),
                     pattern="^task_view_"
                 )
             ],
@@ -284,25 +361,25 @@ class ProductivityBot:
         task_edit_handler = ConversationHandler(
             entry_points=[
                 CallbackQueryHandler(
-                    tasks.edit_task_field, 
+                    lazy_handler('tasks.edit_task_field'), 
                     pattern="^edit_task_field_"
                 )
             ],
             states={
-                tasks.EDIT_VALUE: [
+                states.EDIT_VALUE: [
                     MessageHandler(
                         filters.TEXT & ~filters.COMMAND,
-                        tasks.edit_task_value_received
+                        lazy_handler('tasks.edit_task_value_received')
                     ),
                     CallbackQueryHandler(
-                        tasks.edit_task_value_received,
+                        lazy_handler('tasks.edit_task_value_received'),
                         pattern="^edit_priority_"
                     )
                 ]
             },
             fallbacks=[
                 CallbackQueryHandler(
-                    tasks.view_task,
+                    lazy_handler('tasks.view_task'),
                     pattern="^task_view_"
                 )
             ],
@@ -320,162 +397,253 @@ class ProductivityBot:
         
         self.app.add_handler(MessageHandler(
             filters.Regex(f"^{config.EMOJI['project']} Proyectos$"),
-            menu.show_projects_menu
+            lazy_handler('menu.show_projects_menu')
         ))
         
         self.app.add_handler(MessageHandler(
             filters.Regex(f"^{config.EMOJI['task']} Tareas$"),
-            menu.show_tasks_menu
+            lazy_handler('menu.show_tasks_menu')
         ))
         
         self.app.add_handler(MessageHandler(
             filters.Regex(f"^{config.EMOJI['today']} Hoy$"),
-            menu.show_today
+            lazy_handler('menu.show_today')
         ))
         
         self.app.add_handler(MessageHandler(
             filters.Regex(f"^{config.EMOJI['dashboard']} Dashboard$"),
-            dashboard.show_dashboard
+            lazy_handler('dashboard.show_dashboard')
         ))
         
         self.app.add_handler(MessageHandler(
             filters.Regex(f"^{config.EMOJI['note']} Notas$"),
-            notes.show_notes_menu
+            lazy_handler('notes.show_notes_menu')
         ))
         
         self.app.add_handler(MessageHandler(
             filters.Regex(f"^{config.EMOJI['settings']} Configuración$"),
-            settings.show_settings_menu
+            lazy_handler('settings.show_settings_menu')
         ))
         
         # ========== CALLBACKS DE NAVEGACIÓN ==========
         
         self.app.add_handler(CallbackQueryHandler(
-            menu.back_to_main,
+            lazy_handler('menu.back_to_main'),
             pattern="^back_to_main$"
         ))
         
         # ========== HANDLERS DE PROYECTOS ==========
         
         self.app.add_handler(CallbackQueryHandler(
-            projects.show_projects_menu,
+            lazy_handler('projects.show_projects_menu'),
             pattern="^menu_projects$"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            projects.list_projects,
+            lazy_handler('projects.list_projects'),
             pattern="^project_list_"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            projects.view_project,
+            lazy_handler('projects.view_project'),
             pattern="^project_view_"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            projects.change_project_status,
+            lazy_handler('projects.show_critical_path'),
+            pattern="^project_critical_"
+        ))
+        
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('projects.change_project_status'),
             pattern="^project_status_"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            projects.complete_project,
+            lazy_handler('projects.complete_project'),
             pattern="^project_complete_"
         ))
         
         # ========== HANDLERS DE TAREAS ==========
         
         self.app.add_handler(CallbackQueryHandler(
-            menu.show_tasks_menu,  # Corregido: era tasks.show_tasks_menu
+            lazy_handler('menu.show_tasks_menu'),  # Corregido: era tasks.show_tasks_menu
             pattern="^menu_tasks$"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            tasks.list_tasks,
+            lazy_handler('tasks.list_tasks'),
             pattern="^task_list_"
         ))
         
         # CORRECCIÓN: El handler más específico (view_subtasks) debe ir antes que el general (view_task)
         self.app.add_handler(CallbackQueryHandler(
-            tasks.view_subtasks,
+            lazy_handler('tasks.view_subtasks'),
             pattern="^task_view_subtasks_"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            tasks.view_task,
+            lazy_handler('tasks.view_task'),
             pattern="^task_view_"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            tasks.change_task_status,
+            lazy_handler('tasks.change_task_status'),
             pattern="^task_status_"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            tasks.complete_task,
+            lazy_handler('tasks.complete_task'),
             pattern="^task_complete_"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            tasks.postpone_task,
+            lazy_handler('tasks.postpone_task'),
             pattern="^task_postpone_"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            tasks.edit_task_menu,
+            lazy_handler('tasks.show_recurrence_menu'),
+            pattern="^task_repeat_"
+        ))
+        
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('tasks.set_task_recurrence'),
+            pattern="^task_setrepeat_"
+        ))
+        
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('tasks.show_dependencies'),
+            pattern="^task_deps_"
+        ))
+        
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('tasks.toggle_dependency'),
+            pattern="^task_deptoggle_"
+        ))
+        
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('tasks.edit_task_menu'),
             pattern="^task_edit_"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            tasks.delete_task_confirm,
+            lazy_handler('tasks.delete_task_confirm'),
             pattern="^task_delete_confirm_"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            tasks.delete_task_confirmed,
+            lazy_handler('tasks.delete_task_confirmed'),
             pattern="^task_delete_(?!confirm)"
         ))
         
         # ========== HANDLERS DE NOTAS ==========
         
         self.app.add_handler(CallbackQueryHandler(
-            notes.show_notes_menu,
+            lazy_handler('notes.show_notes_menu'),
             pattern="^menu_notes$"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            notes.list_notes,
+            lazy_handler('notes.list_notes'),
             pattern="^note_list"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            notes.view_note,
+            lazy_handler('notes.view_note'),
             pattern="^note_view_"
         ))
         
         # ========== HANDLERS DE DASHBOARD ==========
         
         self.app.add_handler(CallbackQueryHandler(
-            dashboard.show_dashboard,
+            lazy_handler('dashboard.show_dashboard'),
             pattern="^dashboard_main$"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            dashboard.show_weekly_stats,
+            lazy_handler('dashboard.show_weekly_stats'),
             pattern="^dashboard_weekly$"
         ))
         
         self.app.add_handler(CallbackQueryHandler(
-            dashboard.show_monthly_stats,
+            lazy_handler('dashboard.show_monthly_stats'),
             pattern="^dashboard_monthly$"
         ))
         
         # ========== HANDLERS DE CONFIGURACIÓN ==========
         
         self.app.add_handler(CallbackQueryHandler(
-            settings.show_settings_menu,
+            lazy_handler('settings.show_settings_menu'),
             pattern="^settings_menu$"
         ))
         
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('settings.show_reminder_time_options'),
+            pattern="^settings_(daily_time|evening_reminder)$"
+        ))
+        
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('settings.set_reminder_time'),
+            pattern=r"^settings_set_(daily|evening)_\d{4}$"
+        ))
+        
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('settings.toggle_reminder'),
+            pattern="^settings_toggle_"
+        ))
+        
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('settings.show_timezone_options'),
+            pattern="^settings_timezone$"
+        ))
+        
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('settings.set_timezone'),
+            pattern=r"^settings_set_tz_\d+$"
+        ))
+        
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('settings.show_export_options'),
+            pattern="^settings_export$"
+        ))
+        
+        # block=False: la exportación puede tardar y no debe frenar al resto de updates
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('settings.export_data'),
+            pattern="^settings_export_(jsonl|csv|ics)$",
+            block=False
+        ))
+        
+        self.app.add_handler(CallbackQueryHandler(
+            lazy_handler('settings.show_import_help'),
+            pattern="^settings_import$"
+        ))
+        
+        # ========== IMPORTACIÓN DE DOCUMENTOS ==========
+        # block=False: una importación larga no debe frenar al resto de updates
+        
+        self.app.add_handler(MessageHandler(
+            filters.Document.ALL,
+            lazy_handler('settings.import_document'),
+            block=False
+        ))
+        
+        # ========== BÚSQUEDA INLINE ==========
+        # @bot texto desde cualquier chat. Con debounce, block=False para que
+        # la espera entre letras no frene al resto de updates
+        
+        self.app.add_handler(InlineQueryHandler(
+            lazy_handler('inline.inline_query'),
+            block=not config.INLINE_DEBOUNCE_SECONDS
+        ))
+        
+        # ========== MÉTRICAS ==========
+        # Se envuelven todos los handlers ya registrados (también los de los ConversationHandlers)
+        
+        if config.METRICS_ENABLED:
+            metrics.instrument_application(self.app)
+        
         logger.info("✅ Handlers configurados")
     
     def setup_reminders(self):
@@ -490,73 +658,165 @@ class ProductivityBot:
             config.AUTHORIZED_USER_ID
         )
         
-        # Resumen diario
-        self.scheduler.add_job(
-            self.reminder_system.send_daily_summary,
-            trigger=CronTrigger(
-                hour=config.DEFAULT_DAILY_SUMMARY_TIME.hour,
-                minute=config.DEFAULT_DAILY_SUMMARY_TIME.minute
-            ),
-            id='daily_summary',
-            name='Resumen diario'
-        )
-        logger.info(f"✅ Resumen diario programado: {config.DEFAULT_DAILY_SUMMARY_TIME}")
-        
-        # Recordatorio tarde
-        self.scheduler.add_job(
-            self.reminder_system.send_evening_reminder,
-            trigger=CronTrigger(
-                hour=config.DEFAULT_EVENING_REMINDER_TIME.hour,
-                minute=config.DEFAULT_EVENING_REMINDER_TIME.minute
-            ),
-            id='evening_reminder',
-            name='Recordatorio tarde'
-        )
-        logger.info(f"✅ Recordatorio tarde programado: {config.DEFAULT_EVENING_REMINDER_TIME}")
+        reminders.register_reminder_system(self.reminder_system)
+        
+        # Briefing matutino y preview nocturno: cada usuario tiene su hora y zona horaria
+        # (tabla user_settings). Los gestiona un único planificador con heap.
+        self.reminder_scheduler = ReminderScheduler(self.db_manager, self.app.bot)
+        self.app.bot_data['reminder_scheduler'] = self.reminder_scheduler
+        
+        # Recuperación: ver qué trabajos debían ejecutarse mientras el bot estaba apagado.
+        # Hay que hacerlo ANTES de registrar los trabajos, porque al reemplazarlos
+        # se recalcula su próxima ejecución.
+        now = datetime.now(self.scheduler.timezone)
+        missed_by_user = self.reminder_scheduler.collect_missed(now)
+        missed_job_ids = self.job_store.get_missed_job_ids(now)
+        if missed_job_ids:
+            # Los resúmenes semanal y mensual van a todos los usuarios (fan_out):
+            # todos reciben lo que se perdió
+            for user_id in access.access_control.get_user_ids():
+                missed_by_user.setdefault(user_id, []).extend(missed_job_ids)
+        
+        self.reminder_scheduler.load_all()
+        
+        # Alertas de deadline con hora exacta: un temporizador con heap que se
+        # actualiza cuando cambian las tareas (sin consultar la tabla periódicamente)
+        self.deadline_alerts = DeadlineAlertService(self.db_manager, self.app.bot)
+        self.app.bot_data['deadline_alerts'] = self.deadline_alerts
+        
+        # Las versiones anteriores programaban estos dos como cron globales
+        for job_id in ReminderScheduler.KINDS:
+            try:
+                self.job_store.remove_job(job_id)
+            except JobLookupError:
+                pass
+        
+        # IMPORTANTE: los trabajos persistentes deben apuntar a funciones del módulo
+        # (no a métodos de instancia) para poder guardarse en la base de datos.
         
         # Resumen semanal
         self.scheduler.add_job(
-            self.reminder_system.send_weekly_summary,
+            reminders.run_weekly_summary,
             trigger=CronTrigger(
                 day_of_week='sun',
                 hour=20,
                 minute=0
             ),
             id='weekly_summary',
-            name='Resumen semanal'
+            name='Resumen semanal',
+            replace_existing=True
         )
         logger.info("✅ Resumen semanal programado: Domingos 20:00")
         
         # Resumen mensual
         self.scheduler.add_job(
-            self.reminder_system.send_monthly_summary,
+            reminders.run_monthly_summary,
             trigger=CronTrigger(
                 day=1,
                 hour=9,
                 minute=0
             ),
             id='monthly_summary',
-            name='Resumen mensual'
+            name='Resumen mensual',
+            replace_existing=True
         )
         logger.info("✅ Resumen mensual programado: Día 1 de cada mes, 09:00")
         
+        # Informe periódico de las consultas SQL más costosas (logs/sql.log)
+        if config.SQL_TRACE_ENABLED:
+            self.scheduler.add_job(
+                tracing.log_report,
+                trigger=IntervalTrigger(minutes=config.SQL_REPORT_INTERVAL_MINUTES),
+                id='sql_report',
+                name='Informe de consultas SQL',
+                jobstore='memory',
+                replace_existing=True
+            )
+        
+        # Copias de seguridad en caliente: APScheduler las ejecuta en su pool de hilos
+        if config.BACKUP_ENABLED:
+            self.scheduler.add_job(
+                backup.run_scheduled_backup,
+                trigger=IntervalTrigger(hours=config.BACKUP_INTERVAL_HOURS),
+                next_run_time=backup.BackupManager().next_run_time(),
+                id='database_backup',
+                name='Copia de seguridad',
+                jobstore='memory',
+                replace_existing=True
+            )
+            logger.info(f"✅ Copias de seguridad programadas: cada {config.BACKUP_INTERVAL_HOURS} h")
+        
+        # Archivo de completados: saca de las tablas activas lo terminado hace tiempo
+        if config.ARCHIVE_ENABLED:
+            self.scheduler.add_job(
+                archive.run_scheduled_archive,
+                trigger=IntervalTrigger(hours=config.ARCHIVE_INTERVAL_HOURS),
+                next_run_time=now + timedelta(seconds=config.ARCHIVE_STARTUP_DELAY),
+                id='database_archive',
+                name='Archivo de completados',
+                jobstore='memory',
+                replace_existing=True
+            )
+            logger.info(f"✅ Archivo de completados programado: cada {config.ARCHIVE_INTERVAL_HOURS} h "
+                        f"(más de {config.ARCHIVE_AFTER_DAYS} días)")
+        
+        # Objetivos que se repiten: crea las repeticiones que entran en el horizonte
+        # (y, al arrancar, las que no se crearon mientras el bot estaba apagado)
+        self.scheduler.add_job(
+            recurrence.run_scheduled_recurrence,
+            trigger=IntervalTrigger(hours=config.RECURRENCE_INTERVAL_HOURS),
+            next_run_time=now,
+            id='task_recurrence',
+            name='Objetivos que se repiten',
+            jobstore='memory',
+            replace_existing=True
+        )
+        logger.info(f"✅ Objetivos que se repiten: se revisan cada {config.RECURRENCE_INTERVAL_HOURS} h "
+                    f"(horizonte de {config.RECURRENCE_HORIZON_DAYS} día(s))")
+        
+        # Un único digest por usuario con todo lo perdido (nunca un mensaje por cada trabajo)
+        for user_id, job_ids in missed_by_user.items():
+            self.scheduler.add_job(
+                reminders.run_catch_up_digest,
+                trigger=DateTrigger(run_date=now),
+                args=[job_ids, user_id],
+                id=f'catch_up_digest_{user_id}',
+                name='Digest de recuperación',
+                jobstore='memory',
+                misfire_grace_time=None  # Ejecutar aunque el arranque tarde
+            )
+            logger.info(f"🛰️ Recordatorios perdidos de {user_id} durante el apagado: {', '.join(job_ids)}")
+        
         # Iniciar el scheduler
         self.scheduler.start()
         logger.info("✅ Sistema de recordatorios configurado")
     
+    async def post_init(self, application: Application):
+        """
+        Se ejecuta cuando el event loop ya está en marcha, justo antes de
+        empezar a recibir mensajes.
+        """
+        if self.reminder_scheduler:
+            self.reminder_scheduler.start()
+            logger.info("✅ Planificador de recordatorios por usuario en marcha")
+        
+        if self.deadline_alerts:
+            self.deadline_alerts.start()
+            logger.info("✅ Alertas de deadline en marcha")
+        
+        # Los handlers se cargan al usarse; el resto se importa en un hilo aparte
+        # para que la primera pulsación de cada menú no pague la importación
+        if config.LAZY_HANDLERS and config.HANDLER_PRELOAD:
+            asyncio.get_running_loop().run_in_executor(None, preload_handlers)
+    
     async def start_command(self, update: Update, context):
         """
         Maneja el comando /start.
         """
         user = update.effective_user
         
-        if user.id != config.AUTHORIZED_USER_ID:
-            await update.message.reply_text(
-                "❌ Lo siento, no estás autorizado para usar este bot."
-            )
-            return
-        
-        welcome_message = CORTANA_WELCOME.format(name=user.first_name)
+        # El acceso ya lo comprueba access.check_access antes de llegar aquí
+        welcome_message = render_template(CORTANA_WELCOME, name=user.first_name)
         
         await update.message.reply_text(
             welcome_message,
@@ -583,10 +843,13 @@ class ProductivityBot:
         
         self.setup_handlers()
         self.setup_reminders()
+        metrics.start_http_server()
         
         print("\n" + "="*50)
         print("✅ Bot de productividad iniciado correctamente")
         print(f"👤 Usuario autorizado: {config.AUTHORIZED_USER_ID}")
+        if config.MULTI_USER_MODE:
+            print(f"👥 Modo multiusuario: {len(access.access_control.get_user_ids())} usuario(s)")
         print("🔄 Esperando mensajes...")
         print("="*50 + "\n")
         
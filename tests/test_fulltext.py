@@ -0,0 +1,68 @@
+"""
+Búsqueda de texto con tildes (database/fulltext.py)
+El índice trigram tiene que encontrar las palabras cortas con tilde se
+busquen con ella o sin ella: "día", "dia", "año", "más".
+
+Uso: python -m unittest discover tests (o python -m pytest tests)
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from database.models import DatabaseManager, Note, Task
+
+OWNER_ID = 1
+
+
+class AccentedSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="cortana_test_")
+        self.db = DatabaseManager(os.path.join(self.directory, "test.db"))
+        self.tasks = Task(self.db, OWNER_ID)
+        self.notes = Note(self.db, OWNER_ID)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def search_tasks(self, query):
+        return [task['title'] for task in self.tasks.get_all({'search': query})]
+
+    def test_short_accented_words(self):
+        self.tasks.create("Revisar el día libre")
+        self.tasks.create("Plan del año")
+        self.tasks.create("Más cosas")
+
+        for query in ("día", "dia", "DÍA"):
+            self.assertEqual(self.search_tasks(query), ["Revisar el día libre"], query)
+        for query in ("año", "ano"):
+            self.assertEqual(self.search_tasks(query), ["Plan del año"], query)
+        for query in ("más", "mas"):
+            self.assertEqual(self.search_tasks(query), ["Más cosas"], query)
+
+    def test_typo_next_to_accent(self):
+        self.tasks.create("Reunión con el cliente")
+
+        self.assertEqual(self.search_tasks("rwunion"), ["Reunión con el cliente"])
+
+    def test_notes(self):
+        self.notes.create("Ideas del día", "contenido")
+
+        for query in ("día", "dia"):
+            self.assertEqual([note['title'] for note in self.notes.get_all({'search': query})],
+                             ["Ideas del día"], query)
+
+    def test_index_follows_edits(self):
+        task_id = self.tasks.create("Revisar el día libre")
+
+        self.tasks.update_title(task_id, "Revisar el mes libre")
+        self.assertEqual(self.search_tasks("día"), [])
+        self.assertEqual(self.search_tasks("mes"), ["Revisar el mes libre"])
+
+        self.tasks.delete(task_id)
+        self.assertEqual(self.search_tasks("mes"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
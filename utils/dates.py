@@ -0,0 +1,137 @@
+"""
+Clasificación de fechas para listas, dashboard y resúmenes
+Cada fila con deadline se clasifica como atrasada, hoy, mañana, esta semana o
+más adelante. Antes cada fila hacía su propio datetime.strptime y date.today().
+
+EXPLICACIÓN:
+- parse_date: convierte "AAAA-MM-DD" en un date con una caché acotada por el
+  texto de la fecha. En una lista de 1000 objetivos hay pocas fechas distintas,
+  así que casi todas las filas salen de la caché.
+- DateClassifier: fija "hoy" una vez al crearse (una por mensaje) y clasifica
+  las fechas respecto a ese día. classify_batch reparte una lista entera de
+  filas por categorías en una sola pasada.
+"""
+import functools
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import config
+
+# Categorías de una fecha respecto a hoy
+NO_DATE = 'none'
+INVALID = 'invalid'
+OVERDUE = 'overdue'
+TODAY = 'today'
+TOMORROW = 'tomorrow'
+THIS_WEEK = 'week'      # De pasado mañana a 7 días
+LATER = 'later'
+
+# Categorías que entran en "próximos 7 días" (hoy incluido)
+UPCOMING = (TODAY, TOMORROW, THIS_WEEK)
+
+
+@functools.lru_cache(maxsize=config.DATE_PARSE_CACHE_SIZE)
+def _parse_date(date_str: str) -> Optional[date]:
+    # Camino rápido para el formato que guarda la base de datos
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        try:
+            return date(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:]))
+        except ValueError:
+            pass
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def parse_date(date_str: Optional[str]) -> Optional[date]:
+    """Fecha "AAAA-MM-DD" como date (None si está vacía o no es válida)"""
+    if not date_str:
+        return None
+    return _parse_date(date_str)
+
+
+class DateClassifier:
+    """
+    Clasifica fechas respecto a un "hoy" fijo.
+
+    Uso:
+        dates = DateClassifier()
+        dates.classify('2024-10-30')           # 'tomorrow'
+        groups = dates.classify_batch(tasks)   # {'overdue': [...], 'today': [...], ...}
+    """
+
+    def __init__(self, today: Optional[date] = None):
+        self.today = today or date.today()
+        self.today_iso = self.today.isoformat()
+        self._labels: Dict[str, str] = {}
+
+    def days_until(self, date_str: Optional[str]) -> Optional[int]:
+        """Días que faltan hasta la fecha (negativo si ya pasó)"""
+        parsed = parse_date(date_str)
+        if parsed is None:
+            return None
+        return (parsed - self.today).days
+
+    def classify(self, date_str: Optional[str]) -> str:
+        """Categoría de la fecha: NO_DATE, INVALID, OVERDUE, TODAY, TOMORROW, THIS_WEEK o LATER"""
+        if not date_str:
+            return NO_DATE
+        diff = self.days_until(date_str)
+        if diff is None:
+            return INVALID
+        if diff < 0:
+            return OVERDUE
+        if diff == 0:
+            return TODAY
+        if diff == 1:
+            return TOMORROW
+        if diff <= 7:
+            return THIS_WEEK
+        return LATER
+
+    def classify_batch(self, rows: Iterable[Dict[str, Any]],
+                       field: str = 'deadline') -> Dict[str, List[Dict[str, Any]]]:
+        """Reparte las filas por la categoría de su fecha, en una sola pasada"""
+        groups = defaultdict(list)
+        for row in rows:
+            groups[self.classify(row.get(field))].append(row)
+        return groups
+
+    def is_overdue(self, row: Dict[str, Any], field: str = 'deadline') -> bool:
+        """Fecha pasada y sin completar"""
+        return row.get('status') != 'completed' and self.classify(row.get(field)) == OVERDUE
+
+    def is_upcoming(self, date_str: Optional[str]) -> bool:
+        """Entre hoy y dentro de 7 días, ambos incluidos"""
+        return self.classify(date_str) in UPCOMING
+
+    def is_today_timestamp(self, timestamp: Optional[str]) -> bool:
+        """Si una marca de tiempo ISO (created_at, completed_at...) es de hoy"""
+        return bool(timestamp) and timestamp[:10] == self.today_iso
+
+    def label(self, date_str: Optional[str]) -> str:
+        """Texto de la fecha para los mensajes ("🔥 Hoy", "⚡ Mañana"...)"""
+        if not date_str:
+            return "Sin deadline"
+
+        text = self._labels.get(date_str)
+        if text is None:
+            diff = self.days_until(date_str)
+            if diff is None:
+                text = date_str
+            elif diff < 0:
+                text = f"⚠️ Atrasado ({abs(diff)} días)"
+            elif diff == 0:
+                text = "🔥 Hoy"
+            elif diff == 1:
+                text = "⚡ Mañana"
+            else:
+                day = parse_date(date_str)
+                if diff <= 7:
+                    text = f"📅 En {diff} días ({day.strftime('%d/%m')})"
+                else:
+                    text = day.strftime("%d/%m/%Y")
+            self._labels[date_str] = text
+        return text
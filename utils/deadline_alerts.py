@@ -0,0 +1,274 @@
+"""
+Servicio de alertas de deadline
+Avisa "N minutos antes" de la hora límite de cada tarea que la tenga.
+
+EXPLICACIÓN: Las próximas alertas viven en un min-heap ordenado por hora.
+No se consulta la tabla de tareas cada X minutos: el heap se llena por tandas
+desde el índice parcial idx_tasks_alert_at (solo cuando se vacía) y se
+actualiza al momento cuando una tarea cambia: el servicio está suscrito a los
+eventos de tareas (database/events.py) y cada evento lleva el nuevo alert_at.
+
+Cada alerta se identifica por (dueño, tarea): con STORAGE_MODE = 'per_user'
+cada usuario tiene su archivo y los IDs de tarea se repiten entre usuarios.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from telegram.constants import ParseMode
+
+import config
+from database import events
+from database.models import DatabaseManager, Task, UserSettings
+from utils.formatters import format_date
+from utils.templates import render_template
+from cortana_personality import CORTANA_DEADLINE_ALERT
+
+
+class DeadlineAlertService:
+    """
+    Temporizador único para todas las alertas de deadline.
+
+    El heap solo contiene las alertas hasta una "marca" (alert_at, owner_id, id):
+    todo lo que está por debajo está en memoria y lo que está por encima
+    sigue en la base de datos hasta que haga falta.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, bot):
+        self.db = db_manager
+        self.bot = bot
+        self.settings_manager = UserSettings(db_manager)
+
+        # Entradas: (alert_at, owner_id, task_id). Las obsoletas se descartan al salir.
+        self._heap: List[Tuple[float, int, int]] = []
+        # (owner_id, task_id) -> alert_at vigente (solo las cargadas)
+        self._alerts: Dict[Tuple[int, int], float] = {}
+
+        # Última alerta cargada desde la BD; None = aún no se ha cargado nada
+        self._loaded_until: Optional[Tuple[float, int, int]] = None
+        self._exhausted = False  # True cuando ya no quedan alertas por cargar
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Envíos en curso: el event loop solo guarda referencias débiles a las tareas
+        self._sending: Set[asyncio.Task] = set()
+
+        events.subscribe(self.on_task_event, entity='task')
+
+    # ========== CARGA Y ACTUALIZACIÓN ==========
+
+    def on_task_event(self, event: Dict[str, Any]):
+        """
+        Suscriptor de los eventos de tareas: si ha cambiado la alerta de una
+        tarea (o se ha borrado la tarea), se actualiza el heap.
+        """
+        if self._loop is not None and not self._in_loop():
+            # El cambio se hizo en otro hilo: el heap solo se toca desde el event loop
+            self._loop.call_soon_threadsafe(self.on_task_event, event)
+            return
+
+        if event['action'] == 'imported':
+            for task_id, alert_at in event['changes'].get('alerts', []):
+                self.on_alert_changed(event['owner_id'], task_id, alert_at)
+            return
+
+        change = event['changes'].get('alert_at')
+        if change and event['entity_id'] is not None:
+            self.on_alert_changed(event['owner_id'], event['entity_id'], change[1])
+
+    def on_alert_changed(self, owner_id: int, task_id: int, alert_at: Optional[float]):
+        """La alerta de una tarea ha cambiado (o desaparecido)"""
+        self._alerts.pop((owner_id, task_id), None)
+
+        if alert_at is not None and self._is_loaded((alert_at, owner_id, task_id)):
+            self._alerts[(owner_id, task_id)] = alert_at
+            heapq.heappush(self._heap, (alert_at, owner_id, task_id))
+
+        self._compact_if_needed()
+        self._wake()
+
+    def reload(self):
+        """Descarta las alertas en memoria y las vuelve a leer de la BD (tras restaurar una copia)"""
+        self._heap = []
+        self._alerts = {}
+        self._loaded_until = None
+        self._exhausted = False
+        self._wake()
+
+    def _is_loaded(self, entry: Tuple[float, int, int]) -> bool:
+        """Indica si la alerta cae dentro del tramo que ya está en memoria"""
+        if self._exhausted:
+            return True
+        return self._loaded_until is not None and entry <= self._loaded_until
+
+    def _alert_sources(self) -> List[Task]:
+        """
+        Bases de datos donde buscar alertas: la compartida o, con
+        STORAGE_MODE = 'per_user', el archivo de cada usuario.
+        """
+        if config.STORAGE_MODE != 'per_user':
+            return [Task(self.db)]
+
+        from database.sharding import get_registry
+        registry = get_registry()
+        return [Task(registry.get(user_id)) for user_id in registry.list_user_ids()]
+
+    def _load_next_batch(self):
+        """Carga la siguiente tanda de alertas desde el índice (de cada archivo)"""
+        limit = config.DEADLINE_ALERT_BATCH_SIZE
+        batches = [
+            [(a['alert_at'], a['owner_id'], a['id']) for a in source.get_pending_alerts(self._loaded_until, limit)]
+            for source in self._alert_sources()
+        ]
+        # Cada tanda ya viene ordenada: basta con mezclarlas y quedarse con las primeras
+        batch = list(itertools.islice(heapq.merge(*batches), limit))
+
+        for entry in batch:
+            alert_at, owner_id, task_id = entry
+            self._alerts[(owner_id, task_id)] = alert_at
+            heapq.heappush(self._heap, entry)
+
+        if len(batch) < limit:
+            self._exhausted = True
+        else:
+            self._loaded_until = batch[-1]
+
+    def _is_current(self, alert_at: float, owner_id: int, task_id: int) -> bool:
+        return self._alerts.get((owner_id, task_id)) == alert_at
+
+    def _compact_if_needed(self):
+        """Reconstruye el heap si más de la mitad son entradas obsoletas"""
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._alerts):
+            self._heap = [entry for entry in self._heap if self._is_current(*entry)]
+            heapq.heapify(self._heap)
+
+    def _peek(self) -> Optional[Tuple[float, int, int]]:
+        """Devuelve la próxima alerta válida, cargando otra tanda si hace falta"""
+        while True:
+            while self._heap and not self._is_current(*self._heap[0]):
+                heapq.heappop(self._heap)
+
+            if self._heap:
+                return self._heap[0]
+
+            if self._exhausted:
+                return None
+
+            self._load_next_batch()
+
+    def pop_due(self, now_ts: float) -> List[Tuple[int, int, float]]:
+        """
+        Saca del heap todas las alertas vencidas.
+
+        Returns:
+            Lista de (owner_id, task_id, alert_at) que hay que enviar ahora
+        """
+        due = []
+
+        while True:
+            entry = self._peek()
+            if entry is None or entry[0] > now_ts:
+                break
+
+            alert_at, owner_id, task_id = heapq.heappop(self._heap)
+            del self._alerts[(owner_id, task_id)]
+            due.append((owner_id, task_id, alert_at))
+
+        return due
+
+    def seconds_until_next(self, now_ts: float) -> Optional[float]:
+        """Segundos hasta la próxima alerta, o None si no hay ninguna"""
+        entry = self._peek()
+        if entry is None:
+            return None
+        return max(0.0, entry[0] - now_ts)
+
+    def __len__(self):
+        return len(self._alerts)
+
+    # ========== BUCLE PRINCIPAL ==========
+
+    def start(self):
+        """Arranca el temporizador (requiere un event loop en marcha)"""
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        events.unsubscribe(self.on_task_event)
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _in_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _wake(self):
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            delay = self.seconds_until_next(time.time())
+
+            if delay is None or delay > 0:
+                # Sin alertas pendientes se duerme hasta que una tarea cambie
+                timeout = None if delay is None else min(delay, config.REMINDER_SCHEDULER_MAX_SLEEP)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            for owner_id, task_id, alert_at in self.pop_due(time.time()):
+                sending = asyncio.create_task(self._dispatch(owner_id, task_id, alert_at))
+                self._sending.add(sending)
+                sending.add_done_callback(self._sending.discard)
+
+    async def _dispatch(self, owner_id: int, task_id: int, alert_at: float):
+        """Envía una alerta si sigue vigente en la base de datos"""
+        try:
+            task_manager = Task(self.db, owner_id)
+
+            if not task_manager.claim_alert(task_id, alert_at):
+                return  # La tarea cambió o la alerta ya se envió
+
+            task = task_manager.get_by_id(task_id)
+            if not task:
+                return
+
+            await self.bot.send_message(
+                chat_id=task['owner_id'],
+                text=self.build_alert(task),
+                parse_mode=ParseMode.HTML
+            )
+            print(f"✅ Alerta de deadline enviada (tarea {task_id})")
+        except Exception as e:
+            print(f"❌ Error al enviar alerta de deadline (tarea {task_id}): {e}")
+
+    def build_alert(self, task: Dict) -> str:
+        """Construye el mensaje de alerta de una tarea"""
+        timezone = self.settings_manager.get(task['owner_id'])['timezone']
+        due = datetime.strptime(f"{task['deadline']} {task['deadline_time']}", "%Y-%m-%d %H:%M")
+        due = due.replace(tzinfo=ZoneInfo(timezone))
+        minutes_left = max(0, round((due.timestamp() - time.time()) / 60))
+
+        return render_template(CORTANA_DEADLINE_ALERT,
+            title=task['title'],
+            deadline=format_date(task['deadline']),
+            time=task['deadline_time'],
+            minutes=minutes_left
+        )
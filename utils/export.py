@@ -0,0 +1,267 @@
+"""
+Exportación de los datos de un usuario a JSON Lines, CSV e iCalendar
+Se llama desde ⚙️ Configuración → 📤 Exportar datos y el resultado se envía
+como documento de Telegram.
+
+EXPLICACIÓN: los datos nunca se cargan enteros en memoria. Cada tabla se lee
+con un cursor de SQLite por tandas de EXPORT_BATCH_SIZE filas (fetchmany) y
+cada fila se escribe en el archivo al momento, ya comprimida:
+  - jsonl: un objeto JSON por línea, en un .jsonl.gz
+  - csv:   projects.csv, tasks.csv, notes.csv (y lo archivado en
+           projects_archive.csv y tasks_archive.csv) dentro de un .zip
+  - ics:   calendario con los deadlines pendientes de objetivos y misiones,
+           sin comprimir para que las apps de calendario lo abran directamente
+Así la memoria usada es la misma con 100 filas que con 100.000.
+
+Como todo es código síncrono (SQLite y escritura de archivos), los handlers lo
+ejecutan en un hilo aparte para no bloquear el bot.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Iterator, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import config
+from database.models import DatabaseManager
+from utils.dates import parse_date
+
+# Tablas que se exportan y el nombre de cada fila en JSON Lines
+EXPORT_TABLES = {
+    'projects': 'project',
+    'tasks': 'task',
+    'notes': 'note',
+    # Lo archivado también es del usuario (database/archive.py)
+    'projects_archive': 'archived_project',
+    'tasks_archive': 'archived_task',
+}
+
+# Formato -> extensión del archivo generado
+EXPORT_FORMATS = {
+    'jsonl': '.jsonl.gz',
+    'csv': '.zip',
+    'ics': '.ics',
+}
+
+
+# ========== LECTURA POR TANDAS ==========
+
+def iter_rows(db_manager: DatabaseManager, owner_id: int, sql: str, params: tuple = (),
+              batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre el resultado de una consulta fila a fila, leyendo de la base de
+    datos por tandas. Solo hay en memoria una tanda cada vez.
+    """
+    batch_size = batch_size or config.EXPORT_BATCH_SIZE
+    conn = db_manager.for_user(owner_id).get_connection()
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for row in batch:
+                yield dict(row)
+    finally:
+        conn.close()
+
+
+def iter_table(db_manager: DatabaseManager, owner_id: int, table: str) -> Iterator[Dict[str, Any]]:
+    """Todas las filas de un usuario en una tabla de datos, por orden de id"""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Tabla no exportable: {table}")
+    return iter_rows(db_manager, owner_id,
+                     f"SELECT * FROM {table} WHERE owner_id = ? ORDER BY id", (owner_id,))
+
+
+def table_columns(db_manager: DatabaseManager, owner_id: int, table: str):
+    """Columnas de la tabla (para la cabecera del CSV aunque no haya filas)"""
+    conn = db_manager.for_user(owner_id).get_connection()
+    try:
+        return [row['name'] for row in conn.execute(f"PRAGMA table_info({table})")]
+    finally:
+        conn.close()
+
+
+# ========== FORMATOS ==========
+
+def write_jsonl(db_manager: DatabaseManager, owner_id: int, path: str) -> Dict[str, int]:
+    """Un objeto JSON por línea ({"type": "task", ...}), comprimido con gzip"""
+    counts = {}
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as output:
+        for table, row_type in EXPORT_TABLES.items():
+            counts[table] = 0
+            for row in iter_table(db_manager, owner_id, table):
+                output.write(json.dumps({'type': row_type, **row}, ensure_ascii=False))
+                output.write("\n")
+                counts[table] += 1
+    return counts
+
+
+def write_csv(db_manager: DatabaseManager, owner_id: int, path: str) -> Dict[str, int]:
+    """Un CSV por tabla dentro de un zip (cada archivo se comprime mientras se escribe)"""
+    counts = {}
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for table in EXPORT_TABLES:
+            counts[table] = 0
+            columns = table_columns(db_manager, owner_id, table)
+            with archive.open(f"{table}.csv", 'w') as raw:
+                # utf-8-sig para que Excel reconozca las tildes
+                text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+                writer = csv.DictWriter(text, fieldnames=columns, extrasaction='ignore')
+                writer.writeheader()
+                for row in iter_table(db_manager, owner_id, table):
+                    writer.writerow(row)
+                    counts[table] += 1
+                text.flush()
+                text.detach()
+    return counts
+
+
+def _ics_escape(text: Optional[str]) -> str:
+    return (text or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _ics_line(output, line: str):
+    """Escribe una línea plegada a 75 bytes, como pide el estándar (RFC 5545)"""
+    encoded = line.encode('utf-8')
+    limit = 75
+    while len(encoded) > limit:
+        cut = limit
+        while (encoded[cut] & 0xC0) == 0x80:  # No partir un carácter UTF-8
+            cut -= 1
+        output.write(encoded[:cut].decode('utf-8') + "\r\n ")
+        encoded = encoded[cut:]
+        limit = 74  # Las líneas de continuación empiezan con un espacio
+    output.write(encoded.decode('utf-8') + "\r\n")
+
+
+def _ics_event(output, uid: str, summary: str, description: str, day: date,
+               due_time: Optional[str], zone: ZoneInfo, stamp: str, alarm_minutes: Optional[int]):
+    _ics_line(output, "BEGIN:VEVENT")
+    _ics_line(output, f"UID:{uid}")
+    _ics_line(output, f"DTSTAMP:{stamp}")
+    _ics_line(output, f"SUMMARY:{_ics_escape(summary)}")
+    if description:
+        _ics_line(output, f"DESCRIPTION:{_ics_escape(description)}")
+
+    if due_time:
+        # Con hora límite: evento en UTC a esa hora de la zona del usuario
+        hour, minute = (int(part) for part in due_time.split(':'))
+        due = datetime(day.year, day.month, day.day, hour, minute, tzinfo=zone).astimezone(dt_timezone.utc)
+        _ics_line(output, f"DTSTART:{due.strftime('%Y%m%dT%H%M%SZ')}")
+        _ics_line(output, "DURATION:PT15M")
+        if alarm_minutes:
+            _ics_line(output, "BEGIN:VALARM")
+            _ics_line(output, "ACTION:DISPLAY")
+            _ics_line(output, f"DESCRIPTION:{_ics_escape(summary)}")
+            _ics_line(output, f"TRIGGER:-PT{alarm_minutes}M")
+            _ics_line(output, "END:VALARM")
+    else:
+        # Sin hora: evento de día completo
+        _ics_line(output, f"DTSTART;VALUE=DATE:{day.strftime('%Y%m%d')}")
+        _ics_line(output, f"DTEND;VALUE=DATE:{(day + timedelta(days=1)).strftime('%Y%m%d')}")
+
+    _ics_line(output, "END:VEVENT")
+
+
+def write_ics(db_manager: DatabaseManager, owner_id: int, path: str,
+              timezone: str = config.DEFAULT_TIMEZONE) -> Dict[str, int]:
+    """Calendario con los deadlines de las misiones y objetivos sin completar"""
+    try:
+        zone = ZoneInfo(timezone)
+    except ZoneInfoNotFoundError:
+        zone = ZoneInfo(config.DEFAULT_TIMEZONE)
+
+    stamp = datetime.now(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    counts = {'projects': 0, 'tasks': 0}
+
+    with open(path, 'w', encoding='utf-8', newline='') as output:
+        _ics_line(output, "BEGIN:VCALENDAR")
+        _ics_line(output, "VERSION:2.0")
+        _ics_line(output, "PRODID:-//Cortana//Bot de productividad//ES")
+        _ics_line(output, "CALSCALE:GREGORIAN")
+        _ics_line(output, "X-WR-CALNAME:Deadlines de Cortana")
+
+        projects = iter_rows(db_manager, owner_id, """
+            SELECT id, name, description, deadline FROM projects
+            WHERE owner_id = ? AND deadline IS NOT NULL AND status != 'completed'
+            ORDER BY deadline, id
+        """, (owner_id,))
+        for project in projects:
+            day = parse_date(project['deadline'])
+            if day is None:
+                continue
+            _ics_event(output, f"project-{project['id']}@cortana-bot", f"📁 {project['name']}",
+                       project['description'], day, None, zone, stamp, None)
+            counts['projects'] += 1
+
+        tasks = iter_rows(db_manager, owner_id, """
+            SELECT id, title, description, deadline, deadline_time, remind_before_minutes FROM tasks
+            WHERE owner_id = ? AND deadline IS NOT NULL AND status != 'completed'
+            ORDER BY deadline, id
+        """, (owner_id,))
+        for task in tasks:
+            day = parse_date(task['deadline'])
+            if day is None:
+                continue
+            minutes = task['remind_before_minutes']
+            if minutes is None:
+                minutes = config.DEADLINE_ALERT_DEFAULT_MINUTES
+            _ics_event(output, f"task-{task['id']}@cortana-bot", task['title'],
+                       task['description'], day, task['deadline_time'], zone, stamp, minutes)
+            counts['tasks'] += 1
+
+        _ics_line(output, "END:VCALENDAR")
+
+    return counts
+
+
+# ========== EXPORTACIÓN COMPLETA ==========
+
+def export_user_data(db_manager: DatabaseManager, owner_id: int, fmt: str,
+                     timezone: str = config.DEFAULT_TIMEZONE,
+                     directory: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Exporta los datos de un usuario a un archivo temporal.
+
+    Args:
+        db_manager: Gestor de la base de datos principal
+        owner_id: Usuario cuyos datos se exportan
+        fmt: 'jsonl', 'csv' o 'ics'
+        timezone: Zona horaria del usuario (para las horas límite del calendario)
+        directory: Carpeta del archivo (por defecto la temporal del sistema)
+
+    Returns:
+        {'path', 'filename', 'format', 'counts', 'size'}. Quien llama borra el archivo.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportación desconocido: {fmt}")
+
+    extension = EXPORT_FORMATS[fmt]
+    handle, path = tempfile.mkstemp(prefix="cortana_export_", suffix=extension, dir=directory)
+    os.close(handle)
+
+    try:
+        if fmt == 'jsonl':
+            counts = write_jsonl(db_manager, owner_id, path)
+        elif fmt == 'csv':
+            counts = write_csv(db_manager, owner_id, path)
+        else:
+            counts = write_ics(db_manager, owner_id, path, timezone)
+    except Exception:
+        os.remove(path)
+        raise
+
+    return {
+        'path': path,
+        'filename': f"cortana_{datetime.now().strftime('%Y%m%d_%H%M')}{extension}",
+        'format': fmt,
+        'counts': counts,
+        'size': os.path.getsize(path),
+    }
@@ -5,51 +5,30 @@ Este archivo contiene funciones para dar formato a los mensajes que envía el bo
 from typing import Dict, Any, List, Optional
 from datetime import datetime, date, timedelta
 import config
+from database import recurrence
+from utils.templates import (
+    TASK_BADGES, TASK_STATUS_EMOJI, PRIORITY_EMOJI, TASK_STATUS_LINES, PRIORITY_LINES,
+    PROJECT_STATUS_EMOJI, PROJECT_STATUS_LINES, PROJECT_PRIORITY_LINES, UNKNOWN_EMOJI, task_badge
+)
+from utils.dates import DateClassifier
 
-def format_date(date_str: Optional[str]) -> str:
-    """Formatea una fecha en formato legible en español"""
-    if not date_str:
-        return "Sin deadline"
-    
-    try:
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-        today = date.today()
-        
-        diff = (date_obj - today).days
-        
-        if diff < 0:
-            return f"⚠️ Atrasado ({abs(diff)} días)"
-        elif diff == 0:
-            return "🔥 Hoy"
-        elif diff == 1:
-            return "⚡ Mañana"
-        elif diff <= 7:
-            return f"📅 En {diff} días ({date_obj.strftime('%d/%m')})"
-        else:
-            return date_obj.strftime("%d/%m/%Y")
-    except:
-        return date_str
+def format_date(date_str: Optional[str], dates: Optional[DateClassifier] = None) -> str:
+    """
+    Formatea una fecha en formato legible en español.
+    Para listas, pasar un mismo DateClassifier a todas las filas: "hoy" se
+    calcula una vez y las fechas repetidas no se vuelven a formatear.
+    """
+    return (dates or DateClassifier()).label(date_str)
 
 
 def format_project(project: Dict[str, Any], include_progress: bool = True) -> str:
     """Formatea la información de un proyecto"""
-    status_emoji = {
-        'active': '🟢',
-        'paused': '⏸️',
-        'completed': '✅'
-    }
-    
-    priority_emoji = {
-        'high': '🔴',
-        'medium': '🟡',
-        'low': '🟢'
-    }
-    
+    # Las líneas de estado y prioridad ya están montadas en utils/templates.py
     lines = [
         f"📁 <b>{project['name']}</b>",
-        f"",
-        f"Estado: {status_emoji.get(project['status'], '❓')} {config.PROJECT_STATUS.get(project['status'], 'Desconocido')}",
-        f"Prioridad: {priority_emoji.get(project['priority'], '❓')} {config.PRIORITY_LEVELS.get(project['priority'], 'Media')}"
+        "",
+        PROJECT_STATUS_LINES.get(project['status'], "Estado: ❓ Desconocido"),
+        PROJECT_PRIORITY_LINES.get(project['priority'], "Prioridad: ❓ Media")
     ]
     
     if project.get('client'):
@@ -90,34 +69,79 @@ def format_project_with_progress(project: Dict[str, Any],
     return "\n".join(lines)
 
 
-def format_task(task: Dict[str, Any], include_project: bool = False,
-               project_name: Optional[str] = None) -> str:
-    """Formatea la información de una tarea"""
-    
-    # Asegurarse de que los emojis de estado sean diferentes
-    status_emoji = {
-        'pending': '⏳',
-        'in_progress': '🔄',  # Este debe ser diferente de 'pending'
-        'completed': '✅'
-    }
-    
-    priority_emoji = {
-        'high': '🔴',
-        'medium': '🟡',
-        'low': '🟢'
-    }
+def format_project_overview(projects: List[Dict[str, Any]], title: str,
+                            total: Optional[int] = None) -> str:
+    """
+    Formatea una lista de proyectos con su barra de progreso.
+    Los proyectos vienen de Project.get_overview (ya traen el progreso).
     
-    # El título debe incluir el emoji de estado para que sea visible el cambio
-    title_with_status = f"{status_emoji.get(task['status'], '❓')}{priority_emoji.get(task['priority'], '❓')} <b>{task['title']}</b>"
+    Args:
+        projects: Proyectos a mostrar (la página actual)
+        title: Título de la lista
+        total: Total de proyectos de la lista, si solo se muestra una página
+    """
+    lines = [f"<b>{title}</b>", ""]
+    lines.append(f"Total: {len(projects) if total is None else total} misiones")
+    dates = DateClassifier()
+    
+    for project in projects:
+        status_emoji = PROJECT_STATUS_EMOJI.get(project['status'], UNKNOWN_EMOJI)
+        priority_emoji = PRIORITY_EMOJI.get(project['priority'], "🟢")
+        lines.append("")
+        lines.append(f"{status_emoji}{priority_emoji} <b>{project['name']}</b>")
+        
+        if project['total_tasks'] == 0:
+            lines.append("📊 Sin objetivos asignados todavía.")
+            continue
+        
+        lines.append(
+            f"{format_progress_bar(project['percentage'])} · "
+            f"{project['completed_tasks']}/{project['total_tasks']} objetivos"
+        )
+        
+        details = []
+        if project.get('overdue_tasks'):
+            details.append(f"⚠️ {project['overdue_tasks']} atrasados")
+        if project.get('next_deadline'):
+            details.append(f"⏰ Próximo: {format_date(project['next_deadline'], dates)}")
+        if details:
+            lines.append(" · ".join(details))
     
-    lines = [title_with_status, ""]
+    return "\n".join(lines)
+
+
+def format_task(task: Dict[str, Any], include_project: bool = False,
+               project_name: Optional[str] = None,
+               blocked_by: Optional[List[Dict[str, Any]]] = None) -> str:
+    """
+    Formatea la información de una tarea.
+    blocked_by son los objetivos sin completar a los que espera (utils/task_graph.py).
+    """
+    # El título debe incluir el emoji de estado para que sea visible el cambio
+    title_with_status = f"{task_badge(task['status'], task['priority'])} <b>{task['title']}</b>"
     
     # Línea de estado explícita para mayor claridad
-    lines.append(f"Estado: {config.TASK_STATUS.get(task['status'], 'Desconocido')}")
-    lines.append(f"Prioridad: {config.PRIORITY_LEVELS.get(task['priority'], 'Media')}")
+    lines = [
+        title_with_status,
+        "",
+        TASK_STATUS_LINES.get(task['status'], "Estado: Desconocido"),
+        PRIORITY_LINES.get(task['priority'], "Prioridad: Media")
+    ]
     
     if task.get('deadline'):
         lines.append(f"Deadline: {format_date(task['deadline'])}")
+        
+        if task.get('deadline_time'):
+            minutes = task.get('remind_before_minutes')
+            if minutes is None:
+                minutes = config.DEADLINE_ALERT_DEFAULT_MINUTES
+            lines.append(f"Hora límite: {task['deadline_time']} (aviso {minutes} min antes)")
+    
+    if task.get('recurrence'):
+        lines.append(f"🔁 Se repite {recurrence.describe(task['recurrence'])}")
+    
+    if blocked_by and task['status'] != 'completed':
+        lines.append(f"🔒 Bloqueado: espera a {', '.join(blocker['title'] for blocker in blocked_by)}")
     
     if include_project and project_name:
         lines.append(f"Misión: {project_name}")
@@ -149,22 +173,69 @@ def format_task_list(tasks: List[Dict[str, Any]], title: str) -> str:
         return f"{title}\n\n❌ No hay objetivos"
     
     lines = [f"<b>{title}</b>", ""]
+    dates = DateClassifier()
     
     for i, task in enumerate(tasks, 1):
-        if task['status'] == 'completed':
-            status = "✅"
-        elif task['status'] == 'in_progress':
-            status = "🔄"
-        else:
-            status = "⏳"
-        
-        priority = "🔴" if task['priority'] == 'high' else "🟡" if task['priority'] == 'medium' else "🟢"
+        badge = TASK_BADGES.get((task['status'], task['priority']))
+        if badge is None:
+            badge = TASK_STATUS_EMOJI.get(task['status'], "⏳") + PRIORITY_EMOJI.get(task['priority'], "🟢")
         
         deadline_str = ""
         if task.get('deadline'):
-            deadline_str = f" - {format_date(task['deadline'])}"
+            deadline_str = f" - {format_date(task['deadline'], dates)}"
         
-        lines.append(f"{i}. {status}{priority} {task['title']}{deadline_str}")
+        repeat = " 🔁" if task.get('recurrence') else ""
+        lines.append(f"{i}. {badge} {task['title']}{deadline_str}{repeat}")
+    
+    return "\n".join(lines)
+
+
+def format_critical_path(project_name: str, analysis: Dict[str, Any]) -> str:
+    """
+    Formatea la ruta crítica de una misión (TaskGraph.critical_path): lo que
+    marca la duración, lo que se puede empezar ya y lo que está esperando.
+    """
+    lines = [f"🧭 <b>Ruta crítica: {project_name}</b>", ""]
+    
+    if not analysis['tasks']:
+        lines.append("✅ No queda ningún objetivo pendiente en esta misión.")
+        return "\n".join(lines)
+    
+    dates = DateClassifier()
+    tasks = analysis['tasks']
+    lines.append(f"⏱️ Duración mínima: {analysis['days']} día(s) "
+                 f"(cada objetivo cuenta {config.DEPENDENCY_TASK_DAYS} día)")
+    if not analysis['dependencies']:
+        lines.append("🔗 Sin dependencias: todos los objetivos se pueden hacer a la vez.")
+    
+    lines.append("")
+    lines.append("<b>Ruta crítica</b> (sin holgura: si se retrasa uno, se retrasa la misión)")
+    for i, task in enumerate(analysis['path'], 1):
+        badge = PRIORITY_EMOJI.get(task.get('priority'), "🟢")
+        lines.append(f"{i}. {badge} {task['title']} - {format_date(tasks[task['id']]['finish'], dates)}")
+    
+    if analysis['ready']:
+        lines.append("")
+        lines.append("<b>▶️ Se pueden empezar ya</b>")
+        for task in analysis['ready'][:10]:
+            slack = tasks[task['id']]['slack']
+            margin = "crítico" if slack == 0 else f"{slack} día(s) de holgura"
+            lines.append(f"• {task['title']} ({margin})")
+        if len(analysis['ready']) > 10:
+            lines.append(f"... y {len(analysis['ready']) - 10} más")
+    
+    if analysis['blocked']:
+        lines.append("")
+        lines.append(f"<b>🔒 Esperando a otros</b>: {len(analysis['blocked'])} objetivo(s)")
+    
+    late = [task for task in analysis['ready'] + analysis['blocked']
+            if tasks[task['id']]['late']]
+    if late:
+        lines.append("")
+        lines.append("<b>⚠️ No llegan a su deadline</b>")
+        for task in late[:5]:
+            lines.append(f"• {task['title']}: deadline {format_date(task['deadline'], dates)}, "
+                         f"previsto {format_date(tasks[task['id']]['finish'], dates)}")
     
     return "\n".join(lines)
 
@@ -197,6 +268,7 @@ def format_note(note: Dict[str, Any]) -> str:
 
 def format_dashboard(summary: Dict[str, Any]) -> str:
     """Formatea el dashboard principal"""
+    dates = DateClassifier()
     lines = [
         f"📊 <b>Análisis Táctico</b>",
         f""
@@ -219,7 +291,7 @@ def format_dashboard(summary: Dict[str, Any]) -> str:
         lines.append("")
         lines.append(f"⏰ <b>Próximos Deadlines (7 días):</b>")
         for i, project in enumerate(summary['upcoming_deadlines'][:3], 1):
-            lines.append(f"{i}. {project['name']} - {format_date(project['deadline'])}")
+            lines.append(f"{i}. {project['name']} - {format_date(project['deadline'], dates)}")
         
         if len(summary['upcoming_deadlines']) > 3:
             lines.append(f"... y {len(summary['upcoming_deadlines']) - 3} más")
@@ -262,6 +334,7 @@ def format_daily_summary(tasks_today: list, tasks_overdue: list,
     """
     from datetime import datetime, date
     
+    dates = DateClassifier()
     lines = [
         "🌅 <b>Buenos días. Briefing táctico matutino.</b>",
         ""
@@ -279,7 +352,7 @@ def format_daily_summary(tasks_today: list, tasks_overdue: list,
         lines.append(f"<b>📅 Objetivos para hoy:</b>")
         for i, task in enumerate(tasks_today[:5], 1):
             # Determinar emoji de prioridad
-            priority = "🔴" if task['priority'] == 'high' else "🟡" if task['priority'] == 'medium' else "🟢"
+            priority = PRIORITY_EMOJI.get(task['priority'], "🟢")
             lines.append(f"{i}. {priority} {task['title']}")
         
         if len(tasks_today) > 5:
@@ -290,11 +363,9 @@ def format_daily_summary(tasks_today: list, tasks_overdue: list,
     if tasks_overdue:
         lines.append(f"<b>⚠️ Objetivos Atrasados:</b>")
         for i, task in enumerate(tasks_overdue[:3], 1):
-            priority = "🔴" if task['priority'] == 'high' else "🟡" if task['priority'] == 'medium' else "🟢"
+            priority = PRIORITY_EMOJI.get(task['priority'], "🟢")
             # Calcular días de retraso
-            today = date.today()
-            deadline = datetime.strptime(task['deadline'], "%Y-%m-%d").date()
-            days_overdue = (today - deadline).days
+            days_overdue = -dates.days_until(task['deadline'])
             lines.append(f"{i}. {priority} {task['title']} ({days_overdue} días de retraso)")
         
         if len(tasks_overdue) > 3:
@@ -305,7 +376,7 @@ def format_daily_summary(tasks_today: list, tasks_overdue: list,
     if upcoming_deadlines:
         lines.append(f"<b>⏰ Próximos Deadlines (7 días):</b>")
         for i, project in enumerate(upcoming_deadlines[:3], 1):
-            lines.append(f"{i}. {project['name']} - {format_date(project['deadline'])}")
+            lines.append(f"{i}. {project['name']} - {format_date(project['deadline'], dates)}")
         
         if len(upcoming_deadlines) > 3:
             lines.append(f"... y {len(upcoming_deadlines) - 3} más")
@@ -428,6 +499,7 @@ def format_daily_summary(tasks_today: list, tasks_overdue: list,
     """
     from datetime import datetime, date
     
+    dates = DateClassifier()
     lines = [
         "🌅 <b>Buenos días. Briefing táctico matutino.</b>",
         ""
@@ -445,7 +517,7 @@ def format_daily_summary(tasks_today: list, tasks_overdue: list,
         lines.append(f"<b>📅 Objetivos para hoy:</b>")
         for i, task in enumerate(tasks_today[:5], 1):
             # Determinar emoji de prioridad
-            priority = "🔴" if task['priority'] == 'high' else "🟡" if task['priority'] == 'medium' else "🟢"
+            priority = PRIORITY_EMOJI.get(task['priority'], "🟢")
             lines.append(f"{i}. {priority} {task['title']}")
         
         if len(tasks_today) > 5:
@@ -456,11 +528,9 @@ def format_daily_summary(tasks_today: list, tasks_overdue: list,
     if tasks_overdue:
         lines.append(f"<b>⚠️ Objetivos Atrasados:</b>")
         for i, task in enumerate(tasks_overdue[:3], 1):
-            priority = "🔴" if task['priority'] == 'high' else "🟡" if task['priority'] == 'medium' else "🟢"
+            priority = PRIORITY_EMOJI.get(task['priority'], "🟢")
             # Calcular días de retraso
-            today = date.today()
-            deadline = datetime.strptime(task['deadline'], "%Y-%m-%d").date()
-            days_overdue = (today - deadline).days
+            days_overdue = -dates.days_until(task['deadline'])
             lines.append(f"{i}. {priority} {task['title']} ({days_overdue} días de retraso)")
         
         if len(tasks_overdue) > 3:
@@ -471,7 +541,7 @@ def format_daily_summary(tasks_today: list, tasks_overdue: list,
     if upcoming_deadlines:
         lines.append(f"<b>⏰ Próximos Deadlines (7 días):</b>")
         for i, project in enumerate(upcoming_deadlines[:3], 1):
-            lines.append(f"{i}. {project['name']} - {format_date(project['deadline'])}")
+            lines.append(f"{i}. {project['name']} - {format_date(project['deadline'], dates)}")
         
         if len(upcoming_deadlines) > 3:
             lines.append(f"... y {len(upcoming_deadlines) - 3} más")
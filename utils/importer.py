@@ -0,0 +1,676 @@
+"""
+Importación masiva de objetivos desde CSV, JSON y listas de Markdown
+Se usa enviando un documento al bot (⚙️ Configuración → 📥 Importar objetivos
+explica los formatos).
+
+EXPLICACIÓN: el archivo se recorre fila a fila sin cargarlo entero:
+  - csv:      una fila por objetivo; las columnas se reconocen en español o
+              en inglés (título/title, misión/project, prioridad/priority...)
+  - jsonl:    un objeto por línea (también la exportación .jsonl.gz del bot)
+  - json:     una lista de objetos, leída por trozos con raw_decode
+  - markdown: casillas "- [ ] Objetivo @2024-12-31 !alta"; los títulos (#)
+              indican la misión y las casillas sangradas son subobjetivos
+  - zip:      la exportación CSV del bot (projects.csv + tasks.csv)
+
+Cada fila se valida por separado: las que tienen errores se cuentan y se
+guardan algunos ejemplos, pero no paran la importación. Los nombres de misión
+se resuelven con un único diccionario nombre -> id que se carga al empezar.
+Las filas válidas se insertan con executemany en transacciones de
+IMPORT_BATCH_SIZE filas, y después de cada tanda se avisa del progreso. Cada
+tanda deja en la tabla events un solo evento 'imported' con los ids creados.
+Si el archivo se corta a medias o falla una tanda, lo ya guardado se queda:
+import_tasks lanza ImportInterrupted con el resultado hasta ese punto para
+poder publicar sus eventos y decir cuántos objetivos se crearon.
+
+Como todo es síncrono, el handler lo ejecuta en un hilo aparte.
+"""
+import csv
+import functools
+import gzip
+import io
+import itertools
+import json
+import re
+import time
+import zipfile
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+from database import events
+from database.models import DatabaseManager, Task
+from utils.dates import parse_date
+
+# Extensión del archivo -> formato (se prueba primero la más larga)
+IMPORT_FORMATS = {
+    '.jsonl.gz': 'jsonl',
+    '.csv': 'csv',
+    '.json': 'json',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.md': 'markdown',
+    '.markdown': 'markdown',
+    '.txt': 'markdown',
+    '.zip': 'zip',
+}
+
+# Nombres de columna (o de clave JSON) aceptados para cada campo
+FIELD_ALIASES = {
+    'title': ('title', 'titulo', 'título', 'objetivo', 'tarea', 'task', 'nombre', 'name'),
+    'description': ('description', 'descripcion', 'descripción', 'notas', 'notes'),
+    'project': ('project', 'proyecto', 'mision', 'misión', 'project_name'),
+    'priority': ('priority', 'prioridad'),
+    'deadline': ('deadline', 'fecha', 'fecha_limite', 'fecha límite', 'due', 'due_date'),
+    'deadline_time': ('deadline_time', 'hora', 'hora_limite', 'hora límite'),
+    'remind_before_minutes': ('remind_before_minutes', 'aviso', 'aviso_minutos'),
+    'status': ('status', 'estado'),
+    # Solo sirven para reconstruir subobjetivos y misiones de una exportación del bot
+    'source_id': ('id',),
+    'source_parent_id': ('parent_task_id', 'parent_id'),
+    'source_project_id': ('project_id',),
+}
+_FIELD_BY_ALIAS = {alias: field for field, aliases in FIELD_ALIASES.items() for alias in aliases}
+
+PRIORITY_VALUES = {
+    'high': 'high', 'alta': 'high', '🔴': 'high',
+    'medium': 'medium', 'media': 'medium', 'normal': 'medium', '🟡': 'medium',
+    'low': 'low', 'baja': 'low', '🟢': 'low',
+}
+
+STATUS_VALUES = {
+    'pending': 'pending', 'pendiente': 'pending', 'todo': 'pending',
+    'in_progress': 'in_progress', 'en progreso': 'in_progress', 'en_progreso': 'in_progress',
+    'completed': 'completed', 'completada': 'completed', 'completado': 'completed',
+    'hecho': 'completed', 'done': 'completed',
+}
+
+_TIME = re.compile(r'^(\d{1,2}):(\d{2})$')
+
+# Markdown: casillas, títulos y etiquetas dentro del texto
+_CHECKBOX = re.compile(r'^(\s*)[-*+]\s+\[([ xX])\]\s+(.+)$')
+_HEADING = re.compile(r'^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$')
+_DEADLINE_TAG = re.compile(r'(?:^|\s)@(\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{4})(?:\s+(\d{1,2}:\d{2}))?(?=\s|$)')
+_PRIORITY_TAG = re.compile(r'(?:^|\s)!(alta|media|baja|high|medium|low)(?=\s|$)', re.IGNORECASE)
+
+_INSERT_TASK = """
+    INSERT INTO tasks (id, title, description, project_id, status, priority, deadline, completed_at,
+                       parent_task_id, deadline_time, remind_before_minutes, alert_at, owner_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class ImportInterrupted(Exception):
+    """
+    La importación se paró a medias (archivo mal formado al final, error de la
+    base de datos...). Las tandas anteriores ya están guardadas: result es el
+    resultado de import_tasks hasta ese punto, con 'imported_until' (última
+    línea de la última tanda guardada, None si ninguna). La causa va en
+    __cause__.
+    """
+    
+    def __init__(self, message: str, result: Dict[str, Any]):
+        super().__init__(message)
+        self.result = result
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """Formato de importación según la extensión (None si no se reconoce)"""
+    name = (filename or "").lower()
+    for extension, fmt in IMPORT_FORMATS.items():
+        if name.endswith(extension):
+            return fmt
+    return None
+
+
+# ========== LECTURA DE LOS FORMATOS ==========
+# Cada lector devuelve (línea, fila) con las claves de FIELD_ALIASES
+
+def _canonical(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Traduce las claves de una fila a los nombres de campo internos"""
+    row = {}
+    for key, value in record.items():
+        field = _FIELD_BY_ALIAS.get(str(key).strip().lstrip('\ufeff').lower())
+        if field and field not in row:
+            row[field] = value
+    return row
+
+
+def read_csv(stream, project_names: Optional[Dict[Any, str]] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Filas de un CSV con cabecera. El separador puede ser coma o punto y coma
+    (el que usa Excel en español).
+    """
+    first = stream.readline()
+    if not first:
+        return
+    delimiter = ';' if first.count(';') > first.count(',') else ','
+    reader = csv.reader(itertools.chain([first], stream), delimiter=delimiter)
+
+    header = next(reader)
+    fields = [_FIELD_BY_ALIAS.get(name.strip().lstrip('\ufeff').lower()) for name in header]
+    if 'title' not in fields:
+        raise ValueError("el CSV no tiene una columna de título (title, título u objetivo)")
+
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        row = {}
+        for field, value in zip(fields, values):
+            if field and field not in row:
+                row[field] = value
+        _resolve_source_project(row, project_names)
+        yield reader.line_num, row
+
+
+def _resolve_source_project(row: Dict[str, Any], project_names: Optional[Dict[Any, str]]):
+    """En una exportación del bot la misión viene como id: se cambia por su nombre"""
+    source_project = row.pop('source_project_id', None)
+    if project_names and not row.get('project') and source_project not in (None, ''):
+        row['project'] = project_names.get(str(source_project))
+
+
+def _read_objects(objects: Iterable[Tuple[int, Any]]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Filas de una secuencia de objetos JSON. En una exportación del bot las
+    misiones van antes que los objetivos y las notas se ignoran.
+    """
+    project_names: Dict[Any, str] = {}
+
+    for line, record in objects:
+        if not isinstance(record, dict):
+            yield line, {'error': "no es un objeto JSON válido"}
+            continue
+
+        row_type = record.get('type')
+        if row_type == 'project':
+            if record.get('id') is not None and record.get('name'):
+                project_names[str(record['id'])] = record['name']
+            continue
+        if row_type not in (None, 'task'):
+            continue
+
+        row = _canonical(record)
+        _resolve_source_project(row, project_names)
+        yield line, row
+
+
+def read_jsonl(stream) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Filas de un archivo JSON Lines (un objeto por línea)"""
+    def objects():
+        for number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError:
+                yield number, None
+
+    return _read_objects(objects())
+
+
+def _iter_json_array(stream, chunk_size: int = 64 * 1024) -> Iterator[Tuple[int, Any]]:
+    """
+    Elementos de una lista JSON leída por trozos, sin cargar el archivo entero.
+    Devuelve (línea donde empieza el elemento, elemento).
+    """
+    decoder = json.JSONDecoder()
+    buffer = stream.read(chunk_size).lstrip('\ufeff \t\r\n')
+
+    if buffer.startswith('{'):
+        # Un objeto suelto o {"tasks": [...]}: aquí no queda otra que leerlo entero
+        data = json.loads(buffer + stream.read())
+        items = data.get('tasks', [data]) if isinstance(data, dict) else []
+        yield from ((1, item) for item in items)
+        return
+    if not buffer.startswith('['):
+        raise ValueError("el JSON debe ser una lista de objetivos")
+
+    pos, line = 1, 1
+    counted = 0  # Hasta dónde del buffer se han contado ya los saltos de línea
+
+    def refill() -> bool:
+        """Descarta lo ya leído del buffer y añade el siguiente trozo"""
+        nonlocal buffer, pos, line, counted
+        more = stream.read(chunk_size)
+        if not more:
+            return False
+        line += buffer.count('\n', counted, pos)
+        buffer, pos, counted = buffer[pos:] + more, 0, 0
+        return True
+
+    while True:
+        # Saltar espacios y comas hasta el siguiente elemento
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer):
+                break
+            if not refill():
+                raise ValueError("el JSON está incompleto (falta el ']' final)")
+
+        if buffer[pos] == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # El elemento sigue en el siguiente trozo (o el JSON está mal formado)
+            if not refill():
+                raise ValueError(f"JSON no válido cerca de la línea {line + buffer.count(chr(10), counted, pos)}")
+            continue
+
+        line += buffer.count('\n', counted, pos)
+        counted = pos
+        yield line, item
+        pos = end
+
+
+def read_json(stream) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Filas de una lista JSON de objetivos"""
+    return _read_objects(_iter_json_array(stream))
+
+
+def read_markdown(stream) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Filas de una lista de casillas de Markdown:
+
+        # Misión
+        - [ ] Objetivo @2024-12-31 18:00 !alta
+          - [x] Subobjetivo ya hecho
+
+    Las líneas que no son casillas ni títulos se ignoran.
+    """
+    project = None
+    parents: List[Tuple[int, int]] = []  # (sangría, línea) de las casillas abiertas
+
+    for number, text in enumerate(stream, 1):
+        text = text.rstrip('\r\n').expandtabs(4)
+
+        match = _CHECKBOX.match(text)
+        if not match:
+            heading = _HEADING.match(text)
+            if heading:
+                project, parents = heading.group(1), []
+            continue
+
+        indent, mark, title = len(match.group(1)), match.group(2), match.group(3)
+        while parents and parents[-1][0] >= indent:
+            parents.pop()
+        parent = parents[-1][1] if parents else None
+        parents.append((indent, number))
+
+        row = {
+            'source_id': number,
+            'source_parent_id': parent,
+            # Como al añadir un subobjetivo desde el bot: la misión es solo del objetivo principal
+            'project': project if parent is None else None,
+            'status': 'completed' if mark != ' ' else 'pending',
+        }
+
+        deadline = _DEADLINE_TAG.search(title)
+        if deadline:
+            row['deadline'], row['deadline_time'] = deadline.group(1), deadline.group(2)
+            title = title[:deadline.start()] + title[deadline.end():]
+        priority = _PRIORITY_TAG.search(title)
+        if priority:
+            row['priority'] = priority.group(1)
+            title = title[:priority.start()] + title[priority.end():]
+
+        row['title'] = " ".join(title.split())
+        yield number, row
+
+
+def read_export_zip(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Filas de tasks.csv de la exportación CSV del bot (con sus misiones de projects.csv)"""
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+        if 'tasks.csv' not in names:
+            raise ValueError("el zip no contiene tasks.csv")
+
+        project_names = {}
+        if 'projects.csv' in names:
+            with archive.open('projects.csv') as raw:
+                for row in csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')):
+                    if row.get('id') and row.get('name'):
+                        project_names[row['id']] = row['name']
+
+        with archive.open('tasks.csv') as raw:
+            yield from read_csv(io.TextIOWrapper(raw, encoding='utf-8-sig', newline=''), project_names)
+
+
+def read_file(path: str, fmt: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Abre el archivo y devuelve sus filas según el formato"""
+    if fmt == 'zip':
+        yield from read_export_zip(path)
+        return
+
+    opener = gzip.open if path.endswith('.gz') else open
+    # utf-8-sig: los CSV guardados con Excel empiezan con BOM
+    with opener(path, 'rt', encoding='utf-8-sig', errors='replace', newline='') as stream:
+        if fmt == 'csv':
+            yield from read_csv(stream)
+        elif fmt == 'jsonl':
+            yield from read_jsonl(stream)
+        elif fmt == 'json':
+            yield from read_json(stream)
+        elif fmt == 'markdown':
+            yield from read_markdown(stream)
+        else:
+            raise ValueError(f"Formato de importación desconocido: {fmt}")
+
+
+# ========== VALIDACIÓN ==========
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value).strip()
+
+
+@functools.lru_cache(maxsize=config.DATE_PARSE_CACHE_SIZE)
+def _parse_import_date(text: str) -> Optional[str]:
+    """Fecha en AAAA-MM-DD o DD/MM/AAAA, como texto AAAA-MM-DD (None si no es válida)"""
+    parsed = parse_date(text)
+    if parsed is None:
+        for fmt in ("%d/%m/%Y", "%d-%m-%Y"):
+            try:
+                parsed = datetime.strptime(text, fmt).date()
+                break
+            except ValueError:
+                continue
+    return parsed.isoformat() if parsed else None
+
+
+def validate_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Comprueba una fila y la deja lista para insertar.
+
+    Raises:
+        ValueError: con el motivo, si la fila no es válida
+    """
+    if row.get('error'):
+        raise ValueError(row['error'])
+
+    title = _text(row.get('title'))
+    if not title:
+        raise ValueError("falta el título")
+    if len(title) > config.MAX_TASK_NAME_LENGTH:
+        raise ValueError(f"el título pasa de {config.MAX_TASK_NAME_LENGTH} caracteres")
+
+    project = _text(row.get('project')) or None
+    if project and len(project) > config.MAX_PROJECT_NAME_LENGTH:
+        raise ValueError(f"el nombre de la misión pasa de {config.MAX_PROJECT_NAME_LENGTH} caracteres")
+
+    priority_text = _text(row.get('priority')).lower()
+    priority = PRIORITY_VALUES.get(priority_text, 'medium' if not priority_text else None)
+    if priority is None:
+        raise ValueError(f"prioridad desconocida: {priority_text}")
+
+    status_text = _text(row.get('status')).lower()
+    status = STATUS_VALUES.get(status_text, 'pending' if not status_text else None)
+    if status is None:
+        raise ValueError(f"estado desconocido: {status_text}")
+
+    deadline = None
+    deadline_text = _text(row.get('deadline'))
+    if deadline_text:
+        deadline = _parse_import_date(deadline_text[:10] if 'T' in deadline_text else deadline_text)
+        if deadline is None:
+            raise ValueError(f"fecha no válida: {deadline_text}")
+
+    deadline_time = None
+    time_text = _text(row.get('deadline_time'))
+    if time_text:
+        match = _TIME.match(time_text)
+        if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+            raise ValueError(f"hora no válida: {time_text}")
+        if deadline is None:
+            raise ValueError("hora límite sin fecha")
+        deadline_time = f"{int(match.group(1)):02d}:{match.group(2)}"
+
+    remind_before_minutes = None
+    minutes_text = _text(row.get('remind_before_minutes'))
+    if minutes_text:
+        try:
+            remind_before_minutes = int(float(minutes_text))
+        except ValueError:
+            raise ValueError(f"minutos de aviso no válidos: {minutes_text}")
+        if remind_before_minutes < 0:
+            raise ValueError(f"minutos de aviso no válidos: {minutes_text}")
+
+    return {
+        'title': title,
+        'description': _text(row.get('description')),
+        'project': project,
+        'priority': priority,
+        'status': status,
+        'deadline': deadline,
+        'deadline_time': deadline_time,
+        'remind_before_minutes': remind_before_minutes,
+        'source_id': _text(row.get('source_id')) or None,
+        'source_parent_id': _text(row.get('source_parent_id')) or None,
+    }
+
+
+# ========== INSERCIÓN POR TANDAS ==========
+
+class _TaskWriter:
+    """Inserta tandas de filas ya validadas en una sola transacción cada una"""
+
+    def __init__(self, db_manager: DatabaseManager, owner_id: int, timezone: str, create_projects: bool):
+        self.owner_id = owner_id
+        self.timezone = timezone
+        self.create_projects = create_projects
+        self.conn = db_manager.for_user(owner_id).get_connection()
+        # Las transacciones se abren y cierran a mano; close() devuelve el modo
+        # original porque la conexión puede volver al pool (STORAGE_MODE='per_user')
+        self._isolation_level = self.conn.isolation_level
+        self.conn.isolation_level = None
+
+        # Nombre de misión (sin mayúsculas) -> id: una consulta para toda la importación
+        self.projects = {
+            row['name'].casefold(): row['id']
+            for row in self.conn.execute(
+                "SELECT id, name FROM projects WHERE owner_id = ? ORDER BY id DESC", (owner_id,)
+            )
+        }
+        # id de la fila en el archivo -> id del objetivo creado (para los subobjetivos)
+        self.created_ids: Dict[str, int] = {}
+
+        self.imported = 0
+        self.imported_until: Optional[int] = None  # Última línea de la última tanda guardada
+        self.projects_created = 0
+        self.alerts: List[Tuple[int, float]] = []
+        self.events: List[Dict[str, Any]] = []
+
+    def close(self):
+        self.conn.isolation_level = self._isolation_level
+        self.conn.close()
+
+    def write(self, batch: List[Tuple[int, Dict[str, Any]]], errors: Callable[[int, str], None]):
+        cursor = self.conn.cursor()
+        # Lo que la tanda añade a la memoria, para quitarlo si se deshace
+        events_before = len(self.events)
+        new_projects: List[str] = []
+        new_sources: List[str] = []
+
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Con la base de datos bloqueada para escritura, los ids siguientes son nuestros
+            cursor.execute("""
+                SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'tasks'), 0),
+                           COALESCE((SELECT MAX(id) FROM tasks), 0))
+            """)
+            next_id = cursor.fetchone()[0] + 1
+            completed_at = datetime.now().isoformat()
+
+            rows = []
+            alerts = []
+            for line, task in batch:
+                project_id = self._project_id(cursor, task['project'], new_projects)
+                if project_id is False:
+                    errors(line, f"misión desconocida: {task['project']}")
+                    continue
+
+                parent_id = self.created_ids.get(task['source_parent_id']) if task['source_parent_id'] else None
+                task_id = next_id
+                next_id += 1
+                if task['source_id']:
+                    self.created_ids[task['source_id']] = task_id
+                    new_sources.append(task['source_id'])
+
+                alert_at = Task._compute_alert_at(task, self.timezone) if task['deadline_time'] else None
+                if alert_at is not None:
+                    alerts.append((task_id, alert_at))
+
+                rows.append((
+                    task_id, task['title'], task['description'], project_id, task['status'],
+                    task['priority'], task['deadline'],
+                    completed_at if task['status'] == 'completed' else None,
+                    parent_id, task['deadline_time'], task['remind_before_minutes'], alert_at,
+                    self.owner_id
+                ))
+
+            cursor.executemany(_INSERT_TASK, rows)
+            if rows:
+                self.events.append(events.record(
+                    cursor, self.owner_id, 'task', None, 'imported',
+                    {'ids': [row[0] for row in rows], 'alerts': alerts}
+                ))
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            del self.events[events_before:]
+            for key in new_projects:
+                del self.projects[key]
+            for source_id in new_sources:
+                self.created_ids.pop(source_id, None)
+            self.projects_created -= len(new_projects)
+            raise
+
+        self.imported += len(rows)
+        self.imported_until = batch[-1][0]
+        self.alerts.extend(alerts)
+
+    def _project_id(self, cursor, name: Optional[str], new_projects: List[str]):
+        """id de la misión (None sin misión, False si no existe y no se crean)"""
+        if not name:
+            return None
+
+        key = name.casefold()
+        project_id = self.projects.get(key)
+        if project_id is None:
+            if not self.create_projects:
+                return False
+            cursor.execute("INSERT INTO projects (name, description, owner_id) VALUES (?, '', ?)",
+                           (name, self.owner_id))
+            project_id = self.projects[key] = cursor.lastrowid
+            new_projects.append(key)
+            self.projects_created += 1
+            self.events.append(events.record_change(
+                cursor, 'project', project_id, None,
+                {'name': name, 'description': '', 'owner_id': self.owner_id}
+            ))
+        return project_id
+
+
+def import_tasks(db_manager: DatabaseManager, owner_id: int,
+                 rows: Iterable[Tuple[int, Dict[str, Any]]],
+                 timezone: str = config.DEFAULT_TIMEZONE,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 batch_size: Optional[int] = None,
+                 create_projects: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Valida e inserta las filas leídas de un archivo.
+
+    Args:
+        db_manager: Gestor de la base de datos principal
+        owner_id: Usuario al que se añaden los objetivos
+        rows: (línea, fila) como las devuelven los lectores de este módulo
+        timezone: Zona horaria del usuario (para las alertas con hora límite)
+        progress: Se llama con (filas leídas, objetivos creados) tras cada tanda
+        batch_size: Filas por transacción (por defecto config.IMPORT_BATCH_SIZE)
+        create_projects: Crear las misiones que no existan (por defecto
+            config.IMPORT_CREATE_MISSING_PROJECTS); si no, la fila es un error
+
+    Returns:
+        {'processed', 'imported', 'imported_until', 'projects_created', 'errors',
+         'error_examples', 'alerts', 'events', 'seconds'}. alerts son
+        (task_id, alert_at) de los objetivos con alerta; events, los eventos
+        guardados, para publicarlos (events.publish) desde el hilo del bot.
+
+    Raises:
+        ImportInterrupted: La lectura o una tanda fallaron; lleva el resultado
+            de lo que ya se guardó
+    """
+    batch_size = batch_size or config.IMPORT_BATCH_SIZE
+    if create_projects is None:
+        create_projects = config.IMPORT_CREATE_MISSING_PROJECTS
+
+    started = time.perf_counter()
+    processed = 0
+    error_count = 0
+    error_examples: List[Tuple[int, str]] = []
+
+    def error(line: int, reason: str):
+        nonlocal error_count
+        error_count += 1
+        if len(error_examples) < config.IMPORT_MAX_REPORTED_ERRORS:
+            error_examples.append((line, reason))
+
+    def result() -> Dict[str, Any]:
+        return {
+            'processed': processed,
+            'imported': writer.imported,
+            'imported_until': writer.imported_until,
+            'projects_created': writer.projects_created,
+            'errors': error_count,
+            'error_examples': error_examples,
+            'alerts': writer.alerts,
+            'events': writer.events,
+            'seconds': time.perf_counter() - started,
+        }
+
+    writer = _TaskWriter(db_manager, owner_id, timezone, create_projects)
+    batch = []
+    try:
+        try:
+            for line, row in rows:
+                processed += 1
+                try:
+                    batch.append((line, validate_row(row)))
+                except ValueError as e:
+                    error(line, str(e))
+                    continue
+
+                if len(batch) >= batch_size:
+                    pending, batch = batch, []
+                    writer.write(pending, error)
+                    if progress:
+                        progress(processed, writer.imported)
+        except Exception:
+            # El archivo se cortó a medias: las filas válidas leídas hasta ahí
+            # se guardan igualmente (si lo que falló fue una tanda, no queda ninguna)
+            pending, batch = batch, []
+            if pending:
+                writer.write(pending, error)
+            raise
+
+        if batch:
+            writer.write(batch, error)
+        if progress:
+            progress(processed, writer.imported)
+    except Exception as e:
+        raise ImportInterrupted(str(e), result()) from e
+    finally:
+        writer.close()
+
+    return result()
+
+
+def import_file(db_manager: DatabaseManager, owner_id: int, path: str, fmt: str,
+                timezone: str = config.DEFAULT_TIMEZONE,
+                progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """Importa un archivo entero (ver import_tasks); el resultado incluye 'format'"""
+    result = import_tasks(db_manager, owner_id, read_file(path, fmt), timezone, progress)
+    result['format'] = fmt
+    return result
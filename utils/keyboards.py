@@ -3,9 +3,11 @@ Utilidades para crear teclados y botones de Telegram
 Este archivo contiene funciones para generar los menús interactivos del bot
 """
 from telegram import ReplyKeyboardMarkup, InlineKeyboardMarkup, InlineKeyboardButton, KeyboardButton
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 import config
+from utils.templates import static_markup
 
+@static_markup
 def get_main_keyboard() -> ReplyKeyboardMarkup:
     """
     Crea el teclado persistente del menú principal.
@@ -36,6 +38,7 @@ def get_main_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@static_markup
 def get_projects_menu() -> InlineKeyboardMarkup:
     """
     Crea el menú inline de proyectos.
@@ -72,7 +75,8 @@ def get_projects_menu() -> InlineKeyboardMarkup:
 
 def get_project_list_keyboard(projects: List[Dict[str, Any]], 
                               page: int = 0, 
-                              items_per_page: int = 5) -> InlineKeyboardMarkup:
+                              items_per_page: int = config.PROJECTS_PER_PAGE,
+                              status: str = "active") -> InlineKeyboardMarkup:
     """
     Crea un teclado con lista de proyectos paginada.
     
@@ -80,6 +84,7 @@ def get_project_list_keyboard(projects: List[Dict[str, Any]],
         projects: Lista de proyectos
         page: Página actual (para paginación)
         items_per_page: Cantidad de proyectos por página
+        status: Filtro de la lista (para que las páginas lo mantengan)
         
     Returns:
         InlineKeyboardMarkup con la lista de proyectos
@@ -108,13 +113,13 @@ def get_project_list_keyboard(projects: List[Dict[str, Any]],
     if page > 0:
         nav_buttons.append(InlineKeyboardButton(
             "⬅️ Anterior",
-            callback_data=f"project_list_page_{page-1}"
+            callback_data=f"project_list_{status}_page_{page-1}"
         ))
     
     if end < len(projects):
         nav_buttons.append(InlineKeyboardButton(
             "Siguiente ➡️",
-            callback_data=f"project_list_page_{page+1}"
+            callback_data=f"project_list_{status}_page_{page+1}"
         ))
     
     if nav_buttons:
@@ -155,11 +160,17 @@ def get_project_detail_keyboard(project_id: int,
         callback_data=f"task_list_project_{project_id}"
     )])
     
-    # Botón para ver progreso
-    keyboard.append([InlineKeyboardButton(
-        f"{config.EMOJI['stats']} Ver progreso",
-        callback_data=f"project_progress_{project_id}"
-    )])
+    # Botones para ver progreso y ruta crítica
+    keyboard.append([
+        InlineKeyboardButton(
+            f"{config.EMOJI['stats']} Ver progreso",
+            callback_data=f"project_progress_{project_id}"
+        ),
+        InlineKeyboardButton(
+            "🧭 Ruta crítica",
+            callback_data=f"project_critical_{project_id}"
+        )
+    ])
     
     # Botones de cambio de estado
     status_buttons = []
@@ -211,6 +222,7 @@ def get_project_detail_keyboard(project_id: int,
     return InlineKeyboardMarkup(keyboard)
 
 
+@static_markup
 def get_tasks_menu() -> InlineKeyboardMarkup:
     """
     Crea el menú inline de tareas.
@@ -243,6 +255,10 @@ def get_tasks_menu() -> InlineKeyboardMarkup:
             f"{config.EMOJI['task']} Todas las tareas",
             callback_data="task_list_all"
         )],
+        [InlineKeyboardButton(
+            "✅ Completadas",
+            callback_data="task_list_completed"
+        )],
         [InlineKeyboardButton(
             f"{config.EMOJI['back']} Volver al menú",
             callback_data="back_to_main"
@@ -255,7 +271,8 @@ def get_tasks_menu() -> InlineKeyboardMarkup:
 def get_task_list_keyboard(tasks: List[Dict[str, Any]], 
                            filter_type: str = "all",
                            page: int = 0,
-                           items_per_page: int = 5) -> InlineKeyboardMarkup:
+                           items_per_page: int = 5,
+                           include_archived: Optional[bool] = None) -> InlineKeyboardMarkup:
     """
     Crea un teclado con lista de tareas paginada.
     
@@ -264,6 +281,8 @@ def get_task_list_keyboard(tasks: List[Dict[str, Any]],
         filter_type: Tipo de filtro aplicado (para callback)
         page: Página actual
         items_per_page: Cantidad de tareas por página
+        include_archived: En las vistas de historial, si se muestran los
+                          archivados (añade el botón para cambiarlo); None = sin botón
         
     Returns:
         InlineKeyboardMarkup con la lista de tareas
@@ -311,6 +330,14 @@ def get_task_list_keyboard(tasks: List[Dict[str, Any]],
     if nav_buttons:
         keyboard.append(nav_buttons)
     
+    # Historial: mostrar u ocultar los archivados (database/archive.py)
+    if include_archived is not None:
+        base_filter = filter_type.replace("_archived", "")
+        keyboard.append([InlineKeyboardButton(
+            "🗄️ Ocultar archivados" if include_archived else "🗄️ Incluir archivados",
+            callback_data=f"task_list_{base_filter}" if include_archived else f"task_list_{base_filter}_archived"
+        )])
+    
     # Botón volver
     keyboard.append([InlineKeyboardButton(
         f"{config.EMOJI['back']} Volver",
@@ -381,6 +408,18 @@ def get_task_detail_keyboard(task_id: int,
         callback_data=f"task_add_subtask_{task_id}"
     )])
     
+    # Botones para que se repita y para elegir de qué otros depende
+    keyboard.append([
+        InlineKeyboardButton(
+            "🔁 Repetir",
+            callback_data=f"task_repeat_{task_id}"
+        ),
+        InlineKeyboardButton(
+            "🔗 Depende de",
+            callback_data=f"task_deps_{task_id}_0"
+        )
+    ])
+    
     # Si tiene subtareas, botón para verlas
     if has_subtasks:
         keyboard.append([InlineKeyboardButton(
@@ -409,6 +448,103 @@ def get_task_detail_keyboard(task_id: int,
     return InlineKeyboardMarkup(keyboard)
 
 
+def get_task_recurrence_keyboard(task_id: int, recurring: bool = False) -> InlineKeyboardMarkup:
+    """
+    Crea el teclado para elegir cada cuánto se repite una tarea.
+    
+    Args:
+        task_id: ID de la tarea
+        recurring: Si ya se repite (añade el botón para que deje de hacerlo)
+        
+    Returns:
+        InlineKeyboardMarkup con las reglas de RECURRENCE_PRESETS
+    """
+    keyboard = [
+        [InlineKeyboardButton(label, callback_data=f"task_setrepeat_{task_id}_{key}")]
+        for key, (label, _rule) in config.RECURRENCE_PRESETS.items()
+    ]
+    
+    if recurring:
+        keyboard.append([InlineKeyboardButton(
+            "🚫 No repetir",
+            callback_data=f"task_setrepeat_{task_id}_none"
+        )])
+    
+    keyboard.append([InlineKeyboardButton(
+        f"{config.EMOJI['back']} Volver al objetivo",
+        callback_data=f"task_view_{task_id}"
+    )])
+    
+    return InlineKeyboardMarkup(keyboard)
+
+
+def get_critical_path_keyboard(project_id: int) -> InlineKeyboardMarkup:
+    """Teclado de la ruta crítica de una misión: ver sus tareas o volver a ella"""
+    keyboard = [
+        [InlineKeyboardButton(
+            f"{config.EMOJI['task']} Ver tareas",
+            callback_data=f"task_list_project_{project_id}"
+        )],
+        [InlineKeyboardButton(
+            f"{config.EMOJI['back']} Volver a la misión",
+            callback_data=f"project_view_{project_id}"
+        )]
+    ]
+    
+    return InlineKeyboardMarkup(keyboard)
+
+
+def get_task_dependency_keyboard(task_id: int,
+                                 candidates: List[Dict[str, Any]],
+                                 selected: Set[int],
+                                 page: int = 0,
+                                 items_per_page: int = config.DEPENDENCY_CANDIDATES_PER_PAGE) -> InlineKeyboardMarkup:
+    """
+    Crea el teclado para elegir de qué objetivos depende una tarea.
+    
+    Args:
+        task_id: ID de la tarea
+        candidates: Objetivos que se pueden elegir
+        selected: IDs de los que ya depende (se marcan)
+        page: Página actual
+        items_per_page: Objetivos por página
+        
+    Returns:
+        InlineKeyboardMarkup: cada objetivo añade o quita la dependencia
+    """
+    keyboard = []
+    
+    start = page * items_per_page
+    for candidate in candidates[start:start + items_per_page]:
+        mark = "☑️" if candidate['id'] in selected else "⬜"
+        keyboard.append([InlineKeyboardButton(
+            f"{mark} {candidate['title']}",
+            callback_data=f"task_deptoggle_{task_id}_{candidate['id']}_{page}"
+        )])
+    
+    nav_buttons = []
+    if page > 0:
+        nav_buttons.append(InlineKeyboardButton(
+            "⬅️ Anterior",
+            callback_data=f"task_deps_{task_id}_{page - 1}"
+        ))
+    if start + items_per_page < len(candidates):
+        nav_buttons.append(InlineKeyboardButton(
+            "Siguiente ➡️",
+            callback_data=f"task_deps_{task_id}_{page + 1}"
+        ))
+    if nav_buttons:
+        keyboard.append(nav_buttons)
+    
+    keyboard.append([InlineKeyboardButton(
+        f"{config.EMOJI['back']} Volver al objetivo",
+        callback_data=f"task_view_{task_id}"
+    )])
+    
+    return InlineKeyboardMarkup(keyboard)
+
+
+@static_markup
 def get_notes_menu() -> InlineKeyboardMarkup:
     """
     Crea el menú inline de notas.
@@ -530,6 +666,7 @@ def get_note_detail_keyboard(note_id: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(keyboard)
 
 
+@static_markup
 def get_dashboard_menu() -> InlineKeyboardMarkup:
     """
     Crea el menú del dashboard con acceso a estadísticas.
@@ -540,11 +677,11 @@ def get_dashboard_menu() -> InlineKeyboardMarkup:
     keyboard = [
         [InlineKeyboardButton(
             f"{config.EMOJI['stats']} Estadísticas semanales",
-            callback_data="stats_weekly"
+            callback_data="dashboard_weekly"
         )],
         [InlineKeyboardButton(
             f"{config.EMOJI['stats']} Estadísticas mensuales",
-            callback_data="stats_monthly"
+            callback_data="dashboard_monthly"
         )],
         [InlineKeyboardButton(
             f"{config.EMOJI['project']} Estado de proyectos",
@@ -563,6 +700,7 @@ def get_dashboard_menu() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(keyboard)
 
 
+@static_markup
 def get_settings_menu() -> InlineKeyboardMarkup:
     """
     Crea el menú de configuración.
@@ -587,6 +725,10 @@ def get_settings_menu() -> InlineKeyboardMarkup:
             f"{config.EMOJI['export']} Exportar datos",
             callback_data="settings_export"
         )],
+        [InlineKeyboardButton(
+            f"{config.EMOJI['import']} Importar objetivos",
+            callback_data="settings_import"
+        )],
         [InlineKeyboardButton(
             f"{config.EMOJI['back']} Volver al menú",
             callback_data="back_to_main"
@@ -596,6 +738,135 @@ def get_settings_menu() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(keyboard)
 
 
+@static_markup
+def get_export_keyboard() -> InlineKeyboardMarkup:
+    """
+    Crea el teclado para elegir el formato de exportación.
+    
+    Returns:
+        InlineKeyboardMarkup con los formatos disponibles
+    """
+    keyboard = [
+        [InlineKeyboardButton("📄 JSON Lines (todo)", callback_data="settings_export_jsonl")],
+        [InlineKeyboardButton("📊 CSV para hojas de cálculo", callback_data="settings_export_csv")],
+        [InlineKeyboardButton("📅 Calendario de deadlines (ICS)", callback_data="settings_export_ics")],
+        [InlineKeyboardButton(
+            f"{config.EMOJI['back']} Volver",
+            callback_data="settings_menu"
+        )]
+    ]
+    
+    return InlineKeyboardMarkup(keyboard)
+
+
+@static_markup
+def get_import_keyboard() -> InlineKeyboardMarkup:
+    """
+    Crea el teclado de la pantalla de importación (solo para volver).
+    
+    Returns:
+        InlineKeyboardMarkup con el botón de volver a configuración
+    """
+    keyboard = [
+        [InlineKeyboardButton(
+            f"{config.EMOJI['back']} Volver",
+            callback_data="settings_menu"
+        )]
+    ]
+    
+    return InlineKeyboardMarkup(keyboard)
+
+
+@static_markup
+def get_archived_task_keyboard() -> InlineKeyboardMarkup:
+    """
+    Crea el teclado de un objetivo archivado (solo lectura: volver al historial).
+    
+    Returns:
+        InlineKeyboardMarkup con el botón de volver a los completados
+    """
+    keyboard = [
+        [InlineKeyboardButton(
+            f"{config.EMOJI['back']} Volver",
+            callback_data="task_list_completed_archived"
+        )]
+    ]
+    
+    return InlineKeyboardMarkup(keyboard)
+
+
+def get_reminder_time_keyboard(kind: str, options: List[str],
+                               current: str, enabled: bool) -> InlineKeyboardMarkup:
+    """
+    Crea el teclado para elegir la hora de un recordatorio.
+    
+    Args:
+        kind: Tipo de recordatorio ('daily' o 'evening')
+        options: Horas disponibles en formato HH:MM
+        current: Hora configurada actualmente
+        enabled: Si el recordatorio está activado
+        
+    Returns:
+        InlineKeyboardMarkup con las horas disponibles
+    """
+    keyboard = []
+    
+    # Horas en filas de tres botones
+    row = []
+    for option in options:
+        label = f"✅ {option}" if option == current else option
+        row.append(InlineKeyboardButton(
+            label,
+            callback_data=f"settings_set_{kind}_{option.replace(':', '')}"
+        ))
+        if len(row) == 3:
+            keyboard.append(row)
+            row = []
+    if row:
+        keyboard.append(row)
+    
+    keyboard.append([InlineKeyboardButton(
+        "🔕 Desactivar" if enabled else "🔔 Activar",
+        callback_data=f"settings_toggle_{kind}"
+    )])
+    
+    keyboard.append([InlineKeyboardButton(
+        f"{config.EMOJI['back']} Volver",
+        callback_data="settings_menu"
+    )])
+    
+    return InlineKeyboardMarkup(keyboard)
+
+
+def get_timezone_keyboard(current: str) -> InlineKeyboardMarkup:
+    """
+    Crea el teclado para elegir la zona horaria.
+    Se usa el índice en config.TIMEZONE_OPTIONS como callback
+    porque los nombres de zona contienen '/'.
+    
+    Args:
+        current: Zona horaria configurada actualmente
+        
+    Returns:
+        InlineKeyboardMarkup con las zonas horarias disponibles
+    """
+    keyboard = []
+    
+    for index, timezone in enumerate(config.TIMEZONE_OPTIONS):
+        label = f"✅ {timezone}" if timezone == current else timezone
+        keyboard.append([InlineKeyboardButton(
+            label,
+            callback_data=f"settings_set_tz_{index}"
+        )])
+    
+    keyboard.append([InlineKeyboardButton(
+        f"{config.EMOJI['back']} Volver",
+        callback_data="settings_menu"
+    )])
+    
+    return InlineKeyboardMarkup(keyboard)
+
+
 def get_confirmation_keyboard(action: str, item_id: int) -> InlineKeyboardMarkup:
     """
     Crea un teclado de confirmación genérico.
@@ -623,6 +894,7 @@ def get_confirmation_keyboard(action: str, item_id: int) -> InlineKeyboardMarkup
     return InlineKeyboardMarkup(keyboard)
 
 
+@static_markup
 def get_priority_keyboard() -> InlineKeyboardMarkup:
     """
     Crea un teclado para seleccionar prioridad.
@@ -639,6 +911,7 @@ def get_priority_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(keyboard)
 
 
+@static_markup
 def get_cancel_keyboard() -> InlineKeyboardMarkup:
     """
     Crea un simple teclado con botón de cancelar.
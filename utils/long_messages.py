@@ -0,0 +1,208 @@
+"""
+Mensajes largos: medir antes de enviar y dividir sin romper el HTML
+Telegram rechaza los mensajes de más de 4096 caracteres ("message is too
+long"). En lugar de enviar, fallar y recortar, el texto se mide antes y se
+divide en varios mensajes o se pagina.
+
+EXPLICACIÓN:
+- Telegram cuenta el texto ya sin etiquetas (<b>, <i>...) y en unidades
+  UTF-16: un emoji como 📅 cuenta 2. visible_length() mide igual.
+- split_html() corta preferiblemente en un salto de línea, si no en un espacio
+  y solo en último caso a mitad de palabra. Nunca corta dentro de una etiqueta
+  o de una entidad (&amp;), y las etiquetas abiertas se cierran al final de
+  cada trozo y se vuelven a abrir al principio del siguiente.
+- paginate_lines() recorre una lista de líneas (subobjetivos...) y se queda
+  con las que caben en la página pedida, con botones "más" en la vista.
+"""
+import html
+import re
+from collections import deque
+from typing import Iterable, List, Optional, Tuple
+
+from telegram.constants import ParseMode
+
+import config
+
+# Piezas del HTML: etiqueta, entidad, salto de línea o texto seguido
+_ATOM = re.compile(r'<[^<>]*>|&#?\w+;|\n|[^<&\n]+|[<&]')
+_TAG_NAME = re.compile(r'<\s*(/?)\s*([\w-]+)')
+
+
+def _units(text: str) -> int:
+    """Longitud en unidades UTF-16, como la cuenta Telegram"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def visible_length(text: str) -> int:
+    """Caracteres que cuenta Telegram de un mensaje HTML"""
+    return _units(html.unescape(re.sub(r'<[^<>]*>', '', text)))
+
+
+def _cost(atom: str) -> int:
+    """Caracteres visibles de una pieza (las etiquetas no cuentan)"""
+    if atom.isascii():
+        if len(atom) > 1 and atom[0] == '<':
+            return 0
+        if len(atom) > 1 and atom[0] == '&':
+            return _units(html.unescape(atom))
+        return len(atom)
+    return _units(atom)
+
+
+def _hard_split(atom: str, room: int) -> Tuple[str, str]:
+    """Parte un texto para que la primera mitad quepa en room"""
+    if atom.isascii():
+        return atom[:room], atom[room:]
+    used = 0
+    for i, char in enumerate(atom):
+        used += _units(char)
+        if used > room:
+            return atom[:i], atom[i:]
+    return atom, ""
+
+
+def _split_at_space(atom: str, room: int) -> Optional[Tuple[str, str]]:
+    """Parte un texto por el último espacio que cabe en room (None si no hay)"""
+    fits, _ = _hard_split(atom, room)
+    position = fits.rfind(' ')
+    if position < 0:
+        return None
+    return atom[:position], atom[position + 1:]
+
+
+def split_html(text: str, limit: Optional[int] = None) -> List[str]:
+    """
+    Divide un mensaje HTML en trozos de como mucho limit caracteres visibles.
+
+    Args:
+        text: Mensaje con formato HTML de Telegram
+        limit: Máximo por trozo (por defecto config.TELEGRAM_MAX_MESSAGE_LENGTH)
+
+    Returns:
+        Lista de trozos; un solo elemento si el mensaje ya cabe
+    """
+    limit = limit or config.TELEGRAM_MAX_MESSAGE_LENGTH
+    if _units(text) <= limit or visible_length(text) <= limit:
+        return [text]
+
+    chunks = []
+    pending = deque(_ATOM.findall(text))
+    parts: List[str] = []
+    length = 0
+    stack: List[Tuple[str, str]] = []   # Etiquetas abiertas: (nombre, etiqueta de apertura)
+    newline = None                      # Último salto de línea: (posición, longitud, etiquetas abiertas)
+
+    def cut(position, open_tags, skip):
+        """Cierra el trozo en position y devuelve lo que queda a la cola"""
+        nonlocal parts, length, stack, newline
+        chunk = "".join(parts[:position]) + "".join(f"</{name}>" for name, _ in reversed(open_tags))
+        if chunk.strip() and visible_length(chunk):
+            chunks.append(chunk)
+        rest = [opening for _, opening in open_tags] + parts[position + skip:]
+        pending.extendleft(reversed(rest))
+        parts, length, stack = [], 0, []
+        newline = None
+
+    while pending:
+        atom = pending.popleft()
+        cost = _cost(atom)
+
+        if length + cost > limit:
+            is_text = atom[0] not in '<&' or len(atom) == 1
+            at_space = _split_at_space(atom, limit - length) if is_text else None
+
+            # Corte preferido: salto de línea en la segunda mitad, si no espacio
+            if newline and (newline[1] >= limit // 2 or not at_space):
+                pending.appendleft(atom)
+                cut(newline[0], newline[2], skip=1)
+                continue
+
+            # Si no hay espacio donde cortar se parte el texto a mitad de palabra
+            head, tail = at_space or (_hard_split(atom, limit - length) if is_text else ("", atom))
+            if head:
+                parts.append(head)
+            pending.appendleft(tail)
+            cut(len(parts), stack[:], skip=0)
+            continue
+
+        if cost == 0 and atom.startswith('<'):
+            match = _TAG_NAME.match(atom)
+            if match:
+                closing, name = match.group(1), match.group(2).lower()
+                if not closing:
+                    stack.append((name, atom))
+                else:
+                    for i in range(len(stack) - 1, -1, -1):
+                        if stack[i][0] == name:
+                            del stack[i:]
+                            break
+        elif atom == "\n":
+            newline = (len(parts), length, stack[:])
+
+        parts.append(atom)
+        length += cost
+
+    if parts:
+        cut(len(parts), [], skip=0)
+    return chunks
+
+
+def paginate_lines(lines: Iterable[str], page: int = 0,
+                   limit: Optional[int] = None) -> Tuple[List[str], bool]:
+    """
+    Las líneas de la página pedida, llenando cada página hasta limit caracteres.
+
+    Las líneas se recorren en orden y se dejan de leer en cuanto la página está
+    llena, así que sirve también con un generador.
+
+    Returns:
+        (líneas de la página, si hay más páginas detrás)
+    """
+    limit = limit or config.MESSAGE_PAGE_LENGTH
+    current_page, used, selected = 0, 0, []
+
+    for line in lines:
+        size = visible_length(line) + 1
+        if used and used + size > limit:
+            if current_page == page:
+                return selected, True
+            current_page, used = current_page + 1, 0
+        used += size
+        if current_page == page:
+            selected.append(line)
+
+    return selected, False
+
+
+async def edit_long_message(query, text: str, reply_markup=None, parse_mode=ParseMode.HTML):
+    """
+    Edita el mensaje de un botón con un texto que puede ser largo.
+    Si no cabe, el primer trozo reemplaza el mensaje y el resto se envía
+    después; el teclado va en el último trozo para que quede abajo.
+    """
+    chunks = split_html(text)
+    last = len(chunks) - 1
+    await query.edit_message_text(
+        chunks[0],
+        parse_mode=parse_mode,
+        reply_markup=reply_markup if last == 0 else None
+    )
+    for i, chunk in enumerate(chunks[1:], 1):
+        await query.message.reply_text(
+            chunk,
+            parse_mode=parse_mode,
+            reply_markup=reply_markup if i == last else None
+        )
+
+
+async def send_long_message(bot, chat_id: int, text: str, reply_markup=None, parse_mode=ParseMode.HTML):
+    """Envía un mensaje HTML dividiéndolo si hace falta (el teclado va en el último trozo)"""
+    chunks = split_html(text)
+    last = len(chunks) - 1
+    for i, chunk in enumerate(chunks):
+        await bot.send_message(
+            chat_id=chat_id,
+            text=chunk,
+            parse_mode=parse_mode,
+            reply_markup=reply_markup if i == last else None
+        )
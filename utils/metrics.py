@@ -0,0 +1,386 @@
+"""
+Métricas de latencia del bot
+Mide cuánto tardan los handlers, los métodos de la base de datos y las
+llamadas a la API de Telegram, y cuántos fallan o están en curso.
+
+EXPLICACIÓN: Cada medida se guarda en un histograma por cubos (como hace
+Prometheus): no se guardan los tiempos uno a uno, solo cuántos caen en cada
+intervalo. Así la memoria no crece con el tráfico y los percentiles (p50, p99)
+se estiman interpolando dentro del cubo.
+
+Los resultados se pueden ver:
+- Con el comando /stats (solo administradores)
+- En http://METRICS_HOST:METRICS_PORT/metrics (formato de texto de Prometheus)
+"""
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from telegram.ext import ConversationHandler
+from telegram.request import HTTPXRequest
+
+import config
+
+# Límites superiores de los cubos, en segundos. Empiezan muy abajo porque
+# una consulta a SQLite suele tardar menos de un milisegundo.
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels_key(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+# ========== TIPOS DE MÉTRICA ==========
+
+class _Histogram:
+    """Contadores por cubo de una serie (una combinación de etiquetas)"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # El último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estima el percentil q (0-1) interpolando dentro del cubo"""
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # Cae en +Inf: lo más que sabemos
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+
+        return self.buckets[-1]
+
+
+class MetricFamily:
+    """
+    Una métrica con nombre y todas sus series por etiquetas.
+    kind es 'counter', 'gauge' o 'histogram'.
+    """
+
+    def __init__(self, name: str, kind: str, help_text: str,
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series: Dict[Labels, object] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Dict[str, str], amount: float = 1):
+        key = _labels_key(labels)
+        with self._lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+    def dec(self, labels: Dict[str, str], amount: float = 1):
+        self.inc(labels, -amount)
+
+    def observe(self, labels: Dict[str, str], value: float):
+        key = _labels_key(labels)
+        with self._lock:
+            histogram = self.series.get(key)
+            if histogram is None:
+                histogram = self.series[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def items(self) -> List[Tuple[Dict[str, str], object]]:
+        with self._lock:
+            return [(dict(key), value) for key, value in self.series.items()]
+
+
+class MetricsRegistry:
+    """Conjunto de métricas del proceso"""
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+
+    def _family(self, name: str, kind: str, help_text: str) -> MetricFamily:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = MetricFamily(name, kind, help_text)
+        return family
+
+    def counter(self, name: str, help_text: str) -> MetricFamily:
+        return self._family(name, 'counter', help_text)
+
+    def gauge(self, name: str, help_text: str) -> MetricFamily:
+        return self._family(name, 'gauge', help_text)
+
+    def histogram(self, name: str, help_text: str) -> MetricFamily:
+        return self._family(name, 'histogram', help_text)
+
+    def clear(self):
+        for family in self._families.values():
+            with family._lock:
+                family.series.clear()
+
+    def render_prometheus(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus"""
+        lines = []
+
+        for family in self._families.values():
+            lines.append(f"# HELP {family.name} {family.help_text}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+
+            for labels, value in sorted(family.items(), key=lambda item: _labels_key(item[0])):
+                if family.kind != 'histogram':
+                    lines.append(f"{family.name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+
+                cumulative = 0
+                for bound, bucket_count in zip(family.buckets + (float('inf'),), value.counts):
+                    cumulative += bucket_count
+                    bucket_labels = dict(labels, le='+Inf' if bound == float('inf') else repr(bound))
+                    lines.append(f"{family.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{family.name}_sum{_format_labels(labels)} {_format_value(value.sum)}")
+                lines.append(f"{family.name}_count{_format_labels(labels)} {value.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in sorted(labels.items()):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ========== MÉTRICAS DEL BOT ==========
+
+registry = MetricsRegistry()
+
+# Cada capa tiene su histograma de latencia, su contador de errores y su
+# gauge de llamadas en curso
+LAYERS = {
+    'handler': ('handler', "Handlers de Telegram (comandos, botones y mensajes)"),
+    'db': ('method', "Métodos de los modelos de la base de datos"),
+    'telegram_api': ('method', "Llamadas a la API de Telegram"),
+}
+
+for _layer, (_label, _description) in LAYERS.items():
+    registry.histogram(f"cortana_{_layer}_latency_seconds", f"Latencia: {_description}")
+    registry.counter(f"cortana_{_layer}_errors_total", f"Errores: {_description}")
+    registry.gauge(f"cortana_{_layer}_in_flight", f"En curso: {_description}")
+
+
+@contextmanager
+def track(layer: str, **labels):
+    """
+    Mide un bloque de código: latencia, errores y llamadas en curso.
+
+    Uso:
+        with track('db', method='Task.get_all'):
+            ...
+    """
+    if not config.METRICS_ENABLED:
+        yield
+        return
+
+    in_flight = registry.gauge(f"cortana_{layer}_in_flight", "")
+    in_flight.inc(labels)
+    start = time.perf_counter()
+
+    try:
+        yield
+    except Exception:
+        registry.counter(f"cortana_{layer}_errors_total", "").inc(labels)
+        raise
+    finally:
+        registry.histogram(f"cortana_{layer}_latency_seconds", "").observe(labels, time.perf_counter() - start)
+        in_flight.dec(labels)
+
+
+def summarize(layer: str) -> List[Dict]:
+    """
+    Resumen de una capa para /stats, de más a menos llamadas.
+
+    Returns:
+        Lista de diccionarios con labels, count, errors, avg, p50 y p99 (segundos)
+    """
+    errors = {_labels_key(labels): value
+              for labels, value in registry.counter(f"cortana_{layer}_errors_total", "").items()}
+
+    rows = []
+    for labels, histogram in registry.histogram(f"cortana_{layer}_latency_seconds", "").items():
+        rows.append({
+            'labels': labels,
+            'count': histogram.count,
+            'errors': int(errors.get(_labels_key(labels), 0)),
+            'avg': histogram.sum / histogram.count if histogram.count else 0.0,
+            'p50': histogram.quantile(0.5),
+            'p99': histogram.quantile(0.99),
+        })
+
+    rows.sort(key=lambda row: row['count'], reverse=True)
+    return rows
+
+
+# ========== INSTRUMENTACIÓN ==========
+
+def _update_type(update) -> str:
+    """Tipo de update que recibió el handler, para la etiqueta 'type'"""
+    if getattr(update, 'callback_query', None):
+        return 'callback'
+    message = getattr(update, 'effective_message', None)
+    if message and message.text and message.text.startswith('/'):
+        return 'command'
+    if message:
+        return 'message'
+    return 'other'
+
+
+def instrument_callback(callback, name: Optional[str] = None):
+    """Envuelve el callback de un handler para medirlo"""
+    if getattr(callback, '__metrics_wrapped__', False):
+        return callback
+
+    name = name or getattr(callback, '__name__', repr(callback))
+
+    @functools.wraps(callback)
+    async def wrapper(update, context, *args, **kwargs):
+        with track('handler', handler=name, type=_update_type(update)):
+            return await callback(update, context, *args, **kwargs)
+
+    wrapper.__metrics_wrapped__ = True
+    return wrapper
+
+
+def _instrument_handler(handler):
+    if isinstance(handler, ConversationHandler):
+        inner = list(handler.entry_points) + list(handler.fallbacks)
+        for state_handlers in handler.states.values():
+            inner.extend(state_handlers)
+        for inner_handler in inner:
+            _instrument_handler(inner_handler)
+        return
+
+    if inspect.iscoroutinefunction(handler.callback):
+        handler.callback = instrument_callback(handler.callback)
+
+
+def instrument_application(app):
+    """Mide todos los handlers registrados (llamar después de setup_handlers)"""
+    for handlers in app.handlers.values():
+        for handler in handlers:
+            _instrument_handler(handler)
+
+
+def instrument_class(cls, layer: str = 'db'):
+    """
+    Mide todos los métodos públicos de una clase de modelo.
+    La etiqueta es 'Clase.metodo' (por ejemplo Task.get_all).
+    """
+    for attr_name, attr in list(vars(cls).items()):
+        if attr_name.startswith('_') or not inspect.isfunction(attr):
+            continue
+        if getattr(attr, '__metrics_wrapped__', False):
+            continue
+        setattr(cls, attr_name, _timed_method(attr, layer, f"{cls.__name__}.{attr_name}"))
+
+
+def _timed_method(method, layer: str, label: str):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with track(layer, method=label):
+            return method(*args, **kwargs)
+
+    wrapper.__metrics_wrapped__ = True
+    return wrapper
+
+
+def instrument_models():
+    """Mide los métodos públicos de todos los modelos de database.models"""
+    from database.models import Project, Task, Note, UserSettings, AccessControl
+
+    for cls in (Project, Task, Note, UserSettings, AccessControl):
+        instrument_class(cls, 'db')
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """
+    Cliente HTTP del bot que mide cada llamada a la API de Telegram.
+    La etiqueta es el método de la API (sendMessage, editMessageText...).
+    """
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+
+        with track('telegram_api', method=api_method):
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+
+        if code >= 400 and config.METRICS_ENABLED:
+            registry.counter("cortana_telegram_api_errors_total", "").inc({'method': api_method})
+
+        return code, payload
+
+
+# ========== ENDPOINT HTTP ==========
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        body = registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Prometheus consulta cada pocos segundos: no llenar la consola
+
+
+def start_http_server(host: str = config.METRICS_HOST,
+                      port: Optional[int] = config.METRICS_PORT) -> Optional[ThreadingHTTPServer]:
+    """Arranca el endpoint /metrics en un hilo aparte"""
+    if not config.METRICS_ENABLED or port is None:
+        return None
+
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"⚠️ No se pudo abrir el endpoint de métricas en {host}:{port}: {e}")
+        return None
+
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    print(f"📈 Métricas en http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,304 @@
+"""
+Planificador de recordatorios por usuario
+Cada usuario elige a qué hora y en qué zona horaria recibe el briefing matutino
+y el preview nocturno (tabla user_settings).
+
+EXPLICACIÓN: En lugar de crear un trabajo cron por usuario y por tipo de
+recordatorio, guardamos TODAS las próximas ejecuciones en un único montículo
+(heap) ordenado por hora. Un solo bucle asíncrono duerme hasta la primera
+ejecución, la lanza y calcula la siguiente. Añadir usuarios cuesta O(log n)
+y el bucle nunca recorre la lista completa.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import config
+from database.models import DatabaseManager, UserSettings
+from utils.reminders import ReminderSystem
+
+
+def next_fire_time(hhmm: str, timezone: str, after: datetime) -> datetime:
+    """
+    Calcula la próxima vez que el reloj local marca HH:MM después de `after`.
+
+    Args:
+        hhmm: Hora local en formato HH:MM
+        timezone: Zona horaria del usuario (ej: 'Europe/Madrid')
+        after: Momento de referencia (con zona horaria)
+
+    Returns:
+        Datetime con zona horaria del usuario
+    """
+    tz = _get_zone(timezone)
+    local_after = after.astimezone(tz)
+    hour, minute = map(int, hhmm.split(':'))
+
+    candidate = local_after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= local_after:
+        candidate = _add_local_days(candidate, 1, tz)
+
+    return candidate
+
+
+def previous_fire_time(hhmm: str, timezone: str, before: datetime) -> datetime:
+    """Calcula la última vez que el reloj local marcó HH:MM antes de `before`"""
+    tz = _get_zone(timezone)
+    local_before = before.astimezone(tz)
+    hour, minute = map(int, hhmm.split(':'))
+
+    candidate = local_before.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate > local_before:
+        candidate = _add_local_days(candidate, -1, tz)
+
+    return candidate
+
+
+def _add_local_days(moment: datetime, days: int, tz: ZoneInfo) -> datetime:
+    """Suma días manteniendo la hora local (correcto en los cambios de horario)"""
+    naive = moment.replace(tzinfo=None) + timedelta(days=days)
+    return naive.replace(tzinfo=tz)
+
+
+def _get_zone(timezone: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(config.DEFAULT_TIMEZONE)
+
+
+class ReminderScheduler:
+    """
+    Planificador basado en un min-heap de (hora_utc, usuario, tipo).
+
+    Cuando un usuario cambia su configuración no se busca su entrada en el heap:
+    se incrementa su "generación" y las entradas viejas se descartan al salir.
+    """
+
+    # Tipo de recordatorio -> (campo de hora, campo de activación, método que envía)
+    KINDS = {
+        'daily_summary': ('daily_summary_time', 'daily_summary_enabled', 'send_daily_summary'),
+        'evening_reminder': ('evening_reminder_time', 'evening_reminder_enabled', 'send_evening_reminder')
+    }
+
+    def __init__(self, db_manager: DatabaseManager, bot):
+        self.db = db_manager
+        self.bot = bot
+        self.settings_manager = UserSettings(db_manager)
+
+        # Entradas: (timestamp_utc, desempate, generación, user_id, kind)
+        self._heap: List[Tuple[float, int, int, int, str]] = []
+        self._generations: Dict[Tuple[int, str], int] = {}
+        self._active_keys = set()  # (user_id, kind) con una entrada válida en el heap
+        self._counter = itertools.count()
+        self._stale_entries = 0
+
+        # Copia en memoria de la configuración, para no consultar la BD en el bucle
+        self._settings: Dict[int, Dict] = {}
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Envíos en curso: el event loop solo guarda referencias débiles a las
+        # tareas y sin esta no se podrían perder a medio enviar
+        self._sending: Set[asyncio.Task] = set()
+        self._send_slots = asyncio.Semaphore(config.REMINDER_MAX_CONCURRENT_SENDS)
+
+    # ========== PROGRAMACIÓN ==========
+
+    def load_all(self):
+        """Carga la configuración de todos los usuarios y programa sus recordatorios"""
+        for settings in self.settings_manager.get_all():
+            self._schedule_user(settings)
+
+        print(f"✅ Recordatorios por usuario programados: {len(self)} pendientes")
+
+    def reschedule_user(self, user_id: int):
+        """
+        Vuelve a leer la configuración de un usuario y reprograma sus recordatorios.
+        Se llama justo después de que el usuario cambie algo en Configuración.
+        """
+        self._schedule_user(self.settings_manager.get(user_id))
+        self._wake()
+
+    def reload(self):
+        """Vuelve a programar a todos los usuarios desde la BD (tras restaurar una copia)"""
+        for user_id in list(self._settings):
+            self.remove_user(user_id)
+        self.load_all()
+        self._wake()
+
+    def remove_user(self, user_id: int):
+        """Deja de programar los recordatorios de un usuario (al retirarle el acceso)"""
+        for kind in self.KINDS:
+            key = (user_id, kind)
+            if key in self._active_keys:
+                self._stale_entries += 1
+                self._active_keys.discard(key)
+            self._generations[key] = self._generations.get(key, 0) + 1
+        
+        self._settings.pop(user_id, None)
+        self._compact_if_needed()
+    
+    def _schedule_user(self, settings: Dict, now: Optional[datetime] = None):
+        now = now or datetime.now(ZoneInfo("UTC"))
+        self._settings[settings['user_id']] = settings
+
+        for kind, (time_field, enabled_field, _) in self.KINDS.items():
+            key = (settings['user_id'], kind)
+
+            if key in self._active_keys:
+                self._stale_entries += 1  # La entrada anterior queda obsoleta
+                self._active_keys.discard(key)
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+
+            if not settings[enabled_field]:
+                continue
+
+            fire_at = next_fire_time(settings[time_field], settings['timezone'], now)
+            self._push(fire_at.timestamp(), generation, settings['user_id'], kind)
+            self._active_keys.add(key)
+
+        self._compact_if_needed()
+
+    def _push(self, timestamp: float, generation: int, user_id: int, kind: str):
+        heapq.heappush(self._heap, (timestamp, next(self._counter), generation, user_id, kind))
+
+    def _is_current(self, generation: int, user_id: int, kind: str) -> bool:
+        return self._generations.get((user_id, kind)) == generation
+
+    def _compact_if_needed(self):
+        """Reconstruye el heap si más de la mitad son entradas obsoletas"""
+        if self._stale_entries > 64 and self._stale_entries * 2 > len(self._heap):
+            self._heap = [entry for entry in self._heap if self._is_current(*entry[2:])]
+            heapq.heapify(self._heap)
+            self._stale_entries = 0
+
+    def pop_due(self, now_ts: float) -> List[Tuple[int, str]]:
+        """
+        Saca del heap todos los recordatorios vencidos y programa su siguiente ejecución.
+
+        Returns:
+            Lista de (user_id, kind) que hay que enviar ahora
+        """
+        due = []
+
+        while self._heap and self._heap[0][0] <= now_ts:
+            _, _, generation, user_id, kind = heapq.heappop(self._heap)
+
+            if not self._is_current(generation, user_id, kind):
+                self._stale_entries = max(0, self._stale_entries - 1)
+                continue
+
+            due.append((user_id, kind))
+
+            # Siguiente ejecución: misma hora local, día siguiente
+            settings = self._settings[user_id]
+            time_field = self.KINDS[kind][0]
+            after = datetime.fromtimestamp(now_ts, ZoneInfo("UTC"))
+            fire_at = next_fire_time(settings[time_field], settings['timezone'], after)
+            self._push(fire_at.timestamp(), generation, user_id, kind)
+
+        return due
+
+    def seconds_until_next(self, now_ts: float) -> Optional[float]:
+        """Segundos hasta la próxima entrada válida, o None si no hay ninguna"""
+        while self._heap and not self._is_current(*self._heap[0][2:]):
+            heapq.heappop(self._heap)
+            self._stale_entries = max(0, self._stale_entries - 1)
+
+        if not self._heap:
+            return None
+
+        return max(0.0, self._heap[0][0] - now_ts)
+
+    def __len__(self):
+        return len(self._active_keys)
+
+    # ========== RECUPERACIÓN TRAS UN APAGADO ==========
+
+    def collect_missed(self, now: datetime) -> Dict[int, List[str]]:
+        """
+        Detecta qué recordatorios debieron enviarse mientras el bot estaba apagado.
+
+        La primera vez que se ve a un usuario solo se guarda la referencia,
+        para no enviarle un digest de cosas que nunca se programaron.
+
+        Returns:
+            Diccionario {user_id: [tipos de recordatorio perdidos]}
+        """
+        missed = {}
+
+        for settings in self.settings_manager.get_all():
+            user_id = settings['user_id']
+
+            for kind, (time_field, enabled_field, _) in self.KINDS.items():
+                if not settings[enabled_field]:
+                    continue
+
+                last_sent = self.settings_manager.get_last_sent(user_id, kind)
+                if last_sent is None:
+                    self.settings_manager.mark_sent(user_id, kind, now.timestamp())
+                    continue
+
+                previous = previous_fire_time(settings[time_field], settings['timezone'], now)
+                if last_sent < previous.timestamp():
+                    missed.setdefault(user_id, []).append(kind)
+                    self.settings_manager.mark_sent(user_id, kind, now.timestamp())
+
+        return missed
+
+    # ========== BUCLE PRINCIPAL ==========
+
+    def start(self):
+        """Arranca el bucle del planificador (requiere un event loop en marcha)"""
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _wake(self):
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            delay = self.seconds_until_next(time.time())
+
+            if delay is None or delay > 0:
+                # Dormir como mucho unos minutos: así un cambio de hora del sistema
+                # no deja el bucle esperando para siempre
+                timeout = config.REMINDER_SCHEDULER_MAX_SLEEP if delay is None else min(delay, config.REMINDER_SCHEDULER_MAX_SLEEP)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            for user_id, kind in self.pop_due(time.time()):
+                sending = asyncio.create_task(self._dispatch(user_id, kind))
+                self._sending.add(sending)
+                sending.add_done_callback(self._sending.discard)
+
+    async def _dispatch(self, user_id: int, kind: str):
+        """Envía un recordatorio a un usuario, limitando los envíos simultáneos"""
+        async with self._send_slots:
+            try:
+                reminder = ReminderSystem(self.db, self.bot, user_id)
+                # Si falla no se marca como enviado: el digest de recuperación lo reenvía
+                if await getattr(reminder, self.KINDS[kind][2])():
+                    self.settings_manager.mark_sent(user_id, kind, time.time())
+            except Exception as e:
+                print(f"❌ Error al enviar {kind} al usuario {user_id}: {e}")
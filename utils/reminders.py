@@ -2,19 +2,24 @@
 Sistema de recordatorios automáticos con personalidad Cortana
 Este módulo maneja el envío programado de resúmenes diarios y recordatorios
 """
+import asyncio
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from telegram import Bot
 from telegram.constants import ParseMode
 import config
-from database.models import DatabaseManager, Task, Project
-from utils.formatters import format_daily_summary
+from database.models import DatabaseManager, Task, Project, AccessControl
+from utils.formatters import format_daily_summary, format_date
+from utils.dates import DateClassifier
+from utils.long_messages import send_long_message
 from utils.keyboards import get_main_keyboard
+from utils.templates import render_template
 from cortana_personality import (
     CORTANA_DAILY_SUMMARY_INTRO,
     CORTANA_EVENING_REMINDER,
     CORTANA_WEEKLY_SUMMARY,
-    CORTANA_MONTHLY_SUMMARY
+    CORTANA_MONTHLY_SUMMARY,
+    CORTANA_CATCH_UP_DIGEST
 )
 
 class ReminderSystem:
@@ -26,258 +31,326 @@ class ReminderSystem:
         self.db = db_manager
         self.bot = bot
         self.user_id = user_id
-        self.task_manager = Task(db_manager)
-        self.project_manager = Project(db_manager)
+        self.user_db = db_manager.for_user(user_id)  # Donde están los datos del usuario
+        self.task_manager = Task(db_manager, user_id)
+        self.project_manager = Project(db_manager, user_id)
     
-    async def send_daily_summary(self):
-        """Envía el briefing matutino al usuario"""
+    # ========== ENVÍO DE RECORDATORIOS ==========
+    
+    async def send_daily_summary(self) -> bool:
+        """
+        Envía el briefing matutino al usuario
+        
+        Returns:
+            False si no se pudo enviar (el planificador no lo da por enviado)
+        """
         try:
-            today = date.today()
-            
-            tasks_today = self.task_manager.get_all({'today': True})
-            tasks_overdue = self.task_manager.get_all({'overdue': True})
-            
-            active_projects = self.project_manager.get_all(status='active')
-            
-            next_week = today + timedelta(days=7)
-            upcoming_deadlines = []
-            for project in active_projects:
-                if project.get('deadline'):
-                    try:
-                        deadline = datetime.strptime(project['deadline'], "%Y-%m-%d").date()
-                        if today <= deadline <= next_week:
-                            upcoming_deadlines.append(project)
-                    except:
-                        continue
-            
-            upcoming_deadlines.sort(key=lambda x: x['deadline'])
-            
-            lines = [
-                CORTANA_DAILY_SUMMARY_INTRO,
-                ""
-            ]
-            
-            lines.append(f"📊 <b>Estado Táctico General</b>")
-            lines.append(f"📁 Misiones activas: {len(active_projects)}")
-            lines.append(f"📅 Objetivos de hoy: {len(tasks_today)}")
-            lines.append(f"⚠️ Objetivos atrasados: {len(tasks_overdue)}")
-            lines.append("")
-            
-            if tasks_today:
-                lines.append(f"<b>📅 Objetivos para hoy:</b>")
-                for i, task in enumerate(tasks_today[:5], 1):
-                    priority = "🔴" if task['priority'] == 'high' else "🟡" if task['priority'] == 'medium' else "🟢"
-                    lines.append(f"{i}. {priority} {task['title']}")
-                
-                if len(tasks_today) > 5:
-                    lines.append(f"... y {len(tasks_today) - 5} más")
-                lines.append("")
-            
-            if tasks_overdue:
-                lines.append(f"<b>⚠️ Objetivos Atrasados:</b>")
-                for i, task in enumerate(tasks_overdue[:3], 1):
-                    priority = "🔴" if task['priority'] == 'high' else "🟡" if task['priority'] == 'medium' else "🟢"
-                    days_overdue = (today - datetime.strptime(task['deadline'], "%Y-%m-%d").date()).days
-                    lines.append(f"{i}. {priority} {task['title']} ({days_overdue} días de retraso)")
-                
-                if len(tasks_overdue) > 3:
-                    lines.append(f"... y {len(tasks_overdue) - 3} más")
-                lines.append("")
-            
-            if upcoming_deadlines:
-                lines.append(f"<b>⏰ Próximos Deadlines (7 días):</b>")
-                for i, project in enumerate(upcoming_deadlines[:3], 1):
-                    from utils.formatters import format_date
-                    lines.append(f"{i}. {project['name']} - {format_date(project['deadline'])}")
-                
-                if len(upcoming_deadlines) > 3:
-                    lines.append(f"... y {len(upcoming_deadlines) - 3} más")
-                lines.append("")
-            
-            if not tasks_today and not tasks_overdue:
-                lines.append(f"✨ Día despejado. Perfecto para planificar o avanzar proyectos.")
-            elif tasks_overdue:
-                lines.append(f"💪 Tiempo de ponerse al día. Los datos no mienten.")
-            else:
-                lines.append(f"🚀 Todo listo para un día productivo. Vamos a ello, Spartan.")
-            
-            message = "\n".join(lines)
-            
-            await self.bot.send_message(
-                chat_id=self.user_id,
-                text=message,
-                parse_mode=ParseMode.HTML
-            )
-            
+            await self._send(self.build_daily_summary())
             print(f"✅ Briefing matutino enviado")
-            
+            return True
         except Exception as e:
             print(f"❌ Error al enviar briefing: {e}")
+            return False
     
-    async def send_evening_reminder(self):
-        """Envía el preview nocturno"""
+    async def send_evening_reminder(self) -> bool:
+        """
+        Envía el preview nocturno
+        
+        Returns:
+            False si no se pudo enviar; sin objetivos para mañana no hay nada
+            que enviar y cuenta como hecho
+        """
         try:
-            tomorrow = date.today() + timedelta(days=1)
-            tomorrow_str = tomorrow.strftime("%Y-%m-%d")
+            message = self.build_evening_reminder()
             
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT * FROM tasks 
-                WHERE deadline = ? 
-                AND status != 'completed'
-                AND parent_task_id IS NULL
-                ORDER BY 
-                    CASE priority
-                        WHEN 'high' THEN 1
-                        WHEN 'medium' THEN 2
-                        WHEN 'low' THEN 3
-                    END
-            """, (tomorrow_str,))
-            
-            tasks_tomorrow = [dict(row) for row in cursor.fetchall()]
-            conn.close()
-            
-            if tasks_tomorrow:
-                lines = [
-                    CORTANA_EVENING_REMINDER,
-                    ""
-                ]
-                
-                lines.append(f"Tienes <b>{len(tasks_tomorrow)}</b> objetivo(s) con deadline mañana:")
-                lines.append("")
-                
-                for i, task in enumerate(tasks_tomorrow[:5], 1):
-                    priority = "🔴" if task['priority'] == 'high' else "🟡" if task['priority'] == 'medium' else "🟢"
-                    status = "🔄" if task['status'] == 'in_progress' else "⏳"
-                    lines.append(f"{i}. {status}{priority} {task['title']}")
-                
-                if len(tasks_tomorrow) > 5:
-                    lines.append(f"... y {len(tasks_tomorrow) - 5} más")
-                
-                lines.append("")
-                lines.append("Sugerencia: Revisa si necesitas ajustar prioridades.")
-                
-                message = "\n".join(lines)
-                
-                await self.bot.send_message(
-                    chat_id=self.user_id,
-                    text=message,
-                    parse_mode=ParseMode.HTML
-                )
-                
-                print(f"✅ Preview nocturno enviado: {len(tasks_tomorrow)} objetivos para mañana")
+            if message:
+                await self._send(message)
+                print(f"✅ Preview nocturno enviado")
             else:
                 print(f"ℹ️ No hay objetivos para mañana, preview no enviado")
+            return True
                 
         except Exception as e:
             print(f"❌ Error al enviar preview nocturno: {e}")
+            return False
     
     async def send_weekly_summary(self):
         """Envía el análisis semanal con estadísticas"""
         try:
-            stats = self._calculate_weekly_stats()
-            
-            lines = [
-                CORTANA_WEEKLY_SUMMARY,
-                ""
-            ]
-            
-            lines.append(f"📊 <b>Resumen de la Semana</b>")
-            lines.append(f"")
-            lines.append(f"✅ Objetivos completados: {stats['completed']}")
-            lines.append(f"🔄 En progreso: {stats['in_progress']}")
-            lines.append(f"⏳ Pendientes: {stats['pending']}")
-            lines.append(f"")
-            
-            if stats['completed'] > 0:
-                lines.append(f"📈 Tasa de finalización: {stats['completion_rate']}%")
-                lines.append("")
-            
-            if stats['completed'] >= 10:
-                lines.append("💪 Excelente rendimiento esta semana. Sigue así.")
-            elif stats['completed'] >= 5:
-                lines.append("👍 Buen progreso. Mantén el ritmo.")
-            else:
-                lines.append("📋 Considera revisar tus prioridades para la próxima semana.")
-            
-            message = "\n".join(lines)
-            
-            await self.bot.send_message(
-                chat_id=self.user_id,
-                text=message,
-                parse_mode=ParseMode.HTML
-            )
-            
+            await self._send(self.build_weekly_summary())
             print(f"✅ Análisis semanal enviado")
-            
         except Exception as e:
             print(f"❌ Error al enviar análisis semanal: {e}")
     
     async def send_monthly_summary(self):
         """Envía el informe mensual con estadísticas"""
         try:
-            stats = self._calculate_monthly_stats()
-            
-            lines = [
-                CORTANA_MONTHLY_SUMMARY,
-                ""
-            ]
-            
-            last_month = (date.today().replace(day=1) - timedelta(days=1)).strftime("%B %Y")
-            
-            lines.append(f"📊 <b>Informe de {last_month}</b>")
-            lines.append("")
-            lines.append(f"✅ Objetivos completados: {stats['completed']}")
-            lines.append(f"📁 Misiones finalizadas: {stats['projects_completed']}")
-            lines.append(f"📈 Productividad: {stats['productivity_score']}/10")
-            lines.append("")
+            await self._send(self.build_monthly_summary())
+            print(f"✅ Informe mensual enviado")
+        except Exception as e:
+            print(f"❌ Error al enviar informe mensual: {e}")
+    
+    async def send_catch_up_digest(self, missed_job_ids: List[str]):
+        """
+        Envía UN solo mensaje con todo lo que se perdió mientras el bot estaba apagado.
+        
+        Si se perdieron varios briefings del mismo tipo solo se incluye uno,
+        porque el contenido se calcula con los datos actuales.
+        
+        Args:
+            missed_job_ids: IDs de los trabajos que no llegaron a ejecutarse
+        """
+        try:
+            sections = []
             
-            if stats['productivity_score'] >= 8:
-                lines.append("🌟 Mes excepcional. Los números lo confirman.")
-            elif stats['productivity_score'] >= 6:
-                lines.append("👍 Mes sólido. Buen trabajo.")
-            else:
-                lines.append("📊 Hay margen de mejora. Analiza qué te está frenando.")
+            for job_id in dict.fromkeys(missed_job_ids):  # Sin duplicados, en orden
+                builder = self.BUILDERS.get(job_id)
+                if not builder:
+                    continue
+                
+                section = getattr(self, builder)()
+                if section:
+                    sections.append(section)
             
-            message = "\n".join(lines)
+            if not sections:
+                print(f"ℹ️ Recordatorios perdidos sin contenido, digest no enviado")
+                return
             
-            await self.bot.send_message(
-                chat_id=self.user_id,
-                text=message,
-                parse_mode=ParseMode.HTML
-            )
+            lines = [render_template(CORTANA_CATCH_UP_DIGEST, count=len(sections)), ""]
+            lines.append("\n\n━━━━━━━━━━━━━━━\n\n".join(sections))
             
-            print(f"✅ Informe mensual enviado")
+            await self._send("\n".join(lines))
+            print(f"✅ Digest de recuperación enviado: {len(sections)} recordatorio(s)")
             
         except Exception as e:
-            print(f"❌ Error al enviar informe mensual: {e}")
+            print(f"❌ Error al enviar digest de recuperación: {e}")
+    
+    async def _send(self, message: str):
+        """Envía un mensaje HTML al usuario (en varios si no cabe en uno, como el digest)"""
+        await send_long_message(self.bot, self.user_id, message)
+    
+    # ========== CONSTRUCCIÓN DE MENSAJES ==========
+    
+    # Relación entre el ID del trabajo programado y el método que construye su mensaje
+    BUILDERS = {
+        'daily_summary': 'build_daily_summary',
+        'evening_reminder': 'build_evening_reminder',
+        'weekly_summary': 'build_weekly_summary',
+        'monthly_summary': 'build_monthly_summary'
+    }
+    
+    def build_daily_summary(self) -> str:
+        """Construye el briefing matutino"""
+        dates = DateClassifier()
+        
+        tasks_today = self.task_manager.get_all({'today': True})
+        tasks_overdue = self.task_manager.get_all({'overdue': True})
+        
+        active_projects = self.project_manager.get_all(status='active')
+        
+        upcoming_deadlines = [p for p in active_projects if dates.is_upcoming(p.get('deadline'))]
+        
+        upcoming_deadlines.sort(key=lambda x: x['deadline'])
+        
+        lines = [
+            CORTANA_DAILY_SUMMARY_INTRO,
+            ""
+        ]
+        
+        lines.append(f"📊 <b>Estado Táctico General</b>")
+        lines.append(f"📁 Misiones activas: {len(active_projects)}")
+        lines.append(f"📅 Objetivos de hoy: {len(tasks_today)}")
+        lines.append(f"⚠️ Objetivos atrasados: {len(tasks_overdue)}")
+        lines.append("")
+        
+        if tasks_today:
+            lines.append(f"<b>📅 Objetivos para hoy:</b>")
+            for i, task in enumerate(tasks_today[:5], 1):
+                priority = "🔴" if task['priority'] == 'high' else "🟡" if task['priority'] == 'medium' else "🟢"
+                lines.append(f"{i}. {priority} {task['title']}")
+            
+            if len(tasks_today) > 5:
+                lines.append(f"... y {len(tasks_today) - 5} más")
+            lines.append("")
+        
+        if tasks_overdue:
+            lines.append(f"<b>⚠️ Objetivos Atrasados:</b>")
+            for i, task in enumerate(tasks_overdue[:3], 1):
+                priority = "🔴" if task['priority'] == 'high' else "🟡" if task['priority'] == 'medium' else "🟢"
+                days_overdue = -dates.days_until(task['deadline'])
+                lines.append(f"{i}. {priority} {task['title']} ({days_overdue} días de retraso)")
+            
+            if len(tasks_overdue) > 3:
+                lines.append(f"... y {len(tasks_overdue) - 3} más")
+            lines.append("")
+        
+        if upcoming_deadlines:
+            lines.append(f"<b>⏰ Próximos Deadlines (7 días):</b>")
+            for i, project in enumerate(upcoming_deadlines[:3], 1):
+                lines.append(f"{i}. {project['name']} - {format_date(project['deadline'], dates)}")
+            
+            if len(upcoming_deadlines) > 3:
+                lines.append(f"... y {len(upcoming_deadlines) - 3} más")
+            lines.append("")
+        
+        if not tasks_today and not tasks_overdue:
+            lines.append(f"✨ Día despejado. Perfecto para planificar o avanzar proyectos.")
+        elif tasks_overdue:
+            lines.append(f"💪 Tiempo de ponerse al día. Los datos no mienten.")
+        else:
+            lines.append(f"🚀 Todo listo para un día productivo. Vamos a ello, Spartan.")
+        
+        return "\n".join(lines)
+    
+    def build_evening_reminder(self) -> Optional[str]:
+        """Construye el preview nocturno, o None si no hay nada para mañana"""
+        tomorrow = date.today() + timedelta(days=1)
+        tomorrow_str = tomorrow.strftime("%Y-%m-%d")
+        
+        conn = self.user_db.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT * FROM tasks 
+            WHERE owner_id = ?
+            AND deadline = ? 
+            AND status != 'completed'
+            AND parent_task_id IS NULL
+            ORDER BY 
+                CASE priority
+                    WHEN 'high' THEN 1
+                    WHEN 'medium' THEN 2
+                    WHEN 'low' THEN 3
+                END
+        """, (self.user_id, tomorrow_str))
+        
+        tasks_tomorrow = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        
+        if not tasks_tomorrow:
+            return None
+        
+        lines = [
+            CORTANA_EVENING_REMINDER,
+            ""
+        ]
+        
+        lines.append(f"Tienes <b>{len(tasks_tomorrow)}</b> objetivo(s) con deadline mañana:")
+        lines.append("")
+        
+        for i, task in enumerate(tasks_tomorrow[:5], 1):
+            priority = "🔴" if task['priority'] == 'high' else "🟡" if task['priority'] == 'medium' else "🟢"
+            status = "🔄" if task['status'] == 'in_progress' else "⏳"
+            lines.append(f"{i}. {status}{priority} {task['title']}")
+        
+        if len(tasks_tomorrow) > 5:
+            lines.append(f"... y {len(tasks_tomorrow) - 5} más")
+        
+        lines.append("")
+        lines.append("Sugerencia: Revisa si necesitas ajustar prioridades.")
+        
+        return "\n".join(lines)
+    
+    def build_weekly_summary(self) -> str:
+        """Construye el análisis semanal"""
+        stats = self._calculate_weekly_stats()
+        
+        lines = [
+            CORTANA_WEEKLY_SUMMARY,
+            ""
+        ]
+        
+        lines.append(f"📊 <b>Resumen de la Semana</b>")
+        lines.append(f"")
+        lines.append(f"✅ Objetivos completados: {stats['completed']}")
+        lines.append(f"🔄 En progreso: {stats['in_progress']}")
+        lines.append(f"⏳ Pendientes: {stats['pending']}")
+        lines.append(f"")
+        
+        if stats['completed'] > 0:
+            lines.append(f"📈 Tasa de finalización: {stats['completion_rate']}%")
+            lines.append("")
+        
+        if stats['completed'] >= 10:
+            lines.append("💪 Excelente rendimiento esta semana. Sigue así.")
+        elif stats['completed'] >= 5:
+            lines.append("👍 Buen progreso. Mantén el ritmo.")
+        else:
+            lines.append("📋 Considera revisar tus prioridades para la próxima semana.")
+        
+        return "\n".join(lines)
+    
+    def build_monthly_summary(self) -> str:
+        """Construye el informe mensual"""
+        stats = self._calculate_monthly_stats()
+        
+        lines = [
+            CORTANA_MONTHLY_SUMMARY,
+            ""
+        ]
+        
+        last_month = (date.today().replace(day=1) - timedelta(days=1)).strftime("%B %Y")
+        
+        lines.append(f"📊 <b>Informe de {last_month}</b>")
+        lines.append("")
+        lines.append(f"✅ Objetivos completados: {stats['completed']}")
+        lines.append(f"📁 Misiones finalizadas: {stats['projects_completed']}")
+        lines.append(f"📈 Productividad: {stats['productivity_score']}/10")
+        lines.append("")
+        
+        if stats['productivity_score'] >= 8:
+            lines.append("🌟 Mes excepcional. Los números lo confirman.")
+        elif stats['productivity_score'] >= 6:
+            lines.append("👍 Mes sólido. Buen trabajo.")
+        else:
+            lines.append("📊 Hay margen de mejora. Analiza qué te está frenando.")
+        
+        return "\n".join(lines)
     
-    def _calculate_weekly_stats(self) -> Dict[str, Any]:
-        """Calcula estadísticas de la última semana"""
-        week_ago = date.today() - timedelta(days=7)
+    def _calculate_weekly_stats(self, start: Optional[date] = None,
+                                end: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Calcula estadísticas de una semana (por defecto, los últimos 7 días).
+        Lo ya archivado cuenta a través de archive_rollups (database/archive.py).
+        """
+        start = start or date.today() - timedelta(days=7)
+        end = end or date.today()
+        period = (start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
         
-        conn = self.db.get_connection()
+        conn = self.user_db.get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
             SELECT status, COUNT(*) as count
             FROM tasks
-            WHERE date(updated_at) >= ?
+            WHERE owner_id = ?
+            AND date(updated_at) BETWEEN ? AND ?
             AND parent_task_id IS NULL
             GROUP BY status
-        """, (week_ago.strftime("%Y-%m-%d"),))
+        """, (self.user_id,) + period)
         
         results = cursor.fetchall()
+        
+        cursor.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM tasks
+                 WHERE owner_id = ? AND parent_task_id IS NULL
+                 AND date(created_at) BETWEEN ? AND ?) as created,
+                (SELECT COUNT(*) FROM tasks
+                 WHERE owner_id = ? AND parent_task_id IS NULL AND status != 'completed'
+                 AND deadline BETWEEN ? AND ? AND deadline < date('now')) as overdue
+        """, (self.user_id,) + period + (self.user_id,) + period)
+        
+        counts = cursor.fetchone()
+        archived = self._archived_counts(cursor, 'task', *period)
         conn.close()
         
         stats = {'completed': 0, 'in_progress': 0, 'pending': 0}
-        total = 0
         
         for row in results:
             stats[row['status']] = row['count']
-            total += row['count']
+        stats['completed'] += archived['completed']
+        total = sum(stats.values())
         
         completion_rate = int((stats['completed'] / total * 100)) if total > 0 else 0
         
@@ -285,35 +358,49 @@ class ReminderSystem:
             'completed': stats['completed'],
             'in_progress': stats['in_progress'],
             'pending': stats['pending'],
-            'completion_rate': completion_rate
+            'created': counts['created'] + archived['created'],
+            'overdue': counts['overdue'],
+            'completion_rate': completion_rate,
+            'week_start': period[0],
+            'week_end': period[1]
         }
     
-    def _calculate_monthly_stats(self) -> Dict[str, Any]:
-        """Calcula estadísticas del último mes"""
-        month_ago = date.today() - timedelta(days=30)
+    def _calculate_monthly_stats(self, start: Optional[date] = None,
+                                 end: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Calcula estadísticas de un mes (por defecto, los últimos 30 días).
+        Lo ya archivado cuenta a través de archive_rollups (database/archive.py).
+        """
+        start = start or date.today() - timedelta(days=30)
+        end = end or date.today()
+        period = (start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
         
-        conn = self.db.get_connection()
+        conn = self.user_db.get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
             SELECT COUNT(*) as count
             FROM tasks
-            WHERE status = 'completed'
-            AND date(completed_at) >= ?
+            WHERE owner_id = ?
+            AND status = 'completed'
+            AND date(completed_at) BETWEEN ? AND ?
             AND parent_task_id IS NULL
-        """, (month_ago.strftime("%Y-%m-%d"),))
+        """, (self.user_id,) + period)
         
         completed_tasks = cursor.fetchone()['count']
         
         cursor.execute("""
             SELECT COUNT(*) as count
             FROM projects
-            WHERE status = 'completed'
-            AND date(completed_at) >= ?
-        """, (month_ago.strftime("%Y-%m-%d"),))
+            WHERE owner_id = ?
+            AND status = 'completed'
+            AND date(completed_at) BETWEEN ? AND ?
+        """, (self.user_id,) + period)
         
         completed_projects = cursor.fetchone()['count']
         
+        completed_tasks += self._archived_counts(cursor, 'task', *period)['completed']
+        completed_projects += self._archived_counts(cursor, 'project', *period)['completed']
         conn.close()
         
         productivity_score = min(10, (completed_tasks // 3) + (completed_projects * 2))
@@ -322,4 +409,84 @@ class ReminderSystem:
             'completed': completed_tasks,
             'projects_completed': completed_projects,
             'productivity_score': productivity_score
-        }
\ No newline at end of file
+        }
+    
+    def _archived_counts(self, cursor, kind: str, start: str, end: str) -> Dict[str, int]:
+        """Creados y completados entre dos fechas que ya están en el archivo"""
+        cursor.execute("""
+            SELECT COALESCE(SUM(created), 0) as created, COALESCE(SUM(completed), 0) as completed
+            FROM archive_rollups
+            WHERE owner_id = ? AND kind = ? AND day BETWEEN ? AND ?
+        """, (self.user_id, kind, start, end))
+        
+        row = cursor.fetchone()
+        return {'created': row['created'], 'completed': row['completed']}
+
+
+# ========== PUNTOS DE ENTRADA DEL SCHEDULER ==========
+# EXPLICACIÓN: Los trabajos guardados en la base de datos no pueden apuntar a
+# métodos de una instancia (no se pueden serializar). Por eso el scheduler llama
+# a estas funciones del módulo, que delegan en el sistema registrado al arrancar.
+
+_reminder_system: Optional[ReminderSystem] = None
+
+
+def register_reminder_system(system: ReminderSystem):
+    """Registra el sistema de recordatorios que usarán los trabajos programados"""
+    global _reminder_system
+    _reminder_system = system
+
+
+async def fan_out(method_name: str):
+    """
+    Envía un recordatorio a todos los usuarios autorizados.
+    
+    Se procesan por tandas: los usuarios de una tanda se atienden a la vez
+    y la siguiente tanda no empieza hasta que termina la anterior, para no
+    saturar la API de Telegram cuando hay muchos usuarios.
+    
+    Args:
+        method_name: Método de ReminderSystem que envía el recordatorio
+    """
+    if not _reminder_system:
+        return
+    
+    db, bot = _reminder_system.db, _reminder_system.bot
+    user_ids = AccessControl(db).get_user_ids()
+    batch_size = config.REMINDER_FANOUT_BATCH_SIZE
+    
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        await asyncio.gather(*(
+            getattr(ReminderSystem(db, bot, user_id), method_name)()
+            for user_id in batch
+        ))
+    
+    print(f"📨 {method_name}: {len(user_ids)} usuario(s)")
+
+
+async def run_daily_summary():
+    await fan_out('send_daily_summary')
+
+
+async def run_evening_reminder():
+    await fan_out('send_evening_reminder')
+
+
+async def run_weekly_summary():
+    await fan_out('send_weekly_summary')
+
+
+async def run_monthly_summary():
+    await fan_out('send_monthly_summary')
+
+
+async def run_catch_up_digest(missed_job_ids: List[str], user_id: Optional[int] = None):
+    if not _reminder_system:
+        return
+    
+    if user_id is None or user_id == _reminder_system.user_id:
+        await _reminder_system.send_catch_up_digest(missed_job_ids)
+    else:
+        reminder = ReminderSystem(_reminder_system.db, _reminder_system.bot, user_id)
+        await reminder.send_catch_up_digest(missed_job_ids)
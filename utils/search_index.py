@@ -0,0 +1,317 @@
+"""
+Índice de búsqueda en memoria para la búsqueda inline (@bot texto)
+Encuentra objetivos, misiones y notas mientras el usuario escribe, sin
+consultar la base de datos en cada letra.
+
+EXPLICACIÓN:
+- Por cada usuario se guarda:
+  - docs:     (entidad, id) -> fila (objetivos activos, misiones y notas)
+  - postings: palabra -> documentos que la contienen
+  - vocab:    todas las palabras, ordenadas: las que empiezan por lo que se
+              está escribiendo se encuentran con bisect (búsqueda por prefijo)
+  - grams:    trigrama -> palabras que lo contienen: sirve para encontrar
+              texto en medio de una palabra y para tolerar erratas
+              ("reunoin" encuentra "reunión")
+- Las palabras se comparan sin mayúsculas ni tildes, con las mismas reglas
+  que la búsqueda de los modelos (database/fulltext.py).
+- El índice de un usuario se carga la primera vez que busca (tres consultas)
+  y después se mantiene al día con los eventos de database/events.py: cada
+  cambio solo toca las palabras del documento afectado.
+- Cada usuario tiene una caché con sus últimas búsquedas (texto -> resultado)
+  que se vacía con cualquier cambio en sus datos.
+"""
+import bisect
+import heapq
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import config
+from database import events
+from database.fulltext import (
+    SCORE_EXACT, SCORE_FUZZY, SCORE_INFIX, SCORE_PREFIX, TITLE_BONUS,
+    fuzzy_prefix, max_typos, normalize, trigrams, words,
+)
+from database.models import DatabaseManager, Project, Task, Note
+
+Key = Tuple[str, int]
+
+# Campos con texto de cada entidad (el primero es el título)
+TEXT_FIELDS = {
+    'task': ('title', 'description'),
+    'project': ('name', 'client', 'description'),
+    'note': ('title', 'tags', 'content'),
+}
+
+COMPLETED_PENALTY = 0.5  # Los objetivos y misiones completados van detrás
+
+
+class UserIndex:
+    """Índice de los datos de un usuario"""
+
+    def __init__(self):
+        self.docs: Dict[Key, Dict[str, Any]] = {}
+        self.doc_words: Dict[Key, Set[str]] = {}
+        self.postings: Dict[str, Set[Key]] = {}
+        self.title_postings: Dict[str, Set[Key]] = {}  # Solo los que la tienen en el título
+        self.vocab: List[str] = []
+        self.grams: Dict[str, Set[str]] = {}
+        self.completed: Set[Key] = set()
+        # Documentos del menos al más reciente (la búsqueda vacía sale de aquí)
+        self.recent: 'OrderedDict[Key, None]' = OrderedDict()
+        self.cache: 'OrderedDict[str, List[Key]]' = OrderedDict()
+
+    # ========== ALTAS Y BAJAS ==========
+
+    def add(self, entity: str, row: Dict[str, Any]):
+        key = (entity, row['id'])
+        self.remove(key)
+
+        fields = TEXT_FIELDS[entity]
+        title = set(words(row.get(fields[0])))
+        doc_words = set(title)
+        for field in fields[1:]:
+            doc_words.update(words(row.get(field)))
+
+        self.docs[key] = row
+        self.doc_words[key] = doc_words
+        self.recent[key] = None
+        if row.get('status') == 'completed':
+            self.completed.add(key)
+
+        for word in doc_words:
+            postings = self.postings.get(word)
+            if postings is None:
+                postings = self.postings[word] = set()
+                bisect.insort(self.vocab, word)
+                for gram in trigrams(word):
+                    self.grams.setdefault(gram, set()).add(word)
+            postings.add(key)
+        for word in title:
+            self.title_postings.setdefault(word, set()).add(key)
+
+    def remove(self, key: Key):
+        if key not in self.docs:
+            return
+
+        del self.docs[key]
+        del self.recent[key]
+        self.completed.discard(key)
+        for word in self.doc_words.pop(key):
+            title_postings = self.title_postings.get(word)
+            if title_postings is not None:
+                title_postings.discard(key)
+                if not title_postings:
+                    del self.title_postings[word]
+
+            postings = self.postings[word]
+            postings.discard(key)
+            if postings:
+                continue
+            # Palabra que ya no está en ningún documento
+            del self.postings[word]
+            del self.vocab[bisect.bisect_left(self.vocab, word)]
+            for gram in trigrams(word):
+                gram_words = self.grams[gram]
+                gram_words.discard(word)
+                if not gram_words:
+                    del self.grams[gram]
+
+    def sort_recent(self):
+        """Ordena recent por updated_at (después de la carga inicial)"""
+        keys = sorted(self.recent, key=lambda key: self.docs[key].get('updated_at') or '')
+        self.recent = OrderedDict.fromkeys(keys)
+
+    # ========== BÚSQUEDA ==========
+
+    def search(self, query: str, limit: int) -> List[Key]:
+        cache_key = normalize(query).strip()
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.cache.move_to_end(cache_key)
+            return cached[:limit]
+
+        query_words = words(query)
+        if query_words:
+            result = self._best(self._score(query_words), config.INLINE_RESULTS_LIMIT)
+        else:
+            result = self._most_recent(config.INLINE_RESULTS_LIMIT)
+
+        self.cache[cache_key] = result
+        if len(self.cache) > config.INLINE_QUERY_CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return result[:limit]
+
+    def _most_recent(self, limit: int) -> List[Key]:
+        """Sin texto: lo último que se ha tocado, lo completado al final"""
+        active, completed = [], []
+        for key in reversed(self.recent):
+            if key in self.completed:
+                if len(completed) < limit:
+                    completed.append(key)
+            else:
+                active.append(key)
+                if len(active) >= limit:
+                    break
+        return (active + completed)[:limit]
+
+    def _best(self, scores: Dict[Key, float], limit: int) -> List[Key]:
+        """Los de mayor puntuación; a igual puntuación, los más recientes"""
+        for key in self.completed.intersection(scores):
+            scores[key] *= COMPLETED_PENALTY
+        docs = self.docs
+        return heapq.nlargest(limit, scores, key=lambda key: (scores[key], docs[key].get('updated_at') or ''))
+
+    def _score(self, query_words: List[str]) -> Dict[Key, float]:
+        """Documentos que contienen todas las palabras buscadas, con su puntuación"""
+        scores: Optional[Dict[Key, float]] = None
+
+        for query_word in query_words:
+            # De menor a mayor puntuación: cada documento se queda con la mejor
+            matches = []
+            for word, score in self._matching_words(query_word):
+                matches.append((score, self.postings[word]))
+                if word in self.title_postings:
+                    matches.append((score * TITLE_BONUS, self.title_postings[word]))
+            matches.sort(key=lambda match: match[0])
+
+            word_scores: Dict[Key, float] = {}
+            for score, keys in matches:
+                word_scores.update(dict.fromkeys(keys, score))
+
+            if scores is None:
+                scores = word_scores
+            else:
+                if len(word_scores) < len(scores):
+                    scores, word_scores = word_scores, scores
+                scores = {key: value + word_scores[key] for key, value in scores.items() if key in word_scores}
+            if not scores:
+                return {}
+
+        return scores or {}
+
+    def _matching_words(self, query_word: str) -> Iterable[Tuple[str, float]]:
+        """Palabras del índice que encajan con una palabra buscada y cuánto puntúan"""
+        found: Dict[str, float] = {}
+
+        # Prefijo: todas las palabras que empiezan por lo escrito
+        start = bisect.bisect_left(self.vocab, query_word)
+        for word in self.vocab[start:]:
+            if not word.startswith(query_word):
+                break
+            found[word] = SCORE_EXACT if word == query_word else SCORE_PREFIX
+
+        # Trigramas: texto en medio de una palabra y erratas
+        query_grams = trigrams(query_word)
+        if query_grams:
+            shared = Counter()
+            for gram in query_grams:
+                shared.update(self.grams.get(gram, ()))
+
+            typos = max_typos(query_word)
+            # Cada errata estropea como mucho tres trigramas
+            needed = max(1, len(query_grams) - 3 * typos)
+            for word, count in shared.items():
+                if word in found or count < needed:
+                    continue
+                if count == len(query_grams) and query_word in word:
+                    found[word] = SCORE_INFIX
+                elif typos and fuzzy_prefix(query_word, word, typos):
+                    found[word] = SCORE_FUZZY
+
+        return found.items()
+
+
+class SearchIndex:
+    """
+    Índices de búsqueda de todos los usuarios que han buscado algo.
+    Los eventos pueden llegar desde otros hilos: todo pasa por un lock.
+    """
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+        self.db = db_manager or DatabaseManager()
+        self._users: 'OrderedDict[int, UserIndex]' = OrderedDict()
+        self._loading: Dict[int, bool] = {}  # Usuario cargándose -> ¿ha cambiado algo mientras?
+        self._lock = threading.Lock()
+        events.subscribe(self.on_event)
+
+    def search(self, owner_id: int, query: str,
+               limit: int = config.INLINE_RESULTS_LIMIT) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Busca en los objetivos activos, misiones y notas de un usuario.
+
+        Returns:
+            (entidad, fila) de mejor a peor coincidencia
+        """
+        with self._lock:
+            index = self._users.get(owner_id)
+            if index is not None:
+                self._users.move_to_end(owner_id)
+
+        if index is None:
+            index = self._load(owner_id)
+
+        with self._lock:
+            return [(entity, index.docs[(entity, row_id)]) for entity, row_id in index.search(query, limit)]
+
+    def forget(self, owner_id: Optional[int] = None):
+        """Descarta el índice de un usuario (o de todos): se vuelve a cargar al buscar"""
+        with self._lock:
+            if owner_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(owner_id, None)
+
+    def _load(self, owner_id: int) -> UserIndex:
+        with self._lock:
+            self._loading[owner_id] = False
+
+        index = UserIndex()
+        for row in Task(self.db, owner_id).get_all():
+            index.add('task', row)
+        for row in Project(self.db, owner_id).get_all():
+            index.add('project', row)
+        for row in Note(self.db, owner_id).get_all():
+            index.add('note', row)
+        index.sort_recent()
+
+        with self._lock:
+            # Si algo cambió durante la carga, el índice sirve para esta búsqueda
+            # pero no se guarda: la próxima vuelve a cargar
+            if not self._loading.pop(owner_id, True):
+                self._users[owner_id] = index
+                while len(self._users) > config.INLINE_INDEX_MAX_USERS:
+                    self._users.popitem(last=False)
+        return index
+
+    # ========== EVENTOS ==========
+
+    def on_event(self, event: Dict[str, Any]):
+        """Suscriptor de database/events.py: aplica el cambio al índice del usuario"""
+        if event['entity'] not in TEXT_FIELDS:
+            return  # Las dependencias no cambian ningún texto
+        with self._lock:
+            if event['owner_id'] in self._loading:
+                self._loading[event['owner_id']] = True
+            index = self._users.get(event['owner_id'])
+            if index is None:
+                return  # Todavía no ha buscado nada: se cargará ya con el cambio
+            index.cache.clear()
+
+            entity, action = event['entity'], event['action']
+            if action == 'imported':
+                # Muchas filas nuevas de golpe: mejor volver a cargar
+                del self._users[event['owner_id']]
+            elif action == 'archived':
+                for row_id in event['changes'].get('ids', []):
+                    index.remove((entity, row_id))
+            elif action == 'deleted':
+                index.remove((entity, event['entity_id']))
+            else:
+                key = (entity, event['entity_id'])
+                row = dict(index.docs.get(key) or {'id': event['entity_id']})
+                row.update({field: values[1] for field, values in event['changes'].items()})
+                row['updated_at'] = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(event['created_at']))
+                index.add(entity, row)
+
@@ -0,0 +1,435 @@
+"""
+Grafo de dependencias entre objetivos, en memoria
+Dice qué objetivos se pueden empezar ya y cuáles esperan a otros, y calcula
+la ruta crítica de cada misión sin volver a leer todas las dependencias en
+cada consulta.
+
+EXPLICACIÓN:
+- Las dependencias se guardan en la tabla task_dependencies
+  (Task.add_dependency rechaza las que cerrarían un ciclo). El grafo de un
+  usuario se carga la primera vez que hace falta (dos consultas) con:
+  - blockers / dependents: las dependencias en los dos sentidos
+  - order:   un orden topológico (cada objetivo va detrás de los que
+             necesita). Al añadir una dependencia se mantiene con el algoritmo
+             de Pearce-Kelly: solo se reordena el tramo entre sus dos
+             extremos, no el grafo entero.
+  - waiting: de cuántos objetivos sin completar depende cada uno
+             (más de 0 = bloqueado)
+- Después se mantiene al día con los eventos de database/events.py. Cuando un
+  objetivo se completa o se reabre solo cambia el contador de los que
+  dependen directamente de él.
+- Ruta crítica de una misión (método del camino crítico): cada objetivo
+  pendiente dura DEPENDENCY_TASK_DAYS días. Recorriendo el orden topológico
+  se calcula lo antes que puede empezar cada uno y, al revés, lo más tarde
+  que puede empezar sin retrasar el final. La diferencia es su holgura: los
+  de holgura 0 forman la ruta crítica. El resultado se guarda por misión y
+  solo se descarta cuando cambia un objetivo incluido en él o algo de lo que
+  dependen.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import config
+from database import events
+from database.models import DatabaseManager, DependencyCycle, Task
+
+# Campos de cada objetivo que se guardan en el grafo
+TASK_FIELDS = ('id', 'title', 'status', 'priority', 'deadline', 'project_id')
+
+PRIORITY_ORDER = {'high': 0, 'medium': 1, 'low': 2}
+
+
+class UserGraph:
+    """Dependencias de los objetivos de un usuario"""
+
+    def __init__(self):
+        self.tasks: Dict[int, Dict[str, Any]] = {}  # Solo los que tienen alguna dependencia
+        self.blockers: Dict[int, Set[int]] = {}
+        self.dependents: Dict[int, Set[int]] = {}
+        self.order: Dict[int, int] = {}
+        self.next_order = 0
+        self.waiting: Dict[int, int] = {}
+        # Ruta crítica por misión y, por cada objetivo de esas misiones
+        # (también los completados), la misión en cuyo análisis cuenta
+        self.analyses: Dict[Optional[int], Dict[str, Any]] = {}
+        self.members: Dict[Optional[int], List[int]] = {}
+        self.analyzed: Dict[int, Optional[int]] = {}
+
+    # ========== OBJETIVOS ==========
+
+    def set_task(self, row: Dict[str, Any]):
+        """Añade o actualiza un objetivo (y el contador de los que dependen de él)"""
+        task_id = row['id']
+        previous = self.tasks.get(task_id)
+        self.tasks[task_id] = {field: row.get(field) for field in TASK_FIELDS}
+        if task_id not in self.order:
+            self.order[task_id] = self.next_order
+            self.next_order += 1
+            self.blockers[task_id] = set()
+            self.dependents[task_id] = set()
+            self.waiting[task_id] = 0
+
+        if previous is not None and self._done(previous) != self._done(row):
+            step = 1 if self._done(previous) else -1
+            for dependent in self.dependents[task_id]:
+                self.waiting[dependent] += step
+                self.invalidate(dependent)
+
+    def update_task(self, task_id: int, changes: Dict[str, Any]) -> bool:
+        """Aplica los campos cambiados a un objetivo del grafo (False si no está)"""
+        if task_id not in self.tasks:
+            return False
+        row = dict(self.tasks[task_id])
+        row.update({field: value for field, value in changes.items() if field in TASK_FIELDS})
+        self.set_task(row)
+        return True
+
+    def remove_task(self, task_id: int):
+        """Quita un objetivo borrado o archivado con todas sus dependencias"""
+        self.invalidate(task_id)
+        if task_id not in self.tasks:
+            return
+        for dependent in list(self.dependents[task_id]):
+            self.remove_edge(dependent, task_id)
+        for blocker in list(self.blockers[task_id]):
+            self.remove_edge(task_id, blocker)
+        for table in (self.tasks, self.blockers, self.dependents, self.order, self.waiting):
+            del table[task_id]
+
+    @staticmethod
+    def _done(row: Dict[str, Any]) -> bool:
+        return row.get('status') == 'completed'
+
+    # ========== DEPENDENCIAS ==========
+
+    def add_edge(self, task_id: int, depends_on_id: int):
+        """
+        task_id depende de depends_on_id (los dos tienen que estar en tasks).
+
+        Raises:
+            DependencyCycle: Cerraría un ciclo (no se añade)
+        """
+        if depends_on_id in self.blockers[task_id]:
+            return
+        self._reorder(depends_on_id, task_id)
+        self.blockers[task_id].add(depends_on_id)
+        self.dependents[depends_on_id].add(task_id)
+        if not self._done(self.tasks[depends_on_id]):
+            self.waiting[task_id] += 1
+        self.invalidate(task_id)
+        self.invalidate(depends_on_id)
+
+    def remove_edge(self, task_id: int, depends_on_id: int):
+        if depends_on_id not in self.blockers.get(task_id, ()):
+            return
+        self.blockers[task_id].discard(depends_on_id)
+        self.dependents[depends_on_id].discard(task_id)
+        if not self._done(self.tasks[depends_on_id]):
+            self.waiting[task_id] -= 1
+        self.invalidate(task_id)
+        self.invalidate(depends_on_id)
+
+    def _reorder(self, first: int, then: int):
+        """
+        Pearce-Kelly: deja first antes que then en order moviendo solo los
+        objetivos cuyo orden está entre los dos.
+        """
+        order = self.order
+        lower, upper = order[then], order[first]
+        if upper < lower:
+            return  # Ya estaban en orden
+
+        # Lo que va detrás de then sin pasar de first y lo que va delante de
+        # first sin bajar de then. Si desde then se llega a first, es un ciclo.
+        forward = self._reach(then, self.dependents, lambda node: order[node] <= upper)
+        if first in forward:
+            raise DependencyCycle(then, first)
+        backward = self._reach(first, self.blockers, lambda node: order[node] >= lower)
+
+        nodes = sorted(backward, key=order.get) + sorted(forward, key=order.get)
+        slots = sorted(order[node] for node in nodes)
+        for node, slot in zip(nodes, slots):
+            order[node] = slot
+
+    @staticmethod
+    def _reach(start: int, edges: Dict[int, Set[int]], within) -> Set[int]:
+        found = {start}
+        stack = [start]
+        while stack:
+            for node in edges[stack.pop()]:
+                if node not in found and within(node):
+                    found.add(node)
+                    stack.append(node)
+        return found
+
+    def is_blocked(self, task_id: int) -> bool:
+        return self.waiting.get(task_id, 0) > 0
+
+    def pending_blockers(self, task_id: int) -> List[Dict[str, Any]]:
+        """Objetivos sin completar de los que depende, en orden topológico"""
+        blockers = [self.tasks[node] for node in self.blockers.get(task_id, ())
+                    if not self._done(self.tasks[node])]
+        return sorted(blockers, key=lambda row: self.order[row['id']])
+
+    # ========== RUTA CRÍTICA ==========
+
+    def invalidate(self, task_id: int):
+        """Descarta el análisis de la misión que incluye a este objetivo"""
+        if task_id in self.analyzed:
+            self.drop_analysis(self.analyzed[task_id])
+
+    def drop_analysis(self, project_id: Optional[int]):
+        self.analyses.pop(project_id, None)
+        for task_id in self.members.pop(project_id, ()):
+            self.analyzed.pop(task_id, None)
+
+    def drop_analyses(self):
+        self.analyses.clear()
+        self.members.clear()
+        self.analyzed.clear()
+
+    def analyze(self, project_id: Optional[int], rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Ruta crítica de una misión con sus objetivos (rows).
+
+        Returns:
+            {'project_id', 'days', 'path', 'ready', 'blocked', 'dependencies', 'tasks'}:
+            days es lo que se tarda como mínimo en terminarla; path, ready y
+            blocked son listas de objetivos; tasks, por id, start (día en que
+            puede empezar como pronto), slack (días de holgura), finish (fecha
+            prevista) y late (no llega a su deadline)
+        """
+        rows = list(rows)
+        pending = {row['id']: row for row in rows if not self._done(row)}
+        order = self.order
+        ids = sorted(pending, key=lambda task_id: (order.get(task_id, -1), task_id))
+        duration = config.DEPENDENCY_TASK_DAYS
+
+        def inside(task_id: int, edges: Dict[int, Set[int]]) -> List[int]:
+            return [node for node in edges.get(task_id, ()) if node in pending]
+
+        # Hacia delante: lo antes que puede empezar y terminar cada uno
+        start, finish = {}, {}
+        for task_id in ids:
+            start[task_id] = max((finish[node] for node in inside(task_id, self.blockers)), default=0)
+            finish[task_id] = start[task_id] + duration
+        days = max(finish.values(), default=0)
+
+        # Hacia atrás: lo más tarde que puede empezar sin retrasar el final
+        latest = {}
+        for task_id in reversed(ids):
+            latest_finish = min((latest[node] for node in inside(task_id, self.dependents)), default=days)
+            latest[task_id] = latest_finish - duration
+
+        today = date.today()
+        tasks = {}
+        for task_id in ids:
+            expected = today + timedelta(days=finish[task_id] - 1)
+            deadline = pending[task_id].get('deadline')
+            tasks[task_id] = {
+                'start': start[task_id],
+                'slack': latest[task_id] - start[task_id],
+                'finish': expected.isoformat(),
+                'late': bool(deadline) and expected.isoformat() > deadline,
+            }
+
+        # Una ruta crítica: del primero sin holgura hasta el final, siempre
+        # por objetivos sin holgura que empiezan justo cuando acaba el anterior
+        path = []
+        current = next((task_id for task_id in ids
+                        if tasks[task_id]['slack'] == 0 and start[task_id] == 0), None)
+        while current is not None:
+            path.append(current)
+            current = next((node for node in sorted(inside(current, self.dependents), key=order.get)
+                            if tasks[node]['slack'] == 0 and start[node] == finish[current]), None)
+
+        def by_urgency(task_id: int):
+            row = pending[task_id]
+            return (tasks[task_id]['slack'], PRIORITY_ORDER.get(row.get('priority'), 1),
+                    row.get('deadline') or '9999-12-31', order.get(task_id, -1))
+
+        ready = sorted((task_id for task_id in ids if not self.is_blocked(task_id)), key=by_urgency)
+        analysis = {
+            'project_id': project_id,
+            'days': days,
+            'path': [pending[task_id] for task_id in path],
+            'ready': [pending[task_id] for task_id in ready],
+            'blocked': [pending[task_id] for task_id in ids if self.is_blocked(task_id)],
+            'dependencies': sum(len(inside(task_id, self.blockers)) for task_id in ids),
+            'tasks': tasks,
+        }
+
+        self.drop_analysis(project_id)
+        self.analyses[project_id] = analysis
+        self.members[project_id] = [row['id'] for row in rows]
+        for row in rows:
+            self.analyzed[row['id']] = project_id
+        return analysis
+
+
+class TaskGraph:
+    """
+    Grafos de dependencias de los usuarios que los han usado.
+    Los eventos pueden llegar desde otros hilos: todo pasa por un lock.
+    """
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+        self.db = db_manager or DatabaseManager()
+        self._users: 'OrderedDict[int, UserGraph]' = OrderedDict()
+        self._loading: Dict[int, bool] = {}  # Usuario cargándose -> ¿ha cambiado algo mientras?
+        self._lock = threading.Lock()
+        events.subscribe(self.on_event)
+
+    # ========== CONSULTAS ==========
+
+    def split(self, owner_id: int,
+              tasks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Separa unos objetivos en los que se pueden empezar y los bloqueados (mismo orden)"""
+        graph = self._graph(owner_id)
+        with self._lock:
+            blocked = {task['id'] for task in tasks if graph.is_blocked(task['id'])}
+        return ([task for task in tasks if task['id'] not in blocked],
+                [task for task in tasks if task['id'] in blocked])
+
+    def is_blocked(self, owner_id: int, task_id: int) -> bool:
+        graph = self._graph(owner_id)
+        with self._lock:
+            return graph.is_blocked(task_id)
+
+    def pending_blockers(self, owner_id: int, task_id: int) -> List[Dict[str, Any]]:
+        """Objetivos sin completar que un objetivo está esperando"""
+        graph = self._graph(owner_id)
+        with self._lock:
+            return graph.pending_blockers(task_id)
+
+    def critical_path(self, owner_id: int, project_id: Optional[int]) -> Dict[str, Any]:
+        """Ruta crítica y holguras de una misión (ver UserGraph.analyze); se guarda hasta que algo cambie"""
+        graph = self._graph(owner_id)
+        with self._lock:
+            analysis = graph.analyses.get(project_id)
+            if analysis is not None:
+                return analysis
+            self._loading[owner_id] = False
+
+        rows = Task(self.db, owner_id).get_all({'project_id': project_id})
+
+        with self._lock:
+            changed = self._loading.pop(owner_id, True)
+            analysis = graph.analyze(project_id, rows)
+            # Si algo cambió mientras se leían los objetivos, el análisis vale
+            # para esta respuesta pero no se guarda
+            if changed or self._users.get(owner_id) is not graph:
+                graph.drop_analysis(project_id)
+            return analysis
+
+    def forget(self, owner_id: Optional[int] = None):
+        """Descarta el grafo de un usuario (o de todos): se vuelve a cargar al usarlo"""
+        with self._lock:
+            if owner_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(owner_id, None)
+
+    def _graph(self, owner_id: int) -> UserGraph:
+        with self._lock:
+            graph = self._users.get(owner_id)
+            if graph is not None:
+                self._users.move_to_end(owner_id)
+                return graph
+            self._loading[owner_id] = False
+
+        data = Task(self.db, owner_id).get_dependency_graph()
+        graph = UserGraph()
+        for row in data['tasks']:
+            graph.set_task(row)
+        for edge in data['edges']:
+            if edge['task_id'] in graph.tasks and edge['depends_on_id'] in graph.tasks:
+                graph.add_edge(edge['task_id'], edge['depends_on_id'])
+
+        with self._lock:
+            if not self._loading.pop(owner_id, True):
+                self._users[owner_id] = graph
+                while len(self._users) > config.DEPENDENCY_GRAPH_MAX_USERS:
+                    self._users.popitem(last=False)
+        return graph
+
+    # ========== EVENTOS ==========
+
+    def on_event(self, event: Dict[str, Any]):
+        """Suscriptor de database/events.py: aplica el cambio al grafo del usuario"""
+        owner_id = event['owner_id']
+        with self._lock:
+            if owner_id in self._loading:
+                self._loading[owner_id] = True
+            graph = self._users.get(owner_id)
+        if graph is None or event['entity'] not in ('task', 'project', 'dependency'):
+            return
+
+        missing = []
+        if event['entity'] == 'dependency' and event['action'] == 'created':
+            depends_on_id = event['changes']['depends_on_id'][1]
+            with self._lock:
+                missing = [task_id for task_id in (event['entity_id'], depends_on_id)
+                           if task_id not in graph.tasks]
+        # Los objetivos que entran en el grafo por la nueva dependencia se leen fuera del lock
+        rows = []
+        if missing:
+            task_manager = Task(self.db, owner_id)
+            rows = [row for row in map(task_manager.get_by_id, missing) if row]
+
+        with self._lock:
+            if self._users.get(owner_id) is not graph:
+                return
+            try:
+                self._apply(graph, event, rows)
+            except (DependencyCycle, KeyError) as e:
+                # El grafo no cuadra con la base de datos: se vuelve a cargar al usarlo
+                print(f"⚠️ Grafo de dependencias de {owner_id} descartado: {e}")
+                del self._users[owner_id]
+
+    @staticmethod
+    def _apply(graph: UserGraph, event: Dict[str, Any], rows: List[Dict[str, Any]]):
+        entity, action, changes = event['entity'], event['action'], event['changes']
+        task_id = event['entity_id']
+
+        if entity == 'dependency':
+            for row in rows:
+                graph.set_task(row)
+            if action == 'created':
+                graph.add_edge(task_id, changes['depends_on_id'][1])
+            else:
+                graph.remove_edge(task_id, changes['depends_on_id'][0])
+        elif entity == 'project':
+            graph.drop_analysis(task_id)
+        elif action == 'imported':
+            graph.drop_analyses()
+        elif action == 'archived':
+            for archived_id in changes.get('ids', []):
+                graph.remove_task(archived_id)
+        elif action in ('created', 'deleted'):
+            # Sin project_id en changes es que no tiene misión
+            project_id = changes.get('project_id', [None, None])[1 if action == 'created' else 0]
+            graph.drop_analysis(project_id)
+            if action == 'deleted':
+                graph.remove_task(task_id)
+        else:
+            graph.invalidate(task_id)
+            if 'project_id' in changes:
+                graph.drop_analysis(changes['project_id'][1])
+            graph.update_task(task_id, {field: values[1] for field, values in changes.items()})
+
+
+# Grafo único para todos los handlers (se crea la primera vez)
+_task_graph: Optional[TaskGraph] = None
+_task_graph_lock = threading.Lock()
+
+
+def get_task_graph() -> TaskGraph:
+    global _task_graph
+    if _task_graph is None:
+        with _task_graph_lock:
+            if _task_graph is None:
+                _task_graph = TaskGraph()
+    return _task_graph
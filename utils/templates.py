@@ -0,0 +1,111 @@
+"""
+Plantillas precompiladas para los mensajes y teclados del bot
+Lo que no cambia entre llamadas se prepara una sola vez: los teclados fijos,
+las tablas de emojis y etiquetas, y las plantillas con datos ({title}, {name}...).
+
+EXPLICACIÓN:
+- static_markup: los menús fijos (Tareas, Proyectos, Notas...) se construyen la
+  primera vez y después se devuelve siempre el mismo objeto. Es seguro porque
+  los teclados de python-telegram-bot no se pueden modificar una vez creados.
+- Tablas de consulta: en lugar de crear diccionarios de emojis en cada llamada,
+  las líneas ya montadas ("Estado: ⏳ Pendiente") están en diccionarios fijos.
+- render_template: convierte un texto con campos de str.format en una función
+  con un f-string la primera vez que se usa, así no se vuelve a analizar el
+  texto en cada mensaje.
+"""
+import functools
+import keyword
+import string
+from itertools import product
+from typing import Callable, Dict, Tuple
+
+import config
+
+
+# ========== TECLADOS FIJOS ==========
+
+def static_markup(build: Callable):
+    """
+    Decorador para funciones sin argumentos que devuelven un teclado fijo.
+    El teclado se construye en la primera llamada y se reutiliza.
+    """
+    markup = None
+
+    @functools.wraps(build)
+    def get():
+        nonlocal markup
+        if markup is None:
+            markup = build()
+        return markup
+
+    return get
+
+
+# ========== TABLAS DE CONSULTA ==========
+
+TASK_STATUS_EMOJI = {'pending': '⏳', 'in_progress': '🔄', 'completed': '✅'}
+PROJECT_STATUS_EMOJI = {'active': '🟢', 'paused': '⏸️', 'completed': '✅'}
+PRIORITY_EMOJI = {'high': '🔴', 'medium': '🟡', 'low': '🟢'}
+UNKNOWN_EMOJI = '❓'
+
+# Estado + prioridad de un objetivo ("⏳🔴"), para todas las combinaciones conocidas
+TASK_BADGES: Dict[Tuple[str, str], str] = {
+    (status, priority): status_emoji + priority_emoji
+    for (status, status_emoji), (priority, priority_emoji)
+    in product(TASK_STATUS_EMOJI.items(), PRIORITY_EMOJI.items())
+}
+
+# Líneas ya montadas de las fichas de objetivos y misiones
+TASK_STATUS_LINES = {status: f"Estado: {label}" for status, label in config.TASK_STATUS.items()}
+PRIORITY_LINES = {priority: f"Prioridad: {label}" for priority, label in config.PRIORITY_LEVELS.items()}
+PROJECT_STATUS_LINES = {
+    status: f"Estado: {PROJECT_STATUS_EMOJI.get(status, UNKNOWN_EMOJI)} {label}"
+    for status, label in config.PROJECT_STATUS.items()
+}
+PROJECT_PRIORITY_LINES = {
+    priority: f"Prioridad: {PRIORITY_EMOJI[priority]} {label}"
+    for priority, label in config.PRIORITY_LEVELS.items()
+}
+
+
+def task_badge(status: str, priority: str) -> str:
+    """Emojis de estado y prioridad de un objetivo"""
+    badge = TASK_BADGES.get((status, priority))
+    if badge is None:
+        badge = TASK_STATUS_EMOJI.get(status, UNKNOWN_EMOJI) + PRIORITY_EMOJI.get(priority, UNKNOWN_EMOJI)
+    return badge
+
+
+# ========== PLANTILLAS DE MENSAJES ==========
+
+@functools.lru_cache(maxsize=None)
+def compile_template(text: str) -> Callable[..., str]:
+    """
+    Compila un texto con campos de str.format ({title}, {count}...) a una función.
+
+    El resultado es idéntico a text.format(**valores). Si la plantilla usa algo
+    que no sea un nombre simple ({0}, {user.name}...) se usa str.format tal cual.
+    """
+    fields = []
+    for _, field_name, format_spec, _ in string.Formatter().parse(text):
+        if field_name is None:
+            continue
+        if not field_name.isidentifier() or keyword.iskeyword(field_name) or '{' in (format_spec or ''):
+            return text.format
+        if field_name not in fields:
+            fields.append(field_name)
+
+    if not fields:
+        return lambda **values: text
+
+    # Las llaves, conversiones (!r) y formatos (:>5) se escriben igual en un f-string
+    arguments = ", ".join(fields)
+    source = f"def render({arguments}, **_unused):\n    return f{text!r}\n"
+    namespace = {}
+    exec(compile(source, "<plantilla>", "exec"), namespace)
+    return namespace['render']
+
+
+def render_template(text: str, **values) -> str:
+    """Equivalente a text.format(**values) con la plantilla ya compilada"""
+    return compile_template(text)(**values)
@@ -1,62 +1,286 @@
 """
 Script de verificación de importaciones
 Ejecuta este script para verificar que no hay errores de importación
+
+Uso:
+    python verify_imports.py                     # Verificar que todo se importa
+    python verify_imports.py --profile           # Coste de arranque por módulo
+    python verify_imports.py --profile --output arranque.json
+
+EXPLICACIÓN del modo --profile: cada medición se hace en un proceso nuevo
+(arranque en frío, sin nada en caché) y en una carpeta temporal, así que no
+toca la base de datos real ni necesita conexión con Telegram. Mide:
+  1. El tiempo de importación de cada módulo (python -X importtime)
+  2. Las fases del arranque hasta la primera respuesta: importar main, crear
+     el bot, registrar handlers y recordatorios, responder a /start y al
+     primer botón (que carga su módulo de handlers)
 """
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Módulos del proyecto (el resto son dependencias)
+PROJECT_PACKAGES = {'main', 'config', 'database', 'handlers', 'utils',
+                    'cortana_personality', 'logger_config', 'benchmarks'}
+
+
+# ========== VERIFICACIÓN ==========
+
+def verify():
+    print("🔍 Verificando importaciones...")
+    print()
+
+    try:
+        print("1️⃣ Importando config...")
+        import config
+        print("   ✅ config OK")
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        exit(1)
+
+    try:
+        print("2️⃣ Importando database...")
+        from database.models import DatabaseManager, Project, Task, Note
+        print("   ✅ database OK")
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        exit(1)
+
+    try:
+        print("3️⃣ Importando utils...")
+        from utils.keyboards import get_main_keyboard
+        from utils.formatters import format_dashboard
+        from utils.reminders import ReminderSystem
+        print("   ✅ utils OK")
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        exit(1)
+
+    try:
+        print("4️⃣ Importando handlers...")
+        # main.py los carga al usarse por primera vez: aquí se importan todos
+        from handlers import menu
+        print("   ✅ menu OK")
+        from handlers import projects
+        print("   ✅ projects OK")
+        from handlers import tasks
+        print("   ✅ tasks OK")
+        from handlers import notes
+        print("   ✅ notes OK")
+        from handlers import dashboard
+        print("   ✅ dashboard OK")
+        from handlers import settings
+        print("   ✅ settings OK")
+        from handlers import task_conversations
+        print("   ✅ task_conversations OK")
+        from handlers import project_conversations
+        print("   ✅ project_conversations OK")
+        from handlers import access, stats
+        print("   ✅ access y stats OK")
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        exit(1)
+
+    print()
+    print("=" * 50)
+    print("✅ TODAS LAS IMPORTACIONES CORRECTAS")
+    print("=" * 50)
+    print()
+    print("El bot está listo para ejecutarse con:")
+    print("   python main.py")
+    print()
+
 
-print("🔍 Verificando importaciones...")
-print()
+# ========== PERFIL DE ARRANQUE ==========
 
-try:
-    print("1️⃣ Importando config...")
+def _run_cold(args, workdir):
+    """Ejecuta python en un proceso nuevo dentro de workdir, con el proyecto en el path"""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable] + args, cwd=workdir, env=env,
+                            capture_output=True, text=True, timeout=300)
+    return result, time.perf_counter() - start
+
+
+def parse_importtime(stderr):
+    """
+    Convierte la salida de -X importtime en una lista de módulos.
+    Cada línea es: 'import time: <propio µs> | <acumulado µs> | <sangría><módulo>'
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        stripped = name.lstrip()
+        modules.append({
+            'module': stripped,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            'depth': (len(name) - len(stripped) - 1) // 2,
+            'project': stripped.split('.')[0] in PROJECT_PACKAGES,
+            'imported_by': None,
+        })
+
+    # Cada módulo aparece después de los que importa: su padre es la
+    # siguiente línea con un nivel menos de sangría
+    parent_at_depth = {}
+    for module in reversed(modules):
+        module['imported_by'] = parent_at_depth.get(module['depth'] - 1)
+        parent_at_depth[module['depth']] = module['module']
+
+    # "from paquete import modulo" añade una segunda línea casi vacía del mismo módulo
+    unique = {}
+    for module in modules:
+        if module['module'] not in unique or module['cumulative_ms'] > unique[module['module']]['cumulative_ms']:
+            unique[module['module']] = module
+    return list(unique.values())
+
+
+def profile_imports(workdir):
+    """Coste de importar main.py en frío, módulo a módulo"""
+    result, wall = _run_cold(['-X', 'importtime', '-c', 'import main'], workdir)
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar main:\n{result.stderr[-2000:]}")
+
+    modules = parse_importtime(result.stderr)
+    main_module = next((m for m in modules if m['module'] == 'main'), None)
+    return {
+        'process_s': round(wall, 3),
+        'import_main_ms': main_module['cumulative_ms'] if main_module else None,
+        'project_self_ms': round(sum(m['self_ms'] for m in modules if m['project']), 2),
+        'third_party_self_ms': round(sum(m['self_ms'] for m in modules if not m['project']), 2),
+        'modules': modules,
+    }
+
+
+def startup_probe():
+    """
+    Se ejecuta en el proceso hijo: arranca el bot contra la API falsa y
+    mide cada fase hasta la primera respuesta. Imprime el resultado en JSON.
+    """
+    phases = {}
+    clock = time.perf_counter()
+
+    def mark(name):
+        nonlocal clock
+        now = time.perf_counter()
+        phases[name] = round((now - clock) * 1000, 2)
+        clock = now
+
+    from main import ProductivityBot
+    from benchmarks.fake_telegram import FakeTelegramAPI, FakeRequest
+    from telegram import Update
     import config
-    print("   ✅ config OK")
-except Exception as e:
-    print(f"   ❌ Error: {e}")
-    exit(1)
-
-try:
-    print("2️⃣ Importando database...")
-    from database.models import DatabaseManager, Project, Task, Note
-    print("   ✅ database OK")
-except Exception as e:
-    print(f"   ❌ Error: {e}")
-    exit(1)
-
-try:
-    print("3️⃣ Importando utils...")
-    from utils.keyboards import get_main_keyboard
-    from utils.formatters import format_dashboard
-    from utils.reminders import ReminderSystem
-    print("   ✅ utils OK")
-except Exception as e:
-    print(f"   ❌ Error: {e}")
-    exit(1)
-
-try:
-    print("4️⃣ Importando handlers...")
-    from handlers import menu
-    print("   ✅ menu OK")
-    from handlers import projects
-    print("   ✅ projects OK")
-    from handlers import tasks
-    print("   ✅ tasks OK")
-    from handlers import notes
-    print("   ✅ notes OK")
-    from handlers import dashboard
-    print("   ✅ dashboard OK")
-    from handlers import settings
-    print("   ✅ settings OK")
-    from handlers import task_conversations
-    print("   ✅ task_conversations OK")
-except Exception as e:
-    print(f"   ❌ Error: {e}")
-    exit(1)
-
-print()
-print("=" * 50)
-print("✅ TODAS LAS IMPORTACIONES CORRECTAS")
-print("=" * 50)
-print()
-print("El bot está listo para ejecutarse con:")
-print("   python main.py")
-print()
+    mark('import_main')
+
+    config.HANDLER_PRELOAD = False  # Medir la carga bajo demanda, sin el hilo de precarga
+    api = FakeTelegramAPI()
+    bot = ProductivityBot(request=FakeRequest(api))
+    mark('bot_init')
+
+    bot.setup_handlers()
+    mark('setup_handlers')
+
+    async def first_responses():
+        bot.setup_reminders()
+        mark('setup_reminders')
+
+        await bot.app.initialize()
+        mark('initialize')
+
+        user_id = config.AUTHORIZED_USER_ID
+        await bot.app.process_update(Update.de_json(api.message_update(user_id, "/start"), bot.app.bot))
+        mark('first_response')
+
+        await bot.app.process_update(Update.de_json(api.callback_update(user_id, "menu_tasks"), bot.app.bot))
+        mark('first_click')
+
+        await bot.app.process_update(Update.de_json(api.callback_update(user_id, "menu_tasks"), bot.app.bot))
+        mark('second_click')
+
+        bot.scheduler.shutdown(wait=False)
+        await bot.app.shutdown()
+
+    asyncio.run(first_responses())
+    print("STARTUP_PROBE " + json.dumps(phases))
+
+
+def profile_startup(workdir):
+    result, wall = _run_cold([os.path.join(ROOT, 'verify_imports.py'), '--startup-probe'], workdir)
+    for line in result.stdout.splitlines():
+        if line.startswith("STARTUP_PROBE "):
+            phases = json.loads(line[len("STARTUP_PROBE "):])
+            return {'process_s': round(wall, 3), 'phases_ms': phases}
+    raise RuntimeError(f"El arranque de prueba falló:\n{result.stderr[-2000:]}")
+
+
+def print_profile(imports, startup, top):
+    print("⏱️ Perfil de arranque (en frío, proceso nuevo)")
+    print()
+    print(f"📦 import main: {imports['import_main_ms']:.1f} ms "
+          f"(proyecto {imports['project_self_ms']:.1f} ms · dependencias {imports['third_party_self_ms']:.1f} ms)")
+
+    modules = imports['modules']
+    print(f"\n   Módulos del proyecto (acumulado / propio):")
+    for module in sorted((m for m in modules if m['project']), key=lambda m: m['cumulative_ms'], reverse=True)[:top]:
+        print(f"   {module['cumulative_ms']:>8.1f} ms {module['self_ms']:>8.1f} ms   {module['module']}")
+
+    print(f"\n   Dependencias más caras (importadas directamente por el proyecto):")
+    project_modules = {m['module'] for m in modules if m['project']}
+    direct = [m for m in modules if not m['project'] and m['imported_by'] in project_modules]
+    for module in sorted(direct, key=lambda m: m['cumulative_ms'], reverse=True)[:top]:
+        print(f"   {module['cumulative_ms']:>8.1f} ms   {module['module']}")
+
+    print(f"\n🚀 Hasta la primera respuesta (proceso completo {startup['process_s'] * 1000:.0f} ms):")
+    phases = startup['phases_ms']
+    for name, ms in phases.items():
+        print(f"   {name:<18} {ms:>8.1f} ms")
+
+    until_first = sum(ms for name, ms in phases.items() if name not in ('first_click', 'second_click'))
+    print(f"   {'= primera respuesta':<18} {until_first:>8.1f} ms (sin contar el arranque del intérprete)")
+    print()
+
+
+def profile(top=15, output=None):
+    workdir = tempfile.mkdtemp(prefix="cortana_startup_")
+    try:
+        imports = profile_imports(workdir)
+        startup = profile_startup(workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_profile(imports, startup, top)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({'imports': imports, 'startup': startup}, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados en {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica las importaciones o mide el coste del arranque")
+    parser.add_argument('--profile', action='store_true', help="Medir el arranque en frío por módulo y fase")
+    parser.add_argument('--top', type=int, default=15, help="Módulos a mostrar en cada lista")
+    parser.add_argument('--output', help="Guardar el perfil en este fichero JSON")
+    parser.add_argument('--startup-probe', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.startup_probe:
+        startup_probe()
+    elif args.profile:
+        profile(args.top, args.output)
+    else:
+        verify()
+
+
+if __name__ == "__main__":
+    main()